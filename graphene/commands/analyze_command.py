@@ -0,0 +1,54 @@
+import sys
+from enum import Enum
+import logging
+
+from graphene.commands.command import Command
+from graphene.errors import TypeDoesNotExistException
+from graphene.utils import PrettyPrinter, CmdTimer
+
+
+class AnalyzeCommand(Command):
+    """
+    Used to collect the statistics of a type, or of every type, which are
+    used to estimate the cost of queries.
+    """
+    class AnalyzeType(Enum):
+        TYPE = 1
+        RELATION = 2
+
+    def __init__(self, type_name=None, analyze_type=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.type_name = type_name
+        self.analyze_type = analyze_type
+
+        self.logger.debug("Analyzing type with name: %s" % type_name)
+
+    def __repr__(self):
+        if self.type_name is None:
+            return "[Analyze]"
+        return "[Analyze (%s) %s]" % (self.analyze_type.name, self.type_name)
+
+    def execute(self, storage_manager, output=sys.stdout, timer=CmdTimer()):
+        # Instance of pretty printer to use for all output
+        printer = PrettyPrinter()
+
+        try:
+            if self.type_name is None:
+                results = storage_manager.analyze()
+            else:
+                node_flag = self.analyze_type == AnalyzeCommand.AnalyzeType.TYPE
+                results = storage_manager.analyze(self.type_name, node_flag)
+        except TypeDoesNotExistException as e:
+            with timer.paused():
+                printer.print_error(e, output)
+            return
+
+        values = [(type_name, "type" if node_flag else "relation",
+                   stats["count"])
+                  for type_name, node_flag, stats in results]
+        with timer.paused():
+            if not values:
+                printer.print_info("No types found.\n", output)
+            else:
+                printer.print_table(values, header=("Name", "Kind", "Count"),
+                                    output=output)
@@ -0,0 +1,14 @@
+import sys
+
+from graphene.commands.command import Command
+
+class BeginCommand(Command):
+    """
+    Starts a batch: the following commands keep their changes in the caches
+    until COMMIT is run, instead of writing them after every command.
+    """
+    def __init__(self):
+        pass
+
+    def execute(self, storage_manager, output=sys.stdout, timer=None):
+        storage_manager.begin_batch()
@@ -0,0 +1,13 @@
+import sys
+
+from graphene.commands.command import Command
+
+class CommitCommand(Command):
+    """
+    Ends the batch started by BEGIN, writing its changes to the stores.
+    """
+    def __init__(self):
+        pass
+
+    def execute(self, storage_manager, output=sys.stdout, timer=None):
+        storage_manager.commit_batch()
@@ -0,0 +1,19 @@
+import sys
+
+from graphene.commands.command import Command
+
+
+class CreateIndexCommand(Command):
+    """
+    Used to create an ordered index on a property of a node type.
+    """
+    def __init__(self, type_name, prop_name):
+        self.type_name = type_name
+        self.prop_name = prop_name
+
+    def __repr__(self):
+        return "[Create (Index) Type = %s Property = %s]" % (self.type_name,
+                                                             self.prop_name)
+
+    def execute(self, storage_manager, output=sys.stdout, timer=None):
+        storage_manager.create_property_index(self.type_name, self.prop_name)
@@ -0,0 +1,14 @@
+import sys
+
+from graphene.commands.command import Command
+
+class DropIndexCommand(Command):
+    """
+    Used to delete the index on a property of a node type.
+    """
+    def __init__(self, type_name, prop_name):
+        self.type_name = type_name
+        self.prop_name = prop_name
+
+    def execute(self, storage_manager, output=sys.stdout, timer=None):
+        storage_manager.drop_property_index(self.type_name, self.prop_name)
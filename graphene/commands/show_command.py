@@ -3,7 +3,6 @@ import sys
 
 from graphene.commands.command import Command
 from graphene.utils import PrettyPrinter, CmdTimer
-from graphene.storage import GeneralStore
 from graphene.storage import StorageManager
 
 class ShowCommand(Command):
@@ -38,17 +37,14 @@ class ShowCommand(Command):
         type_manager = type_managers[self.show_type]
         type_name_manager = type_name_managers[self.show_type]
 
-        # Loop through the types and read their names into a list.
-        i = 1
+        # Loop through the types (read in chunks) and read their names into
+        # a list.
         name_list = []
-        while True:
-            cur_type = type_manager.get_item_at_index(i)
-            if cur_type is GeneralStore.EOF:
-                break
+        for cur_type in type_manager.scan_items():
             if cur_type is not None:
-                type_name = type_name_manager.read_string_at_index(i)
+                type_name = type_name_manager.read_string_at_index(
+                    cur_type.nameId)
                 name_list.append(type_name)
-            i += 1
 
         with timer.paused():
             # Print the resulting name list.
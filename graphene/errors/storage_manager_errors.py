@@ -14,3 +14,15 @@ class TypeDoesNotExistException(Exception):
 class TypeMismatchException(Exception):
     """Error for attempting to store the incorrect data type for a property."""
     pass
+
+class NoBatchStartedException(Exception):
+    """Error for committing a batch when no batch was started."""
+    pass
+
+class IndexAlreadyExistsException(Exception):
+    """Error for creating an index on a property that is already indexed."""
+    pass
+
+class IndexDoesNotExistException(Exception):
+    """Error for dropping an index that does not exist."""
+    pass
@@ -17,7 +17,8 @@ stmt
   : ( c=match_stmt
     | c=create_stmt | c=drop_stmt
     | c=exit_stmt
-    | c=show_stmt | c=desc_stmt
+    | c=begin_stmt | c=commit_stmt
+    | c=show_stmt | c=desc_stmt | c=analyze_stmt
     | c=insert_stmt | c=delete_stmt | c=update_stmt
     | c=alter_stmt
     )
@@ -29,6 +30,18 @@ exit_stmt returns [cmd]
   {$cmd = ExitCommand()}
   ;
 
+// BEGIN command
+begin_stmt returns [cmd]
+  : K_BEGIN
+  {$cmd = BeginCommand()}
+  ;
+
+// COMMIT command
+commit_stmt returns [cmd]
+  : K_COMMIT
+  {$cmd = CommitCommand()}
+  ;
+
 // MATCH command
 match_stmt returns [cmd]
   @init {$cmd = None}
@@ -157,12 +170,15 @@ create_stmt returns [cmd]
   @init {$cmd = None}
   : K_CREATE ( ct=create_type
              | cr=create_relation
+             | ci=create_index
              )
   {
 if $ct.ctx is not None:
     $cmd = CreateTypeCommand($ct.ctx)
-else:
+elif $cr.ctx is not None:
     $cmd = CreateRelationCommand($cr.ctx)
+else:
+    $cmd = CreateIndexCommand($ci.ctx.t, $ci.ctx.n)
   }
   ;
 
@@ -192,6 +208,10 @@ create_relation
     (r=(I_RELATION|I_TYPE) {$r.text.isupper()}? {$r=$r.text})
     ('(' (tl=type_list)? ')')?;
 
+create_index
+  : K_INDEX K_ON (t=I_TYPE {$t=$t.text}) '(' (n=I_NAME {$n=$n.text}) ')'
+  ;
+
 // ALTER command
 alter_stmt returns [cmd]
   @init {$cmd = None}
@@ -255,12 +275,15 @@ drop_stmt returns [cmd]
   @init {$cmd = None}
   : K_DROP ( dt=drop_type
            | dr=drop_relation
+           | di=drop_index
            )
 {
 if $dt.ctx is not None:
     $cmd = DropTypeCommand($dt.ctx)
 if $dr.ctx is not None:
     $cmd = DropRelationCommand($dr.ctx)
+if $di.ctx is not None:
+    $cmd = DropIndexCommand($di.ctx.t, $di.ctx.n)
 }
   ;
 
@@ -272,6 +295,10 @@ drop_relation
   : K_RELATION (t=(I_RELATION|I_TYPE) {$t.text.isupper()}? {$t=$t.text})
   ;
 
+drop_index
+  : K_INDEX K_ON (t=I_TYPE {$t=$t.text}) '(' (n=I_NAME {$n=$n.text}) ')'
+  ;
+
 // DELETE command
 delete_stmt returns [cmd]
   @init {$cmd = None}
@@ -362,6 +389,18 @@ desc_stmt returns [cmd]
   {$cmd = DescCommand($t.ctx, desc_t)}
   ;
 
+// ANALYZE command
+analyze_stmt returns [cmd]
+  @init {
+$cmd = None
+name = None
+analyze_t = None
+}
+  : K_ANALYZE ((t=desc_type {name = $t.ctx; analyze_t = AnalyzeCommand.AnalyzeType.TYPE})
+              | (t=desc_relation {name = $t.ctx; analyze_t = AnalyzeCommand.AnalyzeType.RELATION}))?
+  {$cmd = AnalyzeCommand(name, analyze_t)}
+  ;
+
 desc_type
   : K_TYPE (t=I_TYPE {$t=$t.text})
   {return $t}
@@ -452,8 +491,11 @@ K_DELETE : D E L E T E ;
 K_DROP : D R O P ;
 K_EXIT : E X I T ;
 K_QUIT : Q U I T ;
+K_BEGIN : B E G I N ;
+K_COMMIT : C O M M I T ;
 K_SHOW : S H O W ;
 K_DESC : D E S C ;
+K_ANALYZE : A N A L Y Z E ;
 K_INSERT : I N S E R T ;
 K_UPDATE : U P D A T E ;
 K_SET : S E T ;
@@ -463,6 +505,8 @@ K_RELATION : R E L A T I O N ;
 K_NODE : N O D E ;
 K_TYPES : T Y P E S ;
 K_RELATIONS : R E L A T I O N S ;
+K_INDEX : I N D E X ;
+K_ON : O N ;
 
 K_ADD : A D D ;
 K_CHANGE : C H A N G E ;
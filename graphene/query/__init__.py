@@ -1 +1,2 @@
 from project_stream import ProjectStream
+from access_path import AccessPath
@@ -0,0 +1,79 @@
+from enum import Enum
+
+
+class AccessPath:
+    """
+    Way the nodes of a NodeIterator are read, as chosen by the QueryPlanner:
+    either every node of the type, or only the nodes found through one or
+    more property indexes (the queries of the iterator are tested on them
+    either way).
+    """
+    class AccessType(Enum):
+        # Every node of the type is read
+        FULL_SCAN = 1
+        # Nodes equal to a value, from a single index
+        INDEX_SEEK = 2
+        # Nodes in a range of values, from a single index
+        INDEX_RANGE_SCAN = 3
+        # Nodes found in every one of several indexes
+        INDEX_INTERSECTION = 4
+
+    def __init__(self, access_type, lookups=None, estimate=0, cost=0):
+        """
+        Creates an access path
+
+        :param access_type: Type of the access path
+        :type access_type: AccessType
+        :param lookups: (property name, property index, predicates) triples,
+                        predicates being (operator, value) pairs answered by
+                        the index. Empty for a full scan.
+        :type lookups: list[tuple]
+        :param estimate: Estimated number of nodes read
+        :type estimate: int
+        :param cost: Estimated cost of reading them
+        :type cost: float
+        :return: Access path instance
+        :rtype: AccessPath
+        """
+        self.type = access_type
+        if lookups is None:
+            lookups = []
+        self.lookups = lookups
+        self.estimate = estimate
+        self.cost = cost
+
+    def __repr__(self):
+        predicates = ", ".join("%s %s %s" % (name, oper, value)
+                               for name, _, preds in self.lookups
+                               for oper, value in preds)
+        if predicates:
+            return "AccessPath[%s: %s]" % (self.type.name, predicates)
+        return "AccessPath[%s]" % self.type.name
+
+    def uses_index(self):
+        """
+        Whether the nodes are found through property indexes
+
+        :return: False for a full scan, True otherwise
+        :rtype: bool
+        """
+        return self.type != AccessPath.AccessType.FULL_SCAN
+
+    def node_indexes(self):
+        """
+        Gets the indexes of the nodes to read
+
+        :return: Indexes of the nodes in order, None for a full scan
+        :rtype: list[int]
+        """
+        if not self.uses_index():
+            return None
+        nodes = None
+        for _, prop_index, predicates in self.lookups:
+            found = prop_index.lookup_all(predicates)
+            if nodes is None:
+                nodes = found
+            else:
+                found = set(found)
+                nodes = [index for index in nodes if index in found]
+        return nodes
@@ -1,6 +1,8 @@
 from graphene.traversal import *
-from graphene.query import ProjectStream
-from graphene.expressions import MatchNode, MatchRelation
+from graphene.query import ProjectStream, AccessPath
+from graphene.expressions import MatchNode, MatchRelation, AndOperator, \
+    OrOperator
+from graphene.storage import PropertyIndex, Statistics
 from graphene.errors import *
 
 class PlannerErrors:
@@ -34,6 +36,30 @@ class PlannerErrors:
         return DuplicatePropertyException(msg % name)
 
 class QueryPlanner:
+    # Estimated cost of reading a node (and its properties)
+    NODE_READ_COST = 1.0
+    # Estimated cost of reading an entry of a property index, which is kept
+    # in memory
+    INDEX_ENTRY_COST = 0.1
+    # Estimated cost of reading a relation (and its properties)
+    RELATION_READ_COST = 1.0
+    # Estimated cost of adding a result to the hash table of a hash join
+    HASH_ENTRY_COST = 0.1
+    # Estimated cost of writing a result of a hash join to a temporary file
+    # and reading it back, when the hash table does not fit in memory
+    SPILL_ROW_COST = 2.0
+
+    # Estimated selectivities of the comparisons of properties that have
+    # neither statistics nor an index: equalities (inequalities being their
+    # complement), range comparisons, and any other operator
+    EQUALITY_SELECTIVITY = 0.1
+    RANGE_SELECTIVITY = 1 / 3.0
+    DEFAULT_SELECTIVITY = 0.5
+
+    # Relative difference of cost under which plans are considered as cheap,
+    # so that the order of the chain is kept
+    COST_TOLERANCE = 1e-9
+
     def __init__(self, storage_manager):
         self.sm = storage_manager
 
@@ -172,7 +198,343 @@ class QueryPlanner:
         if query is not None:
             query.apply_to(iter_tree)
 
-        return iter_tree
+        # Decide how the nodes of each leaf are read, now that their queries
+        # are known
+        self.plan_access_paths(iter_tree)
+
+        # Decide in which order and direction the relations are followed
+        return self.order_joins(iter_tree)
+
+    def plan_access_paths(self, tree):
+        """
+        Chooses the access path of every leaf (NodeIterator) of the given
+        traversal tree.
+        """
+        if isinstance(tree, NodeIterator):
+            tree.access_path = self.choose_access_path(tree)
+        else:
+            self.plan_access_paths(tree.left)
+            self.plan_access_paths(tree.right)
+
+    def choose_access_path(self, node_iter):
+        """
+        Chooses how the nodes of the given node iterator are read: a full scan
+        of the type, or the nodes found through the property indexes that
+        answer its predicates. An index answers all the predicates on its
+        property at once (an equality is a seek, bounds are a range scan).
+        Indexes are used from the most selective one, and another one is only
+        intersected with them while that lowers the estimated cost, the
+        selectivities of different properties being assumed independent.
+        """
+        total = self.sm.count_nodes_of_type(node_iter.node_type)
+        full_scan = AccessPath(AccessPath.AccessType.FULL_SCAN,
+                               estimate=total,
+                               cost=total * self.NODE_READ_COST)
+
+        # Number of nodes matched by each index, which is exact
+        candidates = []
+        for name, predicates in self.get_sargable_predicates(node_iter):
+            prop_index = self.sm.get_property_index(node_iter.node_type, name)
+            if prop_index is not None:
+                matched = prop_index.count_all(predicates)
+                candidates.append((matched, name, prop_index, predicates))
+        if not candidates:
+            return full_scan
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        entries = 0
+        estimate = total
+        cost = None
+        lookups = []
+        for matched, name, prop_index, predicates in candidates:
+            new_entries = entries + matched
+            new_estimate = estimate * matched / float(max(total, 1))
+            new_cost = new_entries * self.INDEX_ENTRY_COST + \
+                new_estimate * self.NODE_READ_COST
+            if cost is not None and new_cost >= cost:
+                break
+            entries, estimate, cost = new_entries, new_estimate, new_cost
+            lookups.append((name, prop_index, predicates))
+
+        if cost >= full_scan.cost:
+            return full_scan
+        if len(lookups) > 1:
+            access_type = AccessPath.AccessType.INDEX_INTERSECTION
+        elif all(oper == "=" for oper, value in lookups[0][2]):
+            access_type = AccessPath.AccessType.INDEX_SEEK
+        else:
+            access_type = AccessPath.AccessType.INDEX_RANGE_SCAN
+        return AccessPath(access_type, lookups, int(round(estimate)), cost)
+
+    def order_joins(self, tree):
+        """
+        Chooses the order in which the relations of a chain are followed, and
+        the direction each one is followed in, by dynamic programming over the
+        spans of the chain: a span is matched from a shorter one by following
+        a relation forward from its last node, or backward from its first
+        node. The chain is thus started from its cheapest node to start from,
+        usually the most selective one, whatever its position. Each relation
+        is matched with the results of the shorter span in the cheapest way
+        (see RelationIterator.JoinType): followed from each result, found by
+        a scan of the relations of its type (from a single node iterator), or
+        through a hash join of the results with that scan.
+
+        Costs are estimated from the statistics collected by ANALYZE, or from
+        the numbers of nodes and relations of each type and default
+        selectivities for the types that were not analyzed. The tree is
+        rebuilt in the cheapest order; the queries spanning several nodes and
+        relations are applied to it again, since its subtrees changed.
+        """
+        if isinstance(tree, NodeIterator):
+            return tree
+        leaves, rels, queries = self.flatten_chain(tree)
+
+        # Best (cost, number of results, step) of each span of the chain
+        best = {}
+        for i, leaf in enumerate(leaves):
+            best[(i, i)] = self.estimate_leaf(leaf) + (None,)
+        for length in xrange(2, len(leaves) + 1):
+            for i in xrange(len(leaves) - length + 1):
+                j = i + length - 1
+                # Following the relations in the order of the chain is kept
+                # unless the other direction is cheaper
+                plan = self.estimate_join(best, leaves, rels, i, j, False)
+                other = self.estimate_join(best, leaves, rels, i, j, True)
+                if self.is_cheaper(other[0], plan[0]):
+                    plan = other
+                best[(i, j)] = plan
+
+        tree = self.build_chain(best, leaves, rels, 0, len(leaves) - 1)
+        for query in queries:
+            query.apply_to(tree)
+        return tree
+
+    def flatten_chain(self, tree):
+        """
+        PRIVATE METHOD.
+        Splits a traversal tree built in the order of the chain into the node
+        iterators and relation iterators of the chain, in order, and the
+        queries spanning several of them.
+
+        :return: Node iterators, relation iterators, and queries
+        :rtype: tuple
+        """
+        leaves = []
+        rels = []
+        queries = []
+        while isinstance(tree, RelationIterator):
+            leaves.append(tree.right)
+            rels.append(tree)
+            if tree.queries is not None:
+                queries.append(tree.queries)
+            tree = tree.left
+        leaves.append(tree)
+        leaves.reverse()
+        rels.reverse()
+        return leaves, rels, queries
+
+    def build_chain(self, best, leaves, rels, i, j):
+        """
+        PRIVATE METHOD.
+        Builds the traversal tree of the given span of the chain, as planned,
+        by linking its iterators again
+
+        :return: Traversal tree of the span
+        """
+        step = best[(i, j)][2]
+        if step is None:
+            return leaves[i]
+        reverse, join_type = step
+        if reverse:
+            rel, left, right = rels[i], self.build_chain(
+                best, leaves, rels, i + 1, j), leaves[i]
+        else:
+            rel, left, right = rels[j - 1], self.build_chain(
+                best, leaves, rels, i, j - 1), leaves[j]
+        rel.left, rel.right = left, right
+        rel.reverse, rel.join_type = reverse, join_type
+        # Queries spanning several iterators are applied again to the tree
+        rel.queries = None
+        return rel
+
+    def estimate_leaf(self, node_iter):
+        """
+        PRIVATE METHOD.
+        Estimates the cost of reading the nodes of a node iterator, and the
+        number of nodes matching its queries
+
+        :return: Cost and number of nodes
+        :rtype: tuple
+        """
+        total = self.sm.count_nodes_of_type(node_iter.node_type)
+        if node_iter.access_path is not None:
+            cost = node_iter.access_path.cost
+        else:
+            cost = total * self.NODE_READ_COST
+        matched = total * self.estimate_selectivity(
+            node_iter.queries, node_iter.node_type, True)
+        return cost, matched
+
+    def estimate_join(self, best, leaves, rels, i, j, reverse):
+        """
+        PRIVATE METHOD.
+        Estimates the cost of matching the given span of the chain by
+        following a relation from the best plan of a shorter span: forward
+        from its last node, or backward from its first node.
+
+        :return: Cost, number of results, and step (whether the relation is
+                 followed backward, and how it is matched with the results of
+                 the shorter span)
+        :rtype: tuple
+        """
+        if reverse:
+            span, rel, node, end = (i + 1, j), rels[i], leaves[i], leaves[i + 1]
+            key = Statistics.IN_DEGREE
+        else:
+            span, rel, node, end = (i, j - 1), rels[j - 1], leaves[j], \
+                leaves[j - 1]
+            key = Statistics.OUT_DEGREE
+        span_cost, span_matched, _ = best[span]
+
+        relations = self.sm.count_relations_of_type(rel.rel_type)
+        # Mean number of relations of the type of a node at the end of the
+        # span, in the direction they are followed
+        nodes = self.sm.count_nodes_of_type(end.node_type)
+        stats = self.sm.get_statistics(rel.rel_type, False)
+        if stats is not None:
+            # Mean degree of the nodes that have such relations, weighted by
+            # the fraction of the nodes that have some
+            with_relations = min(stats[key]["nodes"] / float(max(nodes, 1)),
+                                 1.0)
+            fanout = Statistics.mean_degree(stats, key) * with_relations
+        else:
+            fanout = relations / float(max(nodes, 1))
+
+        selectivity = self.estimate_selectivity(rel.rel_queries,
+                                                rel.rel_type, False) * \
+            self.estimate_selectivity(node.queries, node.node_type, True)
+        matched = span_matched * fanout * selectivity
+
+        # Following the relations of each result reads their right nodes
+        # again for every result
+        join_type = RelationIterator.JoinType.EXPAND
+        cost = span_cost + span_matched * fanout * \
+            (self.INDEX_ENTRY_COST + self.RELATION_READ_COST +
+             self.NODE_READ_COST)
+        # A hash join reads each relation and right node once
+        hash_cost = span_cost + span_matched * self.HASH_ENTRY_COST + \
+            relations * self.RELATION_READ_COST + \
+            min(relations, span_matched * fanout) * self.NODE_READ_COST
+        if span_matched > RelationIterator.HASH_JOIN_MAX_ROWS:
+            hash_cost += span_matched * self.SPILL_ROW_COST
+        if self.is_cheaper(hash_cost, cost):
+            join_type, cost = RelationIterator.JoinType.HASH_JOIN, hash_cost
+        if span[0] == span[1]:
+            # From a single node iterator, the relations may be scanned
+            # instead, reading the nodes at both of their ends
+            scan_cost = relations * (self.RELATION_READ_COST +
+                                     2 * self.NODE_READ_COST)
+            if self.is_cheaper(scan_cost, cost):
+                join_type, cost = RelationIterator.JoinType.SCAN, scan_cost
+        return cost, matched, (reverse, join_type)
+
+    def estimate_selectivity(self, queries, item_type, node_flag):
+        """
+        Estimates the fraction of the nodes or relations of a type matched by
+        the given queries, the queries being assumed independent
+
+        :param queries: Queries on the items of the type, None for no query
+        :param item_type: Node or relation type
+        :type item_type: GeneralType
+        :param node_flag: Whether the type is a node type (True) or a relation
+                          type (False)
+        :type node_flag: bool
+        :return: Estimated fraction of the items, between 0 and 1
+        :rtype: float
+        """
+        if queries is None:
+            return 1.0
+        if isinstance(queries, AndOperator):
+            return reduce(lambda total, child: total * self.estimate_selectivity(
+                child, item_type, node_flag), queries.children, 1.0)
+        if isinstance(queries, OrOperator):
+            return 1.0 - reduce(lambda total, child: total * (
+                1.0 - self.estimate_selectivity(child, item_type, node_flag)),
+                queries.children, 1.0)
+        return self.estimate_predicate(queries, item_type, node_flag)
+
+    def estimate_predicate(self, query, item_type, node_flag):
+        """
+        PRIVATE METHOD.
+        Estimates the fraction of the items of a type matched by a single
+        comparison: exactly from the index of its property if there is one,
+        otherwise from the statistics of the property, otherwise from default
+        selectivities
+
+        :return: Estimated fraction of the items, between 0 and 1
+        :rtype: float
+        """
+        if type(query.value) is not tuple:
+            prop_index = None
+            if node_flag and query.oper in PropertyIndex.OPERATORS:
+                prop_index = self.sm.get_property_index(item_type, query.name)
+            if prop_index is not None:
+                return prop_index.count(query.oper, query.value) / \
+                    float(max(len(prop_index), 1))
+            prop_stats = self.sm.get_property_statistics(item_type, query.name,
+                                                         node_flag)
+            if prop_stats is not None:
+                selectivity = Statistics.selectivity(prop_stats, query.oper,
+                                                     query.value)
+                if selectivity is not None:
+                    return selectivity
+        if query.oper == "=":
+            return self.EQUALITY_SELECTIVITY
+        elif query.oper == "!=":
+            return 1.0 - self.EQUALITY_SELECTIVITY
+        elif query.oper in Statistics.OPERATORS:
+            return self.RANGE_SELECTIVITY
+        return self.DEFAULT_SELECTIVITY
+
+    def is_cheaper(self, cost, other_cost):
+        """
+        PRIVATE METHOD.
+        Whether a cost is lower than another one, beyond rounding errors
+
+        :rtype: bool
+        """
+        return cost < other_cost * (1 - self.COST_TOLERANCE)
+
+    def get_sargable_predicates(self, node_iter):
+        """
+        Gets the predicates of the given node iterator that an index on their
+        property can answer: comparisons of one of its properties to a value,
+        which are ANDed with the rest of its queries.
+
+        :return: (property name, [(operator, value), ...]) pairs, in the order
+                 the properties are first compared
+        :rtype: list[tuple]
+        """
+        if isinstance(node_iter.queries, Query):
+            queries = [node_iter.queries]
+        elif isinstance(node_iter.queries, AndOperator):
+            queries = node_iter.queries.children
+        else:
+            # ORs cannot be answered by a single index
+            return []
+        names = []
+        predicates = {}
+        for query in queries:
+            if not isinstance(query, Query) or type(query.value) is tuple or \
+               query.oper not in PropertyIndex.OPERATORS:
+                continue
+            if query.ident is not None and query.ident != node_iter.alias:
+                continue
+            if query.name not in predicates:
+                names.append(query.name)
+            predicates.setdefault(query.name, []).append(
+                (query.oper, query.value))
+        return [(name, predicates[name]) for name in names]
 
     def get_orderby_indexes(self, schema, chain):
         schema_names = [name for name, ttype in schema]
@@ -247,8 +609,8 @@ class QueryPlanner:
         results = []
 
         # TODO: Make it so NodeIterator and RelationIterator return same
-        # kind of thing (i.e. RI returns (props, rightNode), NI returns a
-        # NodeProperty instance)
+        # kind of thing (i.e. RI returns (props, firstNode, lastNode), NI
+        # returns a NodeProperty instance)
         i = 0
         if len(node_chain) == 1:
             # Node iterator returns slightly diff. struct. than Rel. iterator
@@ -258,7 +620,7 @@ class QueryPlanner:
                 results.append(nodeprop.properties)
                 i += 1
         else:
-            for props, right in iter_tree:
+            for props, first, last in iter_tree:
                 if limit > 0 and i >= limit:
                     break
                 results.append(props)
@@ -2,6 +2,7 @@ from base.string import String
 from base.node import Node
 from base.property import Property
 from base.relationship import Relationship
+from base.row import Row
 
 from base.graphene_store import GrapheneStore
 from base.general_store import GeneralStore
@@ -12,5 +13,8 @@ from base.relationship_store import RelationshipStore
 from base.relationship_type_store import RelationshipTypeStore
 from base.general_type_store import GeneralTypeStore
 from base.general_type_type_store import GeneralTypeTypeStore
+from base.row_store import RowStore
+from base.property_index import PropertyIndex
+from base.statistics import Statistics
 
 from storage_manager import StorageManager
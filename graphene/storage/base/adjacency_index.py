@@ -0,0 +1,319 @@
+import struct
+from collections import OrderedDict
+
+from graphene.storage.base.persistent_index import PersistentIndex
+
+
+class AdjacencyIndex(PersistentIndex):
+    """
+    Persistent adjacency index of the relationships, in the spirit of a
+    compressed sparse row layout: the relationships of each node are kept
+    contiguously, grouped by relationship type and direction, as a flat list
+    of (relationship index, index of the other node) pairs. The neighborhood
+    of a node is read from a single list instead of following the linked
+    lists of the RelationshipStore (see PersistentIndex for how the file is
+    kept up to date).
+
+    Once the degree of a node passes DENSE_NODE_DEGREE, the node is dense:
+    its groups become ordered dicts from relationship index to other node
+    index, so that relationships of hub nodes are added and removed in
+    constant time instead of being searched for in very long lists. A node
+    stays dense as long as it has relationships.
+    """
+
+    # Direction of the relationships of a group, as seen from the node
+    OUTGOING = 0
+    ''':type: int'''
+    INCOMING = 1
+    ''':type: int'''
+
+    # Degree past which the groups of a node are kept as ordered dicts
+    DENSE_NODE_DEGREE = 256
+    ''':type: int'''
+
+    # Per group: node index, relationship type, direction, number of
+    # relationships
+    GROUP_STRUCT = struct.Struct(PersistentIndex.ENDIAN_FORMAT_STR + "IIBI")
+    ''':type: struct.Struct'''
+
+    def __init__(self, filename, logged=False):
+        """
+        Creates an AdjacencyIndex instance, loading the index from the given
+        file
+
+        :param filename: Name of the index file
+        :type filename: str
+        :param logged: Whether the changes to the store are logged
+        :type logged: bool
+        :return: Adjacency index instance
+        :rtype: AdjacencyIndex
+        """
+        super(AdjacencyIndex, self).__init__(filename, logged)
+
+    def add(self, index, rel_type, first_node_id, second_node_id):
+        """
+        Adds the given relationship to the outgoing relationships of its first
+        node and the incoming relationships of its second node
+
+        :param index: Index of the relationship
+        :type index: int
+        :param rel_type: Index of the relationship type
+        :type rel_type: int
+        :param first_node_id: Index of the first (source) node
+        :type first_node_id: int
+        :param second_node_id: Index of the second (destination) node
+        :type second_node_id: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.insert(first_node_id, rel_type, self.OUTGOING, index,
+                    second_node_id)
+        self.insert(second_node_id, rel_type, self.INCOMING, index,
+                    first_node_id)
+        self.changed()
+
+    def remove(self, index, rel_type, first_node_id, second_node_id):
+        """
+        Removes the given relationship from the relationships of its nodes
+
+        :param index: Index of the relationship
+        :type index: int
+        :param rel_type: Index of the relationship type
+        :type rel_type: int
+        :param first_node_id: Index of the first (source) node
+        :type first_node_id: int
+        :param second_node_id: Index of the second (destination) node
+        :type second_node_id: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.delete(first_node_id, rel_type, self.OUTGOING, index)
+        self.delete(second_node_id, rel_type, self.INCOMING, index)
+        self.changed()
+
+    def get_relations(self, node_index, rel_type=None, direction=None):
+        """
+        Gets the relationships of the given node, optionally only those of the
+        given type and/or direction
+
+        :param node_index: Index of the node
+        :type node_index: int
+        :param rel_type: Index of the relationship type, None for all types
+        :type rel_type: int
+        :param direction: OUTGOING or INCOMING, None for both
+        :type direction: int
+        :return: (relationship index, other node index) pairs, grouped by type
+                 and direction, oldest relationship first within a group
+        :rtype: list[tuple]
+        """
+        node_groups = self.groups.get(node_index)
+        if not node_groups:
+            return []
+        # Only the matching group is read
+        if rel_type is not None and direction is not None:
+            return self.group_pairs(node_groups.get((rel_type, direction), []))
+        pairs = []
+        for rel_type_index, group_direction in sorted(node_groups):
+            if rel_type is not None and rel_type_index != rel_type:
+                continue
+            if direction is not None and group_direction != direction:
+                continue
+            group = node_groups[(rel_type_index, group_direction)]
+            pairs.extend(self.group_pairs(group))
+        return pairs
+
+    def degree(self, node_index, rel_type=None, direction=None):
+        """
+        Gets the number of relationships of the given node, optionally only
+        those of the given type and/or direction
+
+        :param node_index: Index of the node
+        :type node_index: int
+        :param rel_type: Index of the relationship type, None for all types
+        :type rel_type: int
+        :param direction: OUTGOING or INCOMING, None for both
+        :type direction: int
+        :return: Number of relationships
+        :rtype: int
+        """
+        node_groups = self.groups.get(node_index)
+        if not node_groups:
+            return 0
+        return self.node_degree(node_groups, rel_type, direction)
+
+    def rebuild(self, relationships):
+        """
+        Replaces the whole index with the given relationships
+
+        :param relationships: (relationship index, type index, first node
+                              index, second node index) tuples, in any order
+        :type relationships: iterable
+        :return: Nothing
+        :rtype: None
+        """
+        self.reset()
+        for index, rel_type, first_node_id, second_node_id in \
+                sorted(relationships):
+            self.insert(first_node_id, rel_type, self.OUTGOING, index,
+                        second_node_id)
+            self.insert(second_node_id, rel_type, self.INCOMING, index,
+                        first_node_id)
+        self.clean = True
+        self.changed()
+
+    def insert(self, node_index, rel_type, direction, index, other_node_id):
+        """
+        PRIVATE METHOD.
+        Appends a relationship to a group, without marking the index as
+        changed
+
+        :return: Nothing
+        :rtype: None
+        """
+        node_groups = self.groups.setdefault(node_index, {})
+        if node_index in self.dense:
+            node_groups.setdefault((rel_type, direction),
+                                   OrderedDict())[index] = other_node_id
+            return
+        group = node_groups.setdefault((rel_type, direction), [])
+        group.append(index)
+        group.append(other_node_id)
+        if self.node_degree(node_groups) > self.DENSE_NODE_DEGREE:
+            self.make_dense(node_index)
+
+    def delete(self, node_index, rel_type, direction, index):
+        """
+        PRIVATE METHOD.
+        Deletes a relationship from a group, dropping the group (and the node)
+        once it is empty, without marking the index as changed
+
+        :return: Nothing
+        :rtype: None
+        """
+        node_groups = self.groups.get(node_index)
+        if not node_groups:
+            return
+        group = node_groups.get((rel_type, direction))
+        if not group:
+            return
+        if node_index in self.dense:
+            group.pop(index, None)
+        else:
+            for pos in xrange(0, len(group), 2):
+                if group[pos] == index:
+                    del group[pos:pos + 2]
+                    break
+        if not group:
+            del node_groups[(rel_type, direction)]
+            if not node_groups:
+                del self.groups[node_index]
+                self.dense.discard(node_index)
+
+    def make_dense(self, node_index):
+        """
+        PRIVATE METHOD.
+        Turns the groups of the given node into ordered dicts
+
+        :return: Nothing
+        :rtype: None
+        """
+        node_groups = self.groups[node_index]
+        for key, group in node_groups.items():
+            node_groups[key] = OrderedDict(self.group_pairs(group))
+        self.dense.add(node_index)
+
+    def node_degree(self, node_groups, rel_type=None, direction=None):
+        """
+        PRIVATE METHOD.
+        Number of relationships in the given groups of a node, optionally only
+        those of the given type and/or direction
+
+        :return: Number of relationships
+        :rtype: int
+        """
+        return sum(self.group_size(group)
+                   for (rel_type_index, group_direction), group
+                   in node_groups.iteritems()
+                   if (rel_type is None or rel_type_index == rel_type) and
+                   (direction is None or group_direction == direction))
+
+    @staticmethod
+    def group_pairs(group):
+        """
+        PRIVATE METHOD.
+        (relationship index, other node index) pairs of a group
+
+        :return: Pairs, oldest relationship first
+        :rtype: list[tuple]
+        """
+        if isinstance(group, OrderedDict):
+            return group.items()
+        return zip(group[::2], group[1::2])
+
+    @staticmethod
+    def group_size(group):
+        """
+        PRIVATE METHOD.
+        Number of relationships in a group
+
+        :return: Number of relationships
+        :rtype: int
+        """
+        if isinstance(group, OrderedDict):
+            return len(group)
+        return len(group) / 2
+
+    def reset(self):
+        """
+        PRIVATE METHOD.
+        Empties the index in memory
+
+        :return: Nothing
+        :rtype: None
+        """
+        # Groups of each node by node index, each group being a flat list of
+        # (relationship index, other node index) pairs by (type, direction)
+        self.groups = {}
+        # Indexes of the dense nodes
+        self.dense = set()
+
+    def read_data(self, data, offset):
+        """
+        PRIVATE METHOD.
+        Loads the groups of each node from the data of the file
+
+        :return: Nothing
+        :rtype: None
+        """
+        while offset < len(data):
+            node_index, rel_type, direction, amount = \
+                self.GROUP_STRUCT.unpack_from(data, offset)
+            offset += self.GROUP_STRUCT.size
+            items_struct = self.items_struct(2 * amount)
+            self.groups.setdefault(node_index, {})[(rel_type, direction)] = \
+                list(items_struct.unpack_from(data, offset))
+            offset += items_struct.size
+        for node_index, node_groups in self.groups.iteritems():
+            if self.node_degree(node_groups) > self.DENSE_NODE_DEGREE:
+                self.make_dense(node_index)
+
+    def write_data(self):
+        """
+        PRIVATE METHOD.
+        Packs the groups of each node, stored contiguously
+
+        :return: Packed chunks of the index
+        :rtype: list[bytes]
+        """
+        chunks = []
+        for node_index in sorted(self.groups):
+            node_groups = self.groups[node_index]
+            for rel_type, direction in sorted(node_groups):
+                group = node_groups[(rel_type, direction)]
+                if isinstance(group, OrderedDict):
+                    group = [item for pair in group.iteritems()
+                             for item in pair]
+                chunks.append(self.GROUP_STRUCT.pack(
+                    node_index, rel_type, direction, len(group) / 2))
+                chunks.append(self.items_struct(len(group)).pack(*group))
+        return chunks
@@ -1,7 +1,11 @@
 from graphene.storage.base.property import *
 
 
-class Array:
+class Array(object):
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "type", "previousBlock", "amount", "blocks",
+                 "nextBlock", "items"]
+
     def __init__(self, index=0, in_use=True,
                  array_type=Property.PropertyType.undefined, previous_block=0,
                  amount=0, blocks=0, next_block=0, items=None):
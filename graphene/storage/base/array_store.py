@@ -23,6 +23,10 @@ class ArrayStore(GeneralStore):
     HEADER_SIZE = struct.calcsize(HEADER_STRUCT_FORMAT_STR)
     ''':type int'''
 
+    # Precompiled struct for the header format
+    HEADER_STRUCT = struct.Struct(HEADER_STRUCT_FORMAT_STR)
+    ''':type struct.Struct'''
+
     # --------------- Array Types --------------- #
     # Format string to handle bool types (1 byte)
     # '?': boolean
@@ -63,6 +67,10 @@ class ArrayStore(GeneralStore):
     # Padding tuple for non-full array blocks
     PAD_TUPLE = (0,)
 
+    # Precompiled block structs, by block format string
+    BLOCK_STRUCTS = {}
+    ''':type: dict[str, struct.Struct]'''
+
     # Type stored by this class
     STORAGE_TYPE = Array
 
@@ -70,13 +78,15 @@ class ArrayStore(GeneralStore):
     FILE_NAME = "graphenestore.propertystore.array.db"
     ''':type str'''
 
-    def __init__(self, block_size=40):
+    def __init__(self, block_size=40, settings=None):
         """
         Creates an ArrayStore instance which handles reading/writing to the
         file containing array values
 
         :param block_size: Maximum size of the array block (multiple of 8)
         :type block_size: int
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: Array store instance for handling array records
         :rtype: ArrayStore
         """
@@ -90,7 +100,8 @@ class ArrayStore(GeneralStore):
         record_size = self.HEADER_SIZE + block_size
 
         # Initialize using generic base class
-        super(ArrayStore, self).__init__(self.FILE_NAME, record_size)
+        super(ArrayStore, self).__init__(self.FILE_NAME, record_size,
+                                         settings)
 
     def item_from_packed_data(self, index, packed_data):
         """
@@ -108,8 +119,7 @@ class ArrayStore(GeneralStore):
         block_data = packed_data[self.HEADER_SIZE:]
 
         # Unpack the header data using the header struct format
-        header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        unpacked_header_data = header_struct.unpack(header_data)
+        unpacked_header_data = self.HEADER_STRUCT.unpack(header_data)
 
         # Get the property header components
         in_use = unpacked_header_data[0]
@@ -141,10 +151,10 @@ class ArrayStore(GeneralStore):
         """
         # Pack the array header into a struct with the order
         # (inUse, type, previousBlock, amount, nextBlock)
-        header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        packed_header = header_struct.pack(item.inUse, item.type.value,
-                                           item.previousBlock, item.amount,
-                                           item.blocks, item.nextBlock)
+        packed_header = self.HEADER_STRUCT.pack(item.inUse, item.type.value,
+                                                item.previousBlock,
+                                                item.amount, item.blocks,
+                                                item.nextBlock)
         # Pack the data block
         packed_block = self.items_to_data(item.type, item.items)
         # Concatenate the two
@@ -202,11 +212,10 @@ class ArrayStore(GeneralStore):
         :rtype: bytes
         """
         # Create an empty header struct
-        empty_header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        packed_header = empty_header_struct.pack(0, 0, 0, 0, 0, 0)
+        packed_header = self.HEADER_STRUCT.pack(0, 0, 0, 0, 0, 0)
 
         # Create an empty data payload (using BOOL_FORMAT_STR for easy padding)
-        empty_data = struct.Struct(self.BOOL_FORMAT_STR * self.blockSize)
+        empty_data = self.block_struct(self.BOOL_FORMAT_STR * self.blockSize)
         pad_tuple = self.blockSize * self.PAD_TUPLE
         packed_payload = empty_data.pack(*pad_tuple)
 
@@ -291,15 +300,16 @@ class ArrayStore(GeneralStore):
         # 8 shorts or chars (unicode) (2 bytes)
         # 16 booleans (1 byte)
         total_format_str = format_str * amt_struct_items
-        s = struct.Struct(total_format_str)
+        s = cls.block_struct(total_format_str)
         # Pad the missing items with the pad tuple
         amt_missing = (amt_struct_items - len(array))
         padded_items = tuple(array) + cls.PAD_TUPLE * amt_missing
         # Pack the items
         return s.pack(*padded_items)
 
-    @staticmethod
-    def list_from_data(packed_data, format_str, block_size, type_size, amount):
+    @classmethod
+    def list_from_data(cls, packed_data, format_str, block_size, type_size,
+                       amount):
         """
         Create a list of items from the given packed data and parameters
 
@@ -323,7 +333,25 @@ class ArrayStore(GeneralStore):
         # 8 shorts or chars (unicode) (2 bytes)
         # 16 booleans (1 byte)
         total_format_str = format_str * (block_size / type_size)
-        s = struct.Struct(total_format_str)
+        s = cls.block_struct(total_format_str)
         unpacked_array = s.unpack(packed_data)
         # Truncate the array to remove padded items
-        return list(unpacked_array[:amount])
\ No newline at end of file
+        return list(unpacked_array[:amount])
+
+    @classmethod
+    def block_struct(cls, format_str):
+        """
+        Gets the precompiled struct for the given block format string,
+        compiling it the first time it is used
+
+        :param format_str: Format string of a whole data block
+        :type format_str: str
+        :return: Struct for the format string
+        :rtype: struct.Struct
+        """
+        try:
+            return cls.BLOCK_STRUCTS[format_str]
+        except KeyError:
+            block_struct = struct.Struct(format_str)
+            cls.BLOCK_STRUCTS[format_str] = block_struct
+            return block_struct
@@ -0,0 +1,442 @@
+import os
+
+from pylru import lrucache
+
+
+class Page(object):
+    """
+    Fixed-size page of a store file held in the buffer pool
+    """
+
+    __slots__ = ["owner", "number", "data", "dirty"]
+
+    def __init__(self, owner, number, data):
+        """
+        Creates a page of the given pooled file
+
+        :param owner: Pooled file this page belongs to
+        :type owner: PooledFile
+        :param number: Page number in the file (offset / page size)
+        :type number: int
+        :param data: Contents of the page, always a full page long
+        :type data: bytearray
+        :return: Page instance
+        :rtype: Page
+        """
+        self.owner = owner
+        self.number = number
+        self.data = data
+        self.dirty = False
+
+
+class PooledFile(object):
+    """
+    State of a single store file whose pages are held in the buffer pool. It
+    is shared by every PagedFile that has the file open, so that they all see
+    the same pages and logical size.
+    """
+
+    def __init__(self, pool, key, file_obj):
+        """
+        Creates the pooled state of the given open file
+
+        :param pool: Buffer pool holding the pages of this file
+        :type pool: BufferPool
+        :param key: Key of the file in the pool
+        :type key: tuple
+        :param file_obj: File opened for reading and writing ("r+b")
+        :return: PooledFile instance
+        :rtype: PooledFile
+        """
+        self.pool = pool
+        self.key = key
+        self.file = file_obj
+        # Number of PagedFile handles currently using this file
+        self.refs = 0
+        # Logical size of the file, pages that have not been written back yet
+        # may make it larger than the file on disk
+        file_obj.seek(0, os.SEEK_END)
+        self.size = file_obj.tell()
+        # Size of the file on disk, pages past it are not read from disk
+        self.diskSize = self.size
+        # Pages of this file currently in the pool, by page number
+        self.pages = {}
+
+    def load_page(self, number):
+        """
+        Reads the page with the given number from disk
+
+        :param number: Page number
+        :type number: int
+        :return: Page read from disk, zero-filled past the end of the file
+        :rtype: Page
+        """
+        page_size = self.pool.pageSize
+        data = bytearray(page_size)
+        start = number * page_size
+        if start < self.diskSize:
+            self.file.seek(start)
+            raw = self.file.read(page_size)
+            data[:len(raw)] = raw
+        return Page(self, number, data)
+
+    def write_page(self, page):
+        """
+        Writes the given page back to disk, only up to the logical end of file
+
+        :param page: Page to write back
+        :type page: Page
+        :return: Nothing
+        :rtype: None
+        """
+        page_size = self.pool.pageSize
+        start = page.number * page_size
+        if start < self.size:
+            self.file.seek(start)
+            end = min(start + page_size, self.size)
+            self.file.write(bytes(page.data[:end - start]))
+            self.diskSize = max(self.diskSize, end)
+            self.pool.writes += 1
+        page.dirty = False
+
+    def truncate(self, size):
+        """
+        Truncates the file to the given size, dropping the pages past the end
+
+        :param size: New size of the file (bytes)
+        :type size: int
+        :return: Nothing
+        :rtype: None
+        """
+        page_size = self.pool.pageSize
+        for number in self.pages.keys():
+            start = number * page_size
+            if start >= size:
+                self.pool.drop_page(self, number)
+            elif start + page_size > size:
+                # Zero the truncated tail so that growing the file again
+                # reads zeros, as it would from disk
+                page = self.pages[number]
+                page.data[size - start:] = bytearray(start + page_size - size)
+        self.size = size
+        self.diskSize = size
+        self.file.truncate(size)
+
+    def flush(self):
+        """
+        Writes all the dirty pages of the file back to disk
+
+        :return: Nothing
+        :rtype: None
+        """
+        for page in self.pages.values():
+            if page.dirty:
+                self.write_page(page)
+        # Make sure the file on disk has its logical size
+        self.file.truncate(self.size)
+        self.diskSize = self.size
+        self.file.flush()
+
+    def close(self):
+        """
+        Flushes the file, removes its pages from the pool and closes it
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.flush()
+        for number in self.pages.keys():
+            self.pool.drop_page(self, number)
+        self.file.close()
+
+
+class BufferPool(object):
+    """
+    Shared pool of fixed-size pages of store files, bounded by a memory
+    budget. Least recently used pages are evicted first, and dirty pages are
+    written back to disk when evicted or when their file is flushed/closed.
+    """
+
+    # Default size of a page (bytes)
+    PAGE_SIZE = 4096
+    # Default memory budget of the pool (bytes)
+    DEFAULT_BUDGET = 8 * 1024 * 1024
+
+    def __init__(self, budget=DEFAULT_BUDGET, page_size=PAGE_SIZE):
+        """
+        Creates a buffer pool with the given budget
+
+        :param budget: Maximum amount of memory used by pages (bytes)
+        :type budget: int
+        :param page_size: Size of a page (bytes)
+        :type page_size: int
+        :return: BufferPool instance
+        :rtype: BufferPool
+        """
+        self.pageSize = page_size
+        self.budget = budget
+        # Pages by (file key, page number)
+        self.cache = lrucache(max(1, budget / page_size), self.evict_page)
+        # Open pooled files by key
+        self.files = {}
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def open_file(self, file_obj):
+        """
+        Gets the pooled state of the given open file, taking ownership of it
+
+        :param file_obj: File opened for reading and writing ("r+b")
+        :return: Pooled state of the file
+        :rtype: PooledFile
+        """
+        # Key files by (device, inode) so that a file that was removed and
+        # recreated at the same path does not reuse stale pages
+        stat = os.stat(file_obj.name)
+        key = (stat.st_dev, stat.st_ino)
+        pooled = self.files.get(key)
+        if pooled is None:
+            pooled = PooledFile(self, key, file_obj)
+            self.files[key] = pooled
+        else:
+            # The file is already open in the pool, this one is not needed
+            file_obj.close()
+        pooled.refs += 1
+        return pooled
+
+    def close_file(self, pooled):
+        """
+        Releases a handle on the given pooled file, closing it once no handle
+        uses it
+
+        :param pooled: Pooled file to release
+        :type pooled: PooledFile
+        :return: Nothing
+        :rtype: None
+        """
+        pooled.refs -= 1
+        if pooled.refs == 0:
+            pooled.close()
+            del self.files[pooled.key]
+
+    def get_page(self, pooled, number):
+        """
+        Gets the page with the given number, reading it from disk on a miss
+
+        :param pooled: File the page belongs to
+        :type pooled: PooledFile
+        :param number: Page number
+        :type number: int
+        :return: Requested page
+        :rtype: Page
+        """
+        key = (pooled.key, number)
+        try:
+            page = self.cache[key]
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            page = pooled.load_page(number)
+            self.cache[key] = page
+            pooled.pages[number] = page
+        return page
+
+    def drop_page(self, pooled, number):
+        """
+        Removes the page with the given number from the pool without writing
+        it back
+
+        :param pooled: File the page belongs to
+        :type pooled: PooledFile
+        :param number: Page number
+        :type number: int
+        :return: Nothing
+        :rtype: None
+        """
+        del self.cache[(pooled.key, number)]
+        del pooled.pages[number]
+
+    def evict_page(self, key, page):
+        """
+        PRIVATE METHOD.
+        Called by the LRU cache when a page is evicted, writes it back if
+        it is dirty.
+
+        :param key: Key of the page in the cache
+        :type key: tuple
+        :param page: Evicted page
+        :type page: Page
+        :return: Nothing
+        :rtype: None
+        """
+        if page.dirty:
+            page.owner.write_page(page)
+            page.owner.file.flush()
+        del page.owner.pages[page.number]
+
+    def flush(self):
+        """
+        Writes the dirty pages of every open file back to disk
+
+        :return: Nothing
+        :rtype: None
+        """
+        for pooled in self.files.values():
+            pooled.flush()
+
+
+class PagedFile(object):
+    """
+    File-like wrapper that reads and writes a store file through the pages of
+    a buffer pool. Supports the subset of the file interface used by the
+    stores (seek, tell, read, write, truncate).
+    """
+
+    def __init__(self, file_obj, pool):
+        """
+        Wraps the given open file, taking ownership of it
+
+        :param file_obj: File opened for reading and writing ("r+b")
+        :param pool: Buffer pool to hold the pages of the file
+        :type pool: BufferPool
+        :return: PagedFile instance
+        :rtype: PagedFile
+        """
+        self.name = file_obj.name
+        self.pool = pool
+        self._pooled = pool.open_file(file_obj)
+        self._pos = 0
+        self.closed = False
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """
+        Moves the file position
+
+        :param offset: Offset relative to whence
+        :type offset: int
+        :param whence: One of os.SEEK_SET, os.SEEK_CUR or os.SEEK_END
+        :type whence: int
+        :return: Nothing
+        :rtype: None
+        """
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._pooled.size
+        if offset < 0:
+            raise IOError("Invalid argument: negative seek position")
+        self._pos = offset
+
+    def tell(self):
+        """
+        Gets the current file position
+
+        :return: Current position (bytes)
+        :rtype: int
+        """
+        return self._pos
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes from the current position
+
+        :param size: Number of bytes to read, or -1 to read to the end
+        :type size: int
+        :return: Data read, empty at the end of the file
+        :rtype: bytes
+        """
+        pooled = self._pooled
+        pos = self._pos
+        if pos >= pooled.size:
+            return ''
+        if size < 0:
+            end = pooled.size
+        else:
+            end = min(pos + size, pooled.size)
+        page_size = self.pool.pageSize
+        chunks = []
+        while pos < end:
+            number = pos / page_size
+            offset = pos - number * page_size
+            amount = min(page_size - offset, end - pos)
+            page = self.pool.get_page(pooled, number)
+            chunks.append(bytes(page.data[offset:offset + amount]))
+            pos += amount
+        self._pos = end
+        return ''.join(chunks)
+
+    def write(self, data):
+        """
+        Writes the given data at the current position, growing the file if
+        the data goes past the end of the file
+
+        :param data: Data to write
+        :type data: bytes
+        :return: Nothing
+        :rtype: None
+        """
+        pooled = self._pooled
+        pos = self._pos
+        end = pos + len(data)
+        page_size = self.pool.pageSize
+        written = 0
+        # Grow the file first, so that pages evicted while writing are
+        # written back in full
+        if end > pooled.size:
+            pooled.size = end
+        while pos < end:
+            number = pos / page_size
+            offset = pos - number * page_size
+            amount = min(page_size - offset, end - pos)
+            page = self.pool.get_page(pooled, number)
+            page.data[offset:offset + amount] = data[written:written + amount]
+            page.dirty = True
+            pos += amount
+            written += amount
+        self._pos = end
+
+    def truncate(self, size=None):
+        """
+        Truncates the file to the given size (current position by default)
+
+        :param size: New size of the file (bytes)
+        :type size: int
+        :return: Nothing
+        :rtype: None
+        """
+        if size is None:
+            size = self._pos
+        self._pooled.truncate(size)
+
+    def fileno(self):
+        """
+        Gets the file descriptor of the underlying file
+
+        :return: File descriptor
+        :rtype: int
+        """
+        return self._pooled.file.fileno()
+
+    def flush(self):
+        """
+        Writes the dirty pages of the file back to disk
+
+        :return: Nothing
+        :rtype: None
+        """
+        self._pooled.flush()
+
+    def close(self):
+        """
+        Releases this handle, flushing and closing the file once no handle
+        uses it
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.pool.close_file(self._pooled)
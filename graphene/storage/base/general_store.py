@@ -1,6 +1,9 @@
 import abc
+import threading
 
 from graphene.storage.base.graphene_store import *
+from graphene.storage.base.buffer_pool import PagedFile
+from graphene.storage.base.mapped_file import MappedFile
 
 
 class EOF:
@@ -22,10 +25,36 @@ class GeneralStore(object):
     # Type stored by this class
     STORAGE_TYPE = None
 
+    # Whether store files are accessed through a memory map instead of
+    # buffered file reads/writes (avoids a system call per record access)
+    MEMORY_MAPPED = False
+
+    # Shared BufferPool holding pages of all store files, or None to access
+    # the files directly
+    BUFFER_POOL = None
+
+    # Number of records the file is grown by at once when items are written
+    # past its end, or 0 to grow it one write at a time. The unused records
+    # are truncated when the store is closed.
+    PREALLOCATE_RECORDS = 0
+
+    # WriteAheadLog that changes to the store files are logged to before
+    # being applied, or None to apply them directly
+    WAL = None
+
+    # Lock held while a store file is accessed, so that the seek and the
+    # read/write that follows it are not interleaved with another thread's
+    # (e.g. a background cache flusher)
+    IO_LOCK = threading.Lock()
+
+    # Names of the settings above that can be given to a store, overriding
+    # the defaults of the class for that store only
+    SETTINGS = ("MEMORY_MAPPED", "BUFFER_POOL", "PREALLOCATE_RECORDS", "WAL")
+
     # Used to indicate abstract methods
     __metaclass__ = abc.ABCMeta
 
-    def __init__(self, filename, record_size):
+    def __init__(self, filename, record_size, settings=None):
         """
         Creates a GeneralStore instance which handles reading/writing
         to store files for different value types
@@ -34,9 +63,17 @@ class GeneralStore(object):
         :type filename: str
         :param record_size: Size of record to read/write
         :type record_size: int
+        :param settings: Values of the SETTINGS used by this store instead of
+                         the defaults of the class
+        :type settings: dict[str, object]
         :return: GeneralStore instance meant to be sub-classed
         :rtype: GeneralStore
         """
+        for name, value in (settings or {}).items():
+            if name not in self.SETTINGS:
+                raise ValueError("Unknown store setting: %s" % name)
+            setattr(self, name, value)
+
         graphenestore = GrapheneStore()
 
         # Store the given filename
@@ -67,15 +104,67 @@ class GeneralStore(object):
         except IOError:
             raise IOError("ERROR: unable to open file: " + file_path)
 
+        self.wrap_store_file()
+
     def __del__(self):
         """
-        Closes the store file
+        Closes the store file, truncating any unused preallocated records
 
         :return: Nothing
         :rtype: None
         """
+        if self.allocatedSize > self.fileSize:
+            self.storeFile.truncate(self.fileSize)
         self.storeFile.close()
 
+    def wrap_store_file(self):
+        """
+        PRIVATE METHOD.
+        Sets up the access to the opened store file and reads its size
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.MEMORY_MAPPED:
+            # Records are read/written straight from the mapping
+            self.storeFile = MappedFile(self.storeFile)
+        if self.BUFFER_POOL is not None:
+            # Pages are cached in the pool, written back on eviction/close
+            self.storeFile = PagedFile(self.storeFile, self.BUFFER_POOL)
+
+        # Size of the file on disk, including preallocated records
+        self.storeFile.seek(0, os.SEEK_END)
+        self.allocatedSize = self.storeFile.tell()
+        # Size of the records in use, kept in memory so that it does not
+        # have to be read from the file every time an index is needed
+        self.fileSize = self.allocatedSize
+        if self.PREALLOCATE_RECORDS:
+            self.trim_preallocated()
+
+    def replace_file(self, new_filename):
+        """
+        Replaces the store file with a new file of the datafiles directory,
+        e.g. a copy of the records with a different record size. The new file
+        must be complete and synced to disk. The replacement is logged, so
+        that it is redone or undone along with its transaction.
+
+        :param new_filename: Name of the new file
+        :type new_filename: str
+        :return: Nothing
+        :rtype: None
+        """
+        file_path = GrapheneStore().datafilesDir + self.filename
+        with self.IO_LOCK:
+            # Write back the cached pages of the replaced file first
+            self.storeFile.close()
+            if self.WAL is not None:
+                self.WAL.replace_file(self, new_filename)
+            else:
+                os.rename(GrapheneStore().datafilesDir + new_filename,
+                          file_path)
+            self.storeFile = open(file_path, "r+b")
+            self.wrap_store_file()
+
     def pad_file_header(self):
         """
         Pad the first RECORD_SIZE bytes of the file when it's initially created
@@ -104,10 +193,26 @@ class GeneralStore(object):
         :return: Size of the file currently open (bytes)
         :rtype: long
         """
-        # Seek to the end of the file
-        self.storeFile.seek(0, os.SEEK_END)
+        return self.fileSize
 
-        return self.storeFile.tell()
+    def trim_preallocated(self):
+        """
+        PRIVATE METHOD.
+        Drops the trailing zeroed records of the file from its size. These are
+        preallocated records left behind when the store was not closed
+        properly.
+
+        :return: Nothing
+        :rtype: None
+        """
+        record_size = self.recordSize
+        empty_data = self.empty_struct_data()
+        # The header record is always kept
+        while self.fileSize > record_size:
+            self.storeFile.seek(self.fileSize - record_size)
+            if self.storeFile.read(record_size) != empty_data:
+                break
+            self.fileSize -= record_size
 
     def item_at_index(self, index):
         """
@@ -122,10 +227,14 @@ class GeneralStore(object):
 
         # Calculate the file offset
         file_offset = index * self.recordSize
-        # Seek to the calculated offset
-        self.storeFile.seek(file_offset)
-        # Get the packed data from the file
-        packed_data = self.storeFile.read(self.recordSize)
+        # This occurs when we've reached the end of the file.
+        if file_offset >= self.fileSize:
+            return self.EOF
+        with self.IO_LOCK:
+            # Seek to the calculated offset
+            self.storeFile.seek(file_offset)
+            # Get the packed data from the file
+            packed_data = self.storeFile.read(self.recordSize)
 
         # This occurs when we've reached the end of the file.
         if packed_data == '':
@@ -133,6 +242,44 @@ class GeneralStore(object):
         else:
             return self.item_from_packed_data(index, packed_data)
 
+    def items_in_range(self, start, count):
+        """
+        Reads the count items starting at the given index with a single read.
+        Fewer items are returned if the range goes past the end of the file.
+
+        :param start: Index of the first item
+        :type start: int
+        :param count: Number of items to read
+        :type count: int
+        :return: Items in the range (None for deleted items), empty at EOF
+        :rtype: list
+        """
+        if start == 0:
+            raise ValueError("Item cannot be read from index 0")
+        if count <= 0:
+            return []
+
+        record_size = self.recordSize
+        # Read the whole range of packed data at once, up to the end of the
+        # records in use
+        offset = start * record_size
+        if offset >= self.fileSize:
+            return []
+        with self.IO_LOCK:
+            self.storeFile.seek(offset)
+            packed_data = self.storeFile.read(
+                min(count * record_size, self.fileSize - offset))
+
+        # Decode every complete record in the range
+        item_from_packed_data = self.item_from_packed_data
+        items = []
+        for offset in xrange(0, len(packed_data) - record_size + 1,
+                             record_size):
+            items.append(item_from_packed_data(
+                start + offset / record_size,
+                packed_data[offset:offset + record_size]))
+        return items
+
     def write_item(self, item):
         """
         Writes the given item to the store file
@@ -146,6 +293,36 @@ class GeneralStore(object):
         # Write the packed data to the item index
         self.write_to_index_packed_data(item.index, packed_data)
 
+    def write_items(self, items):
+        """
+        Writes the given items to the store file, sorting them by index and
+        merging items with adjacent indexes into a single write
+
+        :param items: Items to write
+        :type items: list
+        :return: Nothing
+        :rtype: None
+        """
+        # Pack the items by index (the last item given for an index wins)
+        packed_items = {}
+        for item in items:
+            if item.index == 0:
+                raise ValueError("Item cannot be written to index 0")
+            packed_items[item.index] = self.packed_data_from_item(item)
+
+        # Write each run of adjacent indexes at once
+        run_start = None
+        run_data = []
+        for index in sorted(packed_items):
+            if run_data and index != run_start + len(run_data):
+                self.write_to_index_packed_data(run_start, ''.join(run_data))
+                run_data = []
+            if not run_data:
+                run_start = index
+            run_data.append(packed_items[index])
+        if run_data:
+            self.write_to_index_packed_data(run_start, ''.join(run_data))
+
     def write_to_index_packed_data(self, index, packed_data):
         """
         Writes the packed data to the given index
@@ -160,10 +337,35 @@ class GeneralStore(object):
             raise ValueError("Item cannot be written to index 0")
 
         file_offset = index * self.recordSize
+        end = file_offset + len(packed_data)
+        with self.IO_LOCK:
+            if self.WAL is not None:
+                self.WAL.log_write(self, file_offset, packed_data)
+            # Grow the file by a whole extent when preallocating
+            if end > self.allocatedSize and self.PREALLOCATE_RECORDS:
+                self.preallocate(end)
+
+            # Seek to the calculated offset and write the data
+            self.storeFile.seek(file_offset)
+            self.storeFile.write(packed_data)
+            self.fileSize = max(self.fileSize, end)
+            self.allocatedSize = max(self.allocatedSize, end)
+
+    def preallocate(self, size):
+        """
+        PRIVATE METHOD.
+        Grows the file to hold at least the given size, rounded up to a
+        multiple of PREALLOCATE_RECORDS records
 
-        # Seek to the calculated offset and write the data
-        self.storeFile.seek(file_offset)
-        self.storeFile.write(packed_data)
+        :param size: Size the file must hold (bytes)
+        :type size: int
+        :return: Nothing
+        :rtype: None
+        """
+        extent_size = self.PREALLOCATE_RECORDS * self.recordSize
+        new_size = (size + extent_size - 1) / extent_size * extent_size
+        self.storeFile.truncate(new_size)
+        self.allocatedSize = new_size
 
     def delete_item(self, item):
         """
@@ -205,10 +407,14 @@ class GeneralStore(object):
         :return: Nothing
         :rtype: None
         """
-        # Seek to trunc_index before the end of the file
-        self.storeFile.seek(-self.recordSize * trunc_amt, os.SEEK_END)
-        # Truncate the file from this point on
-        self.storeFile.truncate()
+        with self.IO_LOCK:
+            # Truncate the file trunc_amt records before the end of the file
+            new_size = self.fileSize - self.recordSize * trunc_amt
+            if self.WAL is not None:
+                self.WAL.log_truncate(self, new_size)
+            self.fileSize = new_size
+            self.storeFile.truncate(self.fileSize)
+            self.allocatedSize = self.fileSize
 
     @abc.abstractmethod
     def item_from_packed_data(self, index, packed_data):
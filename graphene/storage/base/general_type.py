@@ -1,4 +1,7 @@
-class GeneralType:
+class GeneralType(object):
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "nameId", "firstType"]
+
     def __init__(self, index=0, in_use=True, name_id=0, first_type=0):
         """
         General type for Nodes and Relationships
@@ -21,22 +21,29 @@ class GeneralTypeStore(GeneralStore):
     RECORD_SIZE = struct.calcsize(STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for the record format
+    STRUCT = struct.Struct(STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Type stored by this class
     STORAGE_TYPE = GeneralType
 
-    def __init__(self, filename):
+    def __init__(self, filename, settings=None):
         """
         Creates a GeneralTypeStore instance which handles reading/writing to
         the file containing type values
 
         :param filename: Name of the type store (Nodes or Relationships)
         :type filename: str
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: GeneralTypeStore instance for handling GeneralType records
         :rtype: GeneralTypeStore
         """
 
         # Initialize using generic base class
-        super(GeneralTypeStore, self).__init__(filename, self.RECORD_SIZE)
+        super(GeneralTypeStore, self).__init__(filename, self.RECORD_SIZE,
+                                               settings)
         self.FILE_NAME = filename
 
     def item_from_packed_data(self, index, packed_data):
@@ -52,8 +59,7 @@ class GeneralTypeStore(GeneralStore):
         """
 
         # Unpack the data using the GeneralType struct format
-        type_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        unpacked_data = type_struct.unpack(packed_data)
+        unpacked_data = self.STRUCT.unpack(packed_data)
 
         # Get the node components
         in_use = unpacked_data[0]
@@ -77,8 +83,7 @@ class GeneralTypeStore(GeneralStore):
         :rtype: bytes
         """
         # Pack the node into a struct with the order (inUse, nameId, firstType)
-        node_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = node_struct.pack(item.inUse, item.nameId, item.firstType)
+        packed_data = self.STRUCT.pack(item.inUse, item.nameId, item.firstType)
 
         return packed_data
 
@@ -89,6 +94,5 @@ class GeneralTypeStore(GeneralStore):
         :return: Packed class struct of 0s
         :rtype: bytes
         """
-        empty_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0, 0)
+        packed_data = self.STRUCT.pack(0, 0, 0)
         return packed_data
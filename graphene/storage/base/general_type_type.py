@@ -1,7 +1,7 @@
 from graphene.storage.base.property import *
 
 
-class GeneralTypeType:
+class GeneralTypeType(object):
     """
     Stores type components of a Node or Relationship type:
         inUse: Whether the db is using the type of the Node/Relationship type
@@ -10,6 +10,9 @@ class GeneralTypeType:
         nextType: Next type for this Node/Relationship type
     Along with the index where the type of the type is stored
     """
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "typeName", "propertyType", "nextType"]
+
     def __init__(self, index=0, in_use=True, type_name=0,
                  property_type=Property.PropertyType.undefined,
                  next_type=0):
@@ -22,22 +22,29 @@ class GeneralTypeTypeStore(GeneralStore):
     RECORD_SIZE = struct.calcsize(STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for the record format
+    STRUCT = struct.Struct(STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Type stored by this class
     STORAGE_TYPE = GeneralTypeType
 
-    def __init__(self, filename):
+    def __init__(self, filename, settings=None):
         """
         Creates a GeneralTypeTypeStore instance which handles
         reading/writing to the file containing values of types of a type
 
         :param filename: Name of the type store (Nodes or Relationships)
         :type filename: str
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: Store instance for handling records of types of a type
         :rtype: GeneralTypeTypeStore
         """
 
         # Initialize using generic base class
-        super(GeneralTypeTypeStore, self).__init__(filename, self.RECORD_SIZE)
+        super(GeneralTypeTypeStore, self).__init__(filename, self.RECORD_SIZE,
+                                                   settings)
         self.FILE_NAME = filename
 
     def item_from_packed_data(self, index, packed_data):
@@ -53,8 +60,7 @@ class GeneralTypeTypeStore(GeneralStore):
         """
 
         # Unpack the data using the GeneralTypeType struct format
-        type_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        unpacked_data = type_struct.unpack(packed_data)
+        unpacked_data = self.STRUCT.unpack(packed_data)
 
         # Get the node components
         in_use = unpacked_data[0]
@@ -82,8 +88,7 @@ class GeneralTypeTypeStore(GeneralStore):
         :rtype: bytes
         """
         # Pack the node into a struct with the order (inUse, nameId, firstType)
-        node_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = node_struct.pack(item.inUse, item.typeName,
+        packed_data = self.STRUCT.pack(item.inUse, item.typeName,
                                        item.propertyType.value, item.nextType)
 
         return packed_data
@@ -95,6 +100,5 @@ class GeneralTypeTypeStore(GeneralStore):
         :return: Packed class struct of 0s
         :rtype: bytes
         """
-        empty_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0, 0, 0)
+        packed_data = self.STRUCT.pack(0, 0, 0, 0)
         return packed_data
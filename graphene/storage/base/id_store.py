@@ -1,3 +1,4 @@
+import bisect
 import struct
 
 from graphene.storage.base.graphene_store import *
@@ -7,6 +8,13 @@ class IdStore:
     """
     Handles ID recycling by keeping track of available storage indexes for
     files. File does not have a header.
+
+    The available IDs are held in memory as sorted extents of consecutive
+    IDs, also ordered by size, so that requests for several IDs can be given
+    the smallest contiguous run that fits, or the IDs of the largest runs
+    when the available IDs are too fragmented (see gather_ids). The file is rewritten once
+    FLUSH_INTERVAL changes have been made, when flush is called, and when the
+    store is closed.
     """
 
     # Format string used to compact these values
@@ -24,10 +32,18 @@ class IdStore:
     RECORD_SIZE = struct.calcsize(STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for a single ID
+    STRUCT = struct.Struct(STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Return value when no ID is available
     NO_ID = -1
     ''':type: int'''
 
+    # Number of changes to the available IDs before they are written to disk
+    FLUSH_INTERVAL = 1024
+    ''':type: int'''
+
     # Type stored by this class
     STORAGE_TYPE = int
 
@@ -47,10 +63,6 @@ class IdStore:
         # Get the path of the file
         file_path = graphenestore.datafilesDir + filename
 
-        # Initialize a next ID variable to prevent multiple reads when peeking.
-        # If it is 0, then no nextID has been loaded
-        self.nextID = 0
-
         try:
             # If the file exists, simply open it
             if os.path.isfile(file_path):
@@ -63,7 +75,18 @@ class IdStore:
         except IOError:
             raise IOError("ERROR: unable to open IdStore file: " + file_path)
 
+        # Available IDs, as a sorted list of (first ID, amount of IDs) runs,
+        # and the same runs as a sorted list of (amount of IDs, first ID)
+        self.extents = []
+        self.sizes = []
+        # Total number of available IDs
+        self.available = 0
+        self.set_extents(self.extents_for_ids(self.read_ids()))
+        # Number of changes to the IDs that have not been written to disk
+        self.unflushedChanges = 0
+
     def __del__(self):
+        self.flush()
         self.storeFile.close()
 
     def get_file_size(self):
@@ -80,92 +103,243 @@ class IdStore:
 
     def store_id(self, id_value):
         """
-        Stores the given ID into the IdStore file
+        Stores the given ID so that it can be recycled, merging it with the
+        runs of IDs next to it
 
         :param id_value: Id to store
         :type id_value: int
         :return: Nothing
         :rtype: None
         """
-        # Seek to the end of the file
-        self.storeFile.seek(0, os.SEEK_END)
-        # Pack the given ID
-        packed_id = struct.Struct(self.STRUCT_FORMAT_STR).pack(id_value)
-        # Write the packed ID
-        self.storeFile.write(packed_id)
+        extents = self.extents
+        pos = bisect.bisect_left(extents, (id_value, 0))
+        prev_extent = extents[pos - 1] if pos > 0 else None
+        next_extent = extents[pos] if pos < len(extents) else None
+
+        # The ID is already available
+        if (prev_extent and id_value < prev_extent[0] + prev_extent[1]) or \
+           (next_extent and next_extent[0] == id_value):
+            return
+
+        joins_prev = prev_extent and prev_extent[0] + prev_extent[1] == id_value
+        joins_next = next_extent and next_extent[0] == id_value + 1
+        if joins_prev and joins_next:
+            # The ID fills the gap between two runs
+            self.remove_extent(*prev_extent)
+            self.remove_extent(*next_extent)
+            self.add_extent(prev_extent[0],
+                            prev_extent[1] + 1 + next_extent[1])
+        elif joins_prev:
+            self.remove_extent(*prev_extent)
+            self.add_extent(prev_extent[0], prev_extent[1] + 1)
+        elif joins_next:
+            self.remove_extent(*next_extent)
+            self.add_extent(id_value, next_extent[1] + 1)
+        else:
+            self.add_extent(id_value, 1)
+        self.changed()
 
     def get_id(self):
         """
-        Gets an ID from the end of the IdStore file. If no ID is available,
-        returns NO_ID.
+        Gets an available ID (see get_ids). If no ID is available, returns
+        NO_ID.
 
         :return: Available recycled ID
         :rtype: int
         """
-        # Try to seek to RECORD_SIZE bytes before the end of the file
-        try:
-            self.storeFile.seek(-self.RECORD_SIZE, os.SEEK_END)
-        # If an IOError is thrown, the file does not have any IDs
-        except IOError:
-            return self.NO_ID
+        ids = self.get_ids(1)
+        return ids[0] if ids else self.NO_ID
 
-        # Create struct with the IdStore format string
-        id_struct = struct.Struct(self.STRUCT_FORMAT_STR)
+    def get_ids(self, amount):
+        """
+        Gets the given amount of consecutive IDs. The smallest run of
+        available IDs that fits is used (the lowest one on ties), so that
+        larger runs are kept for larger requests. If no run fits, no IDs are
+        returned.
 
-        # Read the ID since the seek succeeded
-        id_value = id_struct.unpack(self.storeFile.read(self.RECORD_SIZE))[0]
+        :param amount: Number of IDs to get
+        :type amount: int
+        :return: List of consecutive recycled IDs, or an empty list
+        :rtype: list
+        """
+        if amount <= 0:
+            return []
+        pos = bisect.bisect_left(self.sizes, (amount, 0))
+        if pos == len(self.sizes):
+            return []
+        length, start = self.sizes[pos]
+        ids = self.take_ids(start, length, amount)
+        self.changed(len(ids))
+        return ids
 
-        # Seek back to the position where the ID was read from
-        self.storeFile.seek(-self.RECORD_SIZE, os.SEEK_END)
-        # Truncate the file from this point on; the ID is no longer available
-        self.storeFile.truncate()
+    def gather_ids(self, amount):
+        """
+        Gets the given amount of IDs from the largest runs of available IDs,
+        for when they are too fragmented for a single run to fit (see
+        get_ids). The IDs are not consecutive. If fewer IDs are available, no
+        IDs are returned.
 
-        return id_value
+        :param amount: Number of IDs to get
+        :type amount: int
+        :return: List of recycled IDs, or an empty list
+        :rtype: list
+        """
+        if amount <= 0 or amount > self.available:
+            return []
+        ids = []
+        while len(ids) < amount:
+            length, start = self.sizes[-1]
+            ids.extend(self.take_ids(start, length, amount - len(ids)))
+        self.changed(len(ids))
+        return ids
 
     def get_all_ids(self):
         """
-        Gets all the IDs from the file. Used for truncation and defragmentation
+        Gets all the available IDs, in ascending order. Used for truncation
+        and defragmentation
 
         :return: List of IDs
         :rtype: list
         """
-        # Get the size of the file
-        amt_ids = self.get_file_size() / self.RECORD_SIZE
         # No IDs available
-        if amt_ids == 0:
+        if not self.extents:
             return None
-        else:
-            # Seek to begining of file
-            self.storeFile.seek(0, os.SEEK_SET)
-            f_str = self.ENDIAN_FORMAT_STR + str(amt_ids) + self.INT_FORMAT_STR
-            ids_struct = struct.Struct(f_str)
-            ids = ids_struct.unpack(
-                self.storeFile.read(amt_ids * self.RECORD_SIZE))
-            return list(ids)
+        ids = []
+        for start, length in self.extents:
+            ids.extend(xrange(start, start + length))
+        return ids
 
     def write_all_ids(self, ids):
         """
-        Overwrites the current ID file with the given IDs
+        Overwrites the available IDs with the given IDs
 
-        :param ids: IDs to overwrite file with
+        :param ids: IDs to overwrite the available IDs with
         :type ids: list
         :return: Nothing
         :rtype: None
         """
-        # Get the existing filename
-        file_name = self.storeFile.name
-        try:
-            # Overwrite the old file
-            self.storeFile = open(file_name, "w")
-
-            # Write the new IDs
-            f_str = self.ENDIAN_FORMAT_STR + str(len(ids)) + self.INT_FORMAT_STR
-            ids_struct = struct.Struct(f_str)
-            ids_packed = ids_struct.pack(*ids)
-            self.storeFile.write(ids_packed)
-            self.storeFile.close()
-
-            # Re-open it so that it can be read/written
-            self.storeFile = open(file_name, "r+b")
-        except IOError:
-            raise IOError("ERROR: unable to open IdStore file: " + file_name)
+        self.set_extents(self.extents_for_ids(ids))
+        self.changed()
+
+    def set_extents(self, extents):
+        """
+        PRIVATE METHOD.
+        Replaces the runs of available IDs
+
+        :param extents: Sorted list of (first ID, amount of IDs) runs
+        :type extents: list[tuple]
+        :return: Nothing
+        :rtype: None
+        """
+        self.extents = extents
+        self.sizes = sorted((length, start) for start, length in extents)
+        self.available = sum(length for start, length in extents)
+
+    def add_extent(self, start, length):
+        """
+        PRIVATE METHOD.
+        Adds a run of available IDs, which must not overlap the others
+
+        :return: Nothing
+        :rtype: None
+        """
+        bisect.insort(self.extents, (start, length))
+        bisect.insort(self.sizes, (length, start))
+        self.available += length
+
+    def remove_extent(self, start, length):
+        """
+        PRIVATE METHOD.
+        Removes a run of available IDs
+
+        :return: Nothing
+        :rtype: None
+        """
+        del self.extents[bisect.bisect_left(self.extents, (start, length))]
+        del self.sizes[bisect.bisect_left(self.sizes, (length, start))]
+        self.available -= length
+
+    def take_ids(self, start, length, amount):
+        """
+        PRIVATE METHOD.
+        Takes up to the given amount of IDs from the start of a run of
+        available IDs, keeping the rest of the run
+
+        :return: IDs taken
+        :rtype: list
+        """
+        self.remove_extent(start, length)
+        if length > amount:
+            self.add_extent(start + amount, length - amount)
+        return range(start, start + min(length, amount))
+
+    def changed(self, amount=1):
+        """
+        PRIVATE METHOD.
+        Records changes to the available IDs, writing them to disk once
+        FLUSH_INTERVAL changes have accumulated
+
+        :param amount: Number of changes made
+        :type amount: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.unflushedChanges += amount
+        if self.unflushedChanges >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the available IDs to the ID file if they have changed
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.unflushedChanges == 0:
+            return
+        # Rewrite the whole file with the current IDs
+        ids = self.get_all_ids() or []
+        f_str = self.ENDIAN_FORMAT_STR + str(len(ids)) + self.INT_FORMAT_STR
+        self.storeFile.seek(0, os.SEEK_SET)
+        self.storeFile.write(struct.Struct(f_str).pack(*ids))
+        self.storeFile.truncate()
+        self.storeFile.flush()
+        self.unflushedChanges = 0
+
+    def read_ids(self):
+        """
+        PRIVATE METHOD.
+        Reads all the IDs stored in the ID file
+
+        :return: List of IDs
+        :rtype: list
+        """
+        # Get the size of the file
+        amt_ids = self.get_file_size() / self.RECORD_SIZE
+        # No IDs available
+        if amt_ids == 0:
+            return []
+        # Seek to begining of file
+        self.storeFile.seek(0, os.SEEK_SET)
+        f_str = self.ENDIAN_FORMAT_STR + str(amt_ids) + self.INT_FORMAT_STR
+        ids_struct = struct.Struct(f_str)
+        ids = ids_struct.unpack(self.storeFile.read(amt_ids * self.RECORD_SIZE))
+        return list(ids)
+
+    @staticmethod
+    def extents_for_ids(ids):
+        """
+        Groups the given IDs into sorted runs of consecutive IDs
+
+        :param ids: IDs to group (any order, duplicates are ignored)
+        :type ids: list
+        :return: Sorted list of (first ID, amount of IDs) runs
+        :rtype: list[tuple]
+        """
+        extents = []
+        for id_value in sorted(set(ids)):
+            if extents and sum(extents[-1]) == id_value:
+                extents[-1] = (extents[-1][0], extents[-1][1] + 1)
+            else:
+                extents.append((id_value, 1))
+        return extents
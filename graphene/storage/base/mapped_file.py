@@ -0,0 +1,218 @@
+import mmap
+import os
+
+
+class SharedMapping(object):
+    """
+    Memory map of a single store file, shared by every MappedFile that has the
+    file open so that all of them see the same size and contents.
+    """
+
+    def __init__(self, file_obj):
+        """
+        Creates a mapping of the given open file
+
+        :param file_obj: File opened for reading and writing ("r+b")
+        :type file_obj: file
+        :return: SharedMapping instance
+        :rtype: SharedMapping
+        """
+        self.file = file_obj
+        # Number of MappedFile handles currently using this mapping
+        self.refs = 0
+        # Size of the mapped file (bytes)
+        self.size = os.fstat(file_obj.fileno()).st_size
+        # A zero-length file cannot be mapped, it is mapped once it grows
+        self.map = None
+        if self.size > 0:
+            self.map = mmap.mmap(file_obj.fileno(), self.size)
+
+    def resize(self, new_size):
+        """
+        Grows or shrinks the file and its mapping to the given size
+
+        :param new_size: New size of the file (bytes)
+        :type new_size: int
+        :return: Nothing
+        :rtype: None
+        """
+        if new_size == self.size:
+            return
+        if new_size == 0:
+            # Mappings cannot be empty, drop the map and truncate the file
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            os.ftruncate(self.file.fileno(), 0)
+        elif self.map is None:
+            os.ftruncate(self.file.fileno(), new_size)
+            self.map = mmap.mmap(self.file.fileno(), new_size)
+        else:
+            # Resizing a file-backed map also resizes the underlying file
+            self.map.resize(new_size)
+        self.size = new_size
+
+    def close(self):
+        """
+        Flushes the mapping to disk and closes it along with the file
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+class MappedFile(object):
+    """
+    File-like wrapper that reads and writes a store file through a memory map,
+    avoiding a system call per record access. Supports the subset of the file
+    interface used by the stores (seek, tell, read, write, truncate).
+    """
+
+    # Open mappings, keyed by (device, inode) so that a file that was removed
+    # and recreated at the same path does not reuse a stale mapping
+    _mappings = {}
+
+    def __init__(self, file_obj):
+        """
+        Wraps the given open file, taking ownership of it
+
+        :param file_obj: File opened for reading and writing ("r+b")
+        :type file_obj: file
+        :return: MappedFile instance
+        :rtype: MappedFile
+        """
+        self.name = file_obj.name
+        # Make sure buffered writes are on disk before the file is mapped
+        file_obj.flush()
+        stat = os.fstat(file_obj.fileno())
+        self._key = (stat.st_dev, stat.st_ino)
+
+        shared = self._mappings.get(self._key)
+        if shared is None:
+            shared = SharedMapping(file_obj)
+            self._mappings[self._key] = shared
+        else:
+            # The file is already mapped, the extra descriptor is not needed
+            file_obj.close()
+        shared.refs += 1
+
+        self._shared = shared
+        self._pos = 0
+        self.closed = False
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """
+        Moves the file position
+
+        :param offset: Offset relative to whence
+        :type offset: int
+        :param whence: One of os.SEEK_SET, os.SEEK_CUR or os.SEEK_END
+        :type whence: int
+        :return: Nothing
+        :rtype: None
+        """
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._shared.size
+        if offset < 0:
+            raise IOError("Invalid argument: negative seek position")
+        self._pos = offset
+
+    def tell(self):
+        """
+        Gets the current file position
+
+        :return: Current position (bytes)
+        :rtype: int
+        """
+        return self._pos
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes from the current position
+
+        :param size: Number of bytes to read, or -1 to read to the end
+        :type size: int
+        :return: Data read, empty at the end of the file
+        :rtype: bytes
+        """
+        shared = self._shared
+        if shared.map is None or self._pos >= shared.size:
+            return ''
+        if size < 0:
+            end = shared.size
+        else:
+            end = min(self._pos + size, shared.size)
+        data = shared.map[self._pos:end]
+        self._pos = end
+        return data
+
+    def write(self, data):
+        """
+        Writes the given data at the current position, growing the file and
+        its mapping if the data goes past the end of the file
+
+        :param data: Data to write
+        :type data: bytes
+        :return: Nothing
+        :rtype: None
+        """
+        shared = self._shared
+        end = self._pos + len(data)
+        if end > shared.size:
+            shared.resize(end)
+        shared.map[self._pos:end] = data
+        self._pos = end
+
+    def truncate(self, size=None):
+        """
+        Truncates the file to the given size (current position by default)
+
+        :param size: New size of the file (bytes)
+        :type size: int
+        :return: Nothing
+        :rtype: None
+        """
+        if size is None:
+            size = self._pos
+        self._shared.resize(size)
+
+    def fileno(self):
+        """
+        Gets the file descriptor of the underlying file
+
+        :return: File descriptor
+        :rtype: int
+        """
+        return self._shared.file.fileno()
+
+    def flush(self):
+        """
+        Flushes modified pages of the mapping to disk
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self._shared.map is not None:
+            self._shared.map.flush()
+
+    def close(self):
+        """
+        Releases this handle, closing the mapping once no handle uses it
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._shared.refs -= 1
+        if self._shared.refs == 0:
+            self._shared.close()
+            del self._mappings[self._key]
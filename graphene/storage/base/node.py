@@ -1,4 +1,4 @@
-class Node:
+class Node(object):
     """
     Stores components of a node:
         inUse: Whether the database is using the node
@@ -6,6 +6,9 @@ class Node:
         propId: ID of the first property the node has
     Along with the index where the node is stored
     """
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "relId", "propId", "nodeType"]
+
     def __init__(self, index=0, in_use=True, rel_id=0, prop_id=0, node_type=0):
         """
         Initializes a Node with the given values
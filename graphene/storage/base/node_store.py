@@ -3,6 +3,11 @@ import struct
 from graphene.storage.base.general_store import *
 from graphene.storage.base.node import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class NodeStore(GeneralStore):
     """
@@ -21,6 +26,10 @@ class NodeStore(GeneralStore):
     RECORD_SIZE = struct.calcsize(STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for the record format
+    STRUCT = struct.Struct(STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Name of NodeStore File
     FILE_NAME = "graphenestore.nodestore.db"
     ''':type: str'''
@@ -28,17 +37,30 @@ class NodeStore(GeneralStore):
     # Type stored by this class
     STORAGE_TYPE = Node
 
-    def __init__(self):
+    # Whether scans over the node store are vectorized with NumPy (only
+    # possible when NumPy is installed)
+    USE_NUMPY = numpy is not None
+    ''':type: bool'''
+
+    # NumPy structured type of a node record, matching STRUCT_FORMAT_STR
+    NUMPY_DTYPE = None if numpy is None else \
+        numpy.dtype([("inUse", "?"), ("relId", "=u4"), ("propId", "=u4"),
+                     ("nodeType", "=u4")])
+
+    def __init__(self, settings=None):
         """
         Creates a NodeStore instance which handles reading/writing to the
         file containing Node values.
 
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: NodeStore instance for handling Node records
         :rtype: NodeStore
         """
 
         # Initialize using generic base class
-        super(NodeStore, self).__init__(self.FILE_NAME, self.RECORD_SIZE)
+        super(NodeStore, self).__init__(self.FILE_NAME, self.RECORD_SIZE,
+                                        settings)
 
     def item_from_packed_data(self, index, packed_data):
         """
@@ -52,8 +74,7 @@ class NodeStore(GeneralStore):
         """
 
         # Unpack the data using the Node struct format
-        node_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        unpacked_data = node_struct.unpack(packed_data)
+        unpacked_data = self.STRUCT.unpack(packed_data)
 
         # Get the node components
         in_use = unpacked_data[0]
@@ -79,8 +100,7 @@ class NodeStore(GeneralStore):
         """
 
         # Pack the node into a struct with the order (inUse, relId, propId)
-        node_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = node_struct.pack(item.inUse, item.relId,
+        packed_data = self.STRUCT.pack(item.inUse, item.relId,
                                        item.propId, item.nodeType)
 
         return packed_data
@@ -92,6 +112,34 @@ class NodeStore(GeneralStore):
         :return: Packed class struct of 0s
         :rtype: bytes
         """
-        empty_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0, 0, 0)
-        return packed_data
\ No newline at end of file
+        packed_data = self.STRUCT.pack(0, 0, 0, 0)
+        return packed_data
+
+    def record_array(self):
+        """
+        Maps the node store file as a read-only NumPy structured array, where
+        the record at position i is the node with index i (record 0 is the
+        file header)
+
+        :return: Structured array of node records (inUse, relId, propId,
+                 nodeType)
+        :rtype: numpy.memmap
+        """
+        # Make sure pending writes are in the file before mapping it
+        with self.IO_LOCK:
+            self.storeFile.flush()
+            amount = self.get_last_file_index()
+        return numpy.memmap(self.storeFile.name, dtype=self.NUMPY_DTYPE,
+                            mode="r", shape=(amount,))
+
+    def types_in_use(self):
+        """
+        Gets the type of every node in use, using a vectorized mask over the
+        whole store
+
+        :return: (node type, node index) pairs, in index order
+        :rtype: list[tuple]
+        """
+        records = self.record_array()
+        indexes = numpy.flatnonzero(records["inUse"])
+        return zip(records["nodeType"][indexes].tolist(), indexes.tolist())
@@ -0,0 +1,232 @@
+import abc
+import struct
+
+from graphene.storage.base.graphene_store import *
+
+
+class PersistentIndex(object):
+    """
+    Base class of the indexes (and other data derived from the stores) that
+    are kept in memory and written as a whole to a file of the datafiles
+    directory. The file starts with a header telling whether it holds a
+    complete copy of the index, followed by the data of the subclass (see
+    read_data and write_data).
+
+    When the changes to the stores are not logged, the header is cleared as
+    soon as the index changes, so that an index left behind by a crash is
+    detected (see clean) and rebuilt from its store. When they are logged to
+    a WriteAheadLog, the file is only written when the log is checkpointed
+    (see write and mark_clean): between checkpoints, it holds the index as of
+    the last checkpoint, which can be brought up to date after a crash from
+    the changes replayed from the log instead of being rebuilt.
+    """
+
+    # Format string used to compact these values
+    # '=': native byte order representation, standard size, no alignment
+    ENDIAN_FORMAT_STR = "="
+    ''':type: str'''
+    # Header: whether the file holds a complete copy of the index
+    HEADER_STRUCT = struct.Struct(ENDIAN_FORMAT_STR + "?")
+    ''':type: struct.Struct'''
+    # Format of a single item index
+    ITEM_FORMAT_STR = "I"
+    ''':type: str'''
+
+    # Whether the data of a file that is not clean is still read, for data
+    # that only needs to be approximately right
+    APPROXIMATE = False
+    ''':type: bool'''
+
+    # Used to indicate abstract methods
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, filename, logged=False):
+        """
+        Creates a PersistentIndex instance, loading the index from the given
+        file
+
+        :param filename: Name of the index file
+        :type filename: str
+        :param logged: Whether the changes to the stores the index is derived
+                       from are logged, the index then being written when the
+                       log is checkpointed
+        :type logged: bool
+        :return: PersistentIndex instance meant to be sub-classed
+        :rtype: PersistentIndex
+        """
+        graphenestore = GrapheneStore()
+        # Store the given filename
+        self.filename = filename
+        # Get the path of the file
+        file_path = graphenestore.datafilesDir + filename
+
+        try:
+            # If the file exists, simply open it
+            if os.path.isfile(file_path):
+                self.storeFile = open(file_path, "r+b")
+            else:
+                # Create the file
+                open(file_path, "w+").close()
+                # Open it so that it can be read/written
+                self.storeFile = open(file_path, "r+b")
+        except IOError:
+            raise IOError("ERROR: unable to open %s file: %s" %
+                          (self.__class__.__name__, file_path))
+
+        self.logged = logged
+        self.reset()
+        # Whether the file holds a complete copy of the index
+        self.clean = self.read_index()
+        # Whether the index changed since it was last written
+        self.dirty = False
+        # Whether the index was written but its header not set yet
+        self.written = False
+
+    def __del__(self):
+        self.flush()
+        self.storeFile.close()
+
+    def read_index(self):
+        """
+        PRIVATE METHOD.
+        Reads the index from its file
+
+        :return: Whether the file holds a complete copy of the index
+        :rtype: bool
+        """
+        self.storeFile.seek(0)
+        data = self.storeFile.read()
+        # A new index has to be built from the store
+        if not data:
+            return False
+        clean, = self.HEADER_STRUCT.unpack_from(data, 0)
+        if not clean and not self.APPROXIMATE:
+            return False
+        try:
+            self.read_data(data, self.HEADER_STRUCT.size)
+        except (struct.error, ValueError):
+            self.reset()
+            return False
+        return clean
+
+    def changed(self):
+        """
+        PRIVATE METHOD.
+        Records that the index changed. Unless the changes to the stores are
+        logged, the file is marked as not clean the first time the index
+        changes after being written, so that a crash before the next flush is
+        detected.
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.dirty:
+            return
+        self.dirty = True
+        if self.logged:
+            return
+        self.storeFile.seek(0)
+        self.storeFile.write(self.HEADER_STRUCT.pack(False))
+        self.storeFile.flush()
+
+    def flush(self):
+        """
+        Writes the whole index to its file, marked as clean
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.write()
+        self.mark_clean()
+
+    def write(self):
+        """
+        Writes the whole index to its file if it changed, marked as not clean
+        until mark_clean is called
+
+        :return: Nothing
+        :rtype: None
+        """
+        if not self.dirty:
+            return
+        self.storeFile.seek(0)
+        self.storeFile.write(self.HEADER_STRUCT.pack(False) +
+                             "".join(self.write_data()))
+        self.storeFile.truncate()
+        self.sync()
+        self.dirty = False
+        self.written = True
+
+    def mark_clean(self):
+        """
+        Marks the index written by write as clean, once its data is on disk
+
+        :return: Nothing
+        :rtype: None
+        """
+        if not self.written:
+            return
+        self.storeFile.seek(0)
+        self.storeFile.write(self.HEADER_STRUCT.pack(True))
+        self.sync()
+        self.written = False
+
+    def sync(self):
+        """
+        PRIVATE METHOD.
+        Flushes the file, and syncs it to disk when the index has to match a
+        checkpoint of the log
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.storeFile.flush()
+        if self.logged:
+            os.fsync(self.storeFile.fileno())
+
+    @abc.abstractmethod
+    def reset(self):
+        """
+        Abstract method: empties the index in memory
+
+        :return: Nothing
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def read_data(self, data, offset):
+        """
+        Abstract method: loads the index from the data of its file
+
+        :param data: Contents of the file
+        :type data: bytes
+        :param offset: Offset of the data of the index, after the header
+        :type offset: int
+        :return: Nothing
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def write_data(self):
+        """
+        Abstract method: packs the index, to be written after the header
+
+        :return: Packed chunks of the index
+        :rtype: list[bytes]
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def items_struct(cls, amount):
+        """
+        Struct for the given amount of item indexes
+
+        :param amount: Number of item indexes
+        :type amount: int
+        :return: Struct packing the item indexes
+        :rtype: struct.Struct
+        """
+        return struct.Struct(cls.ENDIAN_FORMAT_STR + str(amount) +
+                             cls.ITEM_FORMAT_STR)
@@ -1,7 +1,7 @@
 from enum import Enum
 
 
-class Property:
+class Property(object):
     class DefaultValue:
         # Primitive types
         int = 0
@@ -80,8 +80,13 @@ class Property:
         def is_string(prop_type):
             return prop_type.value == 8
 
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "type", "nameId", "prevPropId",
+                 "nextPropId", "propBlockId", "inline"]
+
     def __init__(self, index=0, in_use=True, prop_type=PropertyType.undefined,
-                 name_id=0, prev_prop_id=0, next_prop_id=0, prop_block_id=0):
+                 name_id=0, prev_prop_id=0, next_prop_id=0, prop_block_id=0,
+                 inline=False):
         """
         Initializes a property with the given values
 
@@ -100,6 +105,10 @@ class Property:
         :param prop_block_id: ID to a dynamic store (string or array) or the
                               value if the property is a primitive (int, long,
                               float, etc.)
+        :param inline: Whether the value of a string or array property is
+                       stored in the property record itself, in which case
+                       prop_block_id is the value
+        :type inline: bool
         :return: Property instance with the specified values
         :rtype: Property
         """
@@ -112,6 +121,7 @@ class Property:
         self.prevPropId = prev_prop_id
         self.nextPropId = next_prop_id
         self.propBlockId = prop_block_id
+        self.inline = inline
 
     def __eq__(self, other):
         """
@@ -129,7 +139,8 @@ class Property:
                    (self.nameId == other.nameId) and \
                    (self.prevPropId == other.prevPropId) and\
                    (self.nextPropId == other.nextPropId) and \
-                   (self.propBlockId == other.propBlockId)
+                   (self.propBlockId == other.propBlockId) and \
+                   (self.inline == other.inline)
         else:
             return False
 
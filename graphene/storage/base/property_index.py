@@ -0,0 +1,371 @@
+import bisect
+import struct
+
+from graphene.storage.base.persistent_index import PersistentIndex
+from graphene.storage.base.property import Property
+
+
+class PropertyIndex(PersistentIndex):
+    """
+    Persistent ordered index of the values of a property of the nodes of a
+    node type, so that equality and range predicates are answered with
+    binary searches instead of scans of the nodes of the type. The (value,
+    node index) entries are kept in memory as a blocked sorted list: sorted
+    buckets of at most twice BUCKET_SIZE entries, found by a binary search
+    over the last entry of each bucket, so that inserting or removing an
+    entry only shifts the entries of its bucket (see PersistentIndex for how
+    the file is kept up to date).
+    """
+
+    # Number of entries of a bucket, buckets being split in halves once they
+    # hold twice as many
+    BUCKET_SIZE = 1024
+    ''':type: int'''
+
+    # Comparison operators answered by the index
+    OPERATORS = ("=", "<", "<=", ">", ">=")
+    ''':type: tuple'''
+
+    # Name of the index file, by index of the node type and index of the type
+    # of the property (which does not change when the property is renamed)
+    FILE_NAME_FORMAT = "graphenestore.nodestore.propertyindex.%d.%d.db"
+    ''':type: str'''
+
+    # Per entry: node index, followed by the value
+    NODE_STRUCT = struct.Struct(PersistentIndex.ENDIAN_FORMAT_STR + "I")
+    ''':type: struct.Struct'''
+    # Length of a string or char value, followed by its UTF-8 bytes
+    LENGTH_STRUCT = struct.Struct(PersistentIndex.ENDIAN_FORMAT_STR + "I")
+    ''':type: struct.Struct'''
+    # Format of the values of the other types
+    VALUE_FORMAT_STRS = {
+        Property.PropertyType.int: "q",
+        Property.PropertyType.long: "q",
+        Property.PropertyType.short: "q",
+        Property.PropertyType.bool: "?",
+        Property.PropertyType.float: "d",
+        Property.PropertyType.double: "d",
+    }
+    ''':type: dict'''
+
+    def __init__(self, type_index, tt_index, prop_type, logged=False):
+        """
+        Creates a PropertyIndex instance, loading the index from its file
+
+        :param type_index: Index of the node type
+        :type type_index: int
+        :param tt_index: Index of the type of the property
+        :type tt_index: int
+        :param prop_type: Type of the values of the property (not an array)
+        :type prop_type: PropertyType
+        :param logged: Whether the changes to the stores are logged
+        :type logged: bool
+        :return: Property index instance
+        :rtype: PropertyIndex
+        """
+        self.propType = prop_type
+        if prop_type in self.VALUE_FORMAT_STRS:
+            self.valueStruct = struct.Struct(
+                self.ENDIAN_FORMAT_STR + self.VALUE_FORMAT_STRS[prop_type])
+        else:
+            self.valueStruct = None
+
+        super(PropertyIndex, self).__init__(
+            self.FILE_NAME_FORMAT % (type_index, tt_index), logged)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value, node_index):
+        """
+        Adds the value of the property of the given node to the index
+
+        :param value: Value of the property
+        :param node_index: Index of the node
+        :type node_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.insert(value, node_index)
+        self.changed()
+
+    def remove(self, value, node_index):
+        """
+        Removes the value of the property of the given node from the index
+
+        :param value: Value of the property
+        :param node_index: Index of the node
+        :type node_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        entry = (self.key(value), node_index)
+        i = bisect.bisect_left(self.maxes, entry)
+        if i == len(self.buckets):
+            return
+        bucket = self.buckets[i]
+        pos = bisect.bisect_left(bucket, entry)
+        if pos == len(bucket) or bucket[pos] != entry:
+            return
+        del bucket[pos]
+        self.size -= 1
+        if bucket:
+            self.maxes[i] = bucket[-1]
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+        self.changed()
+
+    def lookup(self, oper, value):
+        """
+        Gets the nodes whose value of the property compares to the given
+        value with the given operator
+
+        :param oper: One of OPERATORS
+        :type oper: str
+        :param value: Value to compare with
+        :return: Indexes of the matching nodes, in order
+        :rtype: list[int]
+        """
+        return self.lookup_all([(oper, value)])
+
+    def lookup_all(self, predicates):
+        """
+        Gets the nodes whose value of the property satisfies all the given
+        comparisons, e.g. a range given by a lower and an upper bound
+
+        :param predicates: (operator, value) pairs, operators being OPERATORS
+        :type predicates: list[tuple]
+        :return: Indexes of the matching nodes, in order
+        :rtype: list[int]
+        """
+        low, high = self.range_bounds(predicates)
+        return sorted(node_index for _, node_index in self.entries(low, high))
+
+    def count(self, oper, value):
+        """
+        Counts the nodes whose value of the property compares to the given
+        value with the given operator, without gathering them
+
+        :param oper: One of OPERATORS
+        :type oper: str
+        :param value: Value to compare with
+        :return: Number of matching nodes
+        :rtype: int
+        """
+        return self.count_all([(oper, value)])
+
+    def count_all(self, predicates):
+        """
+        Counts the nodes whose value of the property satisfies all the given
+        comparisons, without gathering them
+
+        :param predicates: (operator, value) pairs, operators being OPERATORS
+        :type predicates: list[tuple]
+        :return: Number of matching nodes
+        :rtype: int
+        """
+        low, high = self.range_bounds(predicates)
+        return max(high - low, 0)
+
+    def rebuild(self, entries):
+        """
+        Replaces the whole index with the given entries
+
+        :param entries: (value, node index) pairs, in any order
+        :type entries: iterable
+        :return: Nothing
+        :rtype: None
+        """
+        self.set_entries(sorted((self.key(value), node_index)
+                                for value, node_index in entries))
+        self.clean = True
+        self.changed()
+
+    def range_bounds(self, predicates):
+        """
+        PRIVATE METHOD.
+        Slice of the sorted entries satisfying all the given comparisons,
+        which is the intersection of their slices
+
+        :return: Start and end of the slice, the end may be before the start
+        :rtype: tuple
+        """
+        low, high = 0, self.size
+        for oper, value in predicates:
+            pred_low, pred_high = self.bounds(oper, value)
+            low = max(low, pred_low)
+            high = min(high, pred_high)
+        return low, high
+
+    def bounds(self, oper, value):
+        """
+        PRIVATE METHOD.
+        Slice of the sorted entries compared to the given value with the
+        given operator
+
+        :return: Start and end of the slice
+        :rtype: tuple
+        """
+        if oper not in self.OPERATORS:
+            raise ValueError("Operator %s cannot use an index." % oper)
+        value = self.key(value)
+        # Entries of the value are between (value,) and (value, inf)
+        low = self.rank((value,))
+        high = self.rank((value, float("inf")))
+        if oper == "=":
+            return low, high
+        elif oper == "<":
+            return 0, low
+        elif oper == "<=":
+            return 0, high
+        elif oper == ">":
+            return high, self.size
+        else:
+            return low, self.size
+
+    def rank(self, entry):
+        """
+        PRIVATE METHOD.
+        Number of entries smaller than the given entry
+
+        :return: Position of the entry in the sorted entries
+        :rtype: int
+        """
+        i = bisect.bisect_left(self.maxes, entry)
+        if i == len(self.buckets):
+            return self.size
+        return sum(len(bucket) for bucket in self.buckets[:i]) + \
+            bisect.bisect_left(self.buckets[i], entry)
+
+    def entries(self, low, high):
+        """
+        PRIVATE METHOD.
+        Iterates over a slice of the sorted entries
+
+        :param low: Position of the first entry
+        :type low: int
+        :param high: Position after the last entry
+        :type high: int
+        :return: (value, node index) entries
+        :rtype: generator
+        """
+        start = 0
+        for bucket in self.buckets:
+            if start >= high:
+                break
+            end = start + len(bucket)
+            if end > low:
+                for entry in bucket[max(low - start, 0):high - start]:
+                    yield entry
+            start = end
+
+    def set_entries(self, entries):
+        """
+        PRIVATE METHOD.
+        Replaces the entries of the index, splitting them into buckets
+
+        :param entries: Sorted (value, node index) entries
+        :type entries: list[tuple]
+        :return: Nothing
+        :rtype: None
+        """
+        size = self.BUCKET_SIZE
+        self.buckets = [entries[i:i + size]
+                        for i in xrange(0, len(entries), size)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.size = len(entries)
+
+    def insert(self, value, node_index):
+        """
+        PRIVATE METHOD.
+        Inserts an entry in order, without marking the index as changed
+
+        :return: Nothing
+        :rtype: None
+        """
+        entry = (self.key(value), node_index)
+        self.size += 1
+        if not self.buckets:
+            self.buckets.append([entry])
+            self.maxes.append(entry)
+            return
+        # The first bucket whose last entry is not smaller, or the last one
+        i = min(bisect.bisect_left(self.maxes, entry), len(self.buckets) - 1)
+        bucket = self.buckets[i]
+        bisect.insort(bucket, entry)
+        self.maxes[i] = bucket[-1]
+        if len(bucket) >= 2 * self.BUCKET_SIZE:
+            half = len(bucket) // 2
+            self.buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self.maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+
+    def key(self, value):
+        """
+        PRIVATE METHOD.
+        Value as kept in the index, strings and chars being compared as
+        unicode whatever type they were given with
+
+        :return: Indexed value
+        """
+        if self.valueStruct is None and isinstance(value, str):
+            return value.decode("utf-8")
+        return value
+
+    def reset(self):
+        """
+        PRIVATE METHOD.
+        Empties the index in memory
+
+        :return: Nothing
+        :rtype: None
+        """
+        # Sorted buckets of (value, node index) entries, the last entry of
+        # each bucket, and the total number of entries
+        self.buckets = []
+        self.maxes = []
+        self.size = 0
+
+    def read_data(self, data, offset):
+        """
+        PRIVATE METHOD.
+        Loads the entries from the data of the file
+
+        :return: Nothing
+        :rtype: None
+        """
+        entries = []
+        while offset < len(data):
+            node_index, = self.NODE_STRUCT.unpack_from(data, offset)
+            offset += self.NODE_STRUCT.size
+            if self.valueStruct is not None:
+                value, = self.valueStruct.unpack_from(data, offset)
+                offset += self.valueStruct.size
+            else:
+                length, = self.LENGTH_STRUCT.unpack_from(data, offset)
+                offset += self.LENGTH_STRUCT.size
+                value = data[offset:offset + length].decode("utf-8")
+                offset += length
+            entries.append((value, node_index))
+        # Entries are written in order
+        self.set_entries(entries)
+
+    def write_data(self):
+        """
+        PRIVATE METHOD.
+        Packs the entries in order, each one as its node index followed by
+        its value
+
+        :return: Packed chunks of the index
+        :rtype: list[bytes]
+        """
+        chunks = []
+        for value, node_index in self.entries(0, self.size):
+            chunks.append(self.NODE_STRUCT.pack(node_index))
+            if self.valueStruct is not None:
+                chunks.append(self.valueStruct.pack(value))
+            else:
+                data = value.encode("utf-8")
+                chunks.append(self.LENGTH_STRUCT.pack(len(data)))
+                chunks.append(data)
+        return chunks
@@ -9,6 +9,9 @@ class PropertyStore(GeneralStore):
     Handles storage of properties to a file. It stores the properties using
     the format:
     (inUse, type, nameId, prevPropId, nextPropId, propBlockId)
+    Short strings and small arrays can be stored inline, in the data block
+    instead of propBlockId. Such properties have the INLINE_FLAG bit set in
+    their type, along with the number of array items.
     """
 
     # Format string used to compact header values
@@ -23,20 +26,67 @@ class PropertyStore(GeneralStore):
     HEADER_SIZE = struct.calcsize(HEADER_STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for the header format
+    HEADER_STRUCT = struct.Struct(HEADER_STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Format string used to read types other than floats and doubles
     # 'q': signed long long
     REGULAR_FORMAT_STR = "q"
     ''':type: str'''
 
+    # Precompiled struct for types other than floats and doubles
+    REGULAR_STRUCT = struct.Struct(REGULAR_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Format string to handle float and double types
     # 'd': double
     LONG_FORMAT_STR = "d"
     ''':type: str'''
 
+    # Precompiled struct for float and double types
+    LONG_STRUCT = struct.Struct(LONG_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Size of data block (same whether decimal or non-decimal: 8 bytes)
     BLOCK_SIZE = struct.calcsize(REGULAR_FORMAT_STR)
     ''':type: int'''
 
+    # Bit of the type set when the value is stored inline
+    INLINE_FLAG = 0x80
+    ''':type: int'''
+
+    # Bits of the type holding the number of items of an inline array
+    INLINE_AMOUNT_MASK = 0x60
+    ''':type: int'''
+    INLINE_AMOUNT_SHIFT = 5
+    ''':type: int'''
+
+    # Bits of the type holding the property type
+    TYPE_MASK = 0x1f
+    ''':type: int'''
+
+    # Maximum number of items of an inline array
+    INLINE_MAX_AMOUNT = INLINE_AMOUNT_MASK >> INLINE_AMOUNT_SHIFT
+    ''':type: int'''
+
+    # Format of the items of the arrays that can be stored inline (same as in
+    # the ArrayStore), by array type
+    INLINE_ARRAY_FORMAT_STRS = {
+        Property.PropertyType.boolArray: "?",
+        Property.PropertyType.charArray: "H",
+        Property.PropertyType.shortArray: "h",
+        Property.PropertyType.intArray: "i",
+        Property.PropertyType.floatArray: "f",
+        Property.PropertyType.longArray: "q",
+        Property.PropertyType.doubleArray: "d",
+    }
+    ''':type: dict[PropertyType, str]'''
+
+    # Encoding of inline strings (same as in the property string store)
+    INLINE_ENCODING = "UTF-8"
+    ''':type: str'''
+
     # Name of PropertyStore File
     FILE_NAME = "graphenestore.propertystore.db"
     ''':type: str'''
@@ -44,11 +94,13 @@ class PropertyStore(GeneralStore):
     # Type stored by this class
     STORAGE_TYPE = Property
 
-    def __init__(self):
+    def __init__(self, settings=None):
         """
         Creates a PropertyStore instance which handles reading/writing to
         the file containing property values
 
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: PropertyStore instance for handling property records
         :rtype: PropertyStore
         """
@@ -56,7 +108,8 @@ class PropertyStore(GeneralStore):
         record_size = self.HEADER_SIZE + self.BLOCK_SIZE
 
         # Initialize using generic base class
-        super(PropertyStore, self).__init__(self.FILE_NAME, record_size)
+        super(PropertyStore, self).__init__(self.FILE_NAME, record_size,
+                                            settings)
 
     def item_from_packed_data(self, index, packed_data):
         """
@@ -74,12 +127,12 @@ class PropertyStore(GeneralStore):
         block_data = packed_data[self.HEADER_SIZE:]
 
         # Unpack the header data using the header struct format
-        header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        unpacked_header_data = header_struct.unpack(header_data)
+        unpacked_header_data = self.HEADER_STRUCT.unpack(header_data)
 
         # Get the property header components
         in_use = unpacked_header_data[0]
-        prop_type = Property.PropertyType(unpacked_header_data[1])
+        type_data = unpacked_header_data[1]
+        prop_type = Property.PropertyType(type_data & self.TYPE_MASK)
         key_index_id = unpacked_header_data[2]
         prev_prop_id = unpacked_header_data[3]
         next_prop_id = unpacked_header_data[4]
@@ -90,11 +143,12 @@ class PropertyStore(GeneralStore):
             return None
 
         # Unpack the block data
-        prop_block_id = self.value_from_data(prop_type, block_data)
+        prop_type, prop_block_id, inline = \
+            self.unpack_value(type_data, block_data)
 
         # Create a property record with these components
         return Property(index, in_use, prop_type, key_index_id,
-                        prev_prop_id, next_prop_id, prop_block_id)
+                        prev_prop_id, next_prop_id, prop_block_id, inline)
 
     def packed_data_from_item(self, item):
         """
@@ -105,14 +159,12 @@ class PropertyStore(GeneralStore):
         :return: Packed data
         :rtype: bytes
         """
+        type_data, packed_block = self.pack_value(item)
         # Pack the property header into a struct with the order
         # (inUse, type, keyIndexId, prevPropId, nextPropId)
-        header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        packed_header = header_struct.pack(item.inUse, item.type.value,
-                                           item.nameId, item.prevPropId,
-                                           item.nextPropId)
-        # Pack the data block
-        packed_block = self.value_to_data(item.type, item.propBlockId)
+        packed_header = self.HEADER_STRUCT.pack(item.inUse, type_data,
+                                                item.nameId, item.prevPropId,
+                                                item.nextPropId)
         # Concatenate the two
         return packed_header + packed_block
 
@@ -123,11 +175,54 @@ class PropertyStore(GeneralStore):
         :return: Packed struct of 0s
         :rtype: bytes
         """
-        empty_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR +
-                                     self.REGULAR_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0, 0, 0, 0, 0)
+        packed_data = self.HEADER_STRUCT.pack(0, 0, 0, 0, 0) + \
+            self.REGULAR_STRUCT.pack(0)
         return packed_data
 
+    @classmethod
+    def pack_value(cls, item):
+        """
+        Packs the type of the given property, along with its inline flags, and
+        its data block
+
+        :param item: Property to pack the value of
+        :type item: Property
+        :return: Type data and packed data block
+        :rtype: tuple
+        """
+        type_data = item.type.value
+        if item.inline:
+            type_data |= cls.INLINE_FLAG
+            if Property.PropertyType.is_array(item.type):
+                type_data |= len(item.propBlockId) << cls.INLINE_AMOUNT_SHIFT
+            packed_block = cls.inline_value_to_data(item.type, item.propBlockId)
+        else:
+            packed_block = cls.value_to_data(item.type, item.propBlockId)
+        return type_data, packed_block
+
+    @classmethod
+    def unpack_value(cls, type_data, packed_data):
+        """
+        Unpacks the value of a property from its type data and data block
+
+        :param type_data: Type of the property, along with its inline flags
+        :type type_data: int
+        :param packed_data: Packed data block
+        :type packed_data: bytes
+        :return: Property type, value (or index of the dynamic value) and
+                 whether the value is stored inline
+        :rtype: tuple
+        """
+        prop_type = Property.PropertyType(type_data & cls.TYPE_MASK)
+        inline = bool(type_data & cls.INLINE_FLAG)
+        if inline:
+            amount = (type_data & cls.INLINE_AMOUNT_MASK) >> \
+                cls.INLINE_AMOUNT_SHIFT
+            value = cls.inline_value_from_data(prop_type, packed_data, amount)
+        else:
+            value = cls.value_from_data(prop_type, packed_data)
+        return prop_type, value, inline
+
     @classmethod
     def value_from_data(cls, prop_type, packed_data):
         """
@@ -142,12 +237,10 @@ class PropertyStore(GeneralStore):
         # Long values (8 bytes)
         if prop_type is Property.PropertyType.double or \
            prop_type is Property.PropertyType.float:
-            decimal_struct = struct.Struct(cls.LONG_FORMAT_STR)
-            return decimal_struct.unpack(packed_data)[0]
+            return cls.LONG_STRUCT.unpack(packed_data)[0]
 
         # Unpack the general data
-        general_struct = struct.Struct(cls.REGULAR_FORMAT_STR)
-        general_value = general_struct.unpack(packed_data)[0]
+        general_value = cls.REGULAR_STRUCT.unpack(packed_data)[0]
 
         # Character type stored as ASCII value
         if prop_type is Property.PropertyType.char:
@@ -174,11 +267,10 @@ class PropertyStore(GeneralStore):
         # Long values (8 bytes)
         if prop_type is Property.PropertyType.double or \
            prop_type is Property.PropertyType.float:
-            decimal_struct = struct.Struct(cls.LONG_FORMAT_STR)
-            return decimal_struct.pack(value)
+            return cls.LONG_STRUCT.pack(value)
 
-        # Create a struct for the other cases
-        general_struct = struct.Struct(cls.REGULAR_FORMAT_STR)
+        # Use the general struct for the other cases
+        general_struct = cls.REGULAR_STRUCT
 
         # Convert character into ASCII value
         if prop_type is Property.PropertyType.char:
@@ -189,4 +281,67 @@ class PropertyStore(GeneralStore):
         # These general values do not need further processing:
         # int, long, short, or an index to a dynamic store for dynamic types
         else:
-            return general_struct.pack(value)
\ No newline at end of file
+            return general_struct.pack(value)
+
+    @classmethod
+    def fits_inline(cls, prop_type, value):
+        """
+        Whether the given string or array value can be stored inline
+
+        :param prop_type: Property type of the value
+        :type prop_type: PropertyType
+        :param value: Value to store
+        :return: True if the value fits in the data block, False otherwise
+        :rtype: bool
+        """
+        if Property.PropertyType.is_string(prop_type):
+            data = value.encode(cls.INLINE_ENCODING)
+            # Inline strings are padded with null bytes
+            return len(data) <= cls.BLOCK_SIZE and "\x00" not in data
+        format_str = cls.INLINE_ARRAY_FORMAT_STRS.get(prop_type)
+        if format_str is None or len(value) > cls.INLINE_MAX_AMOUNT:
+            return False
+        return struct.calcsize("=" + format_str * len(value)) <= cls.BLOCK_SIZE
+
+    @classmethod
+    def inline_value_from_data(cls, prop_type, packed_data, amount):
+        """
+        Unpacks the given inline string or array
+
+        :param prop_type: Property type of the value
+        :type prop_type: PropertyType
+        :param packed_data: Packed data block
+        :type packed_data: bytes
+        :param amount: Number of items of an array
+        :type amount: int
+        :return: String or list of items
+        """
+        if Property.PropertyType.is_string(prop_type):
+            return packed_data.rstrip("\x00").decode(cls.INLINE_ENCODING)
+        format_str = cls.INLINE_ARRAY_FORMAT_STRS[prop_type]
+        items = list(struct.unpack_from("=" + format_str * amount,
+                                        packed_data))
+        # Chars are stored as their code point
+        if prop_type is Property.PropertyType.charArray:
+            return map(unichr, items)
+        return items
+
+    @classmethod
+    def inline_value_to_data(cls, prop_type, value):
+        """
+        Packs the given string or array into a data block
+
+        :param prop_type: Property type of the value
+        :type prop_type: PropertyType
+        :param value: String or list of items that fits inline
+        :return: Packed data block
+        :rtype: bytes
+        """
+        if Property.PropertyType.is_string(prop_type):
+            data = value.encode(cls.INLINE_ENCODING)
+        else:
+            if prop_type is Property.PropertyType.charArray:
+                value = map(ord, value)
+            format_str = cls.INLINE_ARRAY_FORMAT_STRS[prop_type]
+            data = struct.pack("=" + format_str * len(value), *value)
+        return data.ljust(cls.BLOCK_SIZE, "\x00")
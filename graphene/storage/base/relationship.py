@@ -1,7 +1,7 @@
 from enum import Enum
 
 
-class Relationship:
+class Relationship(object):
     """
     Stores the following information about a relationship:
         - Index:                Index of the relationship in the store file
@@ -21,6 +21,11 @@ class Relationship:
         left = 1
         right = 2
 
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "direction", "firstNodeId", "secondNodeId",
+                 "relType", "firstPrevRelId", "firstNextRelId",
+                 "secondPrevRelId", "secondNextRelId", "propId"]
+
     def __init__(self, index=0, in_use=True, direction=Direction.undefined,
                  first_node_id=0, second_node_id=0, rel_type=0,
                  first_prev_rel_id=0, first_next_rel_id=0,
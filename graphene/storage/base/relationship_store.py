@@ -30,6 +30,10 @@ class RelationshipStore(GeneralStore):
     RECORD_SIZE = struct.calcsize(STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for the record format
+    STRUCT = struct.Struct(STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Name of RelationshipStore File
     FILE_NAME = "graphenestore.relationshipstore.db"
     ''':type: str'''
@@ -37,17 +41,19 @@ class RelationshipStore(GeneralStore):
     # Type stored by this class
     STORAGE_TYPE = Relationship
 
-    def __init__(self):
+    def __init__(self, settings=None):
         """
         Creates a RelationshipStore instance which handles reading/writing to
         the file containing relationship values
 
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: RelationshipStore instance for handling relationship records
         :rtype: RelationshipStore
         """
         # Initialize using generic base class
         super(RelationshipStore, self).__init__(self.FILE_NAME,
-                                                self.RECORD_SIZE)
+                                                self.RECORD_SIZE, settings)
 
     def item_from_packed_data(self, index, packed_data):
         """
@@ -62,8 +68,7 @@ class RelationshipStore(GeneralStore):
         """
 
         # Unpack the data using the relationship struct format
-        relationship_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        unpacked_data = relationship_struct.unpack(packed_data)
+        unpacked_data = self.STRUCT.unpack(packed_data)
 
         # Get the relationship components
 
@@ -108,21 +113,20 @@ class RelationshipStore(GeneralStore):
         # Pack the relationship into a struct with the order
         # (inUse_direction, firstNode, secondNode, relType, firstPrevRelId,
         #  firstNextRelId, secondPrevRelId, secondNextRelId, nextPropId)
-        relationship_struct = struct.Struct(self.STRUCT_FORMAT_STR)
 
         # Create enum to combine the in use and direction values
         enum = self.enum_from_in_use_dir(relationship.inUse,
                                          relationship.direction)
 
-        packed_data = relationship_struct.pack(enum.value,
-                                               relationship.firstNodeId,
-                                               relationship.secondNodeId,
-                                               relationship.relType,
-                                               relationship.firstPrevRelId,
-                                               relationship.firstNextRelId,
-                                               relationship.secondPrevRelId,
-                                               relationship.secondNextRelId,
-                                               relationship.propId)
+        packed_data = self.STRUCT.pack(enum.value,
+                                       relationship.firstNodeId,
+                                       relationship.secondNodeId,
+                                       relationship.relType,
+                                       relationship.firstPrevRelId,
+                                       relationship.firstNextRelId,
+                                       relationship.secondPrevRelId,
+                                       relationship.secondNextRelId,
+                                       relationship.propId)
 
         return packed_data
 
@@ -132,8 +136,7 @@ class RelationshipStore(GeneralStore):
 
         :return: Packed class struct of 0s
         """
-        empty_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0, 0, 0, 0, 0, 0, 0, 0)
+        packed_data = self.STRUCT.pack(0, 0, 0, 0, 0, 0, 0, 0, 0)
         return packed_data
 
     @classmethod
@@ -1,4 +1,4 @@
-class RelationshipType:
+class RelationshipType(object):
     """
     Stores components of a relationship type:
         inUse: Whether relationship type is in use
@@ -6,6 +6,9 @@ class RelationshipType:
     Along with the index where the relationship type is stored
     """
 
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "typeBlockId"]
+
     def __init__(self, index=0, in_use=True, type_block_id=0):
         """
         Initialize a RelationshipType record.
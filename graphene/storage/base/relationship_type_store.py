@@ -26,6 +26,10 @@ class RelationshipTypeStore(GeneralStore):
     RECORD_SIZE = struct.calcsize(STRUCT_FORMAT_STR)
     ''':type: int'''
 
+    # Precompiled struct for the record format
+    STRUCT = struct.Struct(STRUCT_FORMAT_STR)
+    ''':type: struct.Struct'''
+
     # Name of RelationshipTypeStore File
     FILE_NAME = "graphenestore.relationshiptypestore.db"
     ''':type: str'''
@@ -33,16 +37,19 @@ class RelationshipTypeStore(GeneralStore):
     # Type stored by this class
     STORAGE_TYPE = RelationshipType
 
-    def __init__(self):
+    def __init__(self, settings=None):
         """
         Creates a RelationshipTypeStore instance.
 
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: RelationshipStore instance for handling relationship records
         :rtype: RelationshipStore
         """
         # Initialize using generic base class
         super(RelationshipTypeStore, self).__init__(self.FILE_NAME,
-                                                    self.RECORD_SIZE)
+                                                    self.RECORD_SIZE,
+                                                    settings)
 
     def item_from_packed_data(self, index, packed_data):
         """
@@ -56,8 +63,7 @@ class RelationshipTypeStore(GeneralStore):
         :rtype: RelationshipType
         """
         # Unpack the data using the relationship type struct format
-        relationship_type_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        unpacked_data = relationship_type_struct.unpack(packed_data)
+        unpacked_data = self.STRUCT.unpack(packed_data)
 
         # Get the relationship type components
         in_use = unpacked_data[0]
@@ -77,10 +83,8 @@ class RelationshipTypeStore(GeneralStore):
         :type relationship_type: RelationshipType
         :return: Packed data string.
         """
-        relationship_type_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-
-        packed_data = relationship_type_struct.pack(
-            relationship_type.inUse, relationship_type.typeBlockId)
+        packed_data = self.STRUCT.pack(relationship_type.inUse,
+                                       relationship_type.typeBlockId)
 
         return packed_data
 
@@ -90,6 +94,5 @@ class RelationshipTypeStore(GeneralStore):
 
         :return: Packed class struct of 0s
         """
-        empty_struct = struct.Struct(self.STRUCT_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0)
+        packed_data = self.STRUCT.pack(0, 0)
         return packed_data
\ No newline at end of file
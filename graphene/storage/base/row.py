@@ -0,0 +1,78 @@
+class Row(object):
+    """
+    Stores components of a row, holding all the properties of a node in the
+    row file of its node type:
+        inUse: Whether the database is using the row
+        properties: Properties of the node, in the order of the schema
+    Along with the index where the row is stored
+    """
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "properties"]
+
+    def __init__(self, index=0, in_use=True, properties=None):
+        """
+        Initializes a Row with the given values
+
+        :param index: Index of the row to initialize
+        :type index: int
+        :param in_use: Whether the database is using the row
+        :type in_use: bool
+        :param properties: Properties of the node. They are not linked and
+                           have no index of their own.
+        :type properties: list[Property]
+        :return: Row instance with the specified values
+        :rtype: Row
+        """
+        # Index of the row is not stored in the RowStore file
+        self.index = index
+        # Values stored in the RowStore file
+        self.inUse = in_use
+        if properties is None:
+            properties = []
+        self.properties = properties
+
+    def __eq__(self, other):
+        """
+        Overload the == operator
+
+        :param other: Other row
+        :type other: Row
+        :return: True if equivalent, false otherwise
+        :rtype: bool
+        """
+        if isinstance(other, self.__class__):
+            return (self.index == other.index) and \
+                   (self.inUse == other.inUse) and \
+                   (self.properties == other.properties)
+        else:
+            return False
+
+    def __ne__(self, other):
+        """
+        Overload the != operator
+
+        :param other: Other row
+        :type other: Row
+        :return: True if not equivalent, false otherwise
+        :rtype: bool
+        """
+        return not (self == other)
+
+    def __repr__(self):
+        """
+        String representation of this row.
+
+        :return: Human-readable string representing this row.
+        """
+        args = (self.index, self.properties)
+        return "Row: %d. properties: %s" % args
+
+    def list(self):
+        """
+        List the items that this type contains, excluding the index. This is
+        essentially how it's stored on disk
+
+        :return: List of data contained in this type
+        :rtype: list
+        """
+        return [self.inUse, self.properties]
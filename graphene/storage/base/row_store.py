@@ -0,0 +1,226 @@
+import struct
+
+from graphene.storage.base.general_store import *
+from graphene.storage.base.property_store import *
+from graphene.storage.base.row import *
+
+
+class RowStore(GeneralStore):
+    """
+    Handles storage of the properties of the nodes of a node type to a file,
+    one fixed-width row per node. It stores the rows using the format:
+    (inUse, type, block, type, block, ...)
+    with one (type, block) column per property of the schema of the node type.
+    Types and blocks are packed as in the PropertyStore: primitives are stored
+    in the block, strings and arrays are referenced by the index of their
+    first block (unless they are stored inline).
+    """
+
+    # Format string used to compact the in use flag
+    # '=': native byte order representation, standard size, no alignment
+    # '?': boolean
+    HEADER_STRUCT_FORMAT_STR = "= ?"
+    ''':type: str'''
+
+    # Format string used to compact a column
+    # 'B': unsigned char
+    # 's': data block
+    COLUMN_FORMAT_STR = " B %ds" % PropertyStore.BLOCK_SIZE
+    ''':type: str'''
+
+    # Size of the in use flag and of a column (bytes)
+    HEADER_SIZE = struct.calcsize(HEADER_STRUCT_FORMAT_STR)
+    ''':type: int'''
+    COLUMN_SIZE = struct.calcsize("=" + COLUMN_FORMAT_STR)
+    ''':type: int'''
+
+    # Name of the RowStore file of a node type, by index of the node type
+    FILE_NAME_FORMAT = "graphenestore.nodestore.rows.%d.db"
+    ''':type: str'''
+
+    # Number of rows read at once when the rows are copied to a new file
+    COPY_CHUNK_ROWS = 1024
+    ''':type: int'''
+
+    # Type stored by this class
+    STORAGE_TYPE = Row
+
+    def __init__(self, type_index, columns, settings=None):
+        """
+        Creates a RowStore instance which handles reading/writing to the
+        file containing the rows of the nodes of a node type
+
+        :param type_index: Index of the node type
+        :type type_index: int
+        :param columns: Number of properties in the schema of the node type
+        :type columns: int
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
+        :return: RowStore instance for handling row records
+        :rtype: RowStore
+        """
+        self.set_record_format(columns)
+
+        # Initialize using generic base class
+        super(RowStore, self).__init__(self.FILE_NAME_FORMAT % type_index,
+                                       self.STRUCT.size, settings)
+
+    def set_record_format(self, columns):
+        """
+        PRIVATE METHOD.
+        Sets the format of the records for the given number of columns
+
+        :param columns: Number of properties per row
+        :type columns: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.columns = columns
+        self.STRUCT = self.row_struct(columns)
+        self.recordSize = self.STRUCT.size
+
+    def set_columns(self, columns, change):
+        """
+        Changes the number of columns of the rows, when the schema of the node
+        type changes. Every row is changed with the given function and
+        written to a new file at the same index, which then replaces the
+        store file (see replace_file), so that the rows are kept if the
+        change fails part way.
+
+        :param columns: New number of properties per row
+        :type columns: int
+        :param change: Function given the properties of a row, returning the
+                       properties of its new columns
+        :type change: function
+        :return: Nothing
+        :rtype: None
+        """
+        new_struct = self.row_struct(columns)
+        empty_data = "\x00" * new_struct.size
+        new_filename = self.filename + ".new"
+        new_path = GrapheneStore().datafilesDir + new_filename
+        try:
+            with open(new_path, "wb") as new_file:
+                new_file.write(empty_data)
+                last_index = self.get_last_file_index()
+                for start in xrange(1, last_index, self.COPY_CHUNK_ROWS):
+                    chunk = []
+                    for row in self.items_in_range(start,
+                                                   self.COPY_CHUNK_ROWS):
+                        if row is None:
+                            chunk.append(empty_data)
+                        else:
+                            chunk.append(self.pack_row(
+                                new_struct, row.inUse,
+                                change(row.properties)))
+                    new_file.write("".join(chunk))
+                new_file.flush()
+                os.fsync(new_file.fileno())
+        except:
+            os.remove(new_path)
+            raise
+        self.set_record_format(columns)
+        self.replace_file(new_filename)
+
+    def clear(self):
+        """
+        Empties the store, e.g. of the rows left behind by a deleted node type
+        whose index is reused
+
+        :return: Nothing
+        :rtype: None
+        """
+        header = self.empty_struct_data()
+        with self.IO_LOCK:
+            if self.WAL is not None:
+                self.WAL.log_truncate(self, 0)
+            self.storeFile.truncate(0)
+            self.fileSize = 0
+            if self.WAL is not None:
+                self.WAL.log_write(self, 0, header)
+            self.storeFile.seek(0)
+            self.storeFile.write(header)
+            self.fileSize = self.allocatedSize = len(header)
+
+    def item_from_packed_data(self, index, packed_data):
+        """
+        Creates a row from the given packed data
+
+        :param index: Index of the row the packed data belongs to
+        :type index: int
+        :param packed_data: Packed binary data
+        :type packed_data: bytes
+        :return: Row from packed data
+        :rtype: Row
+        """
+        # Empty data, deleted item
+        if packed_data == self.empty_struct_data():
+            return None
+
+        # Unpack the data using the row struct format
+        unpacked_data = self.STRUCT.unpack(packed_data)
+
+        # Get the row components
+        in_use = unpacked_data[0]
+        properties = []
+        for i in xrange(1, len(unpacked_data), 2):
+            prop_type, prop_block_id, inline = PropertyStore.unpack_value(
+                unpacked_data[i], unpacked_data[i + 1])
+            properties.append(Property(prop_type=prop_type,
+                                       prop_block_id=prop_block_id,
+                                       inline=inline))
+
+        # Create a row record with these components
+        return Row(index, in_use, properties)
+
+    def packed_data_from_item(self, item):
+        """
+        Creates packed data with the row given
+
+        :param item: Row to convert into packed data
+        :type item: Row
+        :return: Packed data
+        :rtype: bytes
+        """
+        return self.pack_row(self.STRUCT, item.inUse, item.properties)
+
+    @classmethod
+    def row_struct(cls, columns):
+        """
+        PRIVATE METHOD.
+        Struct of the rows with the given number of columns
+
+        :param columns: Number of properties per row
+        :type columns: int
+        :return: Struct of a row
+        :rtype: struct.Struct
+        """
+        return struct.Struct(cls.HEADER_STRUCT_FORMAT_STR +
+                             cls.COLUMN_FORMAT_STR * columns)
+
+    @classmethod
+    def pack_row(cls, row_struct, in_use, properties):
+        """
+        PRIVATE METHOD.
+        Packs a row with the given struct
+
+        :return: Packed data
+        :rtype: bytes
+        """
+        columns = (row_struct.size - cls.HEADER_SIZE) / cls.COLUMN_SIZE
+        if len(properties) != columns:
+            raise ValueError("Row has %d properties, expected %d." %
+                             (len(properties), columns))
+        values = [in_use]
+        for prop in properties:
+            values.extend(PropertyStore.pack_value(prop))
+        return row_struct.pack(*values)
+
+    def empty_struct_data(self):
+        """
+        Creates a packed struct of 0s
+
+        :return: Packed struct of 0s
+        :rtype: bytes
+        """
+        return "\x00" * self.STRUCT.size
@@ -0,0 +1,480 @@
+import bisect
+import json
+import numbers
+
+from graphene.storage.base.persistent_index import PersistentIndex
+
+
+class Statistics(PersistentIndex):
+    """
+    Persistent statistics of the node and relationship types, collected by
+    ANALYZE and used to estimate how many items match a query. For each
+    analyzed type they hold the number of items and, for each property (by
+    index of the type of the property, which does not change when the
+    property is renamed), the number of distinct values and an equi-depth
+    histogram of the values. Relationship types also hold the distributions
+    of the out-degrees and in-degrees of their nodes: the number of nodes
+    that have such relationships, the largest degree, and the number of nodes
+    of each degree (from which an equi-depth histogram of the degrees is
+    built, see degree_histogram).
+
+    The numbers of items and the degree distributions are kept up to date as
+    items are inserted and deleted. Distinct counts and histograms of the
+    property values only change when the type is analyzed again. The file
+    holds the statistics as JSON and is kept up to date like the indexes (see
+    PersistentIndex), except that statistics left behind by a crash are
+    still used: they are only estimates.
+    """
+
+    # Statistics that were not written after their last changes are used
+    APPROXIMATE = True
+    ''':type: bool'''
+
+    # Keys of the degree distributions of a relationship type
+    OUT_DEGREE = "out_degree"
+    ''':type: str'''
+    IN_DEGREE = "in_degree"
+    ''':type: str'''
+
+    # Maximum number of buckets of a histogram
+    HISTOGRAM_BUCKETS = 16
+    ''':type: int'''
+
+    # Comparison operators whose selectivity can be estimated
+    OPERATORS = ("=", "!=", "<", "<=", ">", ">=")
+    ''':type: tuple'''
+
+    def __init__(self, filename, logged=False):
+        """
+        Creates a Statistics instance, loading the statistics from the given
+        file
+
+        :param filename: Name of the statistics file
+        :type filename: str
+        :param logged: Whether the changes to the stores are logged
+        :type logged: bool
+        :return: Statistics instance
+        :rtype: Statistics
+        """
+        super(Statistics, self).__init__(filename, logged)
+
+    def reset(self):
+        """
+        PRIVATE METHOD.
+        Drops all the statistics in memory
+
+        :return: Nothing
+        :rtype: None
+        """
+        # Statistics of the node types and of the relationship types, by index
+        # of the type
+        self.nodeTypes = {}
+        self.relTypes = {}
+
+    def read_data(self, data, offset):
+        """
+        PRIVATE METHOD.
+        Loads the statistics from the data of the file. Statistics that
+        cannot be read are dropped, they can always be collected again.
+
+        :return: Nothing
+        :rtype: None
+        """
+        data = json.loads(data[offset:])
+        # JSON keys are strings, indexes are used as keys in memory
+        for node_flag, key in ((True, "nodes"), (False, "relations")):
+            types = self.type_statistics(node_flag)
+            for type_index, stats in data.get(key, {}).iteritems():
+                stats["properties"] = dict(
+                    (int(tt_index), prop_stats)
+                    for tt_index, prop_stats
+                    in stats["properties"].iteritems())
+                for degree_key in (self.OUT_DEGREE, self.IN_DEGREE):
+                    if degree_key in stats:
+                        distribution = stats[degree_key]
+                        distribution["counts"] = dict(
+                            (int(degree), nodes) for degree, nodes
+                            in distribution["counts"].iteritems())
+                types[int(type_index)] = stats
+
+    def get(self, node_flag, type_index):
+        """
+        Gets the statistics of the given type
+
+        :param node_flag: Whether the type is a node type (True) or a
+                          relationship type (False)
+        :type node_flag: bool
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Statistics of the type, None if it was never analyzed
+        :rtype: dict
+        """
+        return self.type_statistics(node_flag).get(type_index)
+
+    def set(self, node_flag, type_index, stats):
+        """
+        Replaces the statistics of the given type with newly collected ones
+
+        :param node_flag: Whether the type is a node type (True) or a
+                          relationship type (False)
+        :type node_flag: bool
+        :param type_index: Index of the type
+        :type type_index: int
+        :param stats: Statistics of the type
+        :type stats: dict
+        :return: Nothing
+        :rtype: None
+        """
+        self.type_statistics(node_flag)[type_index] = stats
+        self.changed()
+
+    def drop_type(self, node_flag, type_index):
+        """
+        Drops the statistics of the given type, when it is deleted
+
+        :param node_flag: Whether the type is a node type (True) or a
+                          relationship type (False)
+        :type node_flag: bool
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        if self.type_statistics(node_flag).pop(type_index, None) is not None:
+            self.changed()
+
+    def drop_property(self, node_flag, type_index, tt_index):
+        """
+        Drops the statistics of the given property, when it is dropped or its
+        values change type
+
+        :param node_flag: Whether the type is a node type (True) or a
+                          relationship type (False)
+        :type node_flag: bool
+        :param type_index: Index of the type
+        :type type_index: int
+        :param tt_index: Index of the type of the property
+        :type tt_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        stats = self.get(node_flag, type_index)
+        if stats is not None and \
+           stats["properties"].pop(tt_index, None) is not None:
+            self.changed()
+
+    def add_item(self, node_flag, type_index):
+        """
+        Counts an item inserted in the given type
+
+        :param node_flag: Whether the type is a node type (True) or a
+                          relationship type (False)
+        :type node_flag: bool
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.count_change(node_flag, type_index, 1)
+
+    def remove_item(self, node_flag, type_index):
+        """
+        Counts an item deleted from the given type
+
+        :param node_flag: Whether the type is a node type (True) or a
+                          relationship type (False)
+        :type node_flag: bool
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.count_change(node_flag, type_index, -1)
+
+    def add_degree(self, type_index, key, degree):
+        """
+        Follows the degree of a node after a relationship of the given type
+        was inserted, moving the node to its new degree in the distribution
+
+        :param type_index: Index of the relationship type
+        :type type_index: int
+        :param key: OUT_DEGREE or IN_DEGREE
+        :type key: str
+        :param degree: Number of relationships of the type the node now has
+                       in that direction
+        :type degree: int
+        :return: Nothing
+        :rtype: None
+        """
+        stats = self.get(False, type_index)
+        if stats is None:
+            return
+        self.move_degree(stats[key], degree - 1, degree)
+
+    def remove_degree(self, type_index, key, degree):
+        """
+        Follows the degree of a node after a relationship of the given type
+        was deleted, moving the node to its new degree in the distribution
+        (a node without relationships left is no longer counted)
+
+        :param type_index: Index of the relationship type
+        :type type_index: int
+        :param key: OUT_DEGREE or IN_DEGREE
+        :type key: str
+        :param degree: Number of relationships of the type the node now has
+                       in that direction
+        :type degree: int
+        :return: Nothing
+        :rtype: None
+        """
+        stats = self.get(False, type_index)
+        if stats is None:
+            return
+        self.move_degree(stats[key], degree + 1, degree)
+
+    def move_degree(self, distribution, old_degree, new_degree):
+        """
+        PRIVATE METHOD.
+        Moves a node from one degree to another in a degree distribution, a
+        degree of 0 meaning that the node is not counted
+
+        :return: Nothing
+        :rtype: None
+        """
+        counts = distribution["counts"]
+        if old_degree > 0 and counts.get(old_degree, 0) > 0:
+            counts[old_degree] -= 1
+            if counts[old_degree] == 0:
+                del counts[old_degree]
+            if new_degree == 0:
+                distribution["nodes"] -= 1
+        if new_degree > 0:
+            counts[new_degree] = counts.get(new_degree, 0) + 1
+            if old_degree == 0:
+                distribution["nodes"] += 1
+        if new_degree > distribution["max"]:
+            distribution["max"] = new_degree
+        elif old_degree == distribution["max"] and old_degree not in counts:
+            distribution["max"] = max(counts) if counts else 0
+        self.changed()
+
+    def count_change(self, node_flag, type_index, change):
+        """
+        PRIVATE METHOD.
+        Changes the number of items of the given type, if it was analyzed
+
+        :return: Nothing
+        :rtype: None
+        """
+        stats = self.get(node_flag, type_index)
+        if stats is None:
+            return
+        stats["count"] += change
+        self.changed()
+
+    def type_statistics(self, node_flag):
+        """
+        PRIVATE METHOD.
+        Gets the statistics of the node or relationship types
+
+        :return: Statistics by index of the type
+        :rtype: dict[int, dict]
+        """
+        if node_flag:
+            return self.nodeTypes
+        return self.relTypes
+
+    def write_data(self):
+        """
+        PRIVATE METHOD.
+        Packs the statistics as JSON
+
+        :return: Packed chunks of the statistics
+        :rtype: list[bytes]
+        """
+        return [json.dumps({"nodes": self.nodeTypes,
+                            "relations": self.relTypes})]
+
+    @classmethod
+    def summarize_values(cls, values):
+        """
+        Summarizes the values of a property of the items of a type
+
+        :param values: Values of the property, one per item
+        :type values: list
+        :return: Number of distinct values, and the bounds of an equi-depth
+                 histogram of the values (the first and last bounds being the
+                 smallest and largest values)
+        :rtype: dict
+        """
+        values = sorted(cls.key(value) for value in values)
+        distinct = sum(1 for i, value in enumerate(values)
+                       if i == 0 or value != values[i - 1])
+        return {
+            "distinct": distinct,
+            "histogram": cls.histogram(values),
+        }
+
+    @staticmethod
+    def summarize_degrees(degrees):
+        """
+        Summarizes the degrees of the nodes that have relationships of a type
+        in one direction
+
+        :param degrees: Number of relationships of each of these nodes
+        :type degrees: list[int]
+        :return: Number of nodes, largest degree, and number of nodes of each
+                 degree
+        :rtype: dict
+        """
+        counts = {}
+        for degree in degrees:
+            counts[degree] = counts.get(degree, 0) + 1
+        return {
+            "nodes": len(degrees),
+            "max": max(counts) if counts else 0,
+            "counts": counts,
+        }
+
+    @classmethod
+    def degree_histogram(cls, distribution):
+        """
+        Builds an equi-depth histogram of the degrees of a degree
+        distribution (see histogram), without listing the degree of every
+        node
+
+        :param distribution: Degree distribution of a relationship type
+        :type distribution: dict
+        :return: Bounds of the buckets, empty if no node has relationships
+        :rtype: list[int]
+        """
+        counts = distribution["counts"]
+        nodes = sum(counts.itervalues())
+        if nodes == 0:
+            return []
+        buckets = min(cls.HISTOGRAM_BUCKETS, nodes)
+        # Positions of the bounds in the sorted degrees of the nodes
+        positions = [i * nodes // buckets for i in xrange(buckets)]
+        bounds = []
+        seen = 0
+        for degree in sorted(counts):
+            seen += counts[degree]
+            while len(bounds) < buckets and positions[len(bounds)] < seen:
+                bounds.append(degree)
+        return bounds + [max(counts)]
+
+    @classmethod
+    def histogram(cls, values):
+        """
+        Builds an equi-depth histogram: the bounds of at most
+        HISTOGRAM_BUCKETS buckets holding the same number of values each
+
+        :param values: Sorted values
+        :type values: list
+        :return: Bounds of the buckets, one more than the number of buckets,
+                 empty if there are no values
+        :rtype: list
+        """
+        if not values:
+            return []
+        buckets = min(cls.HISTOGRAM_BUCKETS, len(values))
+        return [values[i * len(values) // buckets] for i in xrange(buckets)] \
+            + [values[-1]]
+
+    @staticmethod
+    def mean_degree(stats, key):
+        """
+        Estimates the mean number of relationships of a type of the nodes that
+        have some, in one direction
+
+        :param stats: Statistics of the relationship type
+        :type stats: dict
+        :param key: OUT_DEGREE or IN_DEGREE
+        :type key: str
+        :return: Mean degree, 0 if no node has such relationships
+        :rtype: float
+        """
+        nodes = stats[key]["nodes"]
+        if nodes <= 0:
+            return 0.0
+        return float(stats["count"]) / nodes
+
+    @classmethod
+    def selectivity(cls, prop_stats, oper, value):
+        """
+        Estimates the fraction of the items of a type whose value of a
+        property compares to the given value with the given operator, from
+        the statistics of the property
+
+        :param prop_stats: Statistics of the property
+        :type prop_stats: dict
+        :param oper: One of OPERATORS
+        :type oper: str
+        :param value: Value to compare with
+        :return: Estimated fraction of the items, between 0 and 1, None if it
+                 cannot be estimated
+        :rtype: float
+        """
+        if oper not in cls.OPERATORS:
+            return None
+        bounds = prop_stats["histogram"]
+        if not bounds:
+            return 0.0
+        value = cls.key(value)
+        try:
+            in_range = bounds[0] <= value <= bounds[-1]
+        except TypeError:
+            return None
+        # Values are assumed to be spread evenly over the distinct values
+        equal = 1.0 / prop_stats["distinct"] if in_range else 0.0
+        if oper == "=":
+            return equal
+        elif oper == "!=":
+            return 1.0 - equal
+        below = cls.fraction_below(bounds, value)
+        if oper == "<":
+            fraction = below
+        elif oper == "<=":
+            fraction = below + equal
+        elif oper == ">":
+            fraction = 1.0 - below - equal
+        else:
+            fraction = 1.0 - below
+        return min(max(fraction, 0.0), 1.0)
+
+    @staticmethod
+    def fraction_below(bounds, value):
+        """
+        PRIVATE METHOD.
+        Fraction of the values of an equi-depth histogram smaller than the
+        given value, interpolated within its bucket for numbers
+
+        :return: Fraction of the values
+        :rtype: float
+        """
+        if value <= bounds[0]:
+            return 0.0
+        if value > bounds[-1]:
+            return 1.0
+        buckets = len(bounds) - 1
+        bucket = bisect.bisect_left(bounds, value) - 1
+        low, high = bounds[bucket], bounds[bucket + 1]
+        if isinstance(value, numbers.Number) and \
+           not isinstance(value, bool) and high > low:
+            within = float(value - low) / (high - low)
+        else:
+            within = 0.5
+        return (bucket + within) / buckets
+
+    @staticmethod
+    def key(value):
+        """
+        PRIVATE METHOD.
+        Value as kept in the statistics, strings being compared as unicode as
+        they are read back from the file
+
+        :return: Value
+        """
+        if isinstance(value, str):
+            return value.decode("utf-8")
+        return value
@@ -1,4 +1,8 @@
-class String:
+class String(object):
+    # Fixed attributes, so records don't carry a per-instance __dict__
+    __slots__ = ["index", "inUse", "previousBlock", "length", "nextBlock",
+                 "string"]
+
     def __init__(self, index=0, in_use=True, previous_block=0,
                  length=0, next_block=0, string=''):
         """
@@ -0,0 +1,185 @@
+import struct
+
+from graphene.storage.base.persistent_index import PersistentIndex
+
+
+class StringIndex(PersistentIndex):
+    """
+    Persistent hash index of the strings of a string store, mapping the hash
+    of each string to the index of its first block, along with the number of
+    references to the string (used when equal strings are shared), see
+    PersistentIndex for how the file is kept up to date.
+    """
+
+    # Per string: hash, index of the first block, number of references
+    ENTRY_STRUCT = struct.Struct(PersistentIndex.ENDIAN_FORMAT_STR + "III")
+    ''':type: struct.Struct'''
+
+    def __init__(self, filename, logged=False):
+        """
+        Creates a StringIndex instance, loading the index from the given file
+
+        :param filename: Name of the index file
+        :type filename: str
+        :param logged: Whether the changes to the string store are logged
+        :type logged: bool
+        :return: String index instance
+        :rtype: StringIndex
+        """
+        super(StringIndex, self).__init__(filename, logged)
+
+    def add(self, string_hash, index, references=1):
+        """
+        Adds the string starting at the given index to the index
+
+        :param string_hash: Hash of the string
+        :type string_hash: int
+        :param index: Index of the first block of the string
+        :type index: int
+        :param references: Number of references to the string
+        :type references: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.remove(index)
+        self.insert(string_hash, index, references)
+        self.changed()
+
+    def remove(self, index):
+        """
+        Removes the string starting at the given index from the index
+
+        :param index: Index of the first block of the string
+        :type index: int
+        :return: Number of references the string had, 0 if it was not indexed
+        :rtype: int
+        """
+        string_hash = self.hashes.pop(index, None)
+        if string_hash is None:
+            return 0
+        heads = self.heads[string_hash]
+        heads.remove(index)
+        if not heads:
+            del self.heads[string_hash]
+        self.changed()
+        return self.references.pop(index)
+
+    def get_indexes(self, string_hash):
+        """
+        Gets the indexes of the first blocks of the strings with the given hash
+
+        :param string_hash: Hash of the strings
+        :type string_hash: int
+        :return: Indexes of the first blocks (a copy)
+        :rtype: list[int]
+        """
+        return list(self.heads.get(string_hash, ()))
+
+    def get_references(self, index):
+        """
+        Gets the number of references to the string starting at the given index
+
+        :param index: Index of the first block of the string
+        :type index: int
+        :return: Number of references, 0 if the string is not indexed
+        :rtype: int
+        """
+        return self.references.get(index, 0)
+
+    def add_reference(self, index, amount=1):
+        """
+        Adds references to the string starting at the given index
+
+        :param index: Index of the first block of the string
+        :type index: int
+        :param amount: Number of references to add
+        :type amount: int
+        :return: Nothing
+        :rtype: None
+        """
+        self.references[index] += amount
+        self.changed()
+
+    def remove_reference(self, index, amount=1):
+        """
+        Removes references to the string starting at the given index
+
+        :param index: Index of the first block of the string
+        :type index: int
+        :param amount: Number of references to remove
+        :type amount: int
+        :return: Number of references left, 0 if the string is not indexed
+        :rtype: int
+        """
+        if index not in self.references:
+            return 0
+        self.references[index] -= amount
+        self.changed()
+        return self.references[index]
+
+    def rebuild(self, entries):
+        """
+        Replaces the whole index with the given strings
+
+        :param entries: (hash, index of the first block, references) triples
+        :type entries: iterable
+        :return: Nothing
+        :rtype: None
+        """
+        self.reset()
+        for string_hash, index, references in entries:
+            self.insert(string_hash, index, references)
+        self.clean = True
+        self.changed()
+
+    def insert(self, string_hash, index, references):
+        """
+        PRIVATE METHOD.
+        Inserts a string that is not indexed yet, without marking the index
+        as changed
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.heads.setdefault(string_hash, []).append(index)
+        self.hashes[index] = string_hash
+        self.references[index] = references
+
+    def reset(self):
+        """
+        PRIVATE METHOD.
+        Empties the index in memory
+
+        :return: Nothing
+        :rtype: None
+        """
+        # Indexes of the first blocks of the strings by hash
+        self.heads = {}
+        # Hash of each string by the index of its first block
+        self.hashes = {}
+        # Number of references to each string by the index of its first block
+        self.references = {}
+
+    def read_data(self, data, offset):
+        """
+        PRIVATE METHOD.
+        Loads the strings from the data of the file
+
+        :return: Nothing
+        :rtype: None
+        """
+        for offset in xrange(offset, len(data) - self.ENTRY_STRUCT.size + 1,
+                             self.ENTRY_STRUCT.size):
+            self.insert(*self.ENTRY_STRUCT.unpack_from(data, offset))
+
+    def write_data(self):
+        """
+        PRIVATE METHOD.
+        Packs the strings, by index of their first block
+
+        :return: Packed chunks of the index
+        :rtype: list[bytes]
+        """
+        return [self.ENTRY_STRUCT.pack(self.hashes[index], index,
+                                       self.references[index])
+                for index in sorted(self.hashes)]
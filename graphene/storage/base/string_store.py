@@ -23,6 +23,10 @@ class StringStore(GeneralStore):
     HEADER_SIZE = struct.calcsize(HEADER_STRUCT_FORMAT_STR)
     ''':type int'''
 
+    # Precompiled struct for the header format
+    HEADER_STRUCT = struct.Struct(HEADER_STRUCT_FORMAT_STR)
+    ''':type struct.Struct'''
+
     # Character used to pad the string block
     PAD_CHAR = "\0"
     ''':type str'''
@@ -30,7 +34,7 @@ class StringStore(GeneralStore):
     # Type stored by this class
     STORAGE_TYPE = String
 
-    def __init__(self, filename, block_size=10):
+    def __init__(self, filename, block_size=10, settings=None):
         """
         Creates a StringStore instance which handles reading/writing to the
         file containing string values
@@ -39,6 +43,8 @@ class StringStore(GeneralStore):
         :type filename: str
         :param block_size: Maximum size of string block
         :type block_size: int
+        :param settings: Settings of the store (see GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: String store instance for handling string records
         :rtype: StringStore
         """
@@ -49,7 +55,8 @@ class StringStore(GeneralStore):
         record_size = self.HEADER_SIZE + block_size
 
         # Initialize using generic base class
-        super(StringStore, self).__init__(filename, record_size)
+        super(StringStore, self).__init__(filename, record_size,
+                                          settings)
 
     def write_item(self, item):
         """
@@ -67,6 +74,24 @@ class StringStore(GeneralStore):
 
         super(StringStore, self).write_item(item)
 
+    def write_items(self, items):
+        """
+        Writes the given string data to the store file, merging adjacent
+        blocks into single writes
+
+        :param items: String data to write
+        :type items: list[String]
+        :return: Nothing
+        :rtype: None
+        """
+        # Check that no string is larger than the block size
+        for item in items:
+            if len(item.string) > self.blockSize:
+                raise ValueError("String string to store cannot be larger "
+                                 "than the block size")
+
+        super(StringStore, self).write_items(items)
+
     def item_from_packed_data(self, index, packed_data):
         """
         Creates a string type from the given packed data
@@ -83,8 +108,7 @@ class StringStore(GeneralStore):
         block_data = packed_data[self.HEADER_SIZE:]
 
         # Unpack the header data using the header struct format
-        header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        unpacked_data = header_struct.unpack(header_data)
+        unpacked_data = self.HEADER_STRUCT.unpack(header_data)
 
         # Get the string components
         in_use = unpacked_data[0]
@@ -115,11 +139,10 @@ class StringStore(GeneralStore):
 
         # Pack the header parts into a struct with the order:
         # (inUse, previousBlock, length, nextBlock)
-        header_struct = struct.Struct(self.HEADER_STRUCT_FORMAT_STR)
-        packed_data = header_struct.pack(item.inUse,
-                                         item.previousBlock,
-                                         item.length,
-                                         item.nextBlock)
+        packed_data = self.HEADER_STRUCT.pack(item.inUse,
+                                              item.previousBlock,
+                                              item.length,
+                                              item.nextBlock)
         # Pad the string to store with enough null bytes to fill the block
         padded_name = self.pad_string(item.string)
 
@@ -164,6 +187,5 @@ class StringStore(GeneralStore):
 
         :return: Packed class struct of 0s
         """
-        empty_struct = struct.Struct(cls.HEADER_STRUCT_FORMAT_STR)
-        packed_data = empty_struct.pack(0, 0, 0, 0)
+        packed_data = cls.HEADER_STRUCT.pack(0, 0, 0, 0)
         return packed_data
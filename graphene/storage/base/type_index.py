@@ -0,0 +1,163 @@
+import bisect
+import struct
+
+from graphene.storage.base.persistent_index import PersistentIndex
+
+
+class TypeIndex(PersistentIndex):
+    """
+    Persistent index of the items (nodes or relationships) of each type, kept
+    in memory as a sorted list of item indexes per type (see PersistentIndex
+    for how the file is kept up to date).
+    """
+
+    # Per type: type index, number of items
+    TYPE_STRUCT = struct.Struct(PersistentIndex.ENDIAN_FORMAT_STR + "II")
+    ''':type: struct.Struct'''
+
+    def __init__(self, filename, logged=False):
+        """
+        Creates a TypeIndex instance, loading the index from the given file
+
+        :param filename: Name of the index file
+        :type filename: str
+        :param logged: Whether the changes to the store are logged
+        :type logged: bool
+        :return: Type index instance
+        :rtype: TypeIndex
+        """
+        super(TypeIndex, self).__init__(filename, logged)
+
+    def add(self, type_index, index):
+        """
+        Adds the item with the given index to the items of the given type
+
+        :param type_index: Index of the type
+        :type type_index: int
+        :param index: Index of the item
+        :type index: int
+        :return: Nothing
+        :rtype: None
+        """
+        items = self.items.setdefault(type_index, [])
+        # New items usually have the largest index
+        if not items or items[-1] < index:
+            items.append(index)
+        else:
+            pos = bisect.bisect_left(items, index)
+            if pos < len(items) and items[pos] == index:
+                return
+            items.insert(pos, index)
+        self.changed()
+
+    def remove(self, type_index, index):
+        """
+        Removes the item with the given index from the items of the given type
+
+        :param type_index: Index of the type
+        :type type_index: int
+        :param index: Index of the item
+        :type index: int
+        :return: Nothing
+        :rtype: None
+        """
+        items = self.items.get(type_index)
+        if not items:
+            return
+        pos = bisect.bisect_left(items, index)
+        if pos < len(items) and items[pos] == index:
+            del items[pos]
+            self.changed()
+
+    def drop_type(self, type_index):
+        """
+        Removes all the items of the given type
+
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Nothing
+        :rtype: None
+        """
+        if self.items.pop(type_index, None) is not None:
+            self.changed()
+
+    def get_items(self, type_index):
+        """
+        Gets the indexes of the items of the given type
+
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Sorted list of item indexes (a copy)
+        :rtype: list[int]
+        """
+        return list(self.items.get(type_index, ()))
+
+    def count(self, type_index):
+        """
+        Gets the number of items of the given type
+
+        :param type_index: Index of the type
+        :type type_index: int
+        :return: Number of items
+        :rtype: int
+        """
+        return len(self.items.get(type_index, ()))
+
+    def rebuild(self, type_items):
+        """
+        Replaces the whole index with the given items
+
+        :param type_items: (type index, item index) pairs, in any order
+        :type type_items: iterable
+        :return: Nothing
+        :rtype: None
+        """
+        self.reset()
+        for type_index, index in type_items:
+            self.items.setdefault(type_index, []).append(index)
+        for items in self.items.values():
+            items.sort()
+        self.clean = True
+        self.changed()
+
+    def reset(self):
+        """
+        PRIVATE METHOD.
+        Empties the index in memory
+
+        :return: Nothing
+        :rtype: None
+        """
+        # Sorted item indexes by type index
+        self.items = {}
+
+    def read_data(self, data, offset):
+        """
+        PRIVATE METHOD.
+        Loads the items of each type from the data of the file
+
+        :return: Nothing
+        :rtype: None
+        """
+        while offset < len(data):
+            type_index, amount = self.TYPE_STRUCT.unpack_from(data, offset)
+            offset += self.TYPE_STRUCT.size
+            items_struct = self.items_struct(amount)
+            self.items[type_index] = \
+                list(items_struct.unpack_from(data, offset))
+            offset += items_struct.size
+
+    def write_data(self):
+        """
+        PRIVATE METHOD.
+        Packs the items of each type, by type index
+
+        :return: Packed chunks of the index
+        :rtype: list[bytes]
+        """
+        chunks = []
+        for type_index in sorted(self.items):
+            items = self.items[type_index]
+            chunks.append(self.TYPE_STRUCT.pack(type_index, len(items)))
+            chunks.append(self.items_struct(len(items)).pack(*items))
+        return chunks
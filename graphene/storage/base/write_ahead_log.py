@@ -0,0 +1,602 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+from graphene.storage.base.general_store import GeneralStore
+from graphene.storage.base.graphene_store import GrapheneStore
+
+
+class WriteAheadLog(object):
+    """
+    Physical write-ahead log of the store files. Every write or truncation of
+    a store file is logged (with the data it replaces) before it is applied,
+    and the writes of a transaction are followed by a commit record. When the
+    log is replayed, committed transactions are redone and the writes of an
+    unfinished transaction are undone, so that a crash cannot leave records
+    (e.g. relationship linked lists) half updated.
+
+    A store file can also be replaced as a whole by a new file (see
+    replace_file), e.g. when the record size of a row store changes. The
+    replaced file is kept as a backup until the next checkpoint, so that the
+    replacement can be undone, and the changes logged for it before the
+    replacement are not redone on the new file.
+
+    Data derived from the stores (e.g. indexes) is written when the log is
+    checkpointed (see add_checkpoint_handler), so that after a crash it
+    matches the stores as of the last checkpoint and can be brought up to
+    date from the records of the log (see before_images).
+    """
+
+    # Durability modes
+    # No log is kept
+    NONE = "none"
+    # The log is synced to disk when a transaction commits once enough
+    # records were logged since the last sync, and otherwise by a background
+    # thread within GROUP_COMMIT_INTERVAL. Records always reach the OS before
+    # the store writes they describe, which protects against a crash of the
+    # process only: the OS may write store pages to disk before the log, so
+    # after a crash of the system the transactions of the last
+    # GROUP_COMMIT_INTERVAL may be lost and their store writes may be left
+    # half applied.
+    GROUP = "group"
+    # Every record is synced to disk before the store write it describes,
+    # and the log is synced when a transaction commits, so that neither a
+    # crash of the process nor of the system can lose a committed
+    # transaction or leave the writes of an unfinished one in place
+    ALWAYS = "always"
+
+    # Group commit: maximum number of records logged between syncs
+    GROUP_COMMIT_RECORDS = 256
+    ''':type: int'''
+    # Group commit: maximum time between syncs (seconds)
+    GROUP_COMMIT_INTERVAL = 0.05
+    ''':type: float'''
+
+    # Size of the log after which the store files are synced and the log is
+    # emptied (bytes)
+    CHECKPOINT_SIZE = 16 * 1024 * 1024
+    ''':type: int'''
+
+    # Record types
+    WRITE = 1
+    TRUNCATE = 2
+    COMMIT = 3
+    REPLACE = 4
+
+    # Record header: type, transaction ID, length of the file name, size of
+    # the file before the change, offset, length of the old data, length of
+    # the new data, checksum of the rest of the record
+    # '=': native byte order representation, standard size, no alignment
+    HEADER_STRUCT = struct.Struct("= B I H Q Q I I I")
+    ''':type: struct.Struct'''
+
+    def __init__(self, filename, mode=GROUP):
+        """
+        Opens (or creates) the log with the given filename in the datafiles
+        directory. The log is not replayed (see replay).
+
+        :param filename: Name of the log file
+        :type filename: str
+        :param mode: Durability mode (GROUP or ALWAYS)
+        :type mode: str
+        :return: WriteAheadLog instance
+        :rtype: WriteAheadLog
+        """
+        self.datafilesDir = GrapheneStore().datafilesDir
+        self.mode = mode
+        try:
+            self.logFile = open(self.datafilesDir + filename, "a+b")
+        except IOError:
+            raise IOError("ERROR: unable to open log file: " + filename)
+        # Store files written since the last checkpoint, by file name
+        self.files = {}
+        # Backups of the store files replaced since the last checkpoint
+        self.backups = []
+        # Records replayed from the log and kept since (see replay)
+        self.replayed = []
+        # Functions called by each checkpoint (see add_checkpoint_handler)
+        self.checkpointHandlers = []
+        # Current transaction and how many transactions it is nested in
+        self.txId = 0
+        self.depth = 0
+        # Group commit state
+        self.unsyncedRecords = 0
+        self.lastSync = time.time()
+        # Group commit: thread syncing the records of the last transactions
+        # when no commit does it in time
+        self.stopped = threading.Event()
+        self.thread = None
+        if self.mode == self.GROUP:
+            self.thread = threading.Thread(target=self.run,
+                                           name="WriteAheadLog")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def close(self):
+        """
+        Checkpoints and closes the log, dropping its checkpoint handlers
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+        with GeneralStore.IO_LOCK:
+            self.checkpoint()
+        self.checkpointHandlers = []
+        self.logFile.close()
+
+    def add_checkpoint_handler(self, handler):
+        """
+        Adds a function called by each checkpoint once the store files are
+        synced: first with False, before the log is emptied, to write the data
+        derived from the stores, then with True, once the log is emptied, to
+        mark that data as matching the stores. Data left written but not
+        marked by a crash between the two calls no longer matches the log.
+
+        :param handler: Function taking whether the log was emptied
+        :type handler: function
+        :return: Nothing
+        :rtype: None
+        """
+        self.checkpointHandlers.append(handler)
+
+    def begin(self):
+        """
+        Starts a transaction, or nests into the current one
+
+        :return: Nothing
+        :rtype: None
+        """
+        # Store writes log records while holding the store I/O lock, which
+        # also keeps the log consistent when several threads write
+        with GeneralStore.IO_LOCK:
+            self.start()
+
+    def commit(self):
+        """
+        Ends a transaction. Once the outermost transaction ends, a commit
+        record is logged and the log is synced according to the mode.
+
+        :return: Nothing
+        :rtype: None
+        """
+        with GeneralStore.IO_LOCK:
+            self.end()
+
+    def start(self):
+        """
+        PRIVATE METHOD.
+        Starts a transaction, the store I/O lock must be held
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.depth == 0:
+            self.txId += 1
+        self.depth += 1
+
+    def end(self):
+        """
+        PRIVATE METHOD.
+        Ends a transaction, the store I/O lock must be held
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        self.append(self.COMMIT, "", 0, 0, "", "")
+        self.logFile.flush()
+        if self.mode == self.ALWAYS or \
+           self.unsyncedRecords >= self.GROUP_COMMIT_RECORDS or \
+           time.time() - self.lastSync >= self.GROUP_COMMIT_INTERVAL:
+            self.sync()
+        # Replayed records are kept until they were used (see replay)
+        if self.logFile.tell() >= self.CHECKPOINT_SIZE and not self.replayed:
+            self.checkpoint()
+
+    def sync(self):
+        """
+        PRIVATE METHOD.
+        Syncs the log to disk, the store I/O lock must be held
+
+        :return: Nothing
+        :rtype: None
+        """
+        os.fsync(self.logFile.fileno())
+        self.unsyncedRecords = 0
+        self.lastSync = time.time()
+
+    def run(self):
+        """
+        PRIVATE METHOD.
+        Body of the group commit thread, syncing the log every
+        GROUP_COMMIT_INTERVAL seconds if records were logged since the last
+        sync
+
+        :return: Nothing
+        :rtype: None
+        """
+        while not self.stopped.wait(self.GROUP_COMMIT_INTERVAL):
+            with GeneralStore.IO_LOCK:
+                if self.unsyncedRecords > 0 and not self.logFile.closed:
+                    self.sync()
+
+    def log_write(self, store, offset, data):
+        """
+        Logs a write of the given data to a store file, before it is applied.
+        Called with the store I/O lock held.
+
+        :param store: Store whose file is written
+        :type store: GeneralStore
+        :param offset: Offset of the write (bytes)
+        :type offset: int
+        :param data: Data that will be written
+        :type data: bytes
+        :return: Nothing
+        :rtype: None
+        """
+        old_size = store.get_file_size()
+        old_data = ""
+        if offset < old_size:
+            store.storeFile.seek(offset)
+            old_data = store.storeFile.read(min(len(data), old_size - offset))
+        self.log(store, self.WRITE, old_size, offset, old_data, data)
+
+    def log_truncate(self, store, size):
+        """
+        Logs the truncation of a store file, before it is applied. Called
+        with the store I/O lock held.
+
+        :param store: Store whose file is truncated
+        :type store: GeneralStore
+        :param size: New size of the file (bytes)
+        :type size: int
+        :return: Nothing
+        :rtype: None
+        """
+        old_size = store.get_file_size()
+        store.storeFile.seek(size)
+        old_data = store.storeFile.read(old_size - size)
+        self.log(store, self.TRUNCATE, old_size, size, old_data, "")
+
+    def replace_file(self, store, new_filename):
+        """
+        Replaces the file of a store with a new file of the datafiles
+        directory, which must be complete and synced to disk. The replacement
+        is logged and synced before it is applied, and the replaced file is
+        kept as a backup until the next checkpoint. Called with the store I/O
+        lock held, once the store file is closed.
+
+        :param store: Store whose file is replaced
+        :type store: GeneralStore
+        :param new_filename: Name of the new file
+        :type new_filename: str
+        :return: Nothing
+        :rtype: None
+        """
+        backup_filename = "%s.%d.old" % (store.filename, len(self.backups))
+        auto_commit = self.depth == 0
+        if auto_commit:
+            self.start()
+        self.append(self.REPLACE, store.filename, 0, 0, backup_filename,
+                    new_filename)
+        self.logFile.flush()
+        self.sync()
+        path = self.datafilesDir + store.filename
+        os.rename(path, self.datafilesDir + backup_filename)
+        os.rename(self.datafilesDir + new_filename, path)
+        self.sync_directory()
+        self.backups.append(self.datafilesDir + backup_filename)
+        if auto_commit:
+            self.end()
+
+    def log(self, store, record_type, old_size, offset, old_data, new_data):
+        """
+        PRIVATE METHOD.
+        Logs a change of a store file, in its own transaction if none is open
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.files[store.filename] = store.storeFile
+        auto_commit = self.depth == 0
+        if auto_commit:
+            self.start()
+        self.append(record_type, store.filename, old_size, offset, old_data,
+                    new_data)
+        # The record must reach the OS before the store file is changed, and
+        # the disk as well when writes must survive a crash of the system
+        self.logFile.flush()
+        if self.mode == self.ALWAYS:
+            self.sync()
+        if auto_commit:
+            self.end()
+
+    def append(self, record_type, filename, old_size, offset, old_data,
+               new_data):
+        """
+        PRIVATE METHOD.
+        Appends a record to the log
+
+        :return: Nothing
+        :rtype: None
+        """
+        body = filename + old_data + new_data
+        header = self.HEADER_STRUCT.pack(
+            record_type, self.txId, len(filename), old_size, offset,
+            len(old_data), len(new_data), zlib.crc32(body) & 0xffffffff)
+        self.logFile.write(header + body)
+        self.unsyncedRecords += 1
+
+    def read_records(self):
+        """
+        Reads the complete records of the log, stopping at the first torn
+        or corrupt record
+
+        :return: List of (type, transaction ID, file name, old size, offset,
+                 old data, new data) records
+        :rtype: list[tuple]
+        """
+        self.logFile.seek(0)
+        data = self.logFile.read()
+        header_struct = self.HEADER_STRUCT
+        pos = 0
+        records = []
+        while pos + header_struct.size <= len(data):
+            record_type, tx_id, name_len, old_size, offset, old_len, new_len, \
+                checksum = header_struct.unpack_from(data, pos)
+            start = pos + header_struct.size
+            end = start + name_len + old_len + new_len
+            body = data[start:end]
+            if end > len(data) or \
+               zlib.crc32(body) & 0xffffffff != checksum:
+                break
+            records.append((record_type, tx_id, body[:name_len], old_size,
+                            offset, body[name_len:name_len + old_len],
+                            body[name_len + old_len:]))
+            pos = end
+        return records
+
+    def replay(self, checkpoint=True):
+        """
+        Redoes the committed transactions of the log and undoes the writes of
+        unfinished ones, then empties the log. Must be run before the store
+        files are opened.
+
+        The log can instead be kept, along with its records, until the next
+        checkpoint, so that the data derived from the stores can be brought
+        up to date from them first (see changed_files and before_images).
+
+        Only the last transaction of the log can be unfinished. The changes
+        of a file logged before it was replaced are not redone: they were
+        copied into the new file. The changes of an unfinished transaction
+        logged after a replacement are not undone: the new file is dropped.
+
+        :param checkpoint: Whether the log is emptied once replayed
+        :type checkpoint: bool
+        :return: Number of transactions redone
+        :rtype: int
+        """
+        records = self.read_records()
+        committed = set(r[1] for r in records if r[0] == self.COMMIT)
+        datafiles_dir = self.datafilesDir
+        files = {}
+
+        def store_file(filename):
+            if filename not in files:
+                path = datafiles_dir + filename
+                if not os.path.isfile(path):
+                    open(path, "w+").close()
+                files[filename] = open(path, "r+b")
+            return files[filename]
+
+        def close_file(filename):
+            f = files.pop(filename, None)
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+
+        # Position of the last committed replacement of each file, and of the
+        # first unfinished one
+        replaced = {}
+        unfinished = {}
+        for position, record in enumerate(records):
+            if record[0] != self.REPLACE:
+                continue
+            if record[1] in committed:
+                replaced[record[2]] = position
+            else:
+                unfinished.setdefault(record[2], position)
+
+        # Redo committed changes in log order
+        backups = []
+        for position, (record_type, tx_id, filename, old_size, offset,
+                       old_data, new_data) in enumerate(records):
+            if record_type == self.COMMIT or tx_id not in committed:
+                continue
+            if record_type == self.REPLACE:
+                # Finish the replacement if the crash interrupted it
+                path = datafiles_dir + filename
+                if os.path.isfile(datafiles_dir + new_data):
+                    close_file(filename)
+                    if os.path.isfile(path) and \
+                       not os.path.isfile(datafiles_dir + old_data):
+                        os.rename(path, datafiles_dir + old_data)
+                    os.rename(datafiles_dir + new_data, path)
+                backups.append(datafiles_dir + old_data)
+                continue
+            if position < replaced.get(filename, -1):
+                continue
+            f = store_file(filename)
+            if record_type == self.WRITE:
+                f.seek(offset)
+                f.write(new_data)
+            else:
+                f.truncate(offset)
+        # Undo unfinished changes in reverse order
+        for position in xrange(len(records) - 1, -1, -1):
+            record_type, tx_id, filename, old_size, offset, old_data, \
+                new_data = records[position]
+            if record_type == self.COMMIT or tx_id in committed:
+                continue
+            if record_type == self.REPLACE:
+                # Put the replaced file back, the changes logged before the
+                # replacement are undone on it
+                close_file(filename)
+                if os.path.isfile(datafiles_dir + old_data):
+                    os.rename(datafiles_dir + old_data,
+                              datafiles_dir + filename)
+                if os.path.isfile(datafiles_dir + new_data):
+                    os.remove(datafiles_dir + new_data)
+                continue
+            if position > unfinished.get(filename, len(records)):
+                continue
+            f = store_file(filename)
+            f.seek(offset)
+            f.write(old_data)
+            f.truncate(old_size)
+
+        for filename in files.keys():
+            close_file(filename)
+        self.sync_directory()
+        self.backups.extend(backups)
+        if checkpoint:
+            self.checkpoint()
+        else:
+            self.replayed = records
+            # New transactions are told apart from the replayed ones
+            self.txId = max([r[1] for r in records] or [0])
+        return len(committed)
+
+    def changed_files(self):
+        """
+        Gets the store files changed by the records kept by replay
+
+        :return: Names of the changed files
+        :rtype: set[str]
+        """
+        return set(r[2] for r in self.replayed if r[0] != self.COMMIT)
+
+    def before_images(self, filename, record_size):
+        """
+        Gets the contents that the records of a store file changed by the
+        records kept by replay had at the last checkpoint, by undoing all
+        these changes, in reverse order, on the replayed file. Records that
+        were past the end of the file are zeroed.
+
+        :param filename: Name of the store file
+        :type filename: str
+        :param record_size: Size of the records of the file (bytes)
+        :type record_size: int
+        :return: Contents of each changed record by index, None if the file
+                 was replaced since the last checkpoint
+        :rtype: dict[int, bytes]
+        """
+        changes = []
+        for record_type, _, record_filename, old_size, offset, old_data, \
+                new_data in self.replayed:
+            if record_filename != filename or record_type == self.COMMIT:
+                continue
+            if record_type == self.REPLACE:
+                return None
+            # Range of the file restored by undoing the change: what it
+            # overwrote, and what it added past the end of the file
+            if record_type == self.WRITE:
+                start = min(offset, old_size)
+                end = offset + len(new_data)
+            else:
+                start = offset
+                end = max(offset, old_size)
+            if end <= start:
+                continue
+            data = "\0" * (offset - start) + old_data
+            changes.append((start, data + "\0" * (end - start - len(data))))
+
+        images = {}
+        for start, data in changes:
+            for index in xrange(start / record_size,
+                                (start + len(data) - 1) / record_size + 1):
+                images[index] = None
+        path = self.datafilesDir + filename
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                for index in images:
+                    f.seek(index * record_size)
+                    images[index] = f.read(record_size)
+        for index in images:
+            images[index] = bytearray(
+                (images[index] or "").ljust(record_size, "\0"))
+        for start, data in reversed(changes):
+            for index in xrange(start / record_size,
+                                (start + len(data) - 1) / record_size + 1):
+                # Part of the record covered by the change
+                record_start = index * record_size
+                low = max(start, record_start)
+                high = min(start + len(data), record_start + record_size)
+                images[index][low - record_start:high - record_start] = \
+                    data[low - start:high - start]
+        return dict((index, str(image)) for index, image in images.iteritems())
+
+    def checkpoint(self):
+        """
+        Syncs the store files written since the last checkpoint to disk, then
+        empties the log, since their changes no longer need to be replayed.
+        The checkpoint handlers are called around the emptying of the log.
+        The store I/O lock must be held.
+
+        :return: Nothing
+        :rtype: None
+        """
+        for store_file in self.files.values():
+            if not store_file.closed:
+                store_file.flush()
+                os.fsync(store_file.fileno())
+        self.files = {}
+        for handler in self.checkpointHandlers:
+            handler(False)
+        # The replaced files are no longer needed to undo a transaction
+        for path in self.backups:
+            if os.path.isfile(path):
+                os.remove(path)
+        self.backups = []
+        self.replayed = []
+        self.truncate()
+        for handler in self.checkpointHandlers:
+            handler(True)
+
+    def sync_directory(self):
+        """
+        PRIVATE METHOD.
+        Syncs the datafiles directory to disk, so that files renamed in it
+        stay renamed after a crash
+
+        :return: Nothing
+        :rtype: None
+        """
+        fd = os.open(self.datafilesDir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def truncate(self):
+        """
+        PRIVATE METHOD.
+        Empties the log and syncs it to disk
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.logFile.seek(0)
+        self.logFile.truncate()
+        self.logFile.flush()
+        os.fsync(self.logFile.fileno())
+        self.unsyncedRecords = 0
+        self.lastSync = time.time()
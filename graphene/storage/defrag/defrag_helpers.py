@@ -1,6 +1,5 @@
 import sys
 
-from graphene.storage.base.general_store import EOF
 from graphene.storage.defrag.reference_map import offset_descriptor_for_class
 from graphene.utils import PrettyPrinter
 
@@ -51,11 +50,9 @@ class FilePrinter:
         :rtype: None
         """
         values = []
-        # Get record values
-        for i in range(start, max_blocks):
-            record = self.baseStore.item_at_index(i)
-            if record is EOF:
-                break
+        # Get record values, reading all the blocks at once
+        records = self.baseStore.items_in_range(start, max_blocks - start)
+        for i, record in enumerate(records, start):
             list_record = [i] + record.list() \
                 if self.itemIndex else record.list()
             values.append(list_record)
@@ -6,3 +6,5 @@ from graphene.storage.intermediate.relationship_property_store import Relationsh
 from graphene.storage.intermediate.node_property import NodeProperty
 from graphene.storage.intermediate.relation_property import RelationProperty
 from graphene.storage.intermediate.general_string_manager import GeneralStringManager
+from graphene.storage.intermediate.write_back_cache import WriteBackCache
+from graphene.storage.intermediate.background_flush_cache import BackgroundFlushCache
@@ -0,0 +1,173 @@
+import logging
+import threading
+
+from graphene.storage.intermediate.write_back_cache import WriteBackCache
+
+
+class BackgroundFlushCache(WriteBackCache):
+    """
+    Write-back cache whose dirty entries are written to the store by a
+    background thread, every FLUSH_INTERVAL seconds or when a sync is
+    scheduled, instead of on the caller's thread. Writers wait for the flusher
+    while HIGH_WATER_MARK entries are dirty (back-pressure), so that memory
+    use stays bounded.
+    """
+
+    # Number of dirty entries at which writers wait for the flusher
+    HIGH_WATER_MARK = 4096
+    ''':type: int'''
+    # Time between flushes when no sync is scheduled (seconds)
+    FLUSH_INTERVAL = 0.1
+    ''':type: float'''
+    # Number of entries written each time the flusher holds the lock
+    FLUSH_CHUNK_SIZE = 64
+    ''':type: int'''
+
+    def __init__(self, store, size):
+        """
+        Creates the cache and starts its flusher thread
+
+        :param store: Node-property or relationship-property store
+        :param size: Maximum number of entries in the cache
+        :type size: int
+        :return: BackgroundFlushCache instance
+        :rtype: BackgroundFlushCache
+        """
+        super(BackgroundFlushCache, self).__init__(store, size)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # Guards the cache, and the store while entries are written back
+        self.lock = threading.RLock()
+        # Notified whenever dirty entries have been written back
+        self.flushed = threading.Condition(self.lock)
+        # Set to wake the flusher up before the interval ends
+        self.wakeup = threading.Event()
+        self.stopped = False
+        # Error raised by the flusher, raised again on the caller's thread
+        self.error = None
+        self.thread = threading.Thread(target=self.run,
+                                       name="BackgroundFlushCache")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __contains__(self, key):
+        with self.lock:
+            return super(BackgroundFlushCache, self).__contains__(key)
+
+    def __getitem__(self, key):
+        with self.lock:
+            return super(BackgroundFlushCache, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            # Back-pressure: wait until the flusher catches up
+            while len(self.dirty) >= self.HIGH_WATER_MARK and \
+                    key not in self.dirty and self.error is None:
+                self.wakeup.set()
+                self.flushed.wait(self.FLUSH_INTERVAL)
+            self.check_error()
+            super(BackgroundFlushCache, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        with self.lock:
+            super(BackgroundFlushCache, self).__delitem__(key)
+
+    def discard(self, key):
+        with self.lock:
+            super(BackgroundFlushCache, self).discard(key)
+
+    def sync(self):
+        """
+        Writes all the dirty entries back on the caller's thread, used when
+        the store must reflect the cache (e.g. before scanning it)
+
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            self.check_error()
+            super(BackgroundFlushCache, self).sync()
+            self.flushed.notify_all()
+
+    def schedule_sync(self):
+        """
+        Wakes the flusher up to write the dirty entries back
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.check_error()
+        self.wakeup.set()
+
+    def drain(self):
+        """
+        Waits until the flusher has written back every dirty entry
+
+        :return: Nothing
+        :rtype: None
+        """
+        with self.lock:
+            while self.dirty and self.error is None:
+                self.wakeup.set()
+                self.flushed.wait(self.FLUSH_INTERVAL)
+            self.check_error()
+
+    def close(self):
+        """
+        Stops the flusher thread and writes back the remaining dirty entries
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join()
+        self.sync()
+
+    def run(self):
+        """
+        PRIVATE METHOD.
+        Body of the flusher thread
+
+        :return: Nothing
+        :rtype: None
+        """
+        while not self.stopped:
+            self.wakeup.wait(self.FLUSH_INTERVAL)
+            self.wakeup.clear()
+            try:
+                self.flush_dirty()
+            except Exception as e:
+                self.logger.exception("Background flush failed")
+                with self.lock:
+                    self.error = e
+                    self.flushed.notify_all()
+                return
+
+    def flush_dirty(self):
+        """
+        PRIVATE METHOD.
+        Writes the dirty entries back in chunks, releasing the lock between
+        chunks so that callers are only blocked for one chunk at a time
+
+        :return: Nothing
+        :rtype: None
+        """
+        while True:
+            with self.lock:
+                if not self.dirty:
+                    return
+                for _ in xrange(min(self.FLUSH_CHUNK_SIZE, len(self.dirty))):
+                    key = self.dirty.pop()
+                    self.store[key] = self.cache.peek(key)
+                self.flushed.notify_all()
+
+    def check_error(self):
+        """
+        PRIVATE METHOD.
+        Raises the error that stopped the flusher, if any
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.error is not None:
+            raise self.error
@@ -11,14 +11,15 @@ class GeneralArrayManager:
 
     STR_ARRAY_FILENAME = "graphenestore.propertystore.array.strings.db"
 
-    def __init__(self, block_size=40, string_block_size=10):
+    def __init__(self, block_size=40, string_block_size=10, settings=None):
         # Size of array blocks. Must be a multiple of 8
         self.blockSize = block_size
         # Create a manager for the array store
-        self.storeManager = GeneralStoreManager(ArrayStore(block_size))
+        self.storeManager = GeneralStoreManager(ArrayStore(block_size,
+                                                           settings))
         # Create a manager for the strings in string arrays
-        self.stringStoreManager = GeneralStringManager(self.STR_ARRAY_FILENAME,
-                                                       string_block_size)
+        self.stringStoreManager = GeneralStringManager(
+            self.STR_ARRAY_FILENAME, string_block_size, settings=settings)
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def __del__(self):
@@ -66,8 +67,8 @@ class GeneralArrayManager:
                       'blocks': amt_parts,
                       'next_block': ids[1],
                       'items': parts[0]}
-        # Create first block using kwargs
-        self.storeManager.create_item(ids[0], **kwargs)
+        # Create first block using kwargs (blocks are written together)
+        blocks = [self.storeManager.new_item(ids[0], **kwargs)]
         # First index in linked list
         first_index = ids[0]
 
@@ -92,7 +93,9 @@ class GeneralArrayManager:
                           'next_block': ids[i + 1],
                           'items': parts[i]}
             # Create next block
-            self.storeManager.create_item(ids[i], **kwargs)
+            blocks.append(self.storeManager.new_item(ids[i], **kwargs))
+        # Write all the blocks, adjacent blocks are written at once
+        self.storeManager.write_items(blocks)
         # Return the first index of the array in the store
         return first_index
 
@@ -238,8 +241,8 @@ class GeneralArrayManager:
                       'next_block': next_id,
                       'items': array_parts[0]}
 
-        # Create first block using kwargs
-        self.storeManager.create_item(cur_id, **kwargs)
+        # Create first block using kwargs (blocks are written together)
+        blocks = [self.storeManager.new_item(cur_id, **kwargs)]
 
         # Create rest of linked list
         for i in range(1, new_length):
@@ -292,8 +295,10 @@ class GeneralArrayManager:
                           'next_block': next_id,
                           'items': array_parts[i]}
             # Create next block
-            self.storeManager.create_item(cur_id, **kwargs)
+            blocks.append(self.storeManager.new_item(cur_id, **kwargs))
 
+        # Write all the blocks, adjacent blocks are written at once
+        self.storeManager.write_items(blocks)
         # Last item in linked list, but items remain from old array
         if old_length > new_length:
             self.delete_rest(next_id)  # Handles string deletion as well
@@ -5,7 +5,8 @@ class GeneralNameManager(StringManager):
     Handles reading/writing variable-length names (ASCII strings)
     """
 
-    def __init__(self, filename, block_size=10):
+    def __init__(self, filename, block_size=10, hash_index=False,
+                 deduplicate=False, settings=None):
         """
         Creates a GeneralNameManager instance which handles reading/writing
         variable-length names (ASCII strings)
@@ -14,10 +15,18 @@ class GeneralNameManager(StringManager):
         :type filename: str
         :param block_size: Length of string block
         :type block_size: int
+        :param hash_index: Whether strings are found through a hash index
+        :type hash_index: bool
+        :param deduplicate: Whether equal strings are stored once and shared
+        :type deduplicate: bool
+        :param settings: Settings of the string store (see
+                         GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: Name manager instance to handle reading/writing names
         :rtype: GeneralNameManager
         """
-        super(GeneralNameManager, self).__init__(filename, block_size)
+        super(GeneralNameManager, self).__init__(
+            filename, block_size, hash_index, deduplicate, settings)
 
     def __del__(self):
         del self.storeManager
@@ -6,6 +6,9 @@ class GeneralStoreManager:
     Handles the creation/deletion of nodes to the NodeStore with ID recycling
     """
 
+    # Number of records read at once when scanning the store
+    SCAN_CHUNK_SIZE = 512
+
     def __init__(self, store):
         """
         Creates an instance of the GeneralStoreManager
@@ -16,6 +19,7 @@ class GeneralStoreManager:
         """
         self.store = store
         self.idStore = IdStore(store.filename + ".id")
+        self.prune_ids()
 
     def __del__(self):
         del self.idStore
@@ -40,6 +44,23 @@ class GeneralStoreManager:
         # Create a type based on the type our store stores
         return item
 
+    def new_item(self, index=0, **kwargs):
+        """
+        Creates an item with the type of the store being managed without
+        writing it, so that it can be written later along with other items
+        (see write_items)
+
+        :param index: Index where the item will be created
+        :type index: int
+        :param kwargs: Arguments to pass to the created item
+        :type kwargs: dict
+        :return: New item with type STORE_TYPE
+        """
+        # If no index is given, check for an available ID from the IdStore
+        if index == 0:
+            index = self.get_indexes()[0]
+        return self.store.STORAGE_TYPE(index, **kwargs)
+
     def write_item(self, item):
         """
         Writes the item to its store file
@@ -50,6 +71,18 @@ class GeneralStoreManager:
         """
         self.store.write_item(item)
 
+    def write_items(self, items):
+        """
+        Writes the items to the store file, coalescing items with adjacent
+        indexes into single writes
+
+        :param items: Items to write to file
+        :type items: list
+        :return: Nothing
+        :rtype: None
+        """
+        self.store.write_items(items)
+
     def delete_item(self, item):
         """
         Deletes the given item from the store and adds the index to its IdStore
@@ -103,8 +136,7 @@ class GeneralStoreManager:
         trunc_amt = self.truncate_amount(ids, last_file_index)
         # Finally truncate this many items
         self.store.truncate_file(trunc_amt)
-        # Write the untruncated ones back in this reverse order to prevent
-        # future fragmentation (lower IDs will be popped from the end)
+        # Write the untruncated ones back
         self.idStore.write_all_ids(ids[trunc_amt:])
 
     def get_item_at_index(self, index):
@@ -117,33 +149,80 @@ class GeneralStoreManager:
         """
         return self.store.item_at_index(index)
 
+    def items_in_range(self, start, count):
+        """
+        Gets the count items from the store starting at the given index
+
+        :param start: Index of the first item
+        :type start: int
+        :param count: Number of items to get
+        :type count: int
+        :return: Items in the range (None for deleted items), empty at EOF
+        :rtype: list
+        """
+        return self.store.items_in_range(start, count)
+
+    def scan_items(self, start=1, chunk_size=None):
+        """
+        Iterates over the items of the store starting at the given index,
+        reading them in chunks of records. Generator
+
+        :param start: Index of the first item
+        :type start: int
+        :param chunk_size: Number of records read at once
+        :type chunk_size: int
+        :return: Items until the end of the store (None for deleted items)
+        :rtype: generator
+        """
+        if chunk_size is None:
+            chunk_size = self.SCAN_CHUNK_SIZE
+        while True:
+            items = self.store.items_in_range(start, chunk_size)
+            for item in items:
+                yield item
+            if len(items) < chunk_size:
+                break
+            start += chunk_size
+
     def get_indexes(self, amount=1):
         """
         Get the requested number of indexes
 
         :param amount: Amount of indexes to retrieve
         :type amount: int
-        :return: List of indexes
+        :return: List of indexes, consecutive when possible
         :rtype: list
         """
-        # List of IDs
-        ids = []
-        # Create list of IDs
-        for i in range(0, amount):
-            # Get ID from ID store
-            cur_index = self.idStore.get_id()
-            # No more IDs, return list with last indexes of the store file
-            if cur_index == IdStore.NO_ID:
-                last_index = self.store.get_last_file_index()
-                ids += [last_index + j for j in range(0, amount - i)]
-                # Done getting IDs, got them from the end of the file
-                break
-            # Append the index from the ID store
-            else:
-                ids.append(cur_index)
+        # Get a contiguous run of recycled IDs from the ID store if one fits,
+        # so that the items (e.g. blocks of a string) are adjacent in the
+        # store file, otherwise gather them from several runs
+        ids = self.idStore.get_ids(amount) or self.idStore.gather_ids(amount)
+        # Not enough IDs were recycled, use the last indexes of the store file
+        if not ids:
+            last_index = self.store.get_last_file_index()
+            ids = range(last_index, last_index + amount)
         # Return list of ids
         return ids
 
+    def prune_ids(self):
+        """
+        PRIVATE METHOD.
+        Drops the recycled IDs that are past the end of the store or whose
+        records are in use. The ID file is only written periodically, so
+        after a crash it may still list IDs that were handed out since.
+
+        :return: Nothing
+        :rtype: None
+        """
+        ids = self.idStore.get_all_ids()
+        if not ids:
+            return
+        last_file_index = self.store.get_last_file_index()
+        free_ids = [i for i in ids if 0 < i < last_file_index and
+                    self.store.item_at_index(i) is None]
+        if len(free_ids) != len(ids):
+            self.idStore.write_all_ids(free_ids)
+
     @staticmethod
     def truncate_amount(ids, last_file_index):
         """
@@ -9,7 +9,8 @@ class GeneralStringManager(StringManager):
     # Default encoding
     ENCODING = "UTF-8"
 
-    def __init__(self, filename, block_size=10):
+    def __init__(self, filename, block_size=10, hash_index=False,
+                 deduplicate=False, settings=None):
         """
         Creates a GeneralStringManager instance which handles reading/writing
         variable-length strings (ASCII strings)
@@ -18,10 +19,18 @@ class GeneralStringManager(StringManager):
         :type filename: str
         :param block_size: Length of string block
         :type block_size: int
+        :param hash_index: Whether strings are found through a hash index
+        :type hash_index: bool
+        :param deduplicate: Whether equal strings are stored once and shared
+        :type deduplicate: bool
+        :param settings: Settings of the string store (see
+                         GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: String manager instance to handle reading/writing strings
         :rtype: GeneralStringManager
         """
-        super(GeneralStringManager, self).__init__(filename, block_size)
+        super(GeneralStringManager, self).__init__(
+            filename, block_size, hash_index, deduplicate, settings)
 
     def __del__(self):
         del self.storeManager
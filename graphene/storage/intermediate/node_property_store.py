@@ -1,4 +1,4 @@
-from graphene.storage import GeneralStore, Node, Property
+from graphene.storage import GeneralStore, Node, Property, Row
 from graphene.storage.intermediate import GeneralNameManager
 from graphene.storage.intermediate.node_property import NodeProperty
 
@@ -29,6 +29,11 @@ class NodePropertyStore:
         cur_node = self.node_manager.get_item_at_index(key)
         if cur_node is None or cur_node == GeneralStore.EOF:
             return cur_node
+        # All the properties of the node are read at once from its row
+        row_manager = self.sm.nodeRowManagers.get(cur_node.nodeType)
+        if row_manager is not None:
+            row = row_manager.get_item_at_index(cur_node.propId)
+            return cur_node, row.properties
         properties = []
         cur_prop_id = cur_node.propId
         while cur_prop_id != 0:
@@ -42,8 +47,12 @@ class NodePropertyStore:
            all(isinstance(p, Property) for p in value[1]):
             node, properties = value
             self.node_manager.write_item(node)
-            for prop in properties:
-                self.prop_manager.write_item(prop)
+            row_manager = self.sm.nodeRowManagers.get(node.nodeType)
+            if row_manager is not None:
+                row_manager.write_item(Row(node.propId, properties=properties))
+            else:
+                # Write the property chain at once
+                self.prop_manager.write_items(properties)
         else:
             raise ValueError("Given value is not a Node instance")
 
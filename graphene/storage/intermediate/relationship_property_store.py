@@ -33,8 +33,8 @@ class RelationshipPropertyStore:
            all(isinstance(p, Property) for p in value[1]):
             rel, properties = value
             self.relationship_manager.write_item(rel)
-            for prop in properties:
-                self.prop_manager.write_item(prop)
+            # Write the property chain at once
+            self.prop_manager.write_items(properties)
         else:
             raise ValueError("Given value is not a Relationship instance")
 
@@ -1,6 +1,8 @@
 import logging
+import zlib
 
 from graphene.storage.base.string_store import *
+from graphene.storage.base.string_index import StringIndex
 from graphene.storage.intermediate.general_store_manager import *
 
 
@@ -9,7 +11,8 @@ class StringManager(object):
     Handles common reading/writing operations for variable-length strings
     """
 
-    def __init__(self, filename, block_size=10):
+    def __init__(self, filename, block_size=10, hash_index=False,
+                 deduplicate=False, settings=None):
         """
         Creates a StringManager instance which handles reading/writing
         variable-length strings (ASCII or Unicode)
@@ -18,6 +21,19 @@ class StringManager(object):
         :type filename: str
         :param block_size: Length of string block
         :type block_size: int
+        :param hash_index: Whether strings are found through a hash index
+                           instead of a scan of the store
+        :type hash_index: bool
+        :param deduplicate: Whether equal strings are stored once and shared
+                            (implies hash_index). The owner of the manager
+                            must rebuild the index with the references to
+                            the strings when it is not clean (see
+                            rebuild_hash_index), and count them again when
+                            the index is repaired (see repair_hash_index)
+        :type deduplicate: bool
+        :param settings: Settings of the string store (see
+                         GeneralStore.SETTINGS)
+        :type settings: dict[str, object]
         :return: String manager instance to handle general reading/writing
                  operations
         :rtype: StringManager
@@ -25,9 +41,23 @@ class StringManager(object):
         # Size of string blocks
         self.blockSize = block_size
         # Create a manager for the string store
-        self.storeManager = GeneralStoreManager(StringStore(filename, block_size))
+        self.storeManager = GeneralStoreManager(
+            StringStore(filename, block_size, settings))
         self.logger = logging.getLogger(self.__class__.__name__)
 
+        # Whether equal strings are shared
+        self.deduplicate = deduplicate
+        # Index of the strings by hash, if any
+        if hash_index or deduplicate:
+            # Written at the checkpoints of the log, if the store is logged
+            logged = self.storeManager.store.WAL is not None
+            self.hashIndex = StringIndex(filename + ".hash", logged)
+            # Without sharing, every string has a single reference
+            if not self.hashIndex.clean and not deduplicate:
+                self.rebuild_hash_index()
+        else:
+            self.hashIndex = None
+
     def __del__(self):
         del self.storeManager
 
@@ -42,6 +72,12 @@ class StringManager(object):
         """
         # Encode the given string to store
         string = self.encode(string)
+        # Share an equal string that is already stored
+        if self.deduplicate:
+            index = self.find_encoded_string(string)
+            if index is not None:
+                self.hashIndex.add_reference(index)
+                return index
         # Get parts of string (separated based on the block size)
         string_parts = self.split_string(string)
         # Number of parts
@@ -64,8 +100,8 @@ class StringManager(object):
                       'next_block': ids[1],
                       'string': string_parts[0]}
 
-        # Create first block using kwargs
-        self.storeManager.create_item(ids[0], **kwargs)
+        # Create first block using kwargs (blocks are written together)
+        blocks = [self.storeManager.new_item(ids[0], **kwargs)]
         # First index in linked list
         first_index = ids[0]
 
@@ -86,7 +122,11 @@ class StringManager(object):
                           'next_block': ids[i + 1],
                           'string': string_parts[i]}
             # Create next block
-            self.storeManager.create_item(ids[i], **kwargs)
+            blocks.append(self.storeManager.new_item(ids[i], **kwargs))
+        # Write all the blocks, adjacent blocks are written at once
+        self.storeManager.write_items(blocks)
+        if self.hashIndex is not None:
+            self.hashIndex.add(self.hash_string(string), first_index)
         # Return the first index of the string in the store
         return first_index
 
@@ -130,6 +170,12 @@ class StringManager(object):
         :return: Whether the delete succeeded
         :rtype: bool
         """
+        if self.hashIndex is not None:
+            # The string is still shared, only drop this reference
+            if self.deduplicate and \
+               self.hashIndex.remove_reference(index) > 0:
+                return True
+            self.hashIndex.remove(index)
         # Store the starting index to check if deletion is
         # starting from beginning of linked list
         start_index = index
@@ -154,15 +200,19 @@ class StringManager(object):
 
     def update_string_at_index(self, index, new_string):
         """
-        Updates the string at the given index
+        Updates the string at the given index. A shared string is left as is
+        and the new string is written elsewhere.
 
         :param index: Index of original string
         :type index: int
         :param new_string: New string to place at the starting index
         :type new_string: str | unicode
-        :return: Nothing
-        :rtype: None
+        :return: Index of the updated string
+        :rtype: int
         """
+        if self.deduplicate and self.hashIndex.get_references(index) > 1:
+            self.hashIndex.remove_reference(index)
+            return self.write_string(new_string)
         # Encode the given string to store
         new_string = self.encode(new_string)
         # Get parts of string (separated based on the block size)
@@ -208,8 +258,8 @@ class StringManager(object):
                       'next_block': next_id,
                       'string': string_parts[0]}
 
-        # Create first block using kwargs
-        self.storeManager.create_item(cur_id, **kwargs)
+        # Create first block using kwargs (blocks are written together)
+        blocks = [self.storeManager.new_item(cur_id, **kwargs)]
 
         # Create rest of linked list
         for i in range(1, new_length):
@@ -249,11 +299,19 @@ class StringManager(object):
                           'next_block': next_id,
                           'string': string_parts[i]}
             # Create next block
-            self.storeManager.create_item(cur_id, **kwargs)
+            blocks.append(self.storeManager.new_item(cur_id, **kwargs))
 
+        # Write all the blocks, adjacent blocks are written at once
+        self.storeManager.write_items(blocks)
         # Last item in linked list, but items remain from old string
         if old_length > new_length:
             self.delete_rest(next_id)
+        if self.hashIndex is not None:
+            # The string keeps its references (a single one if it was not
+            # indexed)
+            references = self.hashIndex.remove(index) or 1
+            self.hashIndex.add(self.hash_string(new_string), index, references)
+        return index
 
     def delete_rest(self, index):
         """
@@ -291,13 +349,15 @@ class StringManager(object):
     def find_string(self, string):
         """
         Finds the starting index of the given string.
-        Complexity: O(|file|)
+        Complexity: O(|file|), O(1) with a hash index
 
         :param string: String to look for
         :type string: str | unicode
         :return: Starting index of string
         :rtype: int
         """
+        if self.hashIndex is not None:
+            return self.find_encoded_string(self.encode(string))
         # Last index in the string store file
         last_index = self.storeManager.store.get_last_file_index()
         for idx in range(1, last_index):
@@ -320,6 +380,8 @@ class StringManager(object):
         """
         if not strings:
             return None
+        if self.hashIndex is not None:
+            return [self.find_string(string) or 0 for string in strings]
         strings_amt = len(strings)
         found_amt = 0
         indexes = [0] * strings_amt
@@ -344,6 +406,89 @@ class StringManager(object):
 
     # TODO: write find_string_mult and find_strings_mult for multiple strings
 
+    def find_encoded_string(self, string):
+        """
+        PRIVATE METHOD.
+        Finds the starting index of the given encoded string in the hash index
+
+        :param string: Encoded string to look for
+        :type string: str
+        :return: Starting index of string, None if it is not stored
+        :rtype: int
+        """
+        decoded = self.decode(string)
+        for index in self.hashIndex.get_indexes(self.hash_string(string)):
+            # Strings with the same hash may differ
+            if self.read_string_at_index(index) == decoded:
+                return index
+        return None
+
+    def rebuild_hash_index(self, references=None):
+        """
+        Rebuilds the hash index by scanning the string store
+
+        :param references: Number of references to each string by its
+                           starting index, or None if every string has a
+                           single reference
+        :type references: dict[int, int]
+        :return: Nothing
+        :rtype: None
+        """
+        entries = []
+        for block in self.storeManager.scan_items():
+            # Only the first blocks of the strings are indexed
+            if block is None or block.previousBlock != 0:
+                continue
+            string = self.read_string_at_index(block.index)
+            if string is None or string is EOF:
+                continue
+            if references is None:
+                refs = 1
+            else:
+                refs = references.get(block.index, 0)
+            entries.append((self.hash_string(self.encode(string)),
+                            block.index, refs))
+        self.hashIndex.rebuild(entries)
+
+    def repair_hash_index(self, indexes):
+        """
+        Brings the hash index up to date after the blocks with the given
+        indexes were changed without it, e.g. by replaying a write-ahead log.
+        Strings keep their references, a new string has a single one unless
+        strings are shared: its references must then be added by the owner
+        of the manager.
+
+        :param indexes: Indexes of the changed blocks
+        :type indexes: iterable
+        :return: Nothing
+        :rtype: None
+        """
+        for index in indexes:
+            references = self.hashIndex.remove(index)
+            block = self.storeManager.get_item_at_index(index)
+            # Only the first blocks of the strings are indexed
+            if block is None or block is EOF or block.previousBlock != 0:
+                continue
+            string = self.read_string_at_index(index)
+            if string is None or string is EOF:
+                continue
+            if not self.deduplicate:
+                references = 1
+            self.hashIndex.add(self.hash_string(self.encode(string)), index,
+                               references)
+
+    @staticmethod
+    def hash_string(string):
+        """
+        Hash of the given encoded string, stable across runs
+
+        :param string: Encoded string
+        :type string: str
+        :return: Hash of the string
+        :rtype: int
+        """
+        return zlib.crc32(string) & 0xffffffff
+
     @abc.abstractmethod
     def encode(self, string):
         """
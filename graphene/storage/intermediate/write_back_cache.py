@@ -0,0 +1,67 @@
+from pylru import WriteBackCacheManager
+
+
+class WriteBackCache(WriteBackCacheManager):
+    """
+    Write-back cache of a node-property or relationship-property store. Dirty
+    entries are written to the store when they are evicted, when the cache is
+    synced, and before they are deleted, so that the store always deletes the
+    latest version of an item.
+    """
+
+    def __delitem__(self, key):
+        """
+        Writes the entry back if it is dirty, then deletes it from the cache
+        and the store
+
+        :param key: Index of the item to delete
+        :type key: int
+        :return: Nothing
+        :rtype: None
+        """
+        if key in self.dirty:
+            self.store[key] = self.cache.peek(key)
+            self.dirty.remove(key)
+        super(WriteBackCache, self).__delitem__(key)
+
+    def discard(self, key):
+        """
+        Removes the entry from the cache without writing it back, used when
+        the item has been deleted from the store
+
+        :param key: Index of the item to discard
+        :type key: int
+        :return: Nothing
+        :rtype: None
+        """
+        if key in self.cache:
+            del self.cache[key]
+        self.dirty.discard(key)
+
+    def schedule_sync(self):
+        """
+        Writes the dirty entries back to the store. Subclasses may write them
+        later instead (see BackgroundFlushCache)
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.sync()
+
+    def drain(self):
+        """
+        Waits until every dirty entry has been written back to the store
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.sync()
+
+    def close(self):
+        """
+        Writes the dirty entries back before the cache is discarded
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.sync()
@@ -1,5 +1,8 @@
-from pylru import WriteBackCacheManager
+from contextlib import contextmanager
+import functools
+import itertools
 import logging
+import os
 
 from graphene.errors.storage_manager_errors import *
 from graphene.errors.query_errors import NonexistentPropertyException
@@ -7,11 +10,84 @@ from graphene.storage import *
 from graphene.storage.base.property import Property
 from graphene.storage.intermediate import *
 from graphene.storage.defrag.defrag_helpers import *
+from graphene.storage.base.type_index import TypeIndex
+from graphene.storage.base.adjacency_index import AdjacencyIndex
+from graphene.storage.base.property_index import PropertyIndex
+from graphene.storage.base.statistics import Statistics
+from graphene.storage.base.write_ahead_log import WriteAheadLog
+
+
+def transaction(method):
+    """
+    Decorator running a StorageManager method in a write-ahead log
+    transaction, so that its changes are redone or undone together after a
+    crash
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.wal is None:
+            return method(self, *args, **kwargs)
+        self.wal.begin()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.commit_transaction()
+    return wrapper
+
+
+def schema_change(method):
+    """
+    Decorator reloading the schema catalog entry of the type altered by a
+    StorageManager method, even if the method fails half way, so that the
+    catalog matches the type stores. The method must take the type name as
+    its first argument and the node flag as its last one.
+    """
+    @functools.wraps(method)
+    def wrapper(self, type_name, *args):
+        try:
+            return method(self, type_name, *args)
+        finally:
+            self.reload_type_data(type_name, args[-1])
+    return wrapper
+
 
 class StorageManager:
     # Maximum size of the cache (in items)
     MAX_CACHE_SIZE = 10000
 
+    # Whether dirty cache entries are written to the stores by a background
+    # thread instead of the caller's thread (see BackgroundFlushCache). With
+    # the write-ahead log, the caches are still drained before each
+    # transaction commits, so writes are only deferred within a batch.
+    BACKGROUND_FLUSH = False
+
+    # Durability mode of the write-ahead log (see WriteAheadLog)
+    WAL_MODE = WriteAheadLog.NONE
+    # Filename for the write-ahead log
+    WAL_FILENAME = "graphenestore.wal"
+
+    # Whether type names and property strings are found through hash indexes
+    # instead of scans of their stores (see StringIndex)
+    STRING_HASH_INDEX = False
+    # Whether equal property strings are stored once and shared (implies a
+    # hash index on the property string store)
+    DEDUPLICATE_STRINGS = False
+
+    # Whether string and array property values that fit in the property
+    # record are stored there instead of the string and array stores
+    INLINE_PROPERTY_VALUES = False
+
+    # Whether the properties of the nodes of new node types are stored in a
+    # fixed-width row file per type (see RowStore) instead of property chains.
+    # Types keep the layout they were created with.
+    NODE_ROW_STORE = False
+
+    # Names of the settings above that can be given to a storage manager,
+    # overriding the defaults of the class for that storage manager only
+    SETTINGS = ("BACKGROUND_FLUSH", "WAL_MODE", "STRING_HASH_INDEX",
+                "DEDUPLICATE_STRINGS", "INLINE_PROPERTY_VALUES",
+                "NODE_ROW_STORE")
+
     # Filename for the node type store
     NODE_TYPE_STORE_FILENAME = "graphenestore.nodetypestore.db"
     # Filename for the dynamic name manager for node type names store
@@ -34,6 +110,18 @@ class StorageManager:
     RELATIONSHIP_TYPE_TYPE_STORE_NAMES_FILENAME = \
         "graphenestore.relationshiptypestore.types.names.db"
 
+    # Filename for the index of the nodes of each type
+    NODE_TYPE_INDEX_FILENAME = "graphenestore.nodestore.typeindex.db"
+    # Filename for the index of the relationships of each type
+    RELATIONSHIP_TYPE_INDEX_FILENAME = \
+        "graphenestore.relationshipstore.typeindex.db"
+    # Filename for the index of the relationships of each node
+    RELATIONSHIP_ADJACENCY_INDEX_FILENAME = \
+        "graphenestore.relationshipstore.adjacency.db"
+
+    # Filename for the statistics of the types, collected by ANALYZE
+    STATISTICS_FILENAME = "graphenestore.statistics.db"
+
     # Filename for the dynamic string property manager
     PROP_STORE_STRINGS_FILENAME = "graphenestore.propertystore.strings.db"
 
@@ -42,69 +130,165 @@ class StorageManager:
     # Size of string blocks
     STRING_BLOCK_SIZE = 32
 
-    def __init__(self):
+    def __init__(self, settings=None):
         """
         Initialize all the required storage managers
 
+        :param settings: Values of the SETTINGS used by this storage manager
+                         instead of the defaults of the class, and of the
+                         GeneralStore.SETTINGS of the stores it opens (except
+                         WAL, which is given by WAL_MODE)
+        :type settings: dict[str, object]
         :return: StoreManager instance to handle general storage manipulations
         :rtype: StorageManager
         """
         self.logger = logging.getLogger(self.__class__.__name__)
 
+        # Settings given to every store opened by the storage manager
+        self.storeSettings = {}
+        for name, value in (settings or {}).items():
+            if name in self.SETTINGS:
+                setattr(self, name, value)
+            elif name in GeneralStore.SETTINGS and name != "WAL":
+                self.storeSettings[name] = value
+            else:
+                raise ValueError("Unknown storage setting: %s" % name)
+
+        # Replay the write-ahead log before the stores are opened, keeping its
+        # records until the indexes are brought up to date from them
+        self.wal = None
+        if self.WAL_MODE != WriteAheadLog.NONE:
+            self.wal = WriteAheadLog(self.WAL_FILENAME, self.WAL_MODE)
+            self.wal.replay(False)
+        self.storeSettings["WAL"] = self.wal
+        # Whether the indexes are written at the checkpoints of the log
+        logged = self.wal is not None
+        # Paths of the files of deleted stores, removed once their deletion is
+        # committed (see remove_files)
+        self.removedFiles = []
+
         # Create a string manager for string property types
         self.prop_string_manager = \
             GeneralStringManager(self.PROP_STORE_STRINGS_FILENAME,
-                                 self.STRING_BLOCK_SIZE)
+                                 self.STRING_BLOCK_SIZE,
+                                 self.STRING_HASH_INDEX,
+                                 self.DEDUPLICATE_STRINGS,
+                                 self.storeSettings)
 
         # Create object managers
-        self.node_manager = GeneralStoreManager(NodeStore())
-        self.property_manager = GeneralStoreManager(PropertyStore())
-        self.relationship_manager = GeneralStoreManager(RelationshipStore())
-        self.array_manager = GeneralArrayManager()
+        self.node_manager = \
+            GeneralStoreManager(NodeStore(self.storeSettings))
+        self.property_manager = \
+            GeneralStoreManager(PropertyStore(self.storeSettings))
+        self.relationship_manager = \
+            GeneralStoreManager(RelationshipStore(self.storeSettings))
+        self.array_manager = GeneralArrayManager(settings=self.storeSettings)
+
+        # Index of the nodes of each type, rebuilt from the node store if it
+        # was not closed properly
+        self.nodeTypeIndex = TypeIndex(self.NODE_TYPE_INDEX_FILENAME, logged)
+        self.recover_node_type_index()
+        # Index of the relationships of each type
+        self.relTypeIndex = \
+            TypeIndex(self.RELATIONSHIP_TYPE_INDEX_FILENAME, logged)
+        # Index of the relationships of each node, by type and direction
+        self.adjacencyIndex = \
+            AdjacencyIndex(self.RELATIONSHIP_ADJACENCY_INDEX_FILENAME, logged)
+        self.recover_relationship_indexes()
+        # Statistics of the analyzed types
+        self.statistics = Statistics(self.STATISTICS_FILENAME, logged)
 
         # Create combined object managers along with their cache handlers
         nodeprop = NodePropertyStore(self)
         relprop = RelationshipPropertyStore(self)
-        self.nodeprop = WriteBackCacheManager(nodeprop, self.MAX_CACHE_SIZE)
-        self.relprop = WriteBackCacheManager(relprop, self.MAX_CACHE_SIZE)
+        if self.BACKGROUND_FLUSH:
+            cache_class = BackgroundFlushCache
+        else:
+            cache_class = WriteBackCache
+        self.nodeprop = cache_class(nodeprop, self.MAX_CACHE_SIZE)
+        self.relprop = cache_class(relprop, self.MAX_CACHE_SIZE)
+        # Number of open batches, caches are only synced when it is 0
+        self.batchDepth = 0
 
         # --- Node type stores, and name stores --- #
         # Create store and manager for node types
-        node_type_store = GeneralTypeStore(self.NODE_TYPE_STORE_FILENAME)
+        node_type_store = GeneralTypeStore(self.NODE_TYPE_STORE_FILENAME,
+                                           self.storeSettings)
         self.nodeTypeManager = GeneralStoreManager(node_type_store)
         # Create a manager for node type names
         self.nodeTypeNameManager = \
             GeneralNameManager(self.NODE_TYPE_STORE_NAMES_FILENAME,
-                               self.NAME_BLOCK_SIZE)
+                               self.NAME_BLOCK_SIZE, self.STRING_HASH_INDEX,
+                               settings=self.storeSettings)
+        self.recover_string_index(self.nodeTypeNameManager)
         # Create store and manager for types of node types
-        node_tt_store = GeneralTypeTypeStore(self.NODE_TYPE_TYPE_STORE_FILENAME)
+        node_tt_store = GeneralTypeTypeStore(
+            self.NODE_TYPE_TYPE_STORE_FILENAME, self.storeSettings)
         self.nodeTypeTypeManager = GeneralStoreManager(node_tt_store)
         # Create a manager for names of types of node types
         self.nodeTypeTypeNameManager = \
             GeneralNameManager(self.NODE_TYPE_TYPE_STORE_NAMES_FILENAME,
-                               self.NAME_BLOCK_SIZE)
+                               self.NAME_BLOCK_SIZE,
+                               settings=self.storeSettings)
 
         # --- Relationship type stores, and name stores --- #
         # Create store and manager for relationship types
-        rel_type_store = GeneralTypeStore(self.RELATIONSHIP_TYPE_STORE_FILENAME)
+        rel_type_store = GeneralTypeStore(
+            self.RELATIONSHIP_TYPE_STORE_FILENAME, self.storeSettings)
         self.relTypeManager = GeneralStoreManager(rel_type_store)
         # Create a manager for relationship type names
         self.relTypeNameManager = \
             GeneralNameManager(self.RELATIONSHIP_TYPE_STORE_NAMES_FILENAME,
-                               self.NAME_BLOCK_SIZE)
+                               self.NAME_BLOCK_SIZE, self.STRING_HASH_INDEX,
+                               settings=self.storeSettings)
+        self.recover_string_index(self.relTypeNameManager)
         # Create store and manager for types of relationship types
         relationship_tt_store = \
-            GeneralTypeTypeStore(self.RELATIONSHIP_TYPE_TYPE_STORE_FILENAME)
+            GeneralTypeTypeStore(self.RELATIONSHIP_TYPE_TYPE_STORE_FILENAME,
+                                 self.storeSettings)
         self.relTypeTypeManager = GeneralStoreManager(relationship_tt_store)
         # Create a manager for names of types of relationship types
         self.relTypeTypeNameManager = \
             GeneralNameManager(self.RELATIONSHIP_TYPE_TYPE_STORE_NAMES_FILENAME,
-                               self.NAME_BLOCK_SIZE)
+                               self.NAME_BLOCK_SIZE,
+                               settings=self.storeSettings)
+
+        # Catalogs of the (type, schema) of every type by name, so that types
+        # are not looked up in the stores every time they are used
+        self.nodeTypeCatalog = self.load_type_catalog(True)
+        self.relTypeCatalog = self.load_type_catalog(False)
+
+        # Row stores of the node types whose properties are stored in rows, by
+        # index of the node type
+        self.nodeRowManagers = self.load_node_row_managers()
+
+        # Ordered indexes of node properties, by index of the node type and
+        # index of the type of the property
+        self.propertyIndexes = self.load_property_indexes()
+
+        # Shared strings need their references counted again after a crash
+        self.recover_property_string_index()
+
+        if self.wal is not None:
+            self.wal.add_checkpoint_handler(self.checkpoint_indexes)
+        # The indexes are up to date: the log is checkpointed, and the files
+        # of the stores whose deletion was replayed are removed
+        self.remove_files()
 
     def __del__(self):
         self.close()
 
     def close(self):
+        # Commit any open batch and write back the cached changes
+        while self.batchDepth > 0:
+            self.commit_batch()
+        self.nodeprop.close()
+        self.relprop.close()
+
+        # Checkpoint the write-ahead log, the stores are up to date
+        if self.wal is not None:
+            self.wal.close()
+
         # Delete the property string manager
         del self.prop_string_manager
 
@@ -112,6 +296,20 @@ class StorageManager:
         del self.nodeprop
         del self.relprop
 
+        # Delete the row managers
+        del self.nodeRowManagers
+
+        # Delete the property indexes
+        del self.propertyIndexes
+
+        # Delete the type indexes
+        del self.nodeTypeIndex
+        del self.relTypeIndex
+        del self.adjacencyIndex
+
+        # Delete the statistics
+        del self.statistics
+
         # Delete the base managers
         del self.node_manager
         del self.property_manager
@@ -134,6 +332,140 @@ class StorageManager:
         del self.relTypeTypeManager
         del self.relTypeTypeNameManager
 
+# --- Batch Methods --- #
+
+    def begin_batch(self):
+        """
+        Starts a batch: until it is committed, changes are kept in the
+        node/relationship caches instead of being synced after every insert,
+        update or delete. Batches can be nested.
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.batchDepth += 1
+        # The whole batch is a single transaction
+        if self.wal is not None:
+            self.wal.begin()
+
+    def commit_batch(self):
+        """
+        Ends a batch, syncing the caches once the outermost batch ends
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.batchDepth == 0:
+            raise NoBatchStartedException("No batch has been started.")
+        self.batchDepth -= 1
+        if self.batchDepth == 0:
+            self.nodeprop.schedule_sync()
+            self.relprop.schedule_sync()
+        if self.wal is not None:
+            self.commit_transaction()
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager running the enclosed operations in a batch (see
+        begin_batch). The batch is committed even if an error occurs, there
+        is no rollback.
+
+        :return: This storage manager
+        :rtype: StorageManager
+        """
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.commit_batch()
+
+    def commit_transaction(self):
+        """
+        PRIVATE METHOD.
+        Ends a write-ahead log transaction. The caches are drained before the
+        outermost transaction commits, so that the writes they defer are
+        logged in the transaction that made them rather than in a later one
+        (or in none, by the background flusher).
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.wal.depth == 1:
+            self.nodeprop.drain()
+            self.relprop.drain()
+        self.wal.commit()
+        if self.wal.depth == 0 and self.removedFiles:
+            self.remove_files()
+
+    def remove_files(self):
+        """
+        PRIVATE METHOD.
+        Removes the files of the stores deleted by the committed transactions.
+        The log is checkpointed first, so that the deletions are on disk and
+        replaying the log never writes to (and recreates) a removed file.
+
+        :return: Nothing
+        :rtype: None
+        """
+        if self.wal is not None:
+            with GeneralStore.IO_LOCK:
+                self.wal.checkpoint()
+        for file_path in self.removedFiles:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+        self.removedFiles = []
+
+    def checkpoint_indexes(self, log_emptied):
+        """
+        PRIVATE METHOD.
+        Checkpoint handler of the write-ahead log: the indexes are written
+        before the log is emptied, and marked as clean once it is, so that the
+        clean indexes on disk always match the stores at the start of the log
+
+        :param log_emptied: Whether the log was emptied
+        :type log_emptied: bool
+        :return: Nothing
+        :rtype: None
+        """
+        for index in self.persistent_indexes():
+            if log_emptied:
+                index.mark_clean()
+            else:
+                index.write()
+
+    def persistent_indexes(self):
+        """
+        PRIVATE METHOD.
+        Gets the indexes and statistics kept on the stores
+
+        :return: Indexes written at the checkpoints of the log
+        :rtype: list[PersistentIndex]
+        """
+        indexes = [self.nodeTypeIndex, self.relTypeIndex, self.adjacencyIndex,
+                   self.statistics]
+        for type_indexes in self.propertyIndexes.values():
+            indexes.extend(type_indexes.values())
+        for manager in (self.prop_string_manager, self.nodeTypeNameManager,
+                        self.relTypeNameManager):
+            if manager.hashIndex is not None:
+                indexes.append(manager.hashIndex)
+        return indexes
+
+    def sync_cache(self, cache):
+        """
+        PRIVATE METHOD.
+        Syncs the given cache with its store (possibly in the background),
+        unless a batch is open
+
+        :param cache: Node or relationship cache
+        :type cache: WriteBackCache
+        :return: Nothing
+        :rtype: None
+        """
+        if self.batchDepth == 0:
+            cache.schedule_sync()
+
 # --- Node Storage Interface Methods --- #
 
     def create_node_type(self, type_name, schema):
@@ -208,6 +540,7 @@ class StorageManager:
 
 # --- Type Storage Methods --- #
 
+    @transaction
     def create_type(self, type_name, schema, node_flag):
         """
         Creates a node or relationship type with the given name and schema
@@ -236,7 +569,7 @@ class StorageManager:
             type_type_name_manager = self.relTypeTypeNameManager
 
         # Make sure the type does not already exists
-        if type_name_manager.find_string(type_name) is not None:
+        if type_name in self.type_catalog(node_flag):
             # The type name already exists!
             if node_flag:
                 raise TypeAlreadyExistsException(
@@ -249,6 +582,7 @@ class StorageManager:
         if len(schema) > 0:
             ids = type_type_manager.get_indexes(len(schema))
             # Create linked list of types for the created type
+            type_types = []
             for i, idx in enumerate(ids):
                 tt_name, tt_type = schema[i]
                 # Replace array syntax with Array following the array type
@@ -262,12 +596,18 @@ class StorageManager:
                 }
                 if i < len(ids) - 1:
                     kwargs["next_type"] = ids[i + 1]
-                prop = type_type_manager.create_item(**kwargs)
+                type_types.append(type_type_manager.new_item(**kwargs))
+            # Write the linked list at once
+            type_type_manager.write_items(type_types)
             new_type = type_manager.create_item(first_type=ids[0],
                                                 name_id=name_index)
         else:
             new_type = type_manager.create_item(name_id=name_index)
         self.logger.debug("TypeManager wrote new type: %s" % new_type)
+        self.type_catalog(node_flag)[type_name] = \
+            self.read_type_data(new_type, node_flag)
+        if node_flag and self.NODE_ROW_STORE:
+            self.create_node_row_manager(new_type, len(schema))
         return new_type
 
     def delete_type_type(self, type_type, node_flag):
@@ -305,6 +645,7 @@ class StorageManager:
         type_type_name_manager.delete_string_at_index(type_type.typeName)
         type_type_manager.delete_item(type_type)
 
+    @transaction
     def delete_type(self, type_name, node_flag):
         """
         Deletes the node or relationship type with the given name
@@ -323,20 +664,30 @@ class StorageManager:
             cache = self.nodeprop
             type_manager = self.nodeTypeManager
             type_name_manager = self.nodeTypeNameManager
+            type_index = self.nodeTypeIndex
         # Deleting a relationship type
         else:
             cache = self.relprop
             type_manager = self.relTypeManager
             type_name_manager = self.relTypeNameManager
+            type_index = self.relTypeIndex
 
         type_data, type_schema = self.get_type_data(type_name, node_flag)
         for tt, _, __ in type_schema:
+            # The nodes are deleted below, so drop their indexes first
+            if node_flag:
+                self.delete_property_index(type_data.index, tt.index)
             self.delete_type_type(tt, node_flag)
-        for node in self.get_nodes_of_type(type_data):
-            del cache[node.index]
+        for index in type_index.get_items(type_data.index):
+            del cache[index]
         cache.sync()  # Sync nodeprop cache
+        type_index.drop_type(type_data.index)
+        self.statistics.drop_type(node_flag, type_data.index)
+        if node_flag:
+            self.delete_node_row_manager(type_data)
         type_name_manager.delete_string_at_index(type_data.nameId)
         type_manager.delete_item(type_data)
+        del self.type_catalog(node_flag)[type_name]
 
     def get_type_data(self, type_name, node_flag):
         """
@@ -350,35 +701,103 @@ class StorageManager:
         :return: ID and schema for type with given name
         :rtype: tuple
         """
-        # Get the appropriate managers
-        # Getting data for a node
+        try:
+            cur_type, schema = self.type_catalog(node_flag)[type_name]
+        except KeyError:
+            # Invalid type name
+            raise TypeDoesNotExistException(
+                "Type %s does not exist." % type_name)
+        # Copy the schema so that the catalog cannot be changed through it
+        return cur_type, list(schema)
+
+    def type_catalog(self, node_flag):
+        """
+        PRIVATE METHOD.
+        Gets the catalog of the node or relationship types
+
+        :param node_flag: Flag specifying whether we are getting the catalog
+                          of the node types (True) or relationship types (False)
+        :type node_flag: bool
+        :return: (type, schema) of every type by name
+        :rtype: dict[str, tuple]
+        """
+        if node_flag is True:
+            return self.nodeTypeCatalog
+        else:
+            return self.relTypeCatalog
+
+    def load_type_catalog(self, node_flag):
+        """
+        PRIVATE METHOD.
+        Reads the (type, schema) of every node or relationship type from the
+        type stores
+
+        :param node_flag: Flag specifying whether we are loading node types
+                          (True) or relationship types (False)
+        :type node_flag: bool
+        :return: (type, schema) of every type by name
+        :rtype: dict[str, tuple]
+        """
         if node_flag is True:
             type_manager = self.nodeTypeManager
             type_name_manager = self.nodeTypeNameManager
-            type_type_manager = self.nodeTypeTypeManager
-            type_type_name_manager = self.nodeTypeTypeNameManager
-        # Getting data for a relationship
         else:
             type_manager = self.relTypeManager
             type_name_manager = self.relTypeNameManager
+
+        catalog = {}
+        for cur_type in type_manager.scan_items():
+            if cur_type is None:
+                continue
+            type_name = type_name_manager.read_string_at_index(cur_type.nameId)
+            catalog[type_name] = self.read_type_data(cur_type, node_flag)
+        return catalog
+
+    def reload_type_data(self, type_name, node_flag):
+        """
+        PRIVATE METHOD.
+        Reads the type with the given name and its schema back from the type
+        stores into the catalog, after the type was altered
+
+        :param type_name: Name of type to reload
+        :type type_name: str
+        :param node_flag: Flag specifying whether we are reloading a node type
+                          (True) or a relationship type (False)
+        :type node_flag: bool
+        :return: Nothing
+        :rtype: None
+        """
+        if node_flag is True:
+            type_manager = self.nodeTypeManager
+        else:
+            type_manager = self.relTypeManager
+
+        catalog = self.type_catalog(node_flag)
+        if type_name not in catalog:
+            return
+        cur_type = type_manager.get_item_at_index(catalog[type_name][0].index)
+        catalog[type_name] = self.read_type_data(cur_type, node_flag)
+
+    def read_type_data(self, cur_type, node_flag):
+        """
+        PRIVATE METHOD.
+        Reads the schema of the given type from the type type stores
+
+        :param cur_type: Type to read the schema of
+        :type cur_type: GeneralType
+        :param node_flag: Flag specifying whether we are reading a node type
+                          (True) or a relationship type (False)
+        :type node_flag: bool
+        :return: The type and its schema
+        :rtype: tuple
+        """
+        if node_flag is True:
+            type_type_manager = self.nodeTypeTypeManager
+            type_type_name_manager = self.nodeTypeTypeNameManager
+        else:
             type_type_manager = self.relTypeTypeManager
             type_type_name_manager = self.relTypeTypeNameManager
 
-        idx = 1
-        cur_type = None
-        while True:
-            cur_type = type_manager.get_item_at_index(idx)
-            if cur_type is GeneralStore.EOF:
-                cur_type = None
-                break
-            if cur_type is not None and \
-               type_name_manager.read_string_at_index(cur_type.nameId) == type_name:
-                break
-            idx += 1
-        if cur_type is None:
-            # Invalid type name
-            raise TypeDoesNotExistException(
-                "Type %s does not exist." % type_name)
         cur_type_type_id = cur_type.firstType
         schema = []
         while cur_type_type_id != 0:
@@ -390,7 +809,416 @@ class StorageManager:
             cur_type_type_id = cur_type_type.nextType
         return cur_type, schema
 
+    def load_node_row_managers(self):
+        """
+        PRIVATE METHOD.
+        Opens the row stores of the node types whose node properties are
+        stored in rows, which are the node types that have a row file
+
+        :return: Row managers by index of the node type
+        :rtype: dict[int, GeneralStoreManager]
+        """
+        row_managers = {}
+        datafiles_dir = GrapheneStore().datafilesDir
+        for type_data, schema in self.nodeTypeCatalog.values():
+            filename = RowStore.FILE_NAME_FORMAT % type_data.index
+            if os.path.isfile(datafiles_dir + filename):
+                row_store = RowStore(type_data.index, len(schema),
+                                     self.storeSettings)
+                row_managers[type_data.index] = GeneralStoreManager(row_store)
+        # Remove the row files of types whose deletion was committed before a
+        # crash (once the indexes are recovered), before a new type can take
+        # their index
+        prefix, suffix = RowStore.FILE_NAME_FORMAT.split("%d")
+        for filename in os.listdir(datafiles_dir):
+            if not filename.startswith(prefix) or \
+               not filename.endswith(suffix):
+                continue
+            type_index = filename[len(prefix):len(filename) - len(suffix)]
+            if type_index.isdigit() and int(type_index) not in row_managers:
+                self.removedFiles.append(datafiles_dir + filename)
+                self.removedFiles.append(datafiles_dir + filename + ".id")
+        return row_managers
+
+    def create_node_row_manager(self, type_data, columns):
+        """
+        PRIVATE METHOD.
+        Creates an empty row store for the given node type
+
+        :param type_data: Node type
+        :type type_data: GeneralType
+        :param columns: Number of properties in the schema of the node type
+        :type columns: int
+        :return: Nothing
+        :rtype: None
+        """
+        row_store = RowStore(type_data.index, columns, self.storeSettings)
+        # Empty the rows left behind by a deleted type with the same index,
+        # whose files must no longer be removed
+        row_store.clear()
+        file_path = GrapheneStore().datafilesDir + row_store.filename
+        self.removedFiles = [path for path in self.removedFiles
+                             if not path.startswith(file_path)]
+        self.nodeRowManagers[type_data.index] = GeneralStoreManager(row_store)
+
+    def delete_node_row_manager(self, type_data):
+        """
+        PRIVATE METHOD.
+        Deletes the row store of the given node type, if it has one
+
+        :param type_data: Node type
+        :type type_data: GeneralType
+        :return: Nothing
+        :rtype: None
+        """
+        row_manager = self.nodeRowManagers.pop(type_data.index, None)
+        if row_manager is None:
+            return
+        file_path = GrapheneStore().datafilesDir + row_manager.store.filename
+        # Close the row and ID files. They are removed once the deletion of
+        # the type is committed, so that the type keeps them if it is undone.
+        del row_manager
+        self.removedFiles.extend((file_path, file_path + ".id"))
+        if self.wal is None:
+            self.remove_files()
+
+    def resize_node_rows(self, type_data, columns, change):
+        """
+        PRIVATE METHOD.
+        Changes the number of columns of the row store of the given node
+        type, changing the properties of every row with the given function
+        (see RowStore.set_columns). The cached properties of the nodes of the
+        type are dropped.
+
+        :param type_data: Node type
+        :type type_data: GeneralType
+        :param columns: New number of properties in the schema of the type
+        :type columns: int
+        :param change: Function given the properties of a row, returning the
+                       properties of its new columns
+        :type change: function
+        :return: Nothing
+        :rtype: None
+        """
+        self.nodeprop.drain()
+        self.nodeRowManagers[type_data.index].store.set_columns(columns,
+                                                                change)
+        for node_index in self.nodeTypeIndex.get_items(type_data.index):
+            self.nodeprop.discard(node_index)
+
+# --- Property Index Methods --- #
+    def create_property_index(self, type_name, prop_name):
+        """
+        Creates an ordered index of the given property of the nodes of the
+        given node type, used to answer equality and range queries on it
+
+        :param type_name: Name of node type
+        :type type_name: str
+        :param prop_name: Name of the property to index
+        :type prop_name: str
+        :return: The new index
+        :rtype: PropertyIndex
+        """
+        type_data, schema = self.get_node_data(type_name)
+        position, tt = self.find_schema_property(schema, prop_name)
+        if tt.index in self.propertyIndexes.get(type_data.index, {}):
+            raise IndexAlreadyExistsException(
+                "Property %s of type %s is already indexed." %
+                (prop_name, type_name))
+        if Property.PropertyType.is_array(tt.propertyType):
+            raise TypeMismatchException(
+                "Array property %s cannot be indexed." % prop_name)
+        prop_index = PropertyIndex(type_data.index, tt.index, tt.propertyType,
+                                   self.wal is not None)
+        # Index the existing nodes
+        prop_index.rebuild((node_prop.properties[position], node_prop.node.index)
+                           for node_prop in self.get_nodes_of_type(type_data))
+        prop_index.flush()
+        self.propertyIndexes.setdefault(type_data.index, {})[tt.index] = \
+            prop_index
+        return prop_index
+
+    def drop_property_index(self, type_name, prop_name):
+        """
+        Drops the index of the given property of the given node type
+
+        :param type_name: Name of node type
+        :type type_name: str
+        :param prop_name: Name of the indexed property
+        :type prop_name: str
+        :return: Nothing
+        :rtype: None
+        """
+        type_data, schema = self.get_node_data(type_name)
+        position, tt = self.find_schema_property(schema, prop_name)
+        if tt.index not in self.propertyIndexes.get(type_data.index, {}):
+            raise IndexDoesNotExistException(
+                "Property %s of type %s is not indexed." %
+                (prop_name, type_name))
+        self.delete_property_index(type_data.index, tt.index)
+
+    def get_property_index(self, node_type, prop_name):
+        """
+        Gets the index of the given property of the given node type
+
+        :param node_type: Type of node
+        :type node_type: GeneralType
+        :param prop_name: Name of the property
+        :type prop_name: str
+        :return: Index of the property, None if it is not indexed
+        :rtype: PropertyIndex
+        """
+        indexes = self.propertyIndexes.get(node_type.index)
+        if not indexes:
+            return None
+        for tt, tt_name, tt_type in self.type_schema(node_type.index, True):
+            if tt_name == prop_name:
+                return indexes.get(tt.index)
+        return None
+
+    def load_property_indexes(self):
+        """
+        PRIVATE METHOD.
+        Opens the indexes of the properties that have an index file,
+        rebuilding the indexes that were not closed properly. Values are not
+        told apart by record: an index is also rebuilt, from the nodes of its
+        type, if a store its values are read from was changed since the last
+        checkpoint of the write-ahead log.
+
+        :return: Property indexes by index of the node type and index of the
+                 type of the property
+        :rtype: dict[int, dict[int, PropertyIndex]]
+        """
+        property_indexes = {}
+        datafiles_dir = GrapheneStore().datafilesDir
+        for type_data, schema in self.nodeTypeCatalog.values():
+            for position, (tt, _, tt_type) in enumerate(schema):
+                filename = PropertyIndex.FILE_NAME_FORMAT % \
+                    (type_data.index, tt.index)
+                if not os.path.isfile(datafiles_dir + filename):
+                    continue
+                prop_index = PropertyIndex(type_data.index, tt.index, tt_type,
+                                           self.wal is not None)
+                if not prop_index.clean or \
+                   self.changed_since_checkpoint(self.value_stores(type_data)):
+                    prop_index.rebuild(
+                        (node_prop.properties[position], node_prop.node.index)
+                        for node_prop in self.get_nodes_of_type(type_data))
+                property_indexes.setdefault(type_data.index, {})[tt.index] = \
+                    prop_index
+        return property_indexes
+
+    def value_stores(self, type_data):
+        """
+        PRIVATE METHOD.
+        Gets the stores the property values of the nodes of the given node
+        type are read from
+
+        :param type_data: Node type
+        :type type_data: GeneralType
+        :return: Stores of the nodes, of their properties and of the strings
+        :rtype: list[GeneralStore]
+        """
+        stores = [self.node_manager.store,
+                  self.prop_string_manager.storeManager.store]
+        row_manager = self.nodeRowManagers.get(type_data.index)
+        if row_manager is None:
+            stores.append(self.property_manager.store)
+        else:
+            stores.append(row_manager.store)
+        return stores
+
+    def delete_property_index(self, type_index, tt_index):
+        """
+        PRIVATE METHOD.
+        Deletes the index of the given property, if it has one
+
+        :param type_index: Index of the node type
+        :type type_index: int
+        :param tt_index: Index of the type of the property
+        :type tt_index: int
+        :return: Whether the property had an index
+        :rtype: bool
+        """
+        indexes = self.propertyIndexes.get(type_index, {})
+        prop_index = indexes.pop(tt_index, None)
+        if prop_index is None:
+            return False
+        if not indexes:
+            del self.propertyIndexes[type_index]
+        file_path = GrapheneStore().datafilesDir + prop_index.filename
+        # Close the index file before removing it
+        del prop_index
+        os.remove(file_path)
+        return True
+
+    def indexed_properties(self, type_index):
+        """
+        PRIVATE METHOD.
+        Gets the indexes of the properties of the given node type
+
+        :param type_index: Index of the node type
+        :type type_index: int
+        :return: (position in the schema, index) of the indexed properties
+        :rtype: list[tuple]
+        """
+        indexes = self.propertyIndexes.get(type_index)
+        if not indexes:
+            return []
+        return [(position, indexes[tt.index])
+                for position, (tt, _, __)
+                in enumerate(self.type_schema(type_index, True))
+                if tt.index in indexes]
+
+    def type_schema(self, type_index, node_flag):
+        """
+        PRIVATE METHOD.
+        Gets the schema of the node or relationship type with the given index
+        from the catalog
+
+        :param type_index: Index of the type
+        :type type_index: int
+        :param node_flag: Flag specifying whether the type is a node type
+                          (True) or a relationship type (False)
+        :type node_flag: bool
+        :return: Schema of the type, empty if there is no such type
+        :rtype: list[tuple]
+        """
+        for type_data, schema in self.type_catalog(node_flag).itervalues():
+            if type_data.index == type_index:
+                return schema
+        return []
+
+    def find_schema_property(self, schema, prop_name):
+        """
+        PRIVATE METHOD.
+        Finds the property with the given name in the given schema
+
+        :param schema: Schema of a type
+        :type schema: list[tuple]
+        :param prop_name: Name of the property
+        :type prop_name: str
+        :return: Position of the property in the schema, and its type type
+        :rtype: tuple
+        """
+        for position, (tt, tt_name, tt_type) in enumerate(schema):
+            if tt_name == prop_name:
+                return position, tt
+        raise NonexistentPropertyException(
+            "Property with name %s does not exist." % prop_name)
+
+# --- Statistics Methods --- #
+    def analyze(self, type_name=None, node_flag=True):
+        """
+        Collects the statistics of the given type, or of every node and
+        relationship type, and writes them to the statistics file
+
+        :param type_name: Name of the type to analyze, None for every type
+        :type type_name: str
+        :param node_flag: Flag specifying whether the type is a node type
+                          (True) or a relationship type (False), ignored when
+                          every type is analyzed
+        :type node_flag: bool
+        :return: (type name, node flag, statistics) of the analyzed types
+        :rtype: list[tuple]
+        """
+        if type_name is not None:
+            analyzed = [(type_name, node_flag)]
+        else:
+            analyzed = [(name, flag) for flag in (True, False)
+                        for name in sorted(self.type_catalog(flag))]
+        results = [(name, flag, self.analyze_type(name, flag))
+                   for name, flag in analyzed]
+        self.statistics.flush()
+        return results
+
+    def get_statistics(self, item_type, node_flag=True):
+        """
+        Gets the statistics of the given type
+
+        :param item_type: Node or relationship type
+        :type item_type: GeneralType
+        :param node_flag: Flag specifying whether the type is a node type
+                          (True) or a relationship type (False)
+        :type node_flag: bool
+        :return: Statistics of the type, None if it was never analyzed
+        :rtype: dict
+        """
+        return self.statistics.get(node_flag, item_type.index)
+
+    def get_property_statistics(self, item_type, prop_name, node_flag=True):
+        """
+        Gets the statistics of the given property of the given type
+
+        :param item_type: Node or relationship type
+        :type item_type: GeneralType
+        :param prop_name: Name of the property
+        :type prop_name: str
+        :param node_flag: Flag specifying whether the type is a node type
+                          (True) or a relationship type (False)
+        :type node_flag: bool
+        :return: Statistics of the property, None if they were not collected
+        :rtype: dict
+        """
+        stats = self.statistics.get(node_flag, item_type.index)
+        if stats is None:
+            return None
+        for tt, tt_name, tt_type in self.type_schema(item_type.index,
+                                                     node_flag):
+            if tt_name == prop_name:
+                return stats["properties"].get(tt.index)
+        return None
+
+    def analyze_type(self, type_name, node_flag):
+        """
+        PRIVATE METHOD.
+        Collects the statistics of the given type by reading all its items
+
+        :param type_name: Name of the type
+        :type type_name: str
+        :param node_flag: Flag specifying whether the type is a node type
+                          (True) or a relationship type (False)
+        :type node_flag: bool
+        :return: Statistics of the type
+        :rtype: dict
+        """
+        type_data, schema = self.get_type_data(type_name, node_flag)
+        if node_flag:
+            items = self.get_nodes_of_type(type_data)
+        else:
+            items = self.get_relations_of_type(type_data)
+        columns = [[] for _ in schema]
+        # Degrees of the nodes that have relationships of the type, in each
+        # direction
+        out_degrees = {}
+        in_degrees = {}
+        count = 0
+        for item in items:
+            count += 1
+            for column, value in zip(columns, item.properties):
+                column.append(value)
+            if not node_flag:
+                rel = item.rel
+                out_degrees[rel.firstNodeId] = \
+                    out_degrees.get(rel.firstNodeId, 0) + 1
+                in_degrees[rel.secondNodeId] = \
+                    in_degrees.get(rel.secondNodeId, 0) + 1
+        stats = {"count": count, "properties": {}}
+        for (tt, _, tt_type), column in zip(schema, columns):
+            # Arrays are not compared as a whole by queries
+            if not Property.PropertyType.is_array(tt_type):
+                stats["properties"][tt.index] = \
+                    Statistics.summarize_values(column)
+        if not node_flag:
+            stats[Statistics.OUT_DEGREE] = \
+                Statistics.summarize_degrees(out_degrees.values())
+            stats[Statistics.IN_DEGREE] = \
+                Statistics.summarize_degrees(in_degrees.values())
+        self.statistics.set(node_flag, type_data.index, stats)
+        return stats
+
 # --- Node Specific Storage Methods --- #
+    @transaction
     def insert_node(self, node_type, node_properties):
         """
         Inserts a node with the given type and properties
@@ -403,7 +1231,17 @@ class StorageManager:
         :rtype: tuple
         """
         properties = []
-        if len(node_properties) > 0:
+        row_manager = self.nodeRowManagers.get(node_type.index)
+        # Properties stored in a row of the node type
+        if row_manager is not None:
+            self.logger.debug("Node properties: %s" % (node_properties,))
+            for prop_type, prop_val in node_properties:
+                kwargs = self.generate_property_args(0, prop_type, prop_val)
+                properties.append(Property(**kwargs))
+            row = row_manager.create_item(properties=properties)
+            new_node = self.node_manager.create_item(prop_id=row.index,
+                                                     node_type=node_type.index)
+        elif len(node_properties) > 0:
             # Get the needed number of IDs to store the properties
             prop_ids = self.property_manager.get_indexes(len(node_properties))
             self.logger.debug("Node properties: %s" % (node_properties,))
@@ -417,21 +1255,11 @@ class StorageManager:
                     kwargs["prev_prop_id"] = prop_ids[i - 1]
                 if i < len(prop_ids) - 1:
                     kwargs["next_prop_id"] = prop_ids[i + 1]
-
-                # String, so write name
-                if prop_type == Property.PropertyType.string:
-                    kwargs["prop_block_id"] = \
-                        self.prop_string_manager.write_string(prop_val)
-                # Array, so use array manager
-                elif prop_type.value >= Property.PropertyType.intArray.value:
-                    kwargs["prop_block_id"] = \
-                        self.array_manager.write_array(prop_val, prop_type)
-                # Otherwise primitive
-                else:
-                    kwargs["prop_block_id"] = prop_val
                 # Create property and add it to the list of properties
-                stored_prop = self.property_manager.create_item(**kwargs)
+                stored_prop = self.property_manager.new_item(**kwargs)
                 properties.append(stored_prop)
+            # Write the property chain at once
+            self.property_manager.write_items(properties)
             self.logger.debug("Final properties: %s" % (node_properties,))
             # Create node with the ID of first property and index of node type
             new_node = self.node_manager.create_item(prop_id=prop_ids[0],
@@ -441,7 +1269,11 @@ class StorageManager:
             new_node = self.node_manager.create_item(node_type=node_type.index)
         # Update cache with new values and sync with store
         self.nodeprop[new_node.index] = (new_node, properties)
-        self.nodeprop.sync()
+        self.sync_cache(self.nodeprop)
+        self.nodeTypeIndex.add(node_type.index, new_node.index)
+        self.statistics.add_item(True, node_type.index)
+        for position, prop_index in self.indexed_properties(node_type.index):
+            prop_index.add(node_properties[position][1], new_node.index)
         return (new_node, properties)
 
     def get_node_type(self, node):
@@ -464,7 +1296,12 @@ class StorageManager:
         :return: Value
         :rtype: Any
         """
-        if prop.type == Property.PropertyType.string:
+        if prop.inline:
+            # Copy arrays so that the cached property cannot be changed
+            if prop.is_array():
+                return list(prop.propBlockId)
+            return prop.propBlockId
+        elif prop.type == Property.PropertyType.string:
             return self.prop_string_manager.read_string_at_index(prop.propBlockId)
         elif prop.type.value >= Property.PropertyType.intArray.value:
             return self.array_manager.read_array_at_index(prop.propBlockId)
@@ -489,25 +1326,298 @@ class StorageManager:
         properties = map(self.get_property_value, properties)
         return NodeProperty(node, properties, node_type, type_name)
 
-    def get_nodes_of_type(self, node_type):
+    def get_nodes_of_type(self, node_type, indexes=None):
         """
         Get NodeProperty items of the given type. Generator
 
-        :param node_type: Type index of node
-        :type node_type: int
+        :param node_type: Type of node
+        :type node_type: GeneralType
+        :param indexes: Indexes of the nodes to get (e.g. from a property
+                        index), all the nodes of the type if None
+        :type indexes: list[int]
         :return: NodeProperty generator
         :rtype: list[NodeProperty]
         """
-        i = 1
-        while True:
-            node = self.get_node(i)
-            if node == GeneralStore.EOF:
-                break
-            i += 1
-            if node is not None and node.type == node_type:
-                yield node
+        if indexes is None:
+            indexes = self.node_indexes_of_type(node_type)
+        # Only load the nodes whose raw records match the type
+        for index in indexes:
+            # The node may have been changed since its record was read
+            node_prop = self.get_node(index)
+            if node_prop is not None and node_prop != GeneralStore.EOF and \
+                    node_prop.type == node_type:
+                yield node_prop
+
+    def node_indexes_of_type(self, node_type):
+        """
+        Get the indexes of the nodes of the given type from the type index
+
+        :param node_type: Type of node
+        :type node_type: GeneralType
+        :return: Indexes of the nodes of the given type, in order
+        :rtype: list[int]
+        """
+        return self.nodeTypeIndex.get_items(node_type.index)
+
+    def count_nodes_of_type(self, node_type):
+        """
+        Count the nodes of the given type without loading them
+
+        :param node_type: Type of node
+        :type node_type: GeneralType
+        :return: Number of nodes of the given type
+        :rtype: int
+        """
+        return self.nodeTypeIndex.count(node_type.index)
+
+    def rebuild_node_type_index(self):
+        """
+        PRIVATE METHOD.
+        Rebuilds the index of the nodes of each type from the node store, with
+        a vectorized scan if NumPy is available or a chunked scan otherwise
+
+        :return: Nothing
+        :rtype: None
+        """
+        node_store = self.node_manager.store
+        if node_store.USE_NUMPY:
+            type_items = node_store.types_in_use()
+        else:
+            type_items = [(node.nodeType, node.index)
+                          for node in self.node_manager.scan_items()
+                          if node is not None]
+        self.nodeTypeIndex.rebuild(type_items)
+
+    def count_relations_of_type(self, relation_type):
+        """
+        Count the relations of the given type without loading them
+
+        :param relation_type: Type of relation
+        :type relation_type: GeneralType
+        :return: Number of relations of the given type
+        :rtype: int
+        """
+        return self.relTypeIndex.count(relation_type.index)
+
+    def rebuild_relationship_type_index(self):
+        """
+        PRIVATE METHOD.
+        Rebuilds the index of the relationships of each type by scanning the
+        relationship store
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.relTypeIndex.rebuild(
+            [(rel.relType, rel.index)
+             for rel in self.relationship_manager.scan_items()
+             if rel is not None])
+
+    def rebuild_adjacency_index(self):
+        """
+        PRIVATE METHOD.
+        Rebuilds the index of the relationships of each node by scanning the
+        relationship store
+
+        :return: Nothing
+        :rtype: None
+        """
+        self.adjacencyIndex.rebuild(
+            [(rel.index, rel.relType, rel.firstNodeId, rel.secondNodeId)
+             for rel in self.relationship_manager.scan_items()
+             if rel is not None])
+
+    def rebuild_property_string_index(self):
+        """
+        PRIVATE METHOD.
+        Rebuilds the hash index of the property strings, counting the
+        references to each string from the property store and the row stores
+
+        :return: Nothing
+        :rtype: None
+        """
+        references = {}
+        props = itertools.chain(
+            self.property_manager.scan_items(),
+            (prop for row_manager in self.nodeRowManagers.values()
+             for row in row_manager.scan_items() if row is not None
+             for prop in row.properties))
+        for prop in props:
+            if prop is not None and prop.is_string() and not prop.inline:
+                references[prop.propBlockId] = \
+                    references.get(prop.propBlockId, 0) + 1
+        self.prop_string_manager.rebuild_hash_index(references)
+
+    def changed_records(self, store):
+        """
+        PRIVATE METHOD.
+        Gets the records of the given store changed since the last checkpoint
+        of the write-ahead log, as replayed when the log was opened
+
+        :param store: Store of the records
+        :type store: GeneralStore
+        :return: (index, item at the checkpoint, current item) triples in index
+                 order, items being None when deleted, or None if the changes
+                 are not known record by record (the file was replaced)
+        :rtype: list[tuple]
+        """
+        if self.wal is None:
+            return []
+        images = self.wal.before_images(store.filename, store.recordSize)
+        if images is None:
+            return None
+        changes = []
+        # The first record of a store is not used
+        for index in sorted(images.keys()):
+            if index == 0:
+                continue
+            after = store.item_at_index(index)
+            if after == GeneralStore.EOF:
+                after = None
+            changes.append((index, store.item_from_packed_data(
+                index, images[index]), after))
+        return changes
+
+    def changed_since_checkpoint(self, stores):
+        """
+        PRIVATE METHOD.
+        Whether any of the given stores was changed since the last checkpoint
+        of the write-ahead log, as replayed when the log was opened
+
+        :param stores: Stores to check
+        :type stores: list[GeneralStore]
+        :return: True if a store was changed
+        :rtype: bool
+        """
+        if self.wal is None:
+            return False
+        changed_files = self.wal.changed_files()
+        return any(store.filename in changed_files for store in stores)
+
+    def recover_node_type_index(self):
+        """
+        PRIVATE METHOD.
+        Brings the node type index up to date with the node store: only the
+        nodes changed since the last checkpoint of the write-ahead log are
+        updated, unless the index was not closed properly and is rebuilt
+
+        :return: Nothing
+        :rtype: None
+        """
+        changes = self.changed_records(self.node_manager.store)
+        if not self.nodeTypeIndex.clean or changes is None:
+            self.rebuild_node_type_index()
+            return
+        for index, before, after in changes:
+            if before is not None:
+                self.nodeTypeIndex.remove(before.nodeType, index)
+            if after is not None:
+                self.nodeTypeIndex.add(after.nodeType, index)
+
+    def recover_relationship_indexes(self):
+        """
+        PRIVATE METHOD.
+        Brings the relationship type index and the adjacency index up to
+        date with the relationship store, like the node type index (see
+        recover_node_type_index)
+
+        :return: Nothing
+        :rtype: None
+        """
+        changes = self.changed_records(self.relationship_manager.store)
+        if not self.relTypeIndex.clean or changes is None:
+            self.rebuild_relationship_type_index()
+        else:
+            for index, before, after in changes:
+                if before is not None:
+                    self.relTypeIndex.remove(before.relType, index)
+                if after is not None:
+                    self.relTypeIndex.add(after.relType, index)
+        if not self.adjacencyIndex.clean or changes is None:
+            self.rebuild_adjacency_index()
+            return
+        for index, before, after in changes:
+            if before is not None and after is not None and \
+               (before.relType, before.firstNodeId, before.secondNodeId) == \
+               (after.relType, after.firstNodeId, after.secondNodeId):
+                # Only the links of the relationship changed
+                continue
+            if before is not None:
+                self.adjacencyIndex.remove(index, before.relType,
+                                           before.firstNodeId,
+                                           before.secondNodeId)
+            if after is not None:
+                self.adjacencyIndex.add(index, after.relType,
+                                        after.firstNodeId, after.secondNodeId)
+
+    def recover_string_index(self, manager):
+        """
+        PRIVATE METHOD.
+        Brings the hash index of the given string manager, if any, up to date
+        with its store: only the strings changed since the last checkpoint of
+        the write-ahead log are updated (the manager rebuilds an index that
+        was not closed properly)
+
+        :param manager: String manager
+        :type manager: StringManager
+        :return: Nothing
+        :rtype: None
+        """
+        if manager.hashIndex is None:
+            return
+        changes = self.changed_records(manager.storeManager.store)
+        if changes is None:
+            manager.rebuild_hash_index()
+        else:
+            manager.repair_hash_index(index for index, _, _ in changes)
+
+    def recover_property_string_index(self):
+        """
+        PRIVATE METHOD.
+        Brings the hash index of the property strings up to date (see
+        recover_string_index). When strings are shared, the references to
+        them are counted again from the property store and the row stores if
+        the index was not closed properly, and otherwise only the references
+        of the properties changed since the last checkpoint are counted.
+
+        :return: Nothing
+        :rtype: None
+        """
+        manager = self.prop_string_manager
+        if not self.DEDUPLICATE_STRINGS:
+            self.recover_string_index(manager)
+            return
+        block_changes = self.changed_records(manager.storeManager.store)
+        # Changed property records, and changed rows
+        prop_changes = [(False, self.changed_records(
+            self.property_manager.store))]
+        for row_manager in self.nodeRowManagers.values():
+            prop_changes.append((True,
+                                 self.changed_records(row_manager.store)))
+        if not manager.hashIndex.clean or block_changes is None or \
+           any(changes is None for _, changes in prop_changes):
+            self.rebuild_property_string_index()
+            return
+        manager.repair_hash_index(index for index, _, _ in block_changes)
+        references = {}
+        for rows, changes in prop_changes:
+            for index, before, after in changes:
+                for item, change in ((before, -1), (after, 1)):
+                    if item is None:
+                        continue
+                    for prop in (item.properties if rows else (item,)):
+                        if prop is not None and prop.is_string() and \
+                           not prop.inline:
+                            references[prop.propBlockId] = \
+                                references.get(prop.propBlockId, 0) + change
+        for index, change in references.iteritems():
+            if change > 0:
+                manager.hashIndex.add_reference(index, change)
+            elif change < 0:
+                manager.hashIndex.remove_reference(index, -change)
 
 # --- Relationship Specific Storage Methods --- #
+    @transaction
     def insert_relation(self, rel_type, rel_properties, src_node, dst_node):
         """
         Creates a directed relationship (rel_type) from src_node to dst_node.
@@ -524,29 +1634,16 @@ class StorageManager:
             prop_ids = self.property_manager.get_indexes(len(rel_properties))
             for i, idx in enumerate(prop_ids):
                 prop_type, prop_val = rel_properties[i]
-                prop_kwargs = {
-                    "index": idx,
-                    "prop_type": prop_type
-                }
+                prop_kwargs = self.generate_property_args(idx, prop_type,
+                                                          prop_val)
                 if i > 0:
                     prop_kwargs["prev_prop_id"] = prop_ids[i - 1]
                 if i < len(prop_ids) - 1:
                     prop_kwargs["next_prop_id"] = prop_ids[i + 1]
-
-                if prop_type == Property.PropertyType.string:
-                    # set_trace()
-                    # TODO: Why are new relation property names not getting
-                    # written?
-                    prop_kwargs["prop_block_id"] = \
-                        self.prop_string_manager.write_string(prop_val)
-                # array, so use array manager
-                elif prop_type.value >= Property.PropertyType.intArray.value:
-                    prop_kwargs["prop_block_id"] = \
-                        self.array_manager.write_array(prop_val, prop_type)
-                else:
-                    prop_kwargs["prop_block_id"] = prop_val
-                stored_prop = self.property_manager.create_item(**prop_kwargs)
+                stored_prop = self.property_manager.new_item(**prop_kwargs)
                 properties.append(stored_prop)
+            # Write the property chain at once
+            self.property_manager.write_items(properties)
             self.logger.debug("Final properties: %s" % (rel_properties,))
 
         # TODO: Relationship's first prop_id is 0 if it has no properties?
@@ -572,7 +1669,8 @@ class StorageManager:
             # shift them. That means we update the original first relationship
             # to say that this new one is the previous one for this given node,
             # and add a next ID to this one of the original relationship.
-            orig_rel = self.relationship_manager.get_item_at_index(src_node.relId)
+            # It is read through the cache, which may hold unsynced changes
+            orig_rel, orig_props = self.relprop[src_node.relId]
             if src_idx == orig_rel.firstNodeId:
                 # THIS relationship's source is THE ORIGINAL'S source
                 orig_rel.firstPrevRelId = rel_idx
@@ -582,12 +1680,10 @@ class StorageManager:
                 orig_rel.secondPrevRelId = rel_idx
                 rel_kwargs["first_next_rel_id"] = orig_rel.index
 
-            # Note that we have to pull the properties out... this is so we
-            # don't mess up the cache values
-            self.relprop[src_node.relId] = (orig_rel, self.relprop[src_node.relId][1])
+            self.relprop[src_node.relId] = (orig_rel, orig_props)
         if dst_node.relId > 0:
             # See above. Same deal with destinations
-            orig_rel = self.relationship_manager.get_item_at_index(dst_node.relId)
+            orig_rel, orig_props = self.relprop[dst_node.relId]
             if dst_idx == orig_rel.firstNodeId:
                 # THIS relationship's destination is THE ORIGINAL'S source
                 orig_rel.firstPrevRelId = rel_idx
@@ -597,7 +1693,7 @@ class StorageManager:
                 orig_rel.secondPrevRelId = rel_idx
                 rel_kwargs["second_next_rel_id"] = orig_rel.index
 
-            self.relprop[dst_node.relId] = (orig_rel, self.relprop[dst_node.relId][1])
+            self.relprop[dst_node.relId] = (orig_rel, orig_props)
         # Set src_node first relation ID to this
         # Note that we have to pull the properties out... this is so we don't
         # mess up the cache values
@@ -607,12 +1703,23 @@ class StorageManager:
         dst_node.relId = rel_idx
         self.nodeprop[dst_idx] = (dst_node, self.nodeprop[dst_idx][1])
 
-        self.nodeprop.sync()
+        self.sync_cache(self.nodeprop)
 
         new_rel = self.relationship_manager.create_item(**rel_kwargs)
 
         self.relprop[new_rel.index] = (new_rel, properties)
-        self.relprop.sync()
+        self.sync_cache(self.relprop)
+        self.relTypeIndex.add(rel_type.index, new_rel.index)
+        self.adjacencyIndex.add(new_rel.index, rel_type.index, src_idx, dst_idx)
+        self.statistics.add_item(False, rel_type.index)
+        self.statistics.add_degree(
+            rel_type.index, Statistics.OUT_DEGREE,
+            self.adjacencyIndex.degree(src_idx, rel_type.index,
+                                       AdjacencyIndex.OUTGOING))
+        self.statistics.add_degree(
+            rel_type.index, Statistics.IN_DEGREE,
+            self.adjacencyIndex.degree(dst_idx, rel_type.index,
+                                       AdjacencyIndex.INCOMING))
         self.logger.debug("New Relationship: %s" % new_rel)
         return new_rel
 
@@ -628,15 +1735,44 @@ class StorageManager:
         return RelationProperty(rel, properties, rel_type, type_name)
 
     def get_relations_of_type(self, relation_type):
-        i = 1
-        while True:
-            relation = self.get_relation(i)
-            if relation == GeneralStore.EOF:
-                break
-            i += 1
-            if relation is not None and relation.type == relation_type:
+        """
+        Get RelationProperty items of the given type. Generator
+
+        :param relation_type: Type of relation
+        :type relation_type: GeneralType
+        :return: RelationProperty generator
+        :rtype: list[RelationProperty]
+        """
+        # Only load the relations listed in the type index
+        for index in self.relTypeIndex.get_items(relation_type.index):
+            # The relation may have been deleted since
+            relation = self.get_relation(index)
+            if relation is not None and relation != GeneralStore.EOF and \
+                    relation.type == relation_type:
                 yield relation
 
+    def get_adjacent_relations(self, node_index, relation_type=None,
+                               direction=None):
+        """
+        Gets the indexes of the relations of the given node, and of the nodes
+        at their other end, from the adjacency index
+
+        :param node_index: Index of the node
+        :type node_index: int
+        :param relation_type: Type of relation, None for all types
+        :type relation_type: GeneralType
+        :param direction: AdjacencyIndex.OUTGOING for the relations the node
+                          is the source of, AdjacencyIndex.INCOMING for those
+                          it is the destination of, None for both
+        :type direction: int
+        :return: (relation index, other node index) pairs
+        :rtype: list[tuple]
+        """
+        if relation_type is not None:
+            relation_type = relation_type.index
+        return self.adjacencyIndex.get_relations(node_index, relation_type,
+                                                 direction)
+
 # --- Deletion Methods --- #
     def update_relation_links(self, node_id, prev_rel_id, next_rel_id):
         """
@@ -658,7 +1794,7 @@ class StorageManager:
             cur_node, cur_node_props = self.nodeprop[node_id]
             cur_node.relId = next_rel_id
             self.nodeprop[cur_node.index] = (cur_node, cur_node_props)
-            self.nodeprop.sync()
+            self.sync_cache(self.nodeprop)
             if next_rel_id != 0:
                 # set next relation's previous relation to 0 (since it is now
                 # the first relation of that node)
@@ -668,7 +1804,7 @@ class StorageManager:
                 else:
                     next_rel.secondPrevRelId = 0
                 self.relprop[next_rel.index] = (next_rel, next_props)
-                self.relprop.sync()
+                self.sync_cache(self.relprop)
         else:
             # Set prev. relation's next rel to this relation's next rel.
             prev_rel, prev_props = self.relprop[prev_rel_id]
@@ -686,8 +1822,9 @@ class StorageManager:
                 else:
                     next_rel.secondPrevRelId = prev_rel_id
                 self.relprop[next_rel.index] = (next_rel, next_props)
-            self.relprop.sync()
+            self.sync_cache(self.relprop)
 
+    @transaction
     def delete_relation(self, rel):
         """
         Deletes a relation and anything referencing it. Also makes sure to
@@ -710,12 +1847,42 @@ class StorageManager:
 
         # Delete relation itself
         self.relationship_manager.delete_item(rel)
+        self.relTypeIndex.remove(rel.relType, rel.index)
+        self.adjacencyIndex.remove(rel.index, rel.relType, rel.firstNodeId,
+                                   rel.secondNodeId)
+        self.statistics.remove_item(False, rel.relType)
+        self.statistics.remove_degree(
+            rel.relType, Statistics.OUT_DEGREE,
+            self.adjacencyIndex.degree(rel.firstNodeId, rel.relType,
+                                       AdjacencyIndex.OUTGOING))
+        self.statistics.remove_degree(
+            rel.relType, Statistics.IN_DEGREE,
+            self.adjacencyIndex.degree(rel.secondNodeId, rel.relType,
+                                       AdjacencyIndex.INCOMING))
 
     def delete_property(self, prop):
         """
         Deletes a property and, if necessary, the string or array it references.
         """
-        if prop.type == Property.PropertyType.string:
+        self.delete_property_value(prop)
+
+        # Delete property itself
+        self.property_manager.delete_item(prop)
+
+    def delete_property_value(self, prop):
+        """
+        PRIVATE METHOD.
+        Deletes the string or array referenced by a property, if any
+
+        :param prop: Property to delete the value of
+        :type prop: Property
+        :return: Nothing
+        :rtype: None
+        """
+        if prop.inline:
+            # The value is stored in the property itself
+            pass
+        elif prop.type == Property.PropertyType.string:
             # The property has a string type, so we have to make sure we delete
             # that string
             self.prop_string_manager.delete_string_at_index(prop.propBlockId)
@@ -723,9 +1890,7 @@ class StorageManager:
             # Property has an array type, so delete the array
             self.array_manager.delete_array_at_index(prop.propBlockId)
 
-        # Delete property itself
-        self.property_manager.delete_item(prop)
-
+    @transaction
     def delete_node(self, node):
         """
         Deletes a node and everything that contains it as a reference.
@@ -734,41 +1899,57 @@ class StorageManager:
         # Delete all relations that are attached to this node (since they can't
         # be attached to nothing)
         cur_rel_id = node.relId
-        isOnlyRel = False
         while cur_rel_id != 0:
-            rel = self.relationship_manager.get_item_at_index(cur_rel_id)
+            # Read through the cache, which may hold unsynced changes
+            rel = self.relprop[cur_rel_id][0]
             # Determine which list to pass through
             if rel.firstNodeId == node.index:
                 cur_rel_id = rel.firstNextRelId
-                isOnlyRel = rel.firstPrevRelId == 0
             else:
                 cur_rel_id = rel.secondNextRelId
-                isOnlyRel = rel.secondPrevRelId == 0
             # Delete the cache instance of the relation (will trigger proper
             # deletion of relation through storage manager too)
             del self.relprop[rel.index]
-            self.relprop.sync()
+            self.sync_cache(self.relprop)
+
+        # Get all properties referred to by this node
+        row_manager = self.nodeRowManagers.get(node.nodeType)
+        if row_manager is not None:
+            row = row_manager.get_item_at_index(node.propId)
+            properties = row.properties
+        else:
+            properties = []
+            cur_prop_id = node.propId
+            while cur_prop_id != 0:
+                prop = self.property_manager.get_item_at_index(cur_prop_id)
+                properties.append(prop)
+                cur_prop_id = prop.nextPropId
+
+        # Remove the node from the property indexes, before the values are
+        # deleted
+        for position, prop_index in self.indexed_properties(node.nodeType):
+            prop_index.remove(self.get_property_value(properties[position]),
+                              node.index)
 
         # Delete all properties referred to by this node
-        cur_prop_id = node.propId
-        while cur_prop_id != 0:
-            prop = self.property_manager.get_item_at_index(cur_prop_id)
-            cur_prop_id = prop.nextPropId
-            self.delete_property(prop)
+        if row_manager is not None:
+            for prop in properties:
+                self.delete_property_value(prop)
+            row_manager.delete_item(row)
+        else:
+            for prop in properties:
+                self.delete_property(prop)
 
         # Delete node itself
         self.node_manager.delete_item(node)
+        self.nodeTypeIndex.remove(node.nodeType, node.index)
+        self.statistics.remove_item(True, node.nodeType)
 
         # Because delete_relation is unaware of whether it's being deleted
-        # because a node was deleted, if this node has only ONE relation
-        # attached to it, it will be modified during the update_relation_links
-        # process. However, the cache thinks the node has been deleted before
-        # the write-through process is done, so the node never actually gets
-        # removed from the cache
-        #
-        # TODO: Handle this more gracefully
-        if isOnlyRel:
-            del self.nodeprop[node.index]
+        # because a node was deleted, the node is put back in the cache when
+        # the relation links are updated. Drop it without writing it back,
+        # otherwise it would be recreated when the cache is synced
+        self.nodeprop.discard(node.index)
 
 # --- Update Interface Methods --- #
     def update_nodes(self, nodeprops, updates):
@@ -798,6 +1979,7 @@ class StorageManager:
         self.update_properties(relprops, updates, False)
 
 # --- Update Methods --- #
+    @transaction
     def update_properties(self, itemprops, updates, node_flag):
         """
         Updates the given nodes or relationship properties
@@ -819,11 +2001,28 @@ class StorageManager:
         # Sync cache before updates
         cache.sync()
 
+        # Indexed properties of each node type, by index of the node type
+        indexed = {}
+
         for itemprop in itemprops:
             if node_flag:
-                _, properties = cache[itemprop.node.index]
+                item, properties = cache[itemprop.node.index]
+                row_manager = self.nodeRowManagers.get(item.nodeType)
+                if item.nodeType not in indexed:
+                    indexed[item.nodeType] = \
+                        self.indexed_properties(item.nodeType)
+                # Move the node to the entries of its new values
+                for position, prop_index in indexed[item.nodeType]:
+                    if position in updates:
+                        prop_index.remove(
+                            self.get_property_value(properties[position]),
+                            item.index)
+                        prop_index.add(updates[position], item.index)
             else:
-                _, properties = cache[itemprop.rel.index]
+                item, properties = cache[itemprop.rel.index]
+                row_manager = None
+            # Properties whose records have to be written
+            changed = []
             # For every update to the properties of the current item
             for index, new_val in updates.iteritems():
                 # Property to update
@@ -831,10 +2030,18 @@ class StorageManager:
                 # Old value (index of name or array, won't be changed)
                 old_val = prop.propBlockId
                 # -- Update property value -- #
+                # Stored or to be stored inline, so replace the value
+                if prop.inline or self.stores_inline(prop.type, new_val):
+                    self.replace_property_value(prop, prop.type, new_val)
+                    changed.append(prop)
                 # String, so update name
-                if prop.is_string():
-                    self.prop_string_manager.\
+                elif prop.is_string():
+                    new_index = self.prop_string_manager.\
                         update_string_at_index(old_val, new_val)
+                    # A shared string is written elsewhere
+                    if new_index != old_val:
+                        prop.propBlockId = new_index
+                        changed.append(prop)
                 # Array, so use array manager
                 elif prop.is_array():
                     self.array_manager.\
@@ -842,11 +2049,20 @@ class StorageManager:
                 # Otherwise primitive
                 else:
                     prop.propBlockId = new_val
-                    self.property_manager.write_item(prop)
+                    changed.append(prop)
+            # Properties stored in a row are written with the whole row
+            if row_manager is not None:
+                if changed:
+                    row_manager.write_item(Row(item.propId,
+                                               properties=properties))
+            else:
+                self.property_manager.write_items(changed)
         # Done with updates, clear cache
         cache.clear()
 
 # --- Alter Methods --- #
+    @transaction
+    @schema_change
     def drop_property(self, type_name, prop_name, node_flag):
         type_data, type_schema = self.get_type_data(type_name, node_flag)
 
@@ -858,6 +2074,7 @@ class StorageManager:
             tt_manager = self.nodeTypeTypeManager
             tt_name_manager = self.nodeTypeTypeNameManager
             get_items = self.get_nodes_of_type
+            row_manager = self.nodeRowManagers.get(type_data.index)
         # Deleting a relationship property
         else:
             cache = self.relprop
@@ -865,6 +2082,10 @@ class StorageManager:
             tt_manager = self.relTypeTypeManager
             tt_name_manager = self.relTypeTypeNameManager
             get_items = self.get_relations_of_type
+            row_manager = None
+        # The properties of the items are changed in the stores directly, so
+        # the cache must not write older versions back meanwhile
+        cache.drain()
 
         # Here we iterate over the schema of the node/relation to remove the
         # corresponding property
@@ -886,6 +2107,10 @@ class StorageManager:
                     # the first type
                     type_data.firstType = next_tt_id
                     type_manager.write_item(type_data)
+                if node_flag:
+                    self.delete_property_index(type_data.index, tt.index)
+                self.statistics.drop_property(node_flag, type_data.index,
+                                              tt.index)
                 self.delete_type_type(tt, node_flag)
                 break
 
@@ -896,6 +2121,20 @@ class StorageManager:
             # If we never broke, that means we never found the desired property.
             raise NonexistentPropertyException("Property with name %s does not exist." % prop_name)
 
+        # Properties stored in rows, so remove the column of the property
+        if row_manager is not None:
+            removed = []
+
+            def remove_column(props):
+                removed.append(props.pop(tt_index))
+                return props
+            self.resize_node_rows(type_data, len(type_schema) - 1,
+                                  remove_column)
+            # The values are only deleted once no row references them
+            for prop in removed:
+                self.delete_property_value(prop)
+            return
+
         for item_prop in get_items(type_data):
             if node_flag:
                 item = item_prop.node
@@ -947,6 +2186,8 @@ class StorageManager:
         # Sync cache to disk
         cache.sync()
 
+    @transaction
+    @schema_change
     def add_property(self, type_name, tt_name, tt_type, node_flag):
         type_data, type_schema = self.get_type_data(type_name, node_flag)
 
@@ -958,6 +2199,7 @@ class StorageManager:
             tt_manager = self.nodeTypeTypeManager
             tt_name_manager = self.nodeTypeTypeNameManager
             get_items = self.get_nodes_of_type
+            row_manager = self.nodeRowManagers.get(type_data.index)
         # Deleting a relationship property
         else:
             cache = self.relprop
@@ -965,6 +2207,10 @@ class StorageManager:
             tt_manager = self.relTypeTypeManager
             tt_name_manager = self.relTypeTypeNameManager
             get_items = self.get_relations_of_type
+            row_manager = None
+        # The properties of the items are changed in the stores directly, so
+        # the cache must not write older versions back meanwhile
+        cache.drain()
 
         tt_id = tt_manager.get_indexes()[0]
         if tt_type.find("[]") > -1:
@@ -980,8 +2226,22 @@ class StorageManager:
             last_tt, _, __ = type_schema[-1]
             last_tt.nextType = new_tt.index
             tt_manager.write_item(last_tt)
+        else:
+            # First property of the type
+            type_data.firstType = new_tt.index
+            type_manager.write_item(type_data)
 
         default_val = getattr(Property.DefaultValue, tt_type)
+        # Properties stored in rows, so add a column for the property
+        if row_manager is not None:
+            def add_column(props):
+                kwargs = self.generate_property_args(
+                    0, Property.PropertyType[tt_type], default_val)
+                return props + [Property(**kwargs)]
+            self.resize_node_rows(type_data, len(type_schema) + 1,
+                                  add_column)
+            return new_tt
+
         for item_prop in get_items(type_data):
             if node_flag:
                 item = item_prop.node
@@ -1019,6 +2279,8 @@ class StorageManager:
 
         return new_tt
 
+    @transaction
+    @schema_change
     def change_property(self, type_name, tt_name, new_tt_type, node_flag):
         type_data, type_schema = self.get_type_data(type_name, node_flag)
 
@@ -1030,6 +2292,7 @@ class StorageManager:
             tt_manager = self.nodeTypeTypeManager
             tt_name_manager = self.nodeTypeTypeNameManager
             get_items = self.get_nodes_of_type
+            row_manager = self.nodeRowManagers.get(type_data.index)
         # Changing a relationship property
         else:
             cache = self.relprop
@@ -1037,6 +2300,10 @@ class StorageManager:
             tt_manager = self.relTypeTypeManager
             tt_name_manager = self.relTypeTypeNameManager
             get_items = self.get_relations_of_type
+            row_manager = None
+        # The properties of the items are changed in the stores directly, so
+        # the cache must not write older versions back meanwhile
+        cache.drain()
 
         for i, (tt, name, tt_type) in enumerate(type_schema):
             if name == tt_name:
@@ -1055,49 +2322,51 @@ class StorageManager:
 
         tt_manager.write_item(prop)
 
-        for item_prop in get_items(type_data):
-            if node_flag:
-                item = item_prop.node
-            else:
-                item = item_prop.rel
-            props = []
-            old_value = item_prop.properties[prop_index]
-            new_value = self.convert_value_between_types(old_value, old_type, new_type)
-
-            cur_prop_id = item.propId
-            i = 0
-            while cur_prop_id != 0:
-                cur_prop = self.property_manager.get_item_at_index(cur_prop_id)
-                if i == prop_index:
-                    cur_prop.type = new_type
-                    if Property.PropertyType.is_array(new_type):
-                        if Property.PropertyType.is_array(old_type):
-                            # Already had an array, so update
-                            array_idx = cur_prop.propBlockId
-                            array_block = self.array_manager.storeManager.get_item_at_index(array_idx)
-                            array_block.type = new_type
-                            self.array_manager.storeManager.write_item(array_block)
-                            self.array_manager.update_array_at_index(cur_prop.propBlockId, new_value)
-                        else:
-                            # Didn't have an array before, so have to write an
-                            # array and put it there
-                            cur_prop.propBlockId = self.array_manager.write_array(new_value, new_type)
-                    elif Property.PropertyType.is_string(new_type):
-                        if Property.PropertyType.is_string(old_type):
-                            # Already had a string, so update
-                            self.prop_string_manager.update_string_at_index(cur_prop.propBlockId, new_value)
-                        else:
-                            cur_prop.propBlockId = self.prop_string_manager.write_string(new_value)
-                    else:
-                        cur_prop.propBlockId = new_value
-                props.append(cur_prop)
-                cur_prop_id = cur_prop.nextPropId
-                i += 1
-
-            cache[item.index] = (item, props)
-        # Sync cache to disk
-        cache.sync()
+        # The values change type, so the index is built again afterwards
+        indexed = node_flag and \
+            self.delete_property_index(type_data.index, prop.index)
+        self.statistics.drop_property(node_flag, type_data.index, prop.index)
 
+        try:
+            for item_prop in get_items(type_data):
+                if node_flag:
+                    item = item_prop.node
+                else:
+                    item = item_prop.rel
+                props = []
+                old_value = item_prop.properties[prop_index]
+                new_value = self.convert_value_between_types(old_value, old_type, new_type)
+
+                # Properties stored in a row, so change the value in the row
+                if row_manager is not None:
+                    props = row_manager.get_item_at_index(item.propId).properties
+                    self.change_property_value(props[prop_index], old_type,
+                                               new_type, new_value)
+                else:
+                    cur_prop_id = item.propId
+                    i = 0
+                    while cur_prop_id != 0:
+                        cur_prop = \
+                            self.property_manager.get_item_at_index(cur_prop_id)
+                        if i == prop_index:
+                            self.change_property_value(cur_prop, old_type,
+                                                       new_type, new_value)
+                        props.append(cur_prop)
+                        cur_prop_id = cur_prop.nextPropId
+                        i += 1
+
+                cache[item.index] = (item, props)
+            # Sync cache to disk
+            cache.sync()
+        finally:
+            # The index is built again from the values as they are, even if
+            # the change failed part way, so that the type is not left without
+            # it (arrays cannot be indexed)
+            if indexed and not Property.PropertyType.is_array(new_type):
+                self.create_property_index(type_name, tt_name)
+
+    @transaction
+    @schema_change
     def rename_property(self, type_name, tt_name, new_tt_name, node_flag):
         type_data, type_schema = self.get_type_data(type_name, node_flag)
 
@@ -1142,8 +2411,16 @@ class StorageManager:
             "prop_type": prop_type
         }
 
+        # Short string or small array, so store it in the property
+        if self.stores_inline(prop_type, prop_val):
+            # Same value types as when read back from the store
+            if prop_type == Property.PropertyType.string:
+                kwargs["prop_block_id"] = unicode(prop_val)
+            else:
+                kwargs["prop_block_id"] = list(prop_val)
+            kwargs["inline"] = True
         # String, so write name
-        if prop_type == Property.PropertyType.string:
+        elif prop_type == Property.PropertyType.string:
             kwargs["prop_block_id"] = \
                 self.prop_string_manager.write_string(prop_val)
         # Array, so use array manager
@@ -1156,6 +2433,89 @@ class StorageManager:
 
         return kwargs
 
+    def stores_inline(self, prop_type, prop_val):
+        """
+        PRIVATE METHOD.
+        Whether the given value is stored in the property record itself
+
+        :param prop_type: Type of the property
+        :type prop_type: PropertyType
+        :param prop_val: Value of the property
+        :return: True if the value is stored inline, False otherwise
+        :rtype: bool
+        """
+        return self.INLINE_PROPERTY_VALUES and \
+            (prop_type == Property.PropertyType.string or
+             Property.PropertyType.is_array(prop_type)) and \
+            PropertyStore.fits_inline(prop_type, prop_val)
+
+    def replace_property_value(self, prop, prop_type, prop_val):
+        """
+        PRIVATE METHOD.
+        Replaces the value of the given property with a value of the given
+        type, deleting the string or array that held its old value. The
+        property is not written.
+
+        :param prop: Property to replace the value of
+        :type prop: Property
+        :param prop_type: New type of the property
+        :type prop_type: PropertyType
+        :param prop_val: New value of the property
+        :return: Nothing
+        :rtype: None
+        """
+        if not prop.inline:
+            if prop.is_string():
+                self.prop_string_manager.delete_string_at_index(
+                    prop.propBlockId)
+            elif prop.is_array():
+                self.array_manager.delete_array_at_index(prop.propBlockId)
+        kwargs = self.generate_property_args(prop.index, prop_type, prop_val)
+        prop.type = prop_type
+        prop.propBlockId = kwargs["prop_block_id"]
+        prop.inline = kwargs.get("inline", False)
+
+    def change_property_value(self, prop, old_type, new_type, new_value):
+        """
+        PRIVATE METHOD.
+        Changes the type of the given property, storing its converted value.
+        The property is not written.
+
+        :param prop: Property to change
+        :type prop: Property
+        :param old_type: Type of the property before the change
+        :type old_type: PropertyType
+        :param new_type: Type of the property after the change
+        :type new_type: PropertyType
+        :param new_value: Value of the property converted to the new type
+        :return: Nothing
+        :rtype: None
+        """
+        if prop.inline or self.stores_inline(new_type, new_value):
+            self.replace_property_value(prop, new_type, new_value)
+            return
+        prop.type = new_type
+        if Property.PropertyType.is_array(new_type):
+            if Property.PropertyType.is_array(old_type):
+                # Already had an array, so update
+                array_idx = prop.propBlockId
+                array_block = self.array_manager.storeManager.get_item_at_index(array_idx)
+                array_block.type = new_type
+                self.array_manager.storeManager.write_item(array_block)
+                self.array_manager.update_array_at_index(prop.propBlockId, new_value)
+            else:
+                # Didn't have an array before, so have to write an
+                # array and put it there
+                prop.propBlockId = self.array_manager.write_array(new_value, new_type)
+        elif Property.PropertyType.is_string(new_type):
+            if Property.PropertyType.is_string(old_type):
+                # Already had a string, so update
+                prop.propBlockId = self.prop_string_manager.update_string_at_index(prop.propBlockId, new_value)
+            else:
+                prop.propBlockId = self.prop_string_manager.write_string(new_value)
+        else:
+            prop.propBlockId = new_value
+
     def is_convertible(self, from_type, to_type):
         # Obviously, a type can be converted to itself.
         if from_type == to_type:
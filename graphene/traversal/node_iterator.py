@@ -10,6 +10,8 @@ class NodeIterator:
         self.node_type, self.type_schema = storage_manager.get_node_data(match_node.type)
         # copy to ensure tuple in argument default is not modified
         self.queries = queries
+        # How the nodes are read (see AccessPath), all of them if None
+        self.access_path = None
 
     def __repr__(self):
         if self.alias is not None:
@@ -68,6 +70,20 @@ class NodeIterator:
             result[name] = (props[i], tt_type)
         return result
 
+    @property
+    def width(self):
+        """
+        Number of properties of the nodes of the iteration
+        """
+        return len(self.type_schema)
+
+    def result_to_dict(self, props):
+        """
+        Converts the properties of a result of the iteration into a dict
+        corresponding to the key names
+        """
+        return self.prop_to_dict(props)
+
     def node_matches(self, properties):
         """
         Tests whether the provided properties (which came from a node) are
@@ -82,6 +98,10 @@ class NodeIterator:
             return self.queries.test(self.prop_to_dict(properties))
 
     def __iter__(self):
-        for nodeprop in self.sm.get_nodes_of_type(self.node_type):
+        # The queries are still tested on the nodes found through an index
+        indexes = None
+        if self.access_path is not None:
+            indexes = self.access_path.node_indexes()
+        for nodeprop in self.sm.get_nodes_of_type(self.node_type, indexes):
             if self.node_matches(nodeprop.properties):
                 yield nodeprop
@@ -1,9 +1,32 @@
+import cPickle
+import tempfile
+from enum import Enum
+
 from graphene.traversal.query import Query
 from graphene.traversal.node_iterator import NodeIterator
 from graphene.storage import *
+from graphene.storage.base.adjacency_index import AdjacencyIndex
 from graphene.expressions import *
 
 class RelationIterator:
+    class JoinType(Enum):
+        # The relations of the type are scanned, and their left nodes are
+        # tested against the node iterator on the left
+        SCAN = 1
+        # The relations are followed from each result of the left side
+        # through the adjacency index
+        EXPAND = 2
+        # The results of the left side are hashed by the node the relation is
+        # followed from, then the relations of the type are scanned and
+        # probed against them
+        HASH_JOIN = 3
+
+    # Maximum number of results of the left side a hash join keeps in memory,
+    # past which they are partitioned to temporary files
+    HASH_JOIN_MAX_ROWS = 100000
+    # Number of partitions of a hash join that does not fit in memory
+    HASH_JOIN_PARTITIONS = 16
+
     def __init__(self, storage_manager, match_rel, left_child, right_child):
         self.sm = storage_manager
         self.alias = match_rel.name
@@ -18,6 +41,14 @@ class RelationIterator:
         self.rel_queries = None
         self.left = left_child
         self.right = right_child
+        # Whether the relation is followed backward, from the first node of
+        # the results of the left side to the right node (which is then the
+        # source of the relation) instead of from their last node
+        self.reverse = False
+        # How the relations are matched with the results of the left side
+        # (see JoinType), as chosen by the QueryPlanner. If None, they are
+        # scanned unless the left side is chained or uses an index.
+        self.join_type = None
 
     def prop_to_dict(self, props):
         """
@@ -43,6 +74,8 @@ class RelationIterator:
             key = "%s:%s" % (self.alias, self.type_name)
         else:
             key = self.type_name
+        if self.reverse:
+            key = "<-%s" % key
         if self.rel_queries is not None:
             s = "RelationIterator[%s, %s: %s, %s]" % (self.left, key, self.rel_queries, self.right)
         else:
@@ -51,6 +84,42 @@ class RelationIterator:
             s += "[%s]" % self.queries
         return s
 
+    @property
+    def width(self):
+        """
+        Number of properties of the results of the iteration
+        """
+        return self.left.width + len(self.type_schema) + self.right.width
+
+    def result_to_dict(self, props):
+        """
+        Converts the properties of a result of the iteration, which are in the
+        order of the chain, into a dict corresponding to the key names
+        """
+        parts = [self.left, self, self.right]
+        if self.reverse:
+            parts.reverse()
+        result = {}
+        start = 0
+        for part in parts:
+            if part is self:
+                end = start + len(self.type_schema)
+                result.update(self.prop_to_dict(props[start:end]))
+            else:
+                end = start + part.width
+                result.update(part.result_to_dict(props[start:end]))
+            start = end
+        return result
+
+    def combine(self, left_props, rel_props, right_props):
+        """
+        Properties of a result, in the order of the chain, from those of a
+        result of the left side, of the relation and of the right node
+        """
+        if self.reverse:
+            return right_props + rel_props + left_props
+        return left_props + rel_props + right_props
+
     def get_rel_schema(self):
         """
         Generate the schema for the relation
@@ -106,6 +175,35 @@ class RelationIterator:
 
 
     def __iter__(self):
+        """
+        Iterates over the matches of the chain, as (properties, first node,
+        last node) triples, the properties being in the order of the chain
+        and the nodes being those at its ends
+        """
+        join_type = self.join_type
+        if join_type is None:
+            # Chained from something else, or from left nodes found through an
+            # index, so follow the relations of the nodes of the left side
+            if not isinstance(self.left, NodeIterator) or \
+               (self.left.access_path is not None and
+                    self.left.access_path.uses_index()):
+                join_type = RelationIterator.JoinType.EXPAND
+            else:
+                join_type = RelationIterator.JoinType.SCAN
+        if join_type == RelationIterator.JoinType.EXPAND:
+            results = self.expand_left()
+        elif join_type == RelationIterator.JoinType.HASH_JOIN:
+            results = self.hash_join()
+        else:
+            results = self.scan_relations()
+        for result in results:
+            yield result
+
+    def scan_relations(self):
+        """
+        Matches the relations of the type, scanned once, whose left node is
+        matched by the node iterator on the left side of the iteration.
+        """
         for relprop in self.sm.get_relations_of_type(self.rel_type):
             rel = relprop.rel
             # Make sure relation matches queries provided
@@ -113,9 +211,14 @@ class RelationIterator:
                 if not self.rel_queries.test(self.prop_to_dict(relprop.properties)):
                     continue
 
-            # Right side will always be a NodeIterator (we branch to the left)
-            right_node = self.sm.get_node(rel.secondNodeId)
-            left_node = self.sm.get_node(rel.firstNodeId)
+            # Right side will always be a NodeIterator (we branch to the left),
+            # it is the source of the relation when following it backward
+            if self.reverse:
+                right_node = self.sm.get_node(rel.firstNodeId)
+                left_node = self.sm.get_node(rel.secondNodeId)
+            else:
+                right_node = self.sm.get_node(rel.secondNodeId)
+                left_node = self.sm.get_node(rel.firstNodeId)
 
             # If the right node is not of the correct type or wasn't matched by
             # the right side's iteration, then this doesn't match
@@ -123,40 +226,217 @@ class RelationIterator:
                 or not self.right.node_matches(right_node.properties):
                 continue
 
-            # If the left is a NodeIterator, our original request was one degree
-            # of separation
-            if isinstance(self.left, NodeIterator):
-                # Check the left node's type
-                if left_node.node.nodeType != self.left.node_type.index:
+            # Our original request was one degree of separation, so check the
+            # left node's type
+            if left_node.node.nodeType != self.left.node_type.index:
+                continue
+            # Check that the left node existed in the left result iterator.
+            # If it did, return properties and the nodes at the ends (so that
+            # future chains can determine whether their left node
+            # corresponds to one of them)
+            if self.left.node_matches(left_node.properties):
+                all_props = self.combine(left_node.properties,
+                                         relprop.properties,
+                                         right_node.properties)
+                if self.queries is not None:
+                    if not self.queries.test(self.result_to_dict(all_props)):
+                        continue
+                yield self.result(all_props, left_node, left_node, right_node)
+
+    def expand_left(self):
+        """
+        Matches the relations of the node at the end of every result of the
+        left side of the iteration: those leaving its last node, or those
+        entering its first node when the relation is followed backward. They
+        are read from the adjacency index of that node, instead of scanning
+        every relation of the type for each result.
+        """
+        if self.reverse:
+            direction = AdjacencyIndex.INCOMING
+        else:
+            direction = AdjacencyIndex.OUTGOING
+        for props, first_node, last_node in self.left_results():
+            end_node = self.end_node(first_node, last_node)
+            adjacent = self.sm.get_adjacent_relations(
+                end_node.node.index, self.rel_type, direction)
+            for rel_index, right_index in adjacent:
+                relprop = self.sm.get_relation(rel_index)
+                # Make sure relation matches queries provided
+                if self.rel_queries is not None:
+                    if not self.rel_queries.test(self.prop_to_dict(relprop.properties)):
+                        continue
+
+                # If the right node is not of the correct type or wasn't
+                # matched by the right side's iteration, then this doesn't match
+                right_node = self.sm.get_node(right_index)
+                if right_node.node.nodeType != self.right.node_type.index \
+                    or not self.right.node_matches(right_node.properties):
                     continue
-                # Check that the left node existed in the left result iterator.
-                # If it did, return properties and the right node (so that
-                # future chains can determine whether their left node
-                # corresponds to this right node)
-                if self.left.node_matches(left_node.properties):
-                    all_props = left_node.properties + relprop.properties + \
-                                right_node.properties
-                    all_prop_dict = {}
-                    all_prop_dict.update(self.left.prop_to_dict(left_node.properties))
-                    all_prop_dict.update(self.prop_to_dict(relprop.properties))
-                    all_prop_dict.update(self.right.prop_to_dict(right_node.properties))
-                    if self.queries is not None:
-                        if not self.queries.test(all_prop_dict):
-                            continue
-                    yield (all_props, right_node)
-            # Otherwise, we already chained from something else, so we just
-            # check that the left node is the right node of something on the
-            # left side of the iteration
+
+                all_props = self.combine(props, relprop.properties,
+                                         right_node.properties)
+                if self.queries is not None:
+                    if not self.queries.test(self.result_to_dict(all_props)):
+                        continue
+                yield self.result(all_props, first_node, last_node,
+                                  right_node)
+
+    def hash_join(self):
+        """
+        Matches the relations of the type with the results of the left side
+        of the iteration, each read once: the results are hashed by the node
+        the relation is followed from, then the relations of the type are
+        scanned and probed against them. Results sharing that node are
+        matched at once, instead of reading its relations for each of them.
+
+        If the left side has more than HASH_JOIN_MAX_ROWS results, the join is
+        done by partitions (as a grace hash join): the results and the
+        relations are split by node into HASH_JOIN_PARTITIONS temporary files,
+        and the partitions are joined one at a time.
+        """
+        table = {}
+        rows = 0
+        build_files = None
+        for result in self.left_results():
+            key = self.end_node(result[1], result[2]).node.index
+            if build_files is None:
+                table.setdefault(key, []).append(result)
+                rows += 1
+                if rows > self.HASH_JOIN_MAX_ROWS:
+                    # Too large to be kept in memory, so spill to disk
+                    build_files = self.partition_files()
+                    for spilled_key, spilled in table.iteritems():
+                        for spilled_result in spilled:
+                            self.spill(build_files, spilled_key,
+                                       spilled_result)
+                    table = None
             else:
-                for props, right in self.left:
-                    if left_node.node == right.node:
-                        all_props = props + relprop.properties + \
-                                right_node.properties
-                        all_prop_dict = {}
-                        all_prop_dict.update(self.left.prop_to_dict(props))
-                        all_prop_dict.update(self.prop_to_dict(relprop.properties))
-                        all_prop_dict.update(self.right.prop_to_dict(right_node.properties))
-                        if self.queries is not None:
-                            if not self.queries.test(all_prop_dict):
-                                continue
-                        yield (all_props, right_node)
+                self.spill(build_files, key, result)
+
+        relations = self.sm.get_relations_of_type(self.rel_type)
+        if build_files is None:
+            for result in self.probe(table, relations):
+                yield result
+            return
+
+        # The relations are partitioned by node like the results
+        probe_files = self.partition_files()
+        for relprop in relations:
+            key = self.end_node_id(relprop.rel)
+            cPickle.dump(relprop.index, probe_files[key % len(probe_files)],
+                         cPickle.HIGHEST_PROTOCOL)
+        for build_file, probe_file in zip(build_files, probe_files):
+            table = {}
+            for key, props, first_index, last_index in \
+                    self.read_spilled(build_file):
+                table.setdefault(key, []).append(
+                    (props, self.sm.get_node(first_index),
+                     self.sm.get_node(last_index)))
+            partition = (self.sm.get_relation(index)
+                         for index in self.read_spilled(probe_file))
+            for result in self.probe(table, partition):
+                yield result
+            build_file.close()
+            probe_file.close()
+
+    def probe(self, table, relations):
+        """
+        PRIVATE METHOD.
+        Matches the given relations with the results of the left side in the
+        given table, by index of the node the relation is followed from
+        """
+        for relprop in relations:
+            matches = table.get(self.end_node_id(relprop.rel))
+            if not matches:
+                continue
+            # Make sure relation matches queries provided
+            if self.rel_queries is not None:
+                if not self.rel_queries.test(self.prop_to_dict(relprop.properties)):
+                    continue
+
+            # The right node is read once for all the matching results
+            if self.reverse:
+                right_node = self.sm.get_node(relprop.rel.firstNodeId)
+            else:
+                right_node = self.sm.get_node(relprop.rel.secondNodeId)
+            if right_node.node.nodeType != self.right.node_type.index \
+                or not self.right.node_matches(right_node.properties):
+                continue
+
+            for props, first_node, last_node in matches:
+                all_props = self.combine(props, relprop.properties,
+                                         right_node.properties)
+                if self.queries is not None:
+                    if not self.queries.test(self.result_to_dict(all_props)):
+                        continue
+                yield self.result(all_props, first_node, last_node,
+                                  right_node)
+
+    def end_node(self, first_node, last_node):
+        """
+        PRIVATE METHOD.
+        End of a result of the left side the relation is followed from
+        """
+        return first_node if self.reverse else last_node
+
+    def end_node_id(self, rel):
+        """
+        PRIVATE METHOD.
+        Index of the node of a relation that is matched with the end of the
+        results of the left side
+        """
+        return rel.secondNodeId if self.reverse else rel.firstNodeId
+
+    def partition_files(self):
+        """
+        PRIVATE METHOD.
+        Temporary files of the partitions of a hash join, deleted when closed
+        """
+        datafiles_dir = GrapheneStore().datafilesDir
+        return [tempfile.TemporaryFile(dir=datafiles_dir)
+                for _ in xrange(self.HASH_JOIN_PARTITIONS)]
+
+    def spill(self, files, key, result):
+        """
+        PRIVATE METHOD.
+        Writes a result of the left side to the file of its partition, with
+        the indexes of its end nodes (they are read back when joined)
+        """
+        props, first_node, last_node = result
+        cPickle.dump((key, props, first_node.node.index, last_node.node.index),
+                     files[key % len(files)], cPickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def read_spilled(spill_file):
+        """
+        PRIVATE METHOD.
+        Reads back the items written to a partition file
+        """
+        spill_file.seek(0)
+        while True:
+            try:
+                yield cPickle.load(spill_file)
+            except EOFError:
+                return
+
+    def result(self, props, first_node, last_node, right_node):
+        """
+        Result of the iteration from the ends of a result of the left side
+        and the right node, which becomes the end the relation was followed to
+        """
+        if self.reverse:
+            return (props, right_node, last_node)
+        return (props, first_node, right_node)
+
+    def left_results(self):
+        """
+        Results of the left side of the iteration, as (properties, first node,
+        last node) triples whether the left side is a node or a relation
+        iterator.
+        """
+        if isinstance(self.left, NodeIterator):
+            for nodeprop in self.left:
+                yield (nodeprop.properties, nodeprop, nodeprop)
+        else:
+            for result in self.left:
+                yield result
@@ -0,0 +1,59 @@
+import unittest
+import StringIO
+
+from graphene.commands import AnalyzeCommand
+from graphene.storage import (StorageManager, GrapheneStore, Property)
+from graphene.utils import PrettyPrinter
+from graphene.server.server import GrapheneServer
+
+class TestAnalyzeCommand(unittest.TestCase):
+    def setUp(self):
+        GrapheneStore.TESTING = True
+        # Set to no colors to avoid escape sequences in output
+        PrettyPrinter.NO_COLORS = True
+
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+        self.server = GrapheneServer()
+        self.sm = self.server.storage_manager
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        self.sm.close()
+
+    def test_no_type(self):
+        cmd = AnalyzeCommand("Foo", AnalyzeCommand.AnalyzeType.TYPE)
+        self.assertEquals(cmd.type_name, "Foo")
+
+        # Create dummy output stream for testing
+        out = StringIO.StringIO()
+        cmd.execute(self.sm, output=out)
+        self.assertEquals(out.getvalue(), "Type Foo does not exist.\n")
+        out.close()
+
+        out = StringIO.StringIO()
+        AnalyzeCommand().execute(self.sm, output=out)
+        self.assertEquals(out.getvalue(), "No types found.\n")
+        out.close()
+
+    def test_analyze(self):
+        printer = PrettyPrinter()
+        # Pretty print expected output for testing later
+        exp_stream = StringIO.StringIO()
+        printer.print_table((("T", "type", 2), ("R", "relation", 0)),
+                            ["NAME", "KIND", "COUNT"], exp_stream)
+        expected = exp_stream.getvalue()
+        exp_stream.close()
+
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        for i in range(2):
+            self.sm.insert_node(t, ((Property.PropertyType.int, i),))
+        out = StringIO.StringIO()
+        AnalyzeCommand().execute(self.sm, output=out)
+        self.assertEquals(out.getvalue(), expected)
+        out.close()
+        self.assertEquals(self.sm.get_statistics(t)["count"], 2)
+        self.assertEquals(self.sm.get_statistics(r, False)["count"], 0)
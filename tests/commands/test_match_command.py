@@ -195,3 +195,37 @@ class TestMatchCommand(unittest.TestCase):
         exp_vals = [ [1, 2], [1, 3], [1, 4], [1, 5], [2, 3] ]
         ret_vals = cmd.execute(self.sm, self.devnull)
         self.assertListEqualUnsorted(ret_vals, exp_vals)
+
+    def test_match_chain(self):
+        # Two relations: 1->2->3 is the only path of length two
+        cmd = self.server.parseString(
+            "MATCH (t:T)-[R]->(t2:T)-[R]->(t3:T)")[0]
+
+        exp_vals = [ [1, 2, 3] ]
+        ret_vals = cmd.execute(self.sm, self.devnull)
+        self.assertListEqualUnsorted(ret_vals, exp_vals)
+
+        cmd = self.server.parseString(
+            "MATCH (t:T)-[R]->(t2:T)-[R]->(t3:T) WHERE t3.a = 4")[0]
+
+        ret_vals = cmd.execute(self.sm, self.devnull)
+        self.assertListEqualUnsorted(ret_vals, [])
+
+    def test_match_index(self):
+        queries = ["MATCH (t:T) WHERE a = 3;", "MATCH (t:T) WHERE t.a >= 4;",
+                   "MATCH (t:T) WHERE a > 1 AND a < 5;",
+                   "MATCH (t:T) WHERE a < 3 OR a = 5;",
+                   "MATCH (t:T)-[R]->(t2:T) WHERE t2.a <= 3;"]
+        scanned = [self.server.parseString(query)[0].execute(self.sm,
+                                                             self.devnull)
+                   for query in queries]
+        self.server.doCommands("CREATE INDEX ON T(a);", False)
+        try:
+            self.assertIsNotNone(self.sm.get_property_index(
+                self.sm.get_node_data("T")[0], "a"))
+            for query, expected in zip(queries, scanned):
+                cmd = self.server.parseString(query)[0]
+                self.assertListEqual(cmd.execute(self.sm, self.devnull),
+                                     expected)
+        finally:
+            self.server.doCommands("DROP INDEX ON T(a);", False)
@@ -31,9 +31,16 @@ class TestParser(unittest.TestCase):
                 "MATCH (A)-[r:R]->(B);",
                 "QUIT;",
                 "EXIT;",
+                "BEGIN;",
+                "COMMIT;",
                 "CREATE TYPE Person ( name : string );",
                 "CREATE RELATION R",
                 "CREATE RELATION R ( name : string )",
+                "CREATE INDEX ON Person(name);",
+                "DROP INDEX ON Person(name);",
+                "ANALYZE;",
+                "ANALYZE TYPE Person;",
+                "ANALYZE RELATION R;",
                 # case-insensitive identifiers
                 "quit",
                 "match (a:A)"
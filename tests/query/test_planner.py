@@ -5,7 +5,8 @@ from graphene.query.planner import QueryPlanner
 from graphene.storage import (StorageManager, GrapheneStore, Property)
 from graphene.expressions import *
 from graphene.errors import *
-from graphene.traversal import Query
+from graphene.traversal import Query, RelationIterator
+from graphene.query import AccessPath
 
 class TestQueryPlanner(unittest.TestCase):
     @classmethod
@@ -407,3 +408,204 @@ class TestQueryPlanner(unittest.TestCase):
         exp_vals = [[3, 15, 5], [3, 12, 4], [2,6,3], [1,3,3], [1,2,2]]
         schema, results = self.planner.execute((n1, r, n2), None, None, orderby=[(('t', 'a'), 'DESC'), (('r', 'b'), 'DESC')])
         self.assertListEqual(results, exp_vals)
+
+    def test_choose_access_path(self):
+        n1 = MatchNode("t", "T")
+        r = MatchRelation("r", "R")
+        n2 = MatchNode("t2", "T")
+        access_type = AccessPath.AccessType
+
+        def leaf_path(query_chain):
+            return self.planner.get_iter_tree((n1,), query_chain).access_path
+
+        self.assertEqual(leaf_path([((None, 'a'), '=', '3')]).type,
+                         access_type.FULL_SCAN)
+        self.server.doCommands("CREATE INDEX ON T(a);", False)
+        try:
+            self.assertEqual(leaf_path(None).type, access_type.FULL_SCAN)
+            path = leaf_path([((None, 'a'), '=', '3')])
+            self.assertEqual(path.type, access_type.INDEX_SEEK)
+            self.assertEqual(path.estimate, 1)
+            # Both bounds are answered by the same index
+            path = leaf_path([((None, 'a'), '>', '1'), 'AND',
+                              (('t', 'a'), '<', '4')])
+            self.assertEqual(path.type, access_type.INDEX_RANGE_SCAN)
+            self.assertEqual(path.estimate, 2)
+            self.assertEqual(len(path.node_indexes()), 2)
+            # Every node matches, so the index does not help
+            self.assertEqual(leaf_path([((None, 'a'), '>=', '1')]).type,
+                             access_type.FULL_SCAN)
+            self.assertEqual(leaf_path([((None, 'a'), '=', '3'), 'OR',
+                                        ((None, 'a'), '=', '4')]).type,
+                             access_type.FULL_SCAN)
+
+            # The left nodes are found through the index
+            schema, results = self.planner.execute(
+                (n1, r, n2), [(('t', 'a'), '=', '3')], None)
+            self.assertListEqualUnsorted(results, [[3, 12, 4], [3, 15, 5]])
+        finally:
+            self.server.doCommands("DROP INDEX ON T(a);", False)
+
+    def test_choose_index_intersection(self):
+        self.server.doCommands("CREATE TYPE U ( x: int, y: int );", False)
+        try:
+            self.server.doCommands("INSERT NODE %s;" % ", ".join(
+                "U(%d, %d)" % (i % 4, i % 5) for i in range(20)), False)
+            self.server.doCommands("CREATE INDEX ON U(x);", False)
+            self.server.doCommands("CREATE INDEX ON U(y);", False)
+            query_chain = [((None, 'x'), '=', '0'), 'AND',
+                           ((None, 'y'), '=', '0')]
+            iter_tree = self.planner.get_iter_tree((MatchNode(None, "U"),),
+                                                   query_chain)
+            path = iter_tree.access_path
+            self.assertEqual(path.type,
+                             AccessPath.AccessType.INDEX_INTERSECTION)
+            self.assertEqual(path.estimate, 1)
+            self.assertEqual([name for name, _, __ in path.lookups],
+                             ['y', 'x'])
+            self.assertEqual([nodeprop.properties for nodeprop in iter_tree],
+                             [[0, 0]])
+        finally:
+            self.server.doCommands("DROP TYPE U;", False)
+
+    def test_order_joins(self):
+        n1, n2, n3 = MatchNode("t", "T"), MatchNode("t2", "T"), \
+            MatchNode("t3", "T")
+        r, r2 = MatchRelation("r", "R"), MatchRelation("r2", "R")
+        chain = (n1, r, n2, r2, n3)
+
+        # Without queries, the chain is followed in order
+        iter_tree = self.planner.get_iter_tree(chain, None)
+        self.assertFalse(iter_tree.reverse)
+        self.assertFalse(iter_tree.left.reverse)
+
+        # Selective last node, the chain is followed backward from it
+        query_chain = [(('t3', 'a'), '=', '4')]
+        iter_tree = self.planner.get_iter_tree(chain, query_chain)
+        self.assertTrue(iter_tree.reverse)
+        self.assertTrue(iter_tree.left.reverse)
+        self.assertEqual(iter_tree.left.left.alias, 't3')
+        schema, results = self.planner.execute(chain, query_chain, None)
+        self.assertListEqualUnsorted(results, [[1,3,3,12,4], [2,6,3,12,4]])
+
+        # Selective middle node, the chain is followed both ways from it, and
+        # queries across the chain are still tested
+        query_chain = [(('t2', 'a'), '=', '3'), 'AND',
+                       (('t', 'a'), '<', ('t3', 'a'))]
+        iter_tree = self.planner.get_iter_tree(chain, query_chain)
+        self.assertEqual(iter_tree.left.left.alias, 't2')
+        self.assertIsNotNone(iter_tree.queries)
+        schema, results = self.planner.execute(chain, query_chain, None)
+        self.assertListEqualUnsorted(results, [[1,3,3,12,4], [1,3,3,15,5],
+                                               [2,6,3,12,4], [2,6,3,15,5]])
+
+    def test_order_joins_statistics(self):
+        self.server.doCommands("CREATE TYPE A ( x: int );", False)
+        self.server.doCommands("CREATE TYPE B ( y: int );", False)
+        self.server.doCommands("CREATE RELATION L;", False)
+        try:
+            self.server.doCommands("INSERT NODE %s;" % ", ".join(
+                "A(1)" for i in range(20)), False)
+            self.server.doCommands("INSERT NODE %s;" % ", ".join(
+                "B(%d)" % i for i in range(20)), False)
+            a_type = self.sm.get_node_data("A")[0]
+            b_type = self.sm.get_node_data("B")[0]
+            l_type = self.sm.get_relationship_data("L")[0]
+            for a, b in zip(self.sm.get_nodes_of_type(a_type),
+                            self.sm.get_nodes_of_type(b_type)):
+                self.sm.insert_relation(l_type, (), a.node, b.node)
+
+            chain = (MatchNode("a", "A"), MatchRelation(None, "L"),
+                     MatchNode("b", "B"))
+            query_chain = [(('a', 'x'), '=', '1'), 'AND',
+                           (('b', 'y'), '<', '1')]
+            # By default an equality is deemed more selective than a range
+            iter_tree = self.planner.get_iter_tree(chain, query_chain)
+            self.assertFalse(iter_tree.reverse)
+            self.assertEqual(iter_tree.join_type,
+                             RelationIterator.JoinType.EXPAND)
+
+            # The statistics show that every A matches, but a single B
+            self.server.doCommands("ANALYZE TYPE A; ANALYZE TYPE B;", False)
+            self.assertEqual(self.planner.estimate_selectivity(
+                iter_tree.left.queries, a_type, True), 1)
+            iter_tree = self.planner.get_iter_tree(chain, query_chain)
+            self.assertTrue(iter_tree.reverse)
+            self.assertEqual(iter_tree.left.alias, 'b')
+            schema, results = self.planner.execute(chain, query_chain, None)
+            self.assertListEqual(results, [[1, 0]])
+
+            # The analyzed degrees give the number of relations followed from
+            # each A: half of them have two, the others one
+            for a, b in zip(list(self.sm.get_nodes_of_type(a_type))[:10],
+                            self.sm.get_nodes_of_type(b_type)):
+                self.sm.insert_relation(l_type, (), a.node, b.node)
+            self.server.doCommands("ANALYZE RELATION L;", False)
+            leaves, rels, _ = self.planner.flatten_chain(
+                self.planner.get_iter_tree(chain, None))
+            best = dict(((i, i), self.planner.estimate_leaf(leaf) + (None,))
+                        for i, leaf in enumerate(leaves))
+            cost, matched, step = self.planner.estimate_join(
+                best, leaves, rels, 0, 1, False)
+            self.assertAlmostEqual(matched, 30)
+        finally:
+            self.server.doCommands("DROP RELATION L;", False)
+            self.server.doCommands("DROP TYPE A;", False)
+            self.server.doCommands("DROP TYPE B;", False)
+
+    def test_hash_join(self):
+        n1, n2, n3 = MatchNode("t", "T"), MatchNode("t2", "T"), \
+            MatchNode("t3", "T")
+        r, r2 = MatchRelation("r", "R"), MatchRelation("r2", "R")
+        chain = (n1, r, n2, r2, n3)
+        for query_chain in (None, [(('t3', 'a'), '=', '4')]):
+            iter_tree = self.planner.get_iter_tree(chain, query_chain)
+            expected = [result[0] for result in iter_tree]
+            # Same results whether the joins hash their left side in memory
+            # or by partitions on disk
+            iter_tree.join_type = RelationIterator.JoinType.HASH_JOIN
+            iter_tree.left.join_type = RelationIterator.JoinType.HASH_JOIN
+            self.assertListEqualUnsorted(
+                [result[0] for result in iter_tree], expected)
+            iter_tree.HASH_JOIN_MAX_ROWS = 1
+            iter_tree.left.HASH_JOIN_MAX_ROWS = 1
+            self.assertListEqualUnsorted(
+                [result[0] for result in iter_tree], expected)
+
+    def test_choose_hash_join(self):
+        self.server.doCommands("CREATE TYPE P ( p: int );", False)
+        self.server.doCommands("CREATE TYPE H ( h: int );", False)
+        self.server.doCommands("CREATE RELATION E;", False)
+        self.server.doCommands("CREATE RELATION F;", False)
+        try:
+            self.server.doCommands("INSERT NODE %s;" % ", ".join(
+                "P(%d)" % i for i in range(60)), False)
+            self.server.doCommands("INSERT NODE H(0);", False)
+            p_type = self.sm.get_node_data("P")[0]
+            hub = list(self.sm.get_nodes_of_type(
+                self.sm.get_node_data("H")[0]))[0].node
+            e_type = self.sm.get_relationship_data("E")[0]
+            f_type = self.sm.get_relationship_data("F")[0]
+            for nodeprop in self.sm.get_nodes_of_type(p_type):
+                # Half the nodes lead to the hub, which leads to the others
+                if nodeprop.properties[0] < 30:
+                    self.sm.insert_relation(e_type, (), nodeprop.node, hub)
+                else:
+                    self.sm.insert_relation(f_type, (), hub, nodeprop.node)
+                hub = self.sm.get_node(hub.index).node
+
+            # Every path through the hub shares its relations
+            chain = (MatchNode("a", "P"), MatchRelation(None, "E"),
+                     MatchNode(None, "H"), MatchRelation(None, "F"),
+                     MatchNode("b", "P"))
+            iter_tree = self.planner.get_iter_tree(chain, None)
+            self.assertEqual(iter_tree.join_type,
+                             RelationIterator.JoinType.HASH_JOIN)
+            schema, results = self.planner.execute(chain, None, None)
+            self.assertEqual(len(results), 900)
+            self.assertEqual(sorted(results)[0], [0, 30])
+        finally:
+            self.server.doCommands("DROP RELATION E;", False)
+            self.server.doCommands("DROP RELATION F;", False)
+            self.server.doCommands("DROP TYPE P;", False)
+            self.server.doCommands("DROP TYPE H;", False)
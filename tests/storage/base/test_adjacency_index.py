@@ -0,0 +1,112 @@
+import unittest
+
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.adjacency_index import AdjacencyIndex
+
+
+class TestAdjacencyIndexMethods(unittest.TestCase):
+    TEST_FILENAME = "graphenestore.test.adjacency.db"
+
+    def setUp(self):
+        GrapheneStore.TESTING = True
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_new_index(self):
+        """
+        Test that a new index is empty and has to be built
+        """
+        adjacency = AdjacencyIndex(self.TEST_FILENAME)
+        self.assertFalse(adjacency.clean)
+        self.assertEquals(adjacency.get_relations(1), [])
+        self.assertEquals(adjacency.degree(1), 0)
+
+    def test_add_remove(self):
+        """
+        Test that relationships are grouped by type and direction for both of
+        their nodes
+        """
+        adjacency = AdjacencyIndex(self.TEST_FILENAME)
+        # (relationship, type, first node, second node)
+        for rel in [(1, 1, 1, 2), (2, 2, 1, 3), (3, 1, 1, 3), (4, 1, 2, 1),
+                    (5, 1, 1, 1)]:
+            adjacency.add(*rel)
+        out = AdjacencyIndex.OUTGOING
+        inc = AdjacencyIndex.INCOMING
+        self.assertEquals(adjacency.get_relations(1, 1, out),
+                          [(1, 2), (3, 3), (5, 1)])
+        self.assertEquals(adjacency.get_relations(1, 1, inc), [(4, 2), (5, 1)])
+        self.assertEquals(adjacency.get_relations(1, 2), [(2, 3)])
+        self.assertEquals(adjacency.get_relations(3), [(3, 1), (2, 1)])
+        self.assertEquals(adjacency.degree(1), 6)
+        self.assertEquals(adjacency.degree(1, 1, out), 3)
+
+        adjacency.remove(3, 1, 1, 3)
+        adjacency.remove(2, 2, 1, 3)
+        self.assertEquals(adjacency.get_relations(1, 1, out),
+                          [(1, 2), (5, 1)])
+        self.assertEquals(adjacency.get_relations(1, 2), [])
+        self.assertEquals(adjacency.get_relations(3), [])
+        self.assertNotIn(3, adjacency.groups)
+
+    def test_flush_read(self):
+        """
+        Test that a flushed index is read back as clean, and that an index
+        changed since its last flush is not
+        """
+        adjacency = AdjacencyIndex(self.TEST_FILENAME)
+        adjacency.rebuild([(3, 1, 2, 1), (1, 1, 1, 2), (2, 4, 2, 2)])
+        adjacency.flush()
+
+        reopened = AdjacencyIndex(self.TEST_FILENAME)
+        self.assertTrue(reopened.clean)
+        self.assertEquals(reopened.groups, adjacency.groups)
+        self.assertEquals(reopened.get_relations(2),
+                          [(3, 1), (1, 1), (2, 2), (2, 2)])
+
+        # Crash after a change
+        adjacency.add(4, 1, 1, 1)
+        self.assertFalse(AdjacencyIndex(self.TEST_FILENAME).clean)
+        adjacency.flush()
+        self.assertEquals(AdjacencyIndex(self.TEST_FILENAME).get_relations(1),
+                          [(1, 2), (4, 1), (3, 2), (4, 1)])
+
+    def test_dense_node(self):
+        """
+        Test that the groups of a node past the dense degree are kept in order
+        and survive removals, flushes and reopening
+        """
+        adjacency = AdjacencyIndex(self.TEST_FILENAME)
+        dense_degree = AdjacencyIndex.DENSE_NODE_DEGREE
+        out = AdjacencyIndex.OUTGOING
+        # Hub node 1 with relationships of types 1 and 2 to nodes 2, 3, ...
+        for i in xrange(1, dense_degree + 2):
+            adjacency.add(i, 1 + i % 2, 1, i + 1)
+        self.assertIn(1, adjacency.dense)
+        self.assertNotIn(2, adjacency.dense)
+        self.assertEquals(adjacency.degree(1), dense_degree + 1)
+        expected = [(i, i + 1) for i in xrange(2, dense_degree + 2, 2)]
+        self.assertEquals(adjacency.get_relations(1, 1, out), expected)
+
+        adjacency.remove(2, 1, 1, 3)
+        adjacency.add(dense_degree + 2, 1, 1, 1)
+        expected = expected[1:] + [(dense_degree + 2, 1)]
+        self.assertEquals(adjacency.get_relations(1, 1, out), expected)
+
+        adjacency.flush()
+        reopened = AdjacencyIndex(self.TEST_FILENAME)
+        self.assertIn(1, reopened.dense)
+        self.assertEquals(reopened.get_relations(1), adjacency.get_relations(1))
+
+        # A node without relationships is no longer dense
+        for rel, other in adjacency.get_relations(1, direction=out):
+            adjacency.remove(rel, 1 + rel % 2, 1, other)
+        for rel, other in adjacency.get_relations(1):
+            adjacency.remove(rel, 1, other, 1)
+        self.assertNotIn(1, adjacency.dense)
+        self.assertEquals(adjacency.get_relations(1), [])
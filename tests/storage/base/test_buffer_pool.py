@@ -0,0 +1,95 @@
+import os
+import unittest
+
+from graphene.storage.base.buffer_pool import BufferPool, PagedFile
+from graphene.storage.base.graphene_store import GrapheneStore
+
+
+class TestBufferPoolMethods(unittest.TestCase):
+    TEST_FILENAME = "graphenestore.bufferpool.db"
+
+    def setUp(self):
+        GrapheneStore.TESTING = True
+        self.path = GrapheneStore().datafilesDir + self.TEST_FILENAME
+        open(self.path, "w+").close()
+        # Pool of 2 pages of 8 bytes each
+        self.pool = BufferPool(budget=16, page_size=8)
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def open_paged(self):
+        return PagedFile(open(self.path, "r+b"), self.pool)
+
+    def disk_contents(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_write_read_across_pages(self):
+        """
+        Test that data spanning several pages is read back as written, and
+        that it is only on disk once the file is closed
+        """
+        paged = self.open_paged()
+        paged.write("abcdefghijkl")
+        paged.seek(6)
+        self.assertEquals(paged.read(4), "ghij")
+        paged.seek(0, os.SEEK_END)
+        self.assertEquals(paged.tell(), 12)
+        # Nothing has been evicted, so nothing was written back
+        self.assertEquals(self.disk_contents(), "")
+        paged.close()
+        self.assertEquals(self.disk_contents(), "abcdefghijkl")
+        # Pages of the closed file are no longer in the pool
+        self.assertEquals(len(self.pool.cache), 0)
+
+    def test_eviction_writes_dirty_pages(self):
+        """
+        Test that evicting dirty pages writes them back to disk
+        """
+        paged = self.open_paged()
+        paged.write("a" * 8 + "b" * 8 + "c" * 8)
+        # The first page was evicted to make room for the third
+        self.assertEquals(self.disk_contents(), "a" * 8)
+        # Reading the evicted page back is a miss
+        misses = self.pool.misses
+        paged.seek(0)
+        self.assertEquals(paged.read(8), "a" * 8)
+        self.assertEquals(self.pool.misses, misses + 1)
+        paged.close()
+        self.assertEquals(self.disk_contents(), "a" * 8 + "b" * 8 + "c" * 8)
+
+    def test_truncate(self):
+        """
+        Test that truncating drops the data past the new end of the file
+        """
+        paged = self.open_paged()
+        paged.write("abcdefghijkl")
+        paged.seek(-8, os.SEEK_END)
+        paged.truncate()
+        self.assertEquals(os.path.getsize(self.path), 4)
+        # Growing the file again reads zeros where the data was truncated
+        paged.seek(10)
+        paged.write("z")
+        paged.seek(0)
+        self.assertEquals(paged.read(), "abcd" + "\x00" * 6 + "z")
+        paged.close()
+        self.assertEquals(self.disk_contents(), "abcd" + "\x00" * 6 + "z")
+
+    def test_shared_file(self):
+        """
+        Test that two handles on the same file share its pages
+        """
+        paged1 = self.open_paged()
+        paged2 = self.open_paged()
+        paged1.write("abcd")
+        self.assertEquals(paged2.read(), "abcd")
+        paged1.close()
+        # Pages stay in the pool until the last handle is closed
+        self.assertEquals(self.disk_contents(), "")
+        paged2.close()
+        self.assertEquals(self.disk_contents(), "abcd")
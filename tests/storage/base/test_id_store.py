@@ -144,8 +144,8 @@ class TestIdStoreMethods(unittest.TestCase):
         id_store.store_id(id_written_2)
         id_store.store_id(id_written_3)
 
-        # Make sure the 3 IDs are read
-        ids = [id_written_1, id_written_2, id_written_3]
+        # Make sure the 3 IDs are read, in ascending order
+        ids = [id_written_2, id_written_3, id_written_1]
         self.assertEquals(id_store.get_all_ids(), ids)
 
     def test_write_all_ids(self):
@@ -163,7 +163,7 @@ class TestIdStoreMethods(unittest.TestCase):
         id_store.store_id(id_written_3)
 
         # Make sure they are in the file as expected
-        ids = [id_written_1, id_written_2, id_written_3]
+        ids = [id_written_2, id_written_3, id_written_1]
         self.assertEquals(id_store.get_all_ids(), ids)
 
         # Overwrite the file with new IDs
@@ -174,3 +174,80 @@ class TestIdStoreMethods(unittest.TestCase):
             self.fail("IdStore overwrite failed: id file failed to open.")
         # Make sure the new IDs have been overwritten
         self.assertEquals(id_store.get_all_ids(), overwrite)
+
+    def test_get_ids(self):
+        """
+        Test that getting several IDs returns a contiguous run, using the
+        smallest run that fits, and no IDs when no run fits
+        """
+        id_store = IdStore(self.TEST_FILENAME)
+
+        for id_value in [42, 10, 12, 11, 20, 21, 5]:
+            id_store.store_id(id_value)
+
+        self.assertEquals(id_store.get_ids(2), [20, 21])
+        self.assertEquals(id_store.get_ids(4), [])
+        self.assertEquals(id_store.get_ids(2), [10, 11])
+        self.assertEquals(id_store.get_ids(2), [])
+        self.assertEquals(id_store.get_all_ids(), [5, 12, 42])
+
+    def test_gather_ids(self):
+        """
+        Test that gathering IDs takes them from the largest runs, and no IDs
+        when fewer are available
+        """
+        id_store = IdStore(self.TEST_FILENAME)
+
+        for id_value in [42, 10, 11, 20, 21, 22, 5]:
+            id_store.store_id(id_value)
+
+        self.assertEquals(id_store.available, 7)
+        self.assertEquals(id_store.gather_ids(8), [])
+        self.assertEquals(id_store.gather_ids(4), [20, 21, 22, 10])
+        self.assertEquals(id_store.sizes, [(1, 5), (1, 11), (1, 42)])
+        self.assertEquals(id_store.gather_ids(4), [])
+        self.assertEquals(sorted(id_store.gather_ids(3)), [5, 11, 42])
+        self.assertEquals(id_store.available, 0)
+
+    def test_store_id_merges(self):
+        """
+        Test that stored IDs are merged with the runs next to them
+        """
+        id_store = IdStore(self.TEST_FILENAME)
+
+        for id_value in [3, 1, 5, 2, 4, 4]:
+            id_store.store_id(id_value)
+
+        self.assertEquals(id_store.extents, [(1, 5)])
+        self.assertEquals(id_store.sizes, [(5, 1)])
+        self.assertEquals(id_store.get_ids(5), [1, 2, 3, 4, 5])
+        self.assertEquals(id_store.get_id(), IdStore.NO_ID)
+
+    def test_flush(self):
+        """
+        Test that IDs are only written to the file when flushed, and that a
+        new IdStore reads the flushed IDs back
+        """
+        id_store = IdStore(self.TEST_FILENAME)
+
+        id_store.store_id(42)
+        id_store.store_id(10)
+        # Changes are batched, nothing has been written yet
+        self.assertEquals(id_store.get_file_size(), 0)
+
+        id_store.flush()
+        self.assertEquals(id_store.get_file_size(), 2 * IdStore.RECORD_SIZE)
+        self.assertEquals(IdStore(self.TEST_FILENAME).get_all_ids(), [10, 42])
+
+    def test_flush_interval(self):
+        """
+        Test that IDs are written to the file once enough changes are made
+        """
+        id_store = IdStore(self.TEST_FILENAME)
+        id_store.FLUSH_INTERVAL = 3
+
+        id_store.store_id(1)
+        id_store.store_id(2)
+        self.assertEquals(id_store.get_file_size(), 0)
+        id_store.get_id()
+        self.assertEquals(IdStore(self.TEST_FILENAME).get_all_ids(), [2])
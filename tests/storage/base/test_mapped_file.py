@@ -0,0 +1,85 @@
+import os
+import unittest
+
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.mapped_file import MappedFile
+
+
+class TestMappedFileMethods(unittest.TestCase):
+    TEST_FILENAME = "graphenestore.mappedfile.db"
+
+    def setUp(self):
+        GrapheneStore.TESTING = True
+        self.path = GrapheneStore().datafilesDir + self.TEST_FILENAME
+        open(self.path, "w+").close()
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def open_mapped(self):
+        return MappedFile(open(self.path, "r+b"))
+
+    def test_empty_read(self):
+        """
+        Test that reading an empty mapped file returns no data
+        """
+        mapped = self.open_mapped()
+        self.assertEquals(mapped.read(4), '')
+        mapped.close()
+
+    def test_write_grows_file(self):
+        """
+        Test that writing past the end of the file grows both the mapping and
+        the file on disk
+        """
+        mapped = self.open_mapped()
+        mapped.write("abcd")
+        mapped.seek(8)
+        mapped.write("efgh")
+        self.assertEquals(os.path.getsize(self.path), 12)
+        mapped.seek(0)
+        self.assertEquals(mapped.read(), "abcd\x00\x00\x00\x00efgh")
+        mapped.close()
+        # Data is on disk after closing
+        with open(self.path, "rb") as f:
+            self.assertEquals(f.read(), "abcd\x00\x00\x00\x00efgh")
+
+    def test_seek_end_and_truncate(self):
+        """
+        Test that seeking relative to the end and truncating work as they do
+        for regular files
+        """
+        mapped = self.open_mapped()
+        mapped.write("abcdefgh")
+        mapped.seek(-4, os.SEEK_END)
+        self.assertEquals(mapped.tell(), 4)
+        mapped.truncate()
+        self.assertEquals(os.path.getsize(self.path), 4)
+        mapped.seek(0, os.SEEK_END)
+        self.assertEquals(mapped.tell(), 4)
+        # Reading at the end of the file returns no data
+        self.assertEquals(mapped.read(4), '')
+        mapped.close()
+
+    def test_shared_mapping(self):
+        """
+        Test that two handles on the same file see each other's writes,
+        including writes that grow the file
+        """
+        mapped1 = self.open_mapped()
+        mapped2 = self.open_mapped()
+        mapped1.write("abcd")
+        mapped2.seek(2)
+        self.assertEquals(mapped2.read(2), "cd")
+        mapped2.write("ef")
+        mapped1.seek(0)
+        self.assertEquals(mapped1.read(), "abcdef")
+        # The mapping stays usable until its last handle is closed
+        mapped1.close()
+        mapped2.seek(0)
+        self.assertEquals(mapped2.read(), "abcdef")
+        mapped2.close()
@@ -41,3 +41,12 @@ class TestNodeMethods(unittest.TestCase):
         self.assertNotEqual(node1, node3)
         self.assertNotEqual(node2, node3)
         self.assertNotEqual(node1, 1)
+
+    def test_slots(self):
+        """
+        Tests that nodes only have the fixed record attributes (no __dict__)
+        """
+        node = Node(24, True, 31, 21, 20)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.unknown = 1
@@ -1,9 +1,14 @@
 import unittest
 
 from graphene.storage.base.node_store import *
+from graphene.storage.base import node_store as node_store_module
 
 
 class TestNodeStoreMethods(unittest.TestCase):
+    # Settings of the stores of the tests (see GeneralStore.SETTINGS),
+    # overridden to run the tests with others
+    SETTINGS = {}
+
     def setUp(self):
         GrapheneStore.TESTING = True
 
@@ -19,7 +24,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         Test that initializing an empty NodeStore succeeds (file is opened)
         """
         try:
-            NodeStore()
+            NodeStore(self.SETTINGS)
         except IOError:
             self.fail("NodeStore initializer failed: db file failed to open.")
 
@@ -29,12 +34,12 @@ class TestNodeStoreMethods(unittest.TestCase):
         repeated; i.e. the old file is reopened and no errors occur.
         """
         try:
-            NodeStore()
+            NodeStore(self.SETTINGS)
         except IOError:
             self.fail("NodeStore initializer failed: "
                       "db file failed to open.")
         try:
-            NodeStore()
+            NodeStore(self.SETTINGS)
         except IOError:
             self.fail("NodeStore initializer failed on second attempt: "
                       "db file failed to open.")
@@ -52,7 +57,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         # Create db file outside interface
         open(graphene_store.datafilesDir + NodeStore.FILE_NAME, "w+").close()
         try:
-            node_store = NodeStore()
+            node_store = NodeStore(self.SETTINGS)
             node = Node(1, False, 1, 1, 1)
             node_store.write_item(node)
         except Exception:
@@ -62,7 +67,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Test that writing a node to index 0 raises an error
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         empty_node = Node()
         with self.assertRaises(ValueError):
@@ -72,7 +77,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Test that reading a node from index 0 raises an error
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         with self.assertRaises(ValueError):
             node_store.item_at_index(0)
@@ -81,7 +86,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Make sure that reading an item when the file is empty returns None
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
         # Read an uncreated item
         no_item = node_store.item_at_index(1)
         # Make sure it returned None
@@ -91,7 +96,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Tests that the node written to the NodeStore is the node that is read.
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         # Create a node and add it to the NodeStore
         node = Node(1, False, 1, 1, 1)
@@ -107,7 +112,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Tests when 2 nodes are written after 1 node to the NodeStore
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         # Create one node and write it to the NodeStore
         node1 = Node(1, False, 1, 1, 1)
@@ -133,7 +138,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Tests that overwriting a node in a database with 3 nodes works
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         # Create 3 nodes
         node1 = Node(1, False, 1, 1, 1)
@@ -173,7 +178,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         """
         Tests that deleting 2 nodes in a database with 3 nodes works
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         # Create 3 nodes
         node1 = Node(1, True, 1, 1, 1)
@@ -216,7 +221,7 @@ class TestNodeStoreMethods(unittest.TestCase):
         Test that the file is truncated when deleting from the end of the
         file
         """
-        node_store = NodeStore()
+        node_store = NodeStore(self.SETTINGS)
 
         # Create 3 nodes
         node1 = Node(1, True, 1, 1, 1)
@@ -243,3 +248,101 @@ class TestNodeStoreMethods(unittest.TestCase):
         node_store.delete_item(node3)
         new_size = node_store.get_file_size()
         self.assertNotEqual(old_size, new_size)
+
+
+    def test_items_in_range(self):
+        """
+        NOTE: GeneralStore Test, only tested here
+        Test that a range of items is read at once, stopping at the end of
+        the file
+        """
+        node_store = NodeStore(self.SETTINGS)
+
+        node1 = Node(1, True, 1, 1, 1)
+        node3 = Node(3, True, 3, 3, 3)
+        node_store.write_item(node1)
+        node_store.write_item(node3)
+
+        # The unwritten item in between is read as deleted
+        self.assertEquals(node_store.items_in_range(1, 3),
+                          [node1, None, node3])
+        # Ranges past the end of the file are cut short
+        self.assertEquals(node_store.items_in_range(3, 5), [node3])
+        self.assertEquals(node_store.items_in_range(4, 5), [])
+        with self.assertRaises(ValueError):
+            node_store.items_in_range(0, 5)
+
+    def test_write_items(self):
+        """
+        NOTE: GeneralStore Test, only tested here
+        Test that items written together (unsorted and with gaps) are read
+        back as written
+        """
+        node_store = NodeStore(self.SETTINGS)
+
+        nodes = [Node(i, True, i, i, i) for i in (5, 1, 2, 3, 7)]
+        node_store.write_items(nodes)
+
+        self.assertEquals(node_store.items_in_range(1, 7),
+                          [nodes[1], nodes[2], nodes[3], None, nodes[0],
+                           None, nodes[4]])
+        # Items cannot be written to index 0
+        with self.assertRaises(ValueError):
+            node_store.write_items([Node()])
+
+    @unittest.skipIf(node_store_module.numpy is None, "NumPy not installed")
+    def test_types_in_use(self):
+        """
+        Test that the types of the nodes in use are found through the record
+        array, and that it matches the written nodes
+        """
+        node_store = NodeStore(self.SETTINGS)
+
+        node_store.write_items([Node(1, True, 0, 0, 1), Node(2, True, 0, 0, 2),
+                                Node(4, True, 0, 0, 1), Node(5, True, 0, 0, 2),
+                                Node(6, True, 0, 0, 1)])
+        node_store.delete_item_at_index(6)
+
+        records = node_store.record_array()
+        self.assertEquals(len(records), 6)
+        self.assertEquals(records[5]["nodeType"], 2)
+        self.assertEquals(node_store.types_in_use(),
+                          [(1, 1), (2, 2), (1, 4), (2, 5)])
+
+class TestNodeStoreMemoryMappedMethods(TestNodeStoreMethods):
+    """
+    Runs the NodeStore tests with the store files accessed through mmap
+    """
+    SETTINGS = {"MEMORY_MAPPED": True}
+
+
+class TestNodeStorePreallocatedMethods(TestNodeStoreMethods):
+    """
+    Runs the NodeStore tests with the store files grown in extents
+    """
+    SETTINGS = {"PREALLOCATE_RECORDS": 4}
+
+    def test_preallocation(self):
+        """
+        Test that the file is grown by whole extents while the record count
+        only covers the written records, and that the unused records are
+        truncated on close and dropped when reopening after a crash
+        """
+        node_store = NodeStore(self.SETTINGS)
+        file_path = node_store.storeFile.name
+
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        node_store.storeFile.flush()
+        self.assertEquals(node_store.get_last_file_index(), 2)
+        self.assertEquals(os.path.getsize(file_path),
+                          4 * NodeStore.RECORD_SIZE)
+        self.assertEquals(node_store.item_at_index(3), EOF)
+        self.assertEquals(len(node_store.items_in_range(1, 4)), 1)
+
+        # The preallocated records are not counted when the file is reopened
+        # before being closed (e.g. after a crash)
+        self.assertEquals(NodeStore(self.SETTINGS).get_last_file_index(), 2)
+
+        del node_store
+        self.assertEquals(os.path.getsize(file_path),
+                          2 * NodeStore.RECORD_SIZE)
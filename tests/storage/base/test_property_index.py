@@ -0,0 +1,104 @@
+import unittest
+
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.property import Property
+from graphene.storage.base.property_index import PropertyIndex
+
+
+class TestPropertyIndexMethods(unittest.TestCase):
+    def setUp(self):
+        GrapheneStore.TESTING = True
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_new_index(self):
+        """
+        Test that a new index is empty and has to be built
+        """
+        prop_index = PropertyIndex(1, 1, Property.PropertyType.int)
+        self.assertFalse(prop_index.clean)
+        self.assertEquals(len(prop_index), 0)
+        self.assertEquals(prop_index.lookup("=", 1), [])
+
+    def test_lookup(self):
+        """
+        Test that equality and range lookups return the matching nodes in
+        order, and that removed entries are no longer found
+        """
+        prop_index = PropertyIndex(1, 1, Property.PropertyType.int)
+        # (value, node index)
+        for value, node_index in [(5, 1), (3, 2), (5, 3), (1, 4), (7, 5)]:
+            prop_index.add(value, node_index)
+        self.assertEquals(prop_index.lookup("=", 5), [1, 3])
+        self.assertEquals(prop_index.lookup("<", 5), [2, 4])
+        self.assertEquals(prop_index.lookup("<=", 5), [1, 2, 3, 4])
+        self.assertEquals(prop_index.lookup(">", 5), [5])
+        self.assertEquals(prop_index.lookup(">=", 5), [1, 3, 5])
+        self.assertEquals(prop_index.lookup("=", 4), [])
+        self.assertEquals(prop_index.count(">", 1), 4)
+        self.assertEquals(prop_index.lookup_all([(">", 1), ("<=", 5)]),
+                          [1, 2, 3])
+        self.assertEquals(prop_index.count_all([(">", 5), ("<", 3)]), 0)
+        with self.assertRaises(ValueError):
+            prop_index.lookup("!=", 5)
+
+        prop_index.remove(5, 1)
+        # Not indexed with this value
+        prop_index.remove(3, 5)
+        self.assertEquals(prop_index.lookup("=", 5), [3])
+        self.assertEquals(prop_index.lookup(">", 1), [2, 3, 5])
+
+    def test_buckets(self):
+        """
+        Test that entries are split into buckets as they are inserted, and
+        that lookups and removals span the buckets
+        """
+        prop_index = PropertyIndex(1, 1, Property.PropertyType.int)
+        prop_index.BUCKET_SIZE = 4
+        # Values 0 to 9, each held by 3 nodes, inserted out of order
+        entries = [(node_index % 10, node_index) for node_index in range(30)]
+        for value, node_index in reversed(entries):
+            prop_index.add(value, node_index)
+        self.assertTrue(len(prop_index.buckets) > 3)
+        self.assertTrue(all(len(bucket) < 8 for bucket in prop_index.buckets))
+        self.assertEquals(list(prop_index.entries(0, 30)), sorted(entries))
+        self.assertEquals(prop_index.lookup("=", 4), [4, 14, 24])
+        self.assertEquals(prop_index.count(">=", 2), 24)
+        self.assertEquals(prop_index.lookup_all([(">", 2), ("<", 5)]),
+                          [3, 4, 13, 14, 23, 24])
+
+        for value, node_index in entries[:25]:
+            prop_index.remove(value, node_index)
+        self.assertEquals(len(prop_index), 5)
+        self.assertEquals(len(prop_index.buckets), len(prop_index.maxes))
+        self.assertEquals(prop_index.lookup(">=", 0), [25, 26, 27, 28, 29])
+
+    def test_flush_read(self):
+        """
+        Test that a flushed index of strings is read back as clean, and that
+        an index changed since its last flush is not
+        """
+        prop_index = PropertyIndex(1, 2, Property.PropertyType.string)
+        prop_index.rebuild([("b", 1), (u"\xe9t\xe9", 2), ("", 3), ("b", 4)])
+        prop_index.flush()
+
+        reopened = PropertyIndex(1, 2, Property.PropertyType.string)
+        self.assertTrue(reopened.clean)
+        self.assertEquals([value for value, _ in reopened.entries(0, 4)],
+                          ["", "b", "b", u"\xe9t\xe9"])
+        self.assertEquals(reopened.lookup("=", "b"), [1, 4])
+        self.assertEquals(reopened.lookup(">", "b"), [2])
+
+        # Crash after a change
+        prop_index.add("a", 5)
+        self.assertFalse(
+            PropertyIndex(1, 2, Property.PropertyType.string).clean)
+        prop_index.flush()
+        self.assertEquals(
+            PropertyIndex(1, 2, Property.PropertyType.string).lookup("<", "b"),
+            [3, 5])
@@ -263,6 +263,37 @@ class TestPropertyStoreMethods(unittest.TestCase):
         # Assert that the values are the same
         self.assertEquals(db_property, db_property_file)
 
+    def test_write_read_inline(self):
+        """
+        Tests that strings and arrays stored inline are the same when read
+        """
+        property_store = PropertyStore()
+        values = [(Property.PropertyType.string, u""),
+                  (Property.PropertyType.string, u"\xe9t\xe9 NY"),
+                  (Property.PropertyType.intArray, [1, -2]),
+                  (Property.PropertyType.boolArray, [True, False, True]),
+                  (Property.PropertyType.charArray, [u"a", unichr(57344)]),
+                  (Property.PropertyType.doubleArray, [5e-324]),
+                  (Property.PropertyType.longArray, [])]
+        for i, (prop_type, value) in enumerate(values):
+            self.assertTrue(PropertyStore.fits_inline(prop_type, value))
+            db_property = Property(i + 1, True, prop_type, 2, 3, 4, value,
+                                   True)
+            property_store.write_item(db_property)
+            self.assertEquals(property_store.item_at_index(i + 1), db_property)
+
+        # Values that do not fit
+        self.assertFalse(PropertyStore.fits_inline(
+            Property.PropertyType.string, u"\xe9t\xe9 NYC"))
+        self.assertFalse(PropertyStore.fits_inline(
+            Property.PropertyType.string, u"a\x00b"))
+        self.assertFalse(PropertyStore.fits_inline(
+            Property.PropertyType.intArray, [1, 2, 3]))
+        self.assertFalse(PropertyStore.fits_inline(
+            Property.PropertyType.boolArray, [True] * 4))
+        self.assertFalse(PropertyStore.fits_inline(
+            Property.PropertyType.stringArray, []))
+
     def test_write_read_2_properties(self):
         """
         Tests when 2 properties are written after 1 property
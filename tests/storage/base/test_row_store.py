@@ -0,0 +1,135 @@
+import unittest
+
+from graphene.storage.base.row_store import *
+
+
+class TestRowStoreMethods(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up the GrapheneStore so that it writes datafiles to the testing
+        directory
+        """
+        GrapheneStore.TESTING = True
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_empty_init(self):
+        """
+        Test that initializing an empty RowStore succeeds (file is opened
+        successfully)
+        """
+        try:
+            RowStore(1, 2)
+        except IOError:
+            self.fail("RowStore initializer failed: db file failed to open.")
+
+    def test_invalid_write(self):
+        """
+        Test that writing a row to offset 0, or with the wrong number of
+        properties, raises an error
+        """
+        row_store = RowStore(1, 1)
+
+        with self.assertRaises(ValueError):
+            row_store.write_item(Row(0, properties=[Property()]))
+        with self.assertRaises(ValueError):
+            row_store.write_item(Row(1))
+
+    def test_write_read(self):
+        """
+        Tests that the row written to the RowStore is the same as the row read
+        """
+        row_store = RowStore(1, 4)
+
+        properties = [
+            Property(prop_type=Property.PropertyType.int, prop_block_id=-42),
+            Property(prop_type=Property.PropertyType.double,
+                     prop_block_id=1.5),
+            Property(prop_type=Property.PropertyType.string,
+                     prop_block_id=7),
+            Property(prop_type=Property.PropertyType.intArray,
+                     prop_block_id=[1, 2], inline=True),
+        ]
+        row = Row(2, properties=properties)
+        row_store.write_item(row)
+
+        self.assertEquals(row_store.item_at_index(2), row)
+        # The row before it was never written
+        self.assertIsNone(row_store.item_at_index(1))
+
+    def test_delete(self):
+        """
+        Tests that deleted rows are read back as None
+        """
+        row_store = RowStore(1, 1)
+
+        for index in (1, 2):
+            row_store.write_item(Row(index, properties=[
+                Property(prop_type=Property.PropertyType.bool,
+                         prop_block_id=True)]))
+        row_store.delete_item_at_index(1)
+        self.assertIsNone(row_store.item_at_index(1))
+        self.assertEquals(row_store.item_at_index(2).properties[0].propBlockId,
+                          True)
+
+    def test_set_columns(self):
+        """
+        Tests that changing the number of columns changes every row at the
+        same index, and that the store is reopened with the new record size
+        """
+        row_store = RowStore(1, 1)
+        for index in (1, 2, 3):
+            row_store.write_item(Row(index, properties=[
+                Property(prop_type=Property.PropertyType.int,
+                         prop_block_id=index)]))
+        row_store.delete_item_at_index(2)
+
+        char_prop = Property(prop_type=Property.PropertyType.char,
+                             prop_block_id=u"x")
+        row_store.set_columns(2, lambda props: props + [char_prop])
+        self.assertEquals(row_store.get_last_file_index(), 4)
+        self.assertIsNone(row_store.item_at_index(2))
+        row = row_store.item_at_index(3)
+        self.assertEquals([p.propBlockId for p in row.properties], [3, u"x"])
+        del row_store
+
+        row_store = RowStore(1, 2)
+        self.assertEquals(row_store.item_at_index(3), row)
+        self.assertFalse(os.path.isfile(
+            GrapheneStore().datafilesDir + row_store.filename + ".new"))
+
+    def test_set_columns_failure(self):
+        """
+        Tests that the rows are kept when changing them fails part way
+        """
+        row_store = RowStore(1, 1)
+        for index in (1, 2):
+            row_store.write_item(Row(index, properties=[
+                Property(prop_type=Property.PropertyType.int,
+                         prop_block_id=index)]))
+
+        def change(props):
+            if props[0].propBlockId == 2:
+                raise ValueError("Cannot change the row")
+            return props + props
+        with self.assertRaises(ValueError):
+            row_store.set_columns(2, change)
+        self.assertEquals(row_store.columns, 1)
+        self.assertEquals(
+            row_store.item_at_index(2).properties[0].propBlockId, 2)
+
+    def test_clear(self):
+        """
+        Tests that clearing the store removes every row
+        """
+        row_store = RowStore(1, 1)
+        row_store.write_item(Row(1, properties=[
+            Property(prop_type=Property.PropertyType.int, prop_block_id=1)]))
+        row_store.clear()
+        self.assertEquals(row_store.get_last_file_index(), 1)
+        self.assertEquals(row_store.item_at_index(1), GeneralStore.EOF)
@@ -0,0 +1,125 @@
+import unittest
+
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.statistics import Statistics
+
+
+class TestStatisticsMethods(unittest.TestCase):
+    def setUp(self):
+        GrapheneStore.TESTING = True
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_summarize_values(self):
+        """
+        Test that values are summarized with their distinct count and an
+        equi-depth histogram spanning their range
+        """
+        summary = Statistics.summarize_values(range(100) * 2)
+        self.assertEquals(summary["distinct"], 100)
+        bounds = summary["histogram"]
+        self.assertEquals(len(bounds), Statistics.HISTOGRAM_BUCKETS + 1)
+        self.assertEquals(bounds, sorted(bounds))
+        self.assertEquals((bounds[0], bounds[-1]), (0, 99))
+        self.assertEquals(Statistics.summarize_values([])["histogram"], [])
+        # Strings are kept as unicode
+        self.assertEquals(
+            Statistics.summarize_values(["b", "a"])["histogram"][0], u"a")
+
+    def test_selectivity(self):
+        """
+        Test that the selectivity of comparisons is estimated from the
+        histogram and distinct count
+        """
+        summary = Statistics.summarize_values(range(1000))
+        self.assertAlmostEquals(Statistics.selectivity(summary, "=", 5), 0.001)
+        self.assertEquals(Statistics.selectivity(summary, "=", 5000), 0)
+        self.assertAlmostEquals(Statistics.selectivity(summary, "<", 250),
+                                0.25, places=2)
+        self.assertAlmostEquals(Statistics.selectivity(summary, ">=", 900),
+                                0.1, places=2)
+        self.assertEquals(Statistics.selectivity(summary, "<", -1), 0)
+        self.assertEquals(Statistics.selectivity(summary, "<=", 5000), 1)
+        self.assertIsNone(Statistics.selectivity(summary, "~", 1))
+        summary = Statistics.summarize_values(["a", "b", "c", "d"])
+        self.assertAlmostEquals(Statistics.selectivity(summary, "!=", "b"),
+                                0.75)
+
+    def test_degrees(self):
+        """
+        Test that degree distributions follow the degrees of the nodes and
+        give an equi-depth histogram of the degrees
+        """
+        stats = Statistics("test.statistics.db")
+        degrees = [1] * 10 + [2] * 5 + [50]
+        stats.set(False, 1, {"count": sum(degrees), "properties": {},
+                             Statistics.OUT_DEGREE:
+                                 Statistics.summarize_degrees(degrees),
+                             Statistics.IN_DEGREE:
+                                 Statistics.summarize_degrees([])})
+        distribution = stats.get(False, 1)[Statistics.OUT_DEGREE]
+        self.assertEquals(distribution["max"], 50)
+        self.assertEquals(Statistics.degree_histogram(distribution),
+                          Statistics.histogram(sorted(degrees)))
+
+        # The node of degree 50 loses a relationship, a new node gets one
+        stats.remove_degree(1, Statistics.OUT_DEGREE, 49)
+        stats.add_degree(1, Statistics.OUT_DEGREE, 1)
+        self.assertEquals(distribution["counts"], {1: 11, 2: 5, 49: 1})
+        self.assertEquals(distribution["nodes"], 17)
+        self.assertEquals(distribution["max"], 49)
+        # A node of degree 1 loses its only relationship
+        stats.remove_degree(1, Statistics.OUT_DEGREE, 0)
+        self.assertEquals(distribution["nodes"], 16)
+        self.assertEquals(Statistics.degree_histogram(distribution),
+                          Statistics.histogram([1] * 10 + [2] * 5 + [49]))
+        in_distribution = stats.get(False, 1)[Statistics.IN_DEGREE]
+        self.assertEquals(Statistics.degree_histogram(in_distribution), [])
+
+    def test_persistence(self):
+        """
+        Test that statistics and their incremental updates are written to the
+        file and read back
+        """
+        stats = Statistics("test.statistics.db")
+        stats.set(True, 1, {"count": 2,
+                            "properties": {3: Statistics.summarize_values(
+                                ["x", "y"])}})
+        stats.set(False, 1, {"count": 1, "properties": {},
+                             Statistics.OUT_DEGREE:
+                                 Statistics.summarize_degrees([1]),
+                             Statistics.IN_DEGREE:
+                                 Statistics.summarize_degrees([1])})
+        stats.add_item(True, 1)
+        stats.add_item(False, 1)
+        stats.add_degree(1, Statistics.OUT_DEGREE, 2)
+        stats.add_degree(1, Statistics.IN_DEGREE, 1)
+        # Types that were not analyzed are ignored
+        stats.add_item(True, 2)
+        del stats
+
+        stats = Statistics("test.statistics.db")
+        self.assertEquals(stats.get(True, 1)["count"], 3)
+        self.assertEquals(stats.get(True, 1)["properties"][3]["histogram"],
+                          [u"x", u"y", u"y"])
+        self.assertIsNone(stats.get(True, 2))
+        rel_stats = stats.get(False, 1)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["nodes"], 1)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["max"], 2)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["counts"], {2: 1})
+        self.assertEquals(rel_stats[Statistics.IN_DEGREE]["nodes"], 2)
+        self.assertEquals(rel_stats[Statistics.IN_DEGREE]["counts"], {1: 2})
+        self.assertEquals(Statistics.mean_degree(rel_stats,
+                                                 Statistics.OUT_DEGREE), 2)
+
+        stats.drop_property(True, 1, 3)
+        stats.drop_type(False, 1)
+        del stats
+        stats = Statistics("test.statistics.db")
+        self.assertEquals(stats.get(True, 1)["properties"], {})
+        self.assertIsNone(stats.get(False, 1))
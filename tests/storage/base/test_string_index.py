@@ -0,0 +1,71 @@
+import unittest
+
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.string_index import StringIndex
+
+
+class TestStringIndexMethods(unittest.TestCase):
+    TEST_FILENAME = "graphenestore.test.stringindex.db"
+
+    def setUp(self):
+        GrapheneStore.TESTING = True
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_new_index(self):
+        """
+        Test that a new index is empty and has to be built
+        """
+        string_index = StringIndex(self.TEST_FILENAME)
+        self.assertFalse(string_index.clean)
+        self.assertEquals(string_index.get_indexes(1), [])
+        self.assertEquals(string_index.get_references(1), 0)
+
+    def test_add_remove(self):
+        """
+        Test that strings with the same hash are kept apart, and that the
+        references to them are counted
+        """
+        string_index = StringIndex(self.TEST_FILENAME)
+        string_index.add(7, 1)
+        string_index.add(7, 4)
+        string_index.add(8, 6, 2)
+        self.assertEquals(string_index.get_indexes(7), [1, 4])
+        self.assertEquals(string_index.get_references(6), 2)
+
+        string_index.add_reference(1)
+        self.assertEquals(string_index.remove_reference(1), 1)
+        self.assertEquals(string_index.remove_reference(9), 0)
+
+        self.assertEquals(string_index.remove(1), 1)
+        self.assertEquals(string_index.remove(1), 0)
+        self.assertEquals(string_index.get_indexes(7), [4])
+        # A string that is rewritten with another hash moves
+        string_index.add(8, 4)
+        self.assertEquals(string_index.get_indexes(7), [])
+        self.assertEquals(string_index.get_indexes(8), [6, 4])
+
+    def test_flush_read(self):
+        """
+        Test that a flushed index is read back as clean, and that an index
+        changed after being flushed is not
+        """
+        string_index = StringIndex(self.TEST_FILENAME)
+        string_index.rebuild([(7, 1, 1), (7, 4, 3), (8, 6, 1)])
+        del string_index
+
+        string_index = StringIndex(self.TEST_FILENAME)
+        self.assertTrue(string_index.clean)
+        self.assertEquals(string_index.get_indexes(7), [1, 4])
+        self.assertEquals(string_index.get_references(4), 3)
+
+        # Crash after a change: the file is left marked as not clean
+        string_index.remove(6)
+        string_index.dirty = False
+        del string_index
+        self.assertFalse(StringIndex(self.TEST_FILENAME).clean)
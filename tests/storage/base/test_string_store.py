@@ -83,6 +83,20 @@ class TestStringStoreMethods(unittest.TestCase):
         with self.assertRaises(ValueError):
             name_store.write_item(long_name)
 
+    def test_invalid_length_write_items(self):
+        """
+        Test that writing several strings raises an error when one of them
+        is longer than blockSize, before anything is written
+        """
+        block_size = 20
+        name_store = StringStore(self.TEST_FILENAME, block_size)
+
+        name = String(1, True, 0, 1, 0, "a")
+        long_name = String(2, True, 0, 1, 0, (block_size + 1) * "a")
+        with self.assertRaises(ValueError):
+            name_store.write_items([name, long_name])
+        self.assertEquals(name_store.item_at_index(1), EOF)
+
     def test_write_read_1_name(self):
         """
         Tests that the name written to the StringStore is the name that is read.
@@ -0,0 +1,90 @@
+import unittest
+
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.type_index import TypeIndex
+
+
+class TestTypeIndexMethods(unittest.TestCase):
+    TEST_FILENAME = "graphenestore.test.typeindex.db"
+
+    def setUp(self):
+        GrapheneStore.TESTING = True
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_new_index(self):
+        """
+        Test that a new index is empty and has to be built
+        """
+        type_index = TypeIndex(self.TEST_FILENAME)
+        self.assertFalse(type_index.clean)
+        self.assertEquals(type_index.get_items(1), [])
+        self.assertEquals(type_index.count(1), 0)
+
+    def test_add_remove(self):
+        """
+        Test that items are kept sorted per type, without duplicates
+        """
+        type_index = TypeIndex(self.TEST_FILENAME)
+        for type_id, index in [(1, 5), (2, 3), (1, 2), (1, 9), (1, 5)]:
+            type_index.add(type_id, index)
+        self.assertEquals(type_index.get_items(1), [2, 5, 9])
+        self.assertEquals(type_index.get_items(2), [3])
+
+        type_index.remove(1, 5)
+        type_index.remove(1, 7)
+        type_index.remove(3, 1)
+        self.assertEquals(type_index.get_items(1), [2, 9])
+        self.assertEquals(type_index.count(1), 2)
+
+        type_index.drop_type(1)
+        self.assertEquals(type_index.get_items(1), [])
+        self.assertEquals(type_index.get_items(2), [3])
+
+    def test_flush_read(self):
+        """
+        Test that a flushed index is read back as clean, and that an index
+        changed since its last flush is not
+        """
+        type_index = TypeIndex(self.TEST_FILENAME)
+        type_index.rebuild([(1, 4), (2, 1), (1, 3)])
+        type_index.flush()
+
+        reopened = TypeIndex(self.TEST_FILENAME)
+        self.assertTrue(reopened.clean)
+        self.assertEquals(reopened.get_items(1), [3, 4])
+        self.assertEquals(reopened.get_items(2), [1])
+
+        # Crash after a change
+        type_index.add(2, 7)
+        self.assertFalse(TypeIndex(self.TEST_FILENAME).clean)
+        type_index.flush()
+        self.assertEquals(TypeIndex(self.TEST_FILENAME).get_items(2), [1, 7])
+
+    def test_logged(self):
+        """
+        Test that a logged index is only written when the log is checkpointed,
+        and is only clean once its data is on disk
+        """
+        type_index = TypeIndex(self.TEST_FILENAME, logged=True)
+        type_index.rebuild([(1, 4)])
+        type_index.flush()
+
+        # The file keeps the index as of the last checkpoint
+        type_index.add(1, 6)
+        reopened = TypeIndex(self.TEST_FILENAME, logged=True)
+        self.assertTrue(reopened.clean)
+        self.assertEquals(reopened.get_items(1), [4])
+
+        # Crash between writing the index and emptying the log
+        type_index.write()
+        self.assertFalse(TypeIndex(self.TEST_FILENAME, logged=True).clean)
+        type_index.mark_clean()
+        reopened = TypeIndex(self.TEST_FILENAME, logged=True)
+        self.assertTrue(reopened.clean)
+        self.assertEquals(reopened.get_items(1), [4, 6])
@@ -0,0 +1,271 @@
+import os
+import time
+import unittest
+
+from graphene.storage.base.general_store import GeneralStore
+from graphene.storage.base.graphene_store import GrapheneStore
+from graphene.storage.base.node import Node
+from graphene.storage.base.node_store import NodeStore
+from graphene.storage.base.write_ahead_log import WriteAheadLog
+
+
+class TestWriteAheadLogMethods(unittest.TestCase):
+    TEST_FILENAME = "graphenestore.test.wal"
+
+    def setUp(self):
+        GrapheneStore.TESTING = True
+        self.wal = WriteAheadLog(self.TEST_FILENAME, WriteAheadLog.ALWAYS)
+        GeneralStore.WAL = self.wal
+
+    def tearDown(self):
+        """
+        Clean the database so that the tests are independent of one another
+        """
+        GeneralStore.WAL = None
+        graphene_store = GrapheneStore()
+        graphene_store.remove_test_datafiles()
+
+    def test_records(self):
+        """
+        Test that writes and truncations are logged with the data they
+        replace, followed by a commit record
+        """
+        node_store = NodeStore()
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        self.wal.begin()
+        node_store.write_item(Node(1, True, 2, 2, 2))
+        node_store.truncate_file()
+        self.wal.commit()
+
+        records = self.wal.read_records()
+        self.assertEquals([r[0] for r in records],
+                          [WriteAheadLog.WRITE, WriteAheadLog.COMMIT,
+                           WriteAheadLog.WRITE, WriteAheadLog.TRUNCATE,
+                           WriteAheadLog.COMMIT])
+        # Every record of the transaction has the same ID
+        self.assertEquals(len(set(r[1] for r in records[2:])), 1)
+        _, _, filename, old_size, offset, old_data, new_data = records[2]
+        self.assertEquals(filename, NodeStore.FILE_NAME)
+        self.assertEquals(offset, NodeStore.RECORD_SIZE)
+        self.assertEquals(old_data, NodeStore.STRUCT.pack(True, 1, 1, 1))
+        self.assertEquals(new_data, NodeStore.STRUCT.pack(True, 2, 2, 2))
+        # The truncation keeps the truncated record
+        self.assertEquals(records[3][5], new_data)
+
+    def test_replay(self):
+        """
+        Test that replaying redoes the committed writes that did not reach the
+        store file and undoes the writes of an unfinished transaction
+        """
+        node_store = NodeStore()
+        path = node_store.storeFile.name
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        self.wal.begin()
+        node_store.write_item(Node(1, True, 2, 2, 2))
+        node_store.write_item(Node(2, True, 3, 3, 3))
+        # Crash before the transaction commits, with the first write lost
+        node_store.storeFile.flush()
+        with open(path, "r+b") as f:
+            f.seek(NodeStore.RECORD_SIZE)
+            f.write(NodeStore.STRUCT.pack(False, 0, 0, 0))
+        self.wal.logFile.flush()
+        GeneralStore.WAL = None
+
+        wal = WriteAheadLog(self.TEST_FILENAME)
+        self.assertEquals(wal.replay(), 1)
+        self.assertEquals(wal.read_records(), [])
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertEquals(data, NodeStore.STRUCT.pack(False, 0, 0, 0) +
+                          NodeStore.STRUCT.pack(True, 1, 1, 1))
+
+    def test_torn_record(self):
+        """
+        Test that a record cut short by a crash, and the records after it,
+        are ignored
+        """
+        node_store = NodeStore()
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        node_store.write_item(Node(2, True, 2, 2, 2))
+        self.wal.logFile.flush()
+        size = os.path.getsize(self.wal.logFile.name)
+        self.wal.logFile.truncate(size - 1)
+
+        records = self.wal.read_records()
+        self.assertEquals([r[0] for r in records],
+                          [WriteAheadLog.WRITE, WriteAheadLog.COMMIT,
+                           WriteAheadLog.WRITE])
+
+    def test_checkpoint(self):
+        """
+        Test that the log is emptied once it grows past the checkpoint size
+        """
+        self.wal.CHECKPOINT_SIZE = 200
+        node_store = NodeStore()
+        for i in range(1, 5):
+            node_store.write_item(Node(i, True, i, i, i))
+            self.assertTrue(self.wal.logFile.tell() < 200)
+        self.assertTrue(len(self.wal.read_records()) < 8)
+
+    def test_group_commit(self):
+        """
+        Test that in group mode, the log is synced by the group commit thread
+        when no commit syncs it, and that the thread stops with the log
+        """
+        wal = WriteAheadLog(self.TEST_FILENAME, WriteAheadLog.GROUP)
+        GeneralStore.WAL = wal
+        wal.GROUP_COMMIT_INTERVAL = 0.01
+        wal.lastSync = time.time() + 60
+        NodeStore().write_item(Node(1, True, 1, 1, 1))
+        deadline = time.time() + 5
+        while wal.unsyncedRecords > 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEquals(wal.unsyncedRecords, 0)
+        wal.close()
+        self.assertFalse(wal.thread.is_alive())
+
+    def test_sync_before_write(self):
+        """
+        Test that in always mode, the log is synced to disk before the store
+        write it describes is applied
+        """
+        node_store = NodeStore()
+        sizes = []
+        sync = self.wal.sync
+
+        def record_sync():
+            sizes.append(node_store.get_file_size())
+            sync()
+
+        self.wal.sync = record_sync
+        self.wal.begin()
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        # The record was synced while the store only held its first record
+        self.assertEquals(sizes, [NodeStore.RECORD_SIZE])
+        self.wal.commit()
+        self.assertEquals(len(sizes), 2)
+
+    def replace_node_store(self, node_store, records):
+        """
+        Replaces the file of the node store with a file of the given records
+        """
+        new_filename = NodeStore.FILE_NAME + ".new"
+        with open(self.wal.datafilesDir + new_filename, "wb") as new_file:
+            new_file.write(node_store.empty_struct_data() + "".join(
+                NodeStore.STRUCT.pack(*record) for record in records))
+        node_store.replace_file(new_filename)
+
+    def test_replace_file(self):
+        """
+        Test that replaying a committed file replacement finishes it without
+        redoing the changes logged before it
+        """
+        node_store = NodeStore()
+        path = node_store.storeFile.name
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        self.wal.begin()
+        node_store.write_item(Node(1, True, 2, 2, 2))
+        self.replace_node_store(node_store, [(True, 3, 3, 3)])
+        node_store.write_item(Node(2, True, 4, 4, 4))
+        self.wal.commit()
+        backups = self.wal.backups
+        self.assertEquals(len(backups), 1)
+        # Crash before the checkpoint, with the replacement undone on disk
+        node_store.storeFile.flush()
+        os.rename(path, path + ".new")
+        os.rename(backups[0], path)
+        GeneralStore.WAL = None
+
+        wal = WriteAheadLog(self.TEST_FILENAME)
+        self.assertEquals(wal.replay(), 2)
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertEquals(data, NodeStore.STRUCT.pack(False, 0, 0, 0) +
+                          NodeStore.STRUCT.pack(True, 3, 3, 3) +
+                          NodeStore.STRUCT.pack(True, 4, 4, 4))
+        self.assertFalse(os.path.isfile(backups[0]))
+
+    def test_replace_file_unfinished(self):
+        """
+        Test that replaying an unfinished file replacement puts the replaced
+        file back and undoes the changes logged before it
+        """
+        node_store = NodeStore()
+        path = node_store.storeFile.name
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        self.wal.begin()
+        node_store.write_item(Node(1, True, 2, 2, 2))
+        self.replace_node_store(node_store, [(True, 3, 3, 3)])
+        node_store.write_item(Node(2, True, 4, 4, 4))
+        backups = self.wal.backups
+        # Crash before the transaction commits
+        node_store.storeFile.flush()
+        GeneralStore.WAL = None
+
+        wal = WriteAheadLog(self.TEST_FILENAME)
+        self.assertEquals(wal.replay(), 1)
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertEquals(data, NodeStore.STRUCT.pack(False, 0, 0, 0) +
+                          NodeStore.STRUCT.pack(True, 1, 1, 1))
+        self.assertFalse(os.path.isfile(backups[0]))
+        self.assertFalse(os.path.isfile(path + ".new"))
+
+    def test_checkpoint_removes_backups(self):
+        """
+        Test that the files replaced since the last checkpoint are removed by
+        the checkpoint
+        """
+        node_store = NodeStore()
+        self.replace_node_store(node_store, [(True, 3, 3, 3)])
+        backup = self.wal.backups[0]
+        self.assertTrue(os.path.isfile(backup))
+        with GeneralStore.IO_LOCK:
+            self.wal.checkpoint()
+        self.assertFalse(os.path.isfile(backup))
+        self.assertEquals(node_store.item_at_index(1), Node(1, True, 3, 3, 3))
+
+    def test_checkpoint_handlers(self):
+        """
+        Test that the checkpoint handlers are called before and after the log
+        is emptied
+        """
+        calls = []
+        self.wal.add_checkpoint_handler(
+            lambda emptied: calls.append((emptied,
+                                          len(self.wal.read_records()))))
+        NodeStore().write_item(Node(1, True, 1, 1, 1))
+        with GeneralStore.IO_LOCK:
+            self.wal.checkpoint()
+        self.assertEquals(calls, [(False, 2), (True, 0)])
+
+    def test_before_images(self):
+        """
+        Test that the records replayed without a checkpoint give the contents
+        the changed records had at the last checkpoint
+        """
+        node_store = NodeStore()
+        node_store.write_item(Node(1, True, 1, 1, 1))
+        with GeneralStore.IO_LOCK:
+            self.wal.checkpoint()
+        node_store.write_item(Node(1, True, 2, 2, 2))
+        node_store.write_item(Node(2, True, 3, 3, 3))
+        node_store.delete_item(Node(2, True, 3, 3, 3))
+        node_store.write_item(Node(1, True, 4, 4, 4))
+        GeneralStore.WAL = None
+
+        wal = WriteAheadLog(self.TEST_FILENAME, WriteAheadLog.ALWAYS)
+        wal.replay(False)
+        # The records are kept until the next checkpoint
+        self.assertEquals(len(wal.read_records()), len(wal.replayed))
+        self.assertEquals(wal.changed_files(), set([NodeStore.FILE_NAME]))
+        # Node 2 did not exist at the checkpoint
+        self.assertEquals(
+            wal.before_images(NodeStore.FILE_NAME, NodeStore.RECORD_SIZE),
+            {1: NodeStore.STRUCT.pack(True, 1, 1, 1),
+             2: "\x00" * NodeStore.RECORD_SIZE})
+        with GeneralStore.IO_LOCK:
+            wal.checkpoint()
+        self.assertEquals(wal.changed_files(), set())
+        self.assertEquals(wal.read_records(), [])
+        wal.close()
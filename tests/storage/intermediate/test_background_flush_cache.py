@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+
+from graphene.storage.intermediate.background_flush_cache import \
+    BackgroundFlushCache
+
+
+class SlowStore(dict):
+    """
+    Dictionary store recording the thread that writes to it
+    """
+    def __init__(self, delay=0):
+        super(SlowStore, self).__init__()
+        self.delay = delay
+        self.writers = set()
+
+    def __setitem__(self, key, value):
+        time.sleep(self.delay)
+        self.writers.add(threading.current_thread().name)
+        super(SlowStore, self).__setitem__(key, value)
+
+
+class TestBackgroundFlushCacheMethods(unittest.TestCase):
+    def setUp(self):
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+
+    def create_cache(self, store, size=100):
+        cache = BackgroundFlushCache(store, size)
+        self.caches.append(cache)
+        return cache
+
+    def test_schedule_sync(self):
+        """
+        Test that scheduled syncs are written by the flusher thread
+        """
+        store = SlowStore()
+        cache = self.create_cache(store)
+        for i in range(10):
+            cache[i] = i * 2
+        # Entries are read from the cache before being written
+        self.assertEquals(cache[3], 6)
+        cache.schedule_sync()
+        cache.drain()
+        self.assertEquals(store, dict((i, i * 2) for i in range(10)))
+        self.assertEquals(store.writers, set(["BackgroundFlushCache"]))
+        self.assertEquals(len(cache.dirty), 0)
+
+    def test_interval(self):
+        """
+        Test that dirty entries are written after the flush interval even
+        when no sync is scheduled
+        """
+        store = SlowStore()
+        cache = self.create_cache(store)
+        cache[1] = "a"
+        deadline = time.time() + 5
+        while 1 not in store and time.time() < deadline:
+            time.sleep(cache.FLUSH_INTERVAL / 2)
+        self.assertEquals(store[1], "a")
+
+    def test_back_pressure(self):
+        """
+        Test that writers wait for the flusher once the high-water mark is
+        reached
+        """
+        store = SlowStore(delay=0.001)
+        cache = self.create_cache(store)
+        cache.HIGH_WATER_MARK = 4
+        for i in range(20):
+            cache[i] = i
+            self.assertTrue(len(cache.dirty) <= 4)
+        cache.drain()
+        self.assertEquals(len(store), 20)
+
+    def test_delete_and_close(self):
+        """
+        Test that deleted entries are removed from the store and that closing
+        the cache writes back the remaining entries
+        """
+        store = SlowStore()
+        cache = BackgroundFlushCache(store, 100)
+        cache[1] = "a"
+        cache[2] = "b"
+        del cache[1]
+        cache.close()
+        self.assertEquals(store, {2: "b"})
+        self.assertFalse(cache.thread.is_alive())
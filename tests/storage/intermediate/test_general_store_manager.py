@@ -108,6 +108,21 @@ class TestGeneralStoreManagerMethods(unittest.TestCase):
         # Make sure the ID store contains no IDs, they have been truncated
         self.assertIsNone(store_manager.idStore.get_all_ids())
 
+    def test_scan_items(self):
+        """
+        Test that scanning the store returns every item in order when the
+        items span several chunks
+        """
+        store_manager = GeneralStoreManager(self.TEST_STORE())
+        items = [store_manager.create_item() for _ in range(7)]
+        store_manager.delete_item(items[3])
+
+        scanned = list(store_manager.scan_items(chunk_size=3))
+        self.assertEquals(scanned, items[:3] + [None] + items[4:])
+        # Scanning can start after the first item
+        self.assertEquals(list(store_manager.scan_items(6, chunk_size=3)),
+                          items[5:])
+
     def test_get_indexes(self):
         """
         Test that get indexes returns the expected number of recycled IDs or
@@ -127,32 +142,75 @@ class TestGeneralStoreManagerMethods(unittest.TestCase):
         # Delete the item, the index should now be in the recycled IDs
         store_manager.delete_item_at_index(index1)
 
-        # Get two indexes, now one should be a recycled index i.e. 1, and the
-        # other should be the last file index
-        index_list = store_manager.get_indexes(2)
-        index1_new = index_list[0]
-        index2 = index_list[1]
-        # Check that the first index is the recycled one
-        self.assertEquals(index1, index1_new)
-        # And that the last index is the last file index
-        self.assertEquals(store_manager.store.get_last_file_index(), index2)
+        # Get two indexes, the single recycled index cannot hold both, so
+        # they should be the last file indexes
+        last_index = store_manager.store.get_last_file_index()
+        self.assertEquals(store_manager.get_indexes(2),
+                          [last_index, last_index + 1])
+        # A single index should be the recycled one
+        self.assertEquals(store_manager.get_indexes(1), [index1])
 
-        # Create and write two items with the indexes
-        store_manager.create_item(index1_new)
-        store_manager.create_item(index2)
-        # And a third without an index argument
-        store_manager.create_item()
-        # Delete the second item (second index)
-        store_manager.delete_item_at_index(index2)
+    def test_get_indexes_contiguous(self):
+        """
+        Test that get indexes returns a contiguous run of recycled IDs,
+        using the smallest run that fits
+        """
+        store_manager = GeneralStoreManager(self.TEST_STORE())
+        items = [store_manager.create_item() for _ in range(8)]
+        # Free a run of 3 IDs and a single ID
+        for item in items[1:4] + items[5:6]:
+            store_manager.delete_item(item)
+
+        # The single ID is used first, keeping the run for larger requests
+        self.assertEquals(store_manager.get_indexes(1), [items[5].index])
+        self.assertEquals(store_manager.get_indexes(3),
+                          [item.index for item in items[1:4]])
+        # No recycled IDs are left
+        last_index = store_manager.store.get_last_file_index()
+        self.assertEquals(store_manager.get_indexes(2),
+                          [last_index, last_index + 1])
 
-        # Now when we get 4 IDs, one should be the recycled second index, and
-        # the other 3 should be the last file index with 2 increments
-        index_list = store_manager.get_indexes(4)
+    def test_get_indexes_fragmented(self):
+        """
+        Test that get indexes gathers recycled IDs from several runs when no
+        run fits, and uses the last file indexes when too few are recycled
+        """
+        store_manager = GeneralStoreManager(self.TEST_STORE())
+        items = [store_manager.create_item() for _ in range(8)]
+        # Free three runs of 2 IDs
+        for item in items[0:2] + items[3:5] + items[6:8]:
+            store_manager.delete_item(item)
+
+        # No run holds 4 IDs, they are gathered from two of the runs
+        indexes = store_manager.get_indexes(4)
+        self.assertEquals(len(indexes), 4)
+        self.assertTrue(set(indexes) < set(i.index for i in items))
+        # Only 2 recycled IDs are left, the last file indexes are used
         last_index = store_manager.store.get_last_file_index()
-        self.assertEquals(index_list[0], index2)
-        self.assertEquals(index_list[1], last_index)
-        self.assertEquals(index_list[2], last_index + 1)
-        self.assertEquals(index_list[3], last_index + 2)
+        self.assertEquals(store_manager.get_indexes(3),
+                          [last_index, last_index + 1, last_index + 2])
+        self.assertEquals(len(store_manager.get_indexes(2)), 2)
+        self.assertEquals(store_manager.idStore.available, 0)
+
+    def test_prune_ids(self):
+        """
+        Test that recycled IDs that were handed out since the ID file was last
+        written are dropped when the store is reopened
+        """
+        store_manager = GeneralStoreManager(self.TEST_STORE())
+        items = [store_manager.create_item() for _ in range(4)]
+        store_manager.delete_item(items[0])
+        store_manager.delete_item(items[1])
+        store_manager.idStore.flush()
+        # Reuse one of the IDs without writing the ID file again
+        index = store_manager.get_indexes()[0]
+        store_manager.create_item(index)
+        store_manager.store.storeFile.flush()
+
+        # Only the ID that is still free is recycled when reopening
+        reopened = GeneralStoreManager(self.TEST_STORE())
+        self.assertEquals(reopened.idStore.get_all_ids(),
+                          [i.index for i in items[:2] if i.index != index])
 
     def test_truncate_amount(self):
         """
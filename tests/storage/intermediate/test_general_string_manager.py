@@ -435,6 +435,53 @@ class TestGeneralNameManagerMethods(unittest.TestCase):
         name_manager.update_string_at_index(name_index2, name2_u)
         self.assertEquals(name2_u, name_manager.read_string_at_index(name_index2))
 
+    def test_hash_index(self):
+        """
+        Test that strings are found through the hash index, which follows the
+        writes, updates and deletes and is read back when the file is reopened
+        """
+        string_manager = GeneralStringManager(self.TEST_FILENAME,
+                                              self.TEST_BLOCK_SIZE, True)
+        index1 = string_manager.write_string(u"ø" * 25)
+        index2 = string_manager.write_string(u"abc")
+        self.assertEquals(string_manager.find_string(u"ø" * 25), index1)
+        self.assertEquals(string_manager.find_strings([u"abc", u"d"]),
+                          [index2, 0])
+
+        string_manager.update_string_at_index(index1, u"d")
+        self.assertIsNone(string_manager.find_string(u"ø" * 25))
+        string_manager.delete_string_at_index(index2)
+        self.assertIsNone(string_manager.find_string(u"abc"))
+        del string_manager
+
+        string_manager = GeneralStringManager(self.TEST_FILENAME,
+                                              self.TEST_BLOCK_SIZE, True)
+        self.assertTrue(string_manager.hashIndex.clean)
+        self.assertEquals(string_manager.find_string(u"d"), index1)
+
+    def test_deduplicate(self):
+        """
+        Test that equal strings are shared until their last reference is
+        deleted, and that updating a shared string leaves it as is
+        """
+        string_manager = GeneralStringManager(self.TEST_FILENAME,
+                                              self.TEST_BLOCK_SIZE, True, True)
+        index = string_manager.write_string(u"é" * 15)
+        self.assertEquals(string_manager.write_string(u"é" * 15), index)
+        self.assertEquals(string_manager.write_string(u"é" * 15), index)
+
+        new_index = string_manager.update_string_at_index(index, u"f")
+        self.assertNotEquals(new_index, index)
+        self.assertEquals(string_manager.read_string_at_index(index),
+                          u"é" * 15)
+        self.assertEquals(string_manager.read_string_at_index(new_index), u"f")
+
+        self.assertTrue(string_manager.delete_string_at_index(index))
+        self.assertEquals(string_manager.read_string_at_index(index),
+                          u"é" * 15)
+        self.assertTrue(string_manager.delete_string_at_index(index))
+        self.assertIsNone(string_manager.find_string(u"é" * 15))
+
     @classmethod
     def random_length(cls):
         """
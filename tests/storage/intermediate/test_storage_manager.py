@@ -1,3 +1,4 @@
+import os
 import unittest
 
 from graphene.errors.storage_manager_errors import *
@@ -6,14 +7,22 @@ from graphene.storage import (StorageManager, GrapheneStore, Property,
                               Relationship, Node)
 from graphene.storage.intermediate.node_property import NodeProperty
 from graphene.storage.intermediate.relation_property import RelationProperty
-from graphene.storage.base.general_store import EOF
+from graphene.storage.base.general_store import EOF, GeneralStore
+from graphene.storage.base.buffer_pool import BufferPool
+from graphene.storage.base.node_store import NodeStore
+from graphene.storage.base.row_store import RowStore
+from graphene.storage.base.write_ahead_log import WriteAheadLog
+from graphene.storage.base.adjacency_index import AdjacencyIndex
+from graphene.storage.base.statistics import Statistics
 
 class TestStorageManagerMethods(unittest.TestCase):
     def setUp(self):
         GrapheneStore.TESTING = True
         graphene_store = GrapheneStore()
         graphene_store.remove_test_datafiles()
-        self.sm = StorageManager()
+        # Settings of every storage manager opened by the test
+        self.settings = self.storage_settings()
+        self.sm = StorageManager(self.settings)
 
     def tearDown(self):
         """
@@ -21,6 +30,13 @@ class TestStorageManagerMethods(unittest.TestCase):
         """
         self.sm.close()
 
+    def storage_settings(self):
+        """
+        Settings of the storage managers of a test (see
+        StorageManager.SETTINGS), overridden to run the tests with others
+        """
+        return {}
+
     def assertIsNoneOrEOF(self, item):
         """
         Since values at the end of a file are still nonexistent, both None and
@@ -28,6 +44,23 @@ class TestStorageManagerMethods(unittest.TestCase):
         """
         self.assertTrue(item is None or item is EOF)
 
+    def test_settings(self):
+        """
+        Test that settings are only used by the storage manager they are given
+        to and by its stores, and that unknown settings are refused
+        """
+        self.sm.close()
+        self.sm = StorageManager(dict(self.settings, NODE_ROW_STORE=True,
+                                      PREALLOCATE_RECORDS=4))
+        self.assertTrue(self.sm.NODE_ROW_STORE)
+        self.assertFalse(StorageManager.NODE_ROW_STORE)
+        self.assertEquals(self.sm.node_manager.store.PREALLOCATE_RECORDS, 4)
+        self.assertEquals(GeneralStore.PREALLOCATE_RECORDS, 0)
+        self.assertIs(self.sm.node_manager.store.WAL, self.sm.wal)
+        self.assertIsNone(GeneralStore.WAL)
+        with self.assertRaises(ValueError):
+            StorageManager(dict(self.settings, WAL=None))
+
     def test_get_empty_type_data(self):
         """
         Test the get_type_data method when no types exist
@@ -179,6 +212,299 @@ class TestStorageManagerMethods(unittest.TestCase):
         with self.assertRaises(TypeDoesNotExistException):
             self.sm.get_relationship_data("R")
 
+    def test_get_nodes_of_type(self):
+        """
+        Test that scanning for nodes of a type only returns live nodes of that
+        type, in index order
+        """
+        t1 = self.sm.create_node_type("T1", (("a", "int"),))
+        t2 = self.sm.create_node_type("T2", (("a", "int"),))
+        nodes = []
+        for i in range(6):
+            t = t1 if i % 2 == 0 else t2
+            node, props = self.sm.insert_node(
+                t, ((Property.PropertyType.int, i),))
+            nodes.append(node)
+        self.sm.delete_node(nodes[2])
+
+        found = list(self.sm.get_nodes_of_type(t1))
+        self.assertEquals([n.index for n in found],
+                          [nodes[0].index, nodes[4].index])
+        self.assertEquals([n.properties for n in found], [[0], [4]])
+        self.assertEquals(len(list(self.sm.get_nodes_of_type(t2))), 3)
+        self.assertEquals(self.sm.count_nodes_of_type(t1), 2)
+
+    def test_rebuild_node_type_index(self):
+        """
+        Test that the node type index is rebuilt from the node store when it
+        was not closed properly
+        """
+        t1 = self.sm.create_node_type("T1", (("a", "int"),))
+        t2 = self.sm.create_node_type("T2", (("a", "int"),))
+        nodes = [self.sm.insert_node(t1 if i % 3 else t2,
+                                     ((Property.PropertyType.int, i),))[0]
+                 for i in range(6)]
+        self.sm.delete_node(nodes[4])
+        # Crash: the index file is left marked as not clean
+        self.sm.nodeTypeIndex.dirty = False
+        self.sm.node_manager.store.storeFile.flush()
+
+        sm = StorageManager(self.settings)
+        self.assertEquals(sm.node_indexes_of_type(t1),
+                          [nodes[i].index for i in (1, 2, 5)])
+        self.assertEquals(sm.count_nodes_of_type(t2), 2)
+        sm.close()
+
+    def test_rebuild_node_type_index_without_numpy(self):
+        """
+        Test that the node type index is rebuilt by reading the node store in
+        chunks when the scan is not vectorized
+        """
+        use_numpy = NodeStore.USE_NUMPY
+        NodeStore.USE_NUMPY = False
+        try:
+            self.test_rebuild_node_type_index()
+        finally:
+            NodeStore.USE_NUMPY = use_numpy
+
+    def test_get_relations_of_type(self):
+        """
+        Test that scanning for relations of a type only returns relations of
+        that type
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r1 = self.sm.create_relationship_type("R1", ())
+        r2 = self.sm.create_relationship_type("R2", ())
+        n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+        rel1 = self.sm.insert_relation(r1, (), n1, n2)
+        self.sm.insert_relation(r2, (), n2, n1)
+        rel3 = self.sm.insert_relation(r1, (), n2, n1)
+
+        found = list(self.sm.get_relations_of_type(r1))
+        self.assertEquals([r.index for r in found], [rel1.index, rel3.index])
+        self.assertEquals(self.sm.count_relations_of_type(r2), 1)
+
+        self.sm.delete_node(n1)
+        self.assertEquals(list(self.sm.get_relations_of_type(r1)), [])
+        self.assertEquals(self.sm.count_relations_of_type(r2), 0)
+
+    def test_rebuild_relationship_type_index(self):
+        """
+        Test that the relationship type index is rebuilt from the relationship
+        store when it was not closed properly
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r1 = self.sm.create_relationship_type("R1", ())
+        r2 = self.sm.create_relationship_type("R2", ())
+        n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+        rels = [self.sm.insert_relation(r1 if i % 2 else r2, (), n1, n2)
+                for i in range(5)]
+        del self.sm.relprop[rels[3].index]
+        # Crash: the index file is left marked as not clean
+        self.sm.relTypeIndex.dirty = False
+        self.sm.relprop.drain()
+        self.sm.relationship_manager.store.storeFile.flush()
+
+        sm = StorageManager(self.settings)
+        self.assertEquals(sm.relTypeIndex.get_items(r1.index),
+                          [rels[1].index])
+        self.assertEquals(sm.count_relations_of_type(r2), 3)
+        sm.close()
+
+    def test_adjacent_relations(self):
+        """
+        Test that the relations of a node are found through the adjacency
+        index, by type and direction
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r1 = self.sm.create_relationship_type("R1", ())
+        r2 = self.sm.create_relationship_type("R2", ())
+        n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+        n3, p3 = self.sm.insert_node(t, ((Property.PropertyType.int, 3),))
+        rel1 = self.sm.insert_relation(r1, (), n1, n2)
+        rel2 = self.sm.insert_relation(r2, (), n1, n3)
+        rel3 = self.sm.insert_relation(r1, (), n3, n1)
+        rel4 = self.sm.insert_relation(r1, (), n1, n3)
+
+        out = AdjacencyIndex.OUTGOING
+        self.assertEquals(self.sm.get_adjacent_relations(n1.index, r1, out),
+                          [(rel1.index, n2.index), (rel4.index, n3.index)])
+        self.assertEquals(self.sm.get_adjacent_relations(
+            n1.index, r1, AdjacencyIndex.INCOMING), [(rel3.index, n3.index)])
+        self.assertEquals(self.sm.get_adjacent_relations(n1.index, r2),
+                          [(rel2.index, n3.index)])
+
+        self.sm.delete_node(n3)
+        self.assertEquals(self.sm.get_adjacent_relations(n1.index),
+                          [(rel1.index, n2.index)])
+        self.assertEquals(self.sm.get_adjacent_relations(n3.index), [])
+
+    def test_rebuild_adjacency_index(self):
+        """
+        Test that the adjacency index is rebuilt from the relationship store
+        when it was not closed properly
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+        rels = [self.sm.insert_relation(r, (), n1, n2) for i in range(3)]
+        del self.sm.relprop[rels[1].index]
+        # Crash: the index file is left marked as not clean
+        self.sm.adjacencyIndex.dirty = False
+        self.sm.relprop.drain()
+        self.sm.relationship_manager.store.storeFile.flush()
+
+        sm = StorageManager(self.settings)
+        self.assertEquals(sm.get_adjacent_relations(n2.index),
+                          [(rels[0].index, n1.index),
+                           (rels[2].index, n1.index)])
+        sm.close()
+
+    def test_property_index(self):
+        """
+        Test that a property index follows inserts, updates, deletes and
+        changes of the schema
+        """
+        t = self.sm.create_node_type("T", (("a", "int"), ("b", "string"),
+                                           ("c", "int[]")))
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.int, i % 3),
+                                         (Property.PropertyType.string, "s"),
+                                         (Property.PropertyType.intArray, [])))
+                 [0] for i in range(6)]
+        prop_index = self.sm.create_property_index("T", "a")
+        self.assertIs(self.sm.get_property_index(t, "a"), prop_index)
+        self.assertIsNone(self.sm.get_property_index(t, "b"))
+        self.assertEquals(prop_index.lookup("=", 1),
+                          [nodes[1].index, nodes[4].index])
+        with self.assertRaises(IndexAlreadyExistsException):
+            self.sm.create_property_index("T", "a")
+        with self.assertRaises(TypeMismatchException):
+            self.sm.create_property_index("T", "c")
+        with self.assertRaises(NonexistentPropertyException):
+            self.sm.create_property_index("T", "d")
+
+        n, _ = self.sm.insert_node(t, ((Property.PropertyType.int, 1),
+                                       (Property.PropertyType.string, "s"),
+                                       (Property.PropertyType.intArray, [])))
+        self.sm.update_nodes([self.sm.get_node(nodes[1].index)], {0: 5})
+        del self.sm.nodeprop[nodes[4].index]
+        self.assertEquals(prop_index.lookup("=", 1), [n.index])
+        self.assertEquals(prop_index.lookup(">", 2), [nodes[1].index])
+
+        # Renaming keeps the index, changing the type rebuilds it
+        self.sm.rename_property("T", "a", "z", True)
+        self.assertIs(self.sm.get_property_index(t, "z"), prop_index)
+        self.sm.change_property("T", "z", "long", True)
+        prop_index = self.sm.get_property_index(t, "z")
+        self.assertEquals(prop_index.propType, Property.PropertyType.long)
+        self.assertEquals(prop_index.lookup("<=", 1),
+                          [nodes[0].index, nodes[3].index, n.index])
+
+        # The index is built again when the change fails part way
+        def fail_change(*args):
+            raise IOError("Failed to change the value")
+        self.sm.change_property_value = fail_change
+        with self.assertRaises(IOError):
+            self.sm.change_property("T", "z", "int", True)
+        del self.sm.change_property_value
+        prop_index = self.sm.get_property_index(t, "z")
+        self.assertEquals(prop_index.propType, Property.PropertyType.int)
+        self.assertEquals(prop_index.lookup("<=", 1),
+                          [nodes[0].index, nodes[3].index, n.index])
+
+        self.sm.drop_property("T", "z", True)
+        self.assertEquals(self.sm.propertyIndexes, {})
+        with self.assertRaises(IndexDoesNotExistException):
+            self.sm.drop_property_index("T", "b")
+        self.sm.create_property_index("T", "b")
+        self.sm.drop_property_index("T", "b")
+        self.assertIsNone(self.sm.get_property_index(t, "b"))
+
+    def test_rebuild_property_index(self):
+        """
+        Test that a property index is brought up to date with the stores when
+        the storage manager is reopened after a crash
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.int, i % 3),))
+                 [0] for i in range(6)]
+        prop_index = self.sm.create_property_index("T", "a")
+        self.sm.update_nodes([self.sm.get_node(nodes[0].index)], {0: 2})
+        # Crash: the index file is left as it was last written
+        prop_index.dirty = False
+        self.sm.nodeprop.drain()
+        for store in [self.sm.property_manager.store] + \
+                [manager.store for manager in self.sm.nodeRowManagers.values()]:
+            store.storeFile.flush()
+
+        sm = StorageManager(self.settings)
+        self.assertEquals(sm.get_property_index(t, "a").lookup("=", 2),
+                          [nodes[0].index, nodes[2].index, nodes[5].index])
+        sm.close()
+
+    def test_analyze(self):
+        """
+        Test that ANALYZE collects the statistics of the types, that they
+        follow inserts, deletes and schema changes, and are read back
+        """
+        t = self.sm.create_node_type("T", (("a", "int"), ("b", "int[]")))
+        r = self.sm.create_relationship_type("R", (("w", "string"),))
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.int, i % 4),
+                                         (Property.PropertyType.intArray, [])))
+                 [0] for i in range(8)]
+        for i in range(1, 4):
+            self.sm.insert_relation(r, ((Property.PropertyType.string, "x"),),
+                                    nodes[0], nodes[i])
+        self.assertIsNone(self.sm.get_statistics(t))
+
+        results = self.sm.analyze()
+        self.assertEquals([(name, flag) for name, flag, _ in results],
+                          [("T", True), ("R", False)])
+        stats = self.sm.get_statistics(t)
+        self.assertEquals(stats["count"], 8)
+        self.assertEquals(self.sm.get_property_statistics(t, "a")["distinct"],
+                          4)
+        # Arrays are not summarized
+        self.assertIsNone(self.sm.get_property_statistics(t, "b"))
+        rel_stats = self.sm.get_statistics(r, False)
+        self.assertEquals(rel_stats["count"], 3)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["nodes"], 1)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["max"], 3)
+        self.assertEquals(rel_stats[Statistics.IN_DEGREE]["nodes"], 3)
+        self.assertEquals(Statistics.mean_degree(rel_stats,
+                                                 Statistics.OUT_DEGREE), 3)
+
+        # Counts follow inserts and deletes
+        n, _ = self.sm.insert_node(t, ((Property.PropertyType.int, 9),
+                                       (Property.PropertyType.intArray, [])))
+        self.sm.insert_relation(r, ((Property.PropertyType.string, "x"),),
+                                self.sm.get_node(n.index).node, nodes[1])
+        del self.sm.nodeprop[nodes[0].index]
+        self.sm.nodeprop.sync()
+        self.assertEquals(self.sm.get_statistics(t)["count"], 8)
+        rel_stats = self.sm.get_statistics(r, False)
+        self.assertEquals(rel_stats["count"], 1)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["nodes"], 1)
+        self.assertEquals(rel_stats[Statistics.OUT_DEGREE]["max"], 1)
+        self.assertEquals(rel_stats[Statistics.IN_DEGREE]["nodes"], 1)
+
+        # Statistics are written to their file
+        self.sm.rename_property("T", "a", "z", True)
+        self.sm.statistics.flush()
+        self.sm.statistics = Statistics(self.sm.STATISTICS_FILENAME)
+        self.assertEquals(self.sm.get_property_statistics(t, "z")["distinct"],
+                          4)
+        self.sm.change_property("T", "z", "long", True)
+        self.assertIsNone(self.sm.get_property_statistics(t, "z"))
+        self.sm.delete_relationship_type("R")
+        self.assertIsNone(self.sm.get_statistics(r, False))
+        with self.assertRaises(TypeDoesNotExistException):
+            self.sm.analyze("R", False)
+
     def test_insert_relation(self):
         t = self.sm.create_node_type("T", (("a", "int"),))
         r = self.sm.create_relationship_type("R",
@@ -384,6 +710,59 @@ class TestStorageManagerMethods(unittest.TestCase):
         self.assertEqual(n1.relId, 0)
         self.assertEqual(n2.relId, 0)
 
+    def test_batch(self):
+        """
+        Test that changes made in a batch are only synced to the stores when
+        the outermost batch is committed
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        with self.sm.batch():
+            n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+            with self.sm.batch():
+                n2, p2 = self.sm.insert_node(t,
+                                             ((Property.PropertyType.int, 2),))
+                rel = self.sm.insert_relation(r, (), n1, n2)
+            # The nested batch did not sync the caches
+            self.assertEquals(self.sm.node_manager.get_item_at_index(n1.index)
+                              .relId, 0)
+            self.assertIn(rel.index, self.sm.relprop.dirty)
+            # Reads go through the cache
+            self.assertEquals(self.sm.get_node(n2.index).node.relId,
+                              rel.index)
+        self.assertEquals(self.sm.node_manager.get_item_at_index(n1.index)
+                          .relId, rel.index)
+        self.assertEquals(len(self.sm.nodeprop.dirty), 0)
+        self.assertEquals(len(self.sm.relprop.dirty), 0)
+        # Committing without a batch fails
+        with self.assertRaises(NoBatchStartedException):
+            self.sm.commit_batch()
+
+    def test_batch_delete(self):
+        """
+        Test that nodes and relations created and deleted in the same batch
+        are removed from the stores
+        """
+        t = self.sm.create_node_type("T", ())
+        r = self.sm.create_relationship_type("R", ())
+        with self.sm.batch():
+            n1, p1 = self.sm.insert_node(t, ())
+            n2, p2 = self.sm.insert_node(t, ())
+            n3, p3 = self.sm.insert_node(t, ())
+            r1 = self.sm.insert_relation(r, (), n1, n2)
+            r2 = self.sm.insert_relation(r, (), n2, n3)
+            r3 = self.sm.insert_relation(r, (), n3, n1)
+            del self.sm.nodeprop[n1.index]
+
+        self.assertIsNoneOrEOF(self.sm.get_node(n1.index))
+        self.assertIsNoneOrEOF(self.sm.get_relation(r1.index))
+        self.assertIsNoneOrEOF(self.sm.get_relation(r3.index))
+        self.assertEquals(self.sm.get_node(n2.index).node.relId, r2.index)
+        self.assertEquals(self.sm.get_node(n3.index).node.relId, r2.index)
+        r2 = self.sm.get_relation(r2.index).rel
+        self.assertEquals(r2.firstPrevRelId, 0)
+        self.assertEquals(r2.secondNextRelId, 0)
+
     def test_update_items_simple(self, node_flag=True):
         """
         Test that updating an item's properties works properly, in a 1 property
@@ -842,7 +1221,11 @@ class TestStorageManagerMethods(unittest.TestCase):
         for index, new_val in updates.iteritems():
             prop = properties[index]
             cur_val = prop.propBlockId
-            if prop.is_string():
+            # Inline values are stored in the property
+            if prop.inline:
+                if cur_val != new_val:
+                    return False
+            elif prop.is_string():
                 if string_manager.read_string_at_index(cur_val) != new_val:
                     return False
             elif prop.is_array():
@@ -1113,6 +1496,37 @@ class TestStorageManagerMethods(unittest.TestCase):
         r = self.sm.create_relationship_type("R", schema)
         self.rename_property_helper("R", False)
 
+    def test_type_catalog(self):
+        """
+        Test that the schema catalog follows the changes to the types and is
+        loaded back from the type stores
+        """
+        t = self.sm.create_node_type("T", (("a", "int"), ("b", "string")))
+        self.sm.create_relationship_type("R", ())
+        self.sm.create_node_type("U", ())
+        self.sm.delete_node_type("U")
+        self.sm.rename_property("T", "a", "c", True)
+        self.sm.add_property("R", "d", "int[]", False)
+        with self.assertRaises(NonexistentPropertyException):
+            self.sm.drop_property("T", "e", True)
+
+        catalogs = [self.sm.type_catalog(True), self.sm.type_catalog(False)]
+        self.sm.close()
+
+        self.sm = sm = StorageManager(self.settings)
+        self.assertEquals([sm.type_catalog(True), sm.type_catalog(False)],
+                          catalogs)
+        node_type, schema = sm.get_node_data("T")
+        self.assertEquals(node_type, t)
+        self.assertEquals([(name, tt_type) for _, name, tt_type in schema],
+                          [("c", Property.PropertyType.int),
+                           ("b", Property.PropertyType.string)])
+        _, schema = sm.get_relationship_data("R")
+        self.assertEquals([(name, tt_type) for _, name, tt_type in schema],
+                          [("d", Property.PropertyType.intArray)])
+        with self.assertRaises(TypeDoesNotExistException):
+            sm.get_node_data("U")
+
     # --- Helpers --- #
     def test_is_convertible(self):
         numerical_types = [
@@ -1146,3 +1560,434 @@ class TestStorageManagerMethods(unittest.TestCase):
                 if Property.PropertyType.is_array(t):
                     continue
                 self.assertFalse(self.sm.is_convertible(t, s), "%s %s" % (t, s))
+
+
+class TestStorageManagerMemoryMappedMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with the store files accessed through mmap
+    """
+    def storage_settings(self):
+        return {"MEMORY_MAPPED": True}
+
+
+class TestStorageManagerBufferPoolMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with the store files cached in a buffer
+    pool small enough for pages to be evicted
+    """
+    def storage_settings(self):
+        return {"BUFFER_POOL": BufferPool(budget=1024, page_size=64)}
+
+
+class TestStorageManagerWriteAheadLogMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with changes logged to a write-ahead log
+    """
+    def storage_settings(self):
+        return {"WAL_MODE": WriteAheadLog.GROUP}
+
+    def test_replay_unfinished_relation(self):
+        """
+        Test that a relation insert interrupted by a crash is undone when the
+        storage manager is reopened, leaving the nodes unlinked
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+        # Crash once the nodes were rewired, before the transaction commits
+        self.sm.wal.begin()
+        rel = self.sm.insert_relation(r, (), n1, n2)
+        for manager in (self.sm.node_manager, self.sm.relationship_manager):
+            manager.store.storeFile.flush()
+        self.sm.wal.logFile.flush()
+        self.assertEquals(self.sm.node_manager.get_item_at_index(n1.index)
+                          .relId, rel.index)
+        self.sm.wal = None
+
+        sm = StorageManager(self.settings)
+        self.assertEquals(sm.get_node(n1.index).node.relId, 0)
+        self.assertEquals(sm.get_node(n2.index).node.relId, 0)
+        self.assertIsNoneOrEOF(sm.get_relation(rel.index))
+        sm.close()
+
+    def test_repair_indexes(self):
+        """
+        Test that the indexes left behind by a crash are brought up to date
+        from the changes replayed from the log instead of being rebuilt
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.int, i),))[0]
+                 for i in range(3)]
+        rel = self.sm.insert_relation(r, (), nodes[0], nodes[1])
+        # The indexes are written when the log is checkpointed
+        with GeneralStore.IO_LOCK:
+            self.sm.wal.checkpoint()
+        n, p = self.sm.insert_node(t, ((Property.PropertyType.int, 3),))
+        self.sm.delete_relation(rel)
+        rel2 = self.sm.insert_relation(r, (), nodes[2], n)
+        # Crash: the index files are left as they were at the checkpoint
+        for index in self.sm.persistent_indexes():
+            index.dirty = False
+        self.sm.nodeprop.drain()
+        self.sm.relprop.drain()
+        for manager in (self.sm.node_manager, self.sm.relationship_manager):
+            manager.store.storeFile.flush()
+
+        def rebuild(sm):
+            self.fail("An index was rebuilt")
+
+        class RepairingStorageManager(StorageManager):
+            rebuild_node_type_index = rebuild
+            rebuild_relationship_type_index = rebuild
+            rebuild_adjacency_index = rebuild
+
+        sm = RepairingStorageManager(self.settings)
+        self.assertEquals(sm.node_indexes_of_type(t),
+                          [node.index for node in nodes + [n]])
+        self.assertEquals(sm.relTypeIndex.get_items(r.index), [rel2.index])
+        self.assertEquals(sm.get_adjacent_relations(nodes[0].index), [])
+        self.assertEquals(sm.get_adjacent_relations(n.index),
+                          [(rel2.index, nodes[2].index)])
+        sm.close()
+
+
+class TestStorageManagerBackgroundFlushMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with the caches written back by background
+    flusher threads
+    """
+    def storage_settings(self):
+        return {"BACKGROUND_FLUSH": True}
+
+    def test_batch(self):
+        """
+        Test that the changes of a batch reach the stores once the caches are
+        drained (the flusher does not wait for the batch to end)
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        with self.sm.batch():
+            n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+            n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+            rel = self.sm.insert_relation(r, (), n1, n2)
+        self.sm.nodeprop.drain()
+        self.sm.relprop.drain()
+        self.assertEquals(self.sm.node_manager.get_item_at_index(n1.index)
+                          .relId, rel.index)
+        self.assertEquals(self.sm.relationship_manager
+                          .get_item_at_index(rel.index).secondNodeId,
+                          n2.index)
+        self.assertEquals(len(self.sm.nodeprop.dirty), 0)
+
+
+class TestStorageManagerBackgroundFlushLogMethods(
+        TestStorageManagerBackgroundFlushMethods):
+    """
+    Runs the StorageManager tests with background flushers and a write-ahead
+    log
+    """
+    def storage_settings(self):
+        settings = super(TestStorageManagerBackgroundFlushLogMethods,
+                         self).storage_settings()
+        settings["WAL_MODE"] = WriteAheadLog.GROUP
+        return settings
+
+    def test_commit_drains_caches(self):
+        """
+        Test that the cached writes of a transaction reach the stores before
+        it commits, so that they are logged in that transaction
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        r = self.sm.create_relationship_type("R", ())
+        n1, p1 = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        n2, p2 = self.sm.insert_node(t, ((Property.PropertyType.int, 2),))
+        tx_id = self.sm.wal.txId
+        rel = self.sm.insert_relation(r, (), n1, n2)
+        self.assertEquals(len(self.sm.nodeprop.dirty), 0)
+        self.assertEquals(len(self.sm.relprop.dirty), 0)
+        self.assertEquals(self.sm.node_manager.get_item_at_index(n1.index)
+                          .relId, rel.index)
+        # Every write was logged in the transaction of the insert
+        self.sm.wal.logFile.flush()
+        tx_ids = set(record[1] for record in self.sm.wal.read_records())
+        self.assertEquals(max(tx_ids), tx_id + 1)
+        self.sm.wal.logFile.seek(0, os.SEEK_END)
+
+
+class TestStorageManagerSharedStringsMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with hash indexes on the strings and equal
+    property strings shared
+    """
+    def storage_settings(self):
+        return {"STRING_HASH_INDEX": True, "DEDUPLICATE_STRINGS": True}
+
+    def test_shared_strings(self):
+        """
+        Test that equal property strings are stored once, and that a shared
+        string outlives the nodes that still use it
+        """
+        t = self.sm.create_node_type("T", (("a", "string"),))
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.string,
+                                          "NY"),)) for _ in range(3)]
+        block_ids = set(props[0].propBlockId for _, props in nodes)
+        self.assertEquals(len(block_ids), 1)
+        block_id = block_ids.pop()
+        string_index = self.sm.prop_string_manager.hashIndex
+        self.assertEquals(string_index.get_references(block_id), 3)
+
+        self.sm.delete_node(nodes[0][0])
+        self.assertEquals(string_index.get_references(block_id), 2)
+        self.assertEquals(self.sm.prop_string_manager
+                          .read_string_at_index(block_id), "NY")
+
+        # Updating one node leaves the other one's value alone
+        self.sm.update_nodes([self.sm.get_node(nodes[1][0].index)], {0: "LA"})
+        self.assertEquals(self.sm.get_node(nodes[1][0].index).properties,
+                          ["LA"])
+        self.assertEquals(self.sm.get_node(nodes[2][0].index).properties,
+                          ["NY"])
+        self.assertEquals(string_index.get_references(block_id), 1)
+
+    def test_rebuild_shared_strings(self):
+        """
+        Test that the references to the shared strings are counted again from
+        the property store when the index was not closed properly
+        """
+        t = self.sm.create_node_type("T", (("a", "string"),))
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.string,
+                                          "NY"),)) for _ in range(3)]
+        block_id = nodes[0][1][0].propBlockId
+        # Crash: the index file is left marked as not clean
+        self.sm.prop_string_manager.hashIndex.dirty = False
+        self.sm.nodeprop.drain()
+        self.sm.property_manager.store.storeFile.flush()
+        self.sm.prop_string_manager.storeManager.store.storeFile.flush()
+
+        sm = StorageManager(self.settings)
+        string_index = sm.prop_string_manager.hashIndex
+        self.assertEquals(string_index.get_references(block_id), 3)
+        self.assertEquals(sm.prop_string_manager.find_string("NY"), block_id)
+        sm.close()
+
+
+class TestStorageManagerInlineValuesMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with short strings and small arrays stored
+    in the property records
+    """
+    def storage_settings(self):
+        return {"INLINE_PROPERTY_VALUES": True}
+
+    def test_inline_values(self):
+        """
+        Test that values that fit are stored inline, and that updates move
+        values in and out of the string and array stores
+        """
+        t = self.sm.create_node_type("T", (("a", "string"), ("b", "int[]")))
+        n, props = self.sm.insert_node(t, (
+            (Property.PropertyType.string, "NY"),
+            (Property.PropertyType.intArray, [1, 2])))
+        self.assertTrue(props[0].inline)
+        self.assertTrue(props[1].inline)
+        self.assertEquals(self.sm.prop_string_manager.storeManager.store
+                          .get_last_file_index(), 1)
+        self.sm.nodeprop.sync()
+        self.sm.nodeprop.clear()
+        self.assertEquals(self.sm.get_node(n.index).properties,
+                          [u"NY", [1, 2]])
+
+        long_string = "a string longer than eight bytes"
+        self.sm.update_nodes([self.sm.get_node(n.index)],
+                             {0: long_string, 1: [1, 2, 3]})
+        _, props = self.sm.nodeprop[n.index]
+        self.assertFalse(props[0].inline)
+        self.assertFalse(props[1].inline)
+        self.assertEquals(self.sm.get_node(n.index).properties,
+                          [long_string, [1, 2, 3]])
+
+        self.sm.update_nodes([self.sm.get_node(n.index)], {0: "LA", 1: []})
+        _, props = self.sm.nodeprop[n.index]
+        self.assertTrue(props[0].inline)
+        self.assertTrue(props[1].inline)
+        self.assertEquals(self.sm.get_node(n.index).properties, [u"LA", []])
+        # The values that were moved inline were deleted from the stores
+        self.assertIsNoneOrEOF(self.sm.prop_string_manager.storeManager
+                               .get_item_at_index(1))
+        self.assertIsNoneOrEOF(self.sm.array_manager.storeManager
+                               .get_item_at_index(1))
+
+
+class TestStorageManagerNodeRowStoreMethods(TestStorageManagerMethods):
+    """
+    Runs the StorageManager tests with the properties of the nodes stored in
+    a row file per node type
+    """
+    def storage_settings(self):
+        return {"NODE_ROW_STORE": True}
+
+    def row_file_path(self, t):
+        return GrapheneStore().datafilesDir + RowStore.FILE_NAME_FORMAT % t.index
+
+    def test_insert_node(self):
+        """
+        Test that the properties of a node are stored in a single row, not in
+        property records
+        """
+        t = self.sm.create_node_type("T", (("a", "int"), ("b", "string")))
+        node, props = self.sm.insert_node(t, ((Property.PropertyType.int, 3),
+                                              (Property.PropertyType.string, "a")))
+        self.assertEquals(self.sm.get_node_type(node), t)
+
+        row = self.sm.nodeRowManagers[t.index].get_item_at_index(node.propId)
+        self.assertEquals(row.properties, props)
+        self.assertEquals(self.sm.get_property_value(props[0]), 3)
+        self.assertEquals(self.sm.get_property_value(props[1]), "a")
+        self.assertEquals(self.sm.property_manager.store.get_last_file_index(),
+                          1)
+
+        self.sm.nodeprop.sync()
+        self.sm.nodeprop.clear()
+        self.assertEquals(self.sm.get_node(node.index).properties, [3, "a"])
+
+    def test_create_type_with_nodes(self):
+        """
+        Test that deleting a node type deletes its nodes along with its row
+        file
+        """
+        t = self.sm.create_node_type("T", (("a", "int"), ("c", "string"),
+                                           ("d", "int[]")))
+        nodes = [self.sm.insert_node(t, ((Property.PropertyType.int, i),
+                                         (Property.PropertyType.string, "a"),
+                                         (Property.PropertyType.intArray, [i])))
+                 for i in range(3)]
+        self.assertTrue(os.path.isfile(self.row_file_path(t)))
+        self.sm.delete_node_type("T")
+        self.assertIsNoneOrEOF(self.sm.nodeTypeManager.get_item_at_index(t.index))
+        for n, _ in nodes:
+            self.assertIsNoneOrEOF(self.sm.node_manager.get_item_at_index(n.index))
+        self.assertFalse(os.path.isfile(self.row_file_path(t)))
+        self.assertNotIn(t.index, self.sm.nodeRowManagers)
+        # The strings and arrays of the nodes were deleted too
+        self.assertIsNoneOrEOF(self.sm.prop_string_manager.storeManager
+                               .get_item_at_index(1))
+        self.assertIsNoneOrEOF(self.sm.array_manager.storeManager
+                               .get_item_at_index(1))
+
+    def test_delete_type_logged(self):
+        """
+        Test that with a write-ahead log, the row file of a deleted node type
+        is only removed once the deletion is committed, so that the type gets
+        it back if the deletion is undone, and that it is not recreated when
+        the log is replayed
+        """
+        self.sm.close()
+        self.settings["WAL_MODE"] = WriteAheadLog.GROUP
+        self.sm = StorageManager(self.settings)
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        n, _ = self.sm.insert_node(t, ((Property.PropertyType.int, 1),))
+        # Crash before the deletion of the type commits
+        self.sm.wal.begin()
+        self.sm.delete_node_type("T")
+        self.assertTrue(os.path.isfile(self.row_file_path(t)))
+        for manager in (self.sm.nodeTypeManager, self.sm.node_manager):
+            manager.store.storeFile.flush()
+        self.sm.wal.logFile.flush()
+        self.sm.wal = None
+
+        sm = StorageManager(self.settings)
+        self.assertIn(t.index, sm.nodeRowManagers)
+        self.assertEquals(sm.get_node(n.index).properties, [1])
+        sm.delete_node_type("T")
+        self.assertFalse(os.path.isfile(self.row_file_path(t)))
+        sm.close()
+        sm = StorageManager(self.settings)
+        self.assertFalse(os.path.isfile(self.row_file_path(t)))
+        sm.close()
+
+    def test_remove_deleted_row_files(self):
+        """
+        Test that the row file left behind by a type whose deletion was
+        committed is removed when the storage manager is reopened
+        """
+        t = self.sm.create_node_type("T", (("a", "int"),))
+        path = self.row_file_path(t)
+        with open(path, "rb") as row_file:
+            data = row_file.read()
+        self.sm.delete_node_type("T")
+        self.sm.close()
+        with open(path, "wb") as row_file:
+            row_file.write(data)
+        self.sm = StorageManager(self.settings)
+        self.assertFalse(os.path.isfile(path))
+        self.assertEquals(self.sm.nodeRowManagers, {})
+
+    def test_drop_property(self):
+        """
+        Test that dropping a property removes its column from the rows
+        """
+        schema = (("a", "string"), ("b", "int"), ("c", "int[]"))
+        types = (Property.PropertyType.string, Property.PropertyType.int,
+                 Property.PropertyType.intArray)
+        t = self.sm.create_node_type("T", schema)
+        n1, _ = self.sm.insert_node(t, zip(types, ("foo", 1, [1, 2])))
+        n2, _ = self.sm.insert_node(t, zip(types, ("bar", 2, [3])))
+
+        with self.assertRaises(NonexistentPropertyException):
+            self.sm.drop_property("T", "foo", True)
+        self.sm.drop_property("T", "c", True)
+        self.assertEquals(self.sm.nodeRowManagers[t.index].store.columns, 2)
+        self.assertEquals(self.sm.get_node(n1.index).properties, ["foo", 1])
+        self.assertEquals(self.sm.get_node(n2.index).properties, ["bar", 2])
+
+        self.sm.drop_property("T", "a", True)
+        self.sm.nodeprop.clear()
+        self.assertEquals(self.sm.get_node(n1.index).properties, [1])
+        self.assertEquals(self.sm.get_node(n2.index).properties, [2])
+        # The dropped strings and arrays were deleted
+        self.assertIsNoneOrEOF(self.sm.prop_string_manager.storeManager
+                               .get_item_at_index(1))
+        self.assertIsNoneOrEOF(self.sm.array_manager.storeManager
+                               .get_item_at_index(1))
+
+    def test_add_property(self):
+        """
+        Test that adding a property adds a column with its default value to
+        the rows, including those of a type with no properties
+        """
+        t = self.sm.create_node_type("T", ())
+        n1, props = self.sm.insert_node(t, ())
+        self.assertEquals(props, [])
+        n2, _ = self.sm.insert_node(t, ())
+
+        self.sm.add_property("T", "a", "string", True)
+        self.sm.add_property("T", "b", "int[]", True)
+        self.assertEquals(self.sm.nodeRowManagers[t.index].store.columns, 2)
+        self.sm.update_nodes([self.sm.get_node(n1.index)], {0: "x", 1: [1]})
+        self.sm.add_property("T", "c", "int", True)
+        self.sm.nodeprop.clear()
+        self.assertEquals(self.sm.get_node(n1.index).properties,
+                          ["x", [1], 0])
+        self.assertEquals(self.sm.get_node(n2.index).properties,
+                          ["", [], 0])
+
+    def test_reopen_rows(self):
+        """
+        Test that a node type keeps its layout when the storage manager is
+        reopened, whatever NODE_ROW_STORE is set to
+        """
+        t = self.sm.create_node_type("T", (("a", "string"), ("b", "long")))
+        n, _ = self.sm.insert_node(t, ((Property.PropertyType.string, "NY"),
+                                       (Property.PropertyType.long, 2 ** 40)))
+        self.sm.close()
+        self.sm = StorageManager(dict(self.settings, NODE_ROW_STORE=False))
+        u = self.sm.create_node_type("U", (("a", "int"),))
+        m, props = self.sm.insert_node(u, ((Property.PropertyType.int, 1),))
+        self.assertIn(t.index, self.sm.nodeRowManagers)
+        self.assertNotIn(u.index, self.sm.nodeRowManagers)
+        self.assertEquals(self.sm.get_node(n.index).properties,
+                          ["NY", 2 ** 40])
+        self.assertEquals(self.sm.get_node(m.index).properties, [1])
+        self.assertEquals(m.propId, props[0].index)